@@ -293,7 +293,12 @@ class AutoScraperController:
                     # Mostrar últimas 20 líneas
                     recent_lines = lines[-20:] if len(lines) > 20 else lines
                     for line in recent_lines:
-                        print(line.strip())
+                        try:
+                            # Archivos en JSON por líneas (LOG_JSON=true)
+                            entry = json.loads(line)
+                            print(f"{entry['ts'][:19]} - {entry['nivel']} - {entry['mensaje']}")
+                        except (ValueError, KeyError, TypeError):
+                            print(line.strip())
             except Exception as e:
                 print(f"❌ Error leyendo logs: {e}")
         else:
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark del perfil ligero de navegador sobre páginas de detalle de sjf2 (requiere Chrome y red)
+- Perfil completo (lean=False) contra perfil ligero (headless nuevo + recursos bloqueados vía CDP)
+- Bytes transferidos por tesis: suma de encodedDataLength del registro de rendimiento de Chrome
+- Tiempo de carga por tesis: navegación hasta loadEventEnd y hasta contenido extraíble (PageReady)
+- Peticiones bloqueadas por el perfil ligero
+
+Uso:
+    python benchmark_browser_profile.py [registro ...]
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.browser_profile import CHROME_USER_AGENT, chrome_options, create_chrome_driver
+from src.scraper.page_ready import PageReady
+from src.scraper.scjn_config import READY_SELECTORS, URL_PATTERNS
+
+DEFAULT_REGISTROS = [2031000, 2030758, 2030500, 2030250, 2030000, 2029750, 2029500, 2029250]
+LOAD_TIME_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+return nav ? nav.loadEventEnd - nav.startTime : null;
+"""
+
+
+def network_totals(driver):
+    """Bytes recibidos y peticiones bloqueadas desde la última lectura del registro de rendimiento"""
+    received, blocked, requests = 0, 0, 0
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        method, params = message.get('method'), message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            requests += 1
+        elif method == 'Network.loadingFinished':
+            received += params.get('encodedDataLength', 0)
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            blocked += 1
+    return received, blocked, requests
+
+
+def run_profile(lean, registros):
+    options = chrome_options(headless=True, user_agent=CHROME_USER_AGENT, lean=lean)
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    driver = create_chrome_driver(lean=lean, options=options)
+    ready = PageReady(driver)
+    rows = []
+    try:
+        network_totals(driver)  # descartar el arranque del navegador
+        for registro in registros:
+            url = f"{URL_PATTERNS['base_url']}/detalle/tesis/{registro}"
+            start = time.perf_counter()
+            driver.get(url)
+            ready.wait(READY_SELECTORS['detail'])
+            to_content = time.perf_counter() - start
+            load_ms = driver.execute_script(LOAD_TIME_JS)
+            received, blocked, requests = network_totals(driver)
+            rows.append({'registro': registro, 'bytes': received, 'bloqueadas': blocked, 'peticiones': requests,
+                         'carga_ms': load_ms or 0.0, 'contenido_s': to_content})
+    finally:
+        driver.quit()
+    return rows
+
+
+def report(name, rows):
+    kb = [row['bytes'] / 1024 for row in rows]
+    print(f"   {name:<16} {statistics.mean(kb):>8.1f} KB/tesis   "
+          f"carga {statistics.mean(row['carga_ms'] for row in rows):>7.0f} ms   "
+          f"contenido {statistics.mean(row['contenido_s'] for row in rows):>5.2f} s   "
+          f"peticiones {statistics.mean(row['peticiones'] for row in rows):>5.1f}   "
+          f"bloqueadas {statistics.mean(row['bloqueadas'] for row in rows):>5.1f}")
+    return statistics.mean(kb), statistics.mean(row['carga_ms'] for row in rows)
+
+
+def main():
+    """Función principal"""
+    registros = [int(arg) for arg in sys.argv[1:]] or DEFAULT_REGISTROS
+    print(f"📊 Benchmark del perfil de navegador ({len(registros)} tesis)")
+
+    full = run_profile(False, registros)
+    lean = run_profile(True, registros)
+
+    print()
+    full_kb, full_ms = report("Perfil completo", full)
+    lean_kb, lean_ms = report("Perfil ligero", lean)
+    print(f"   📉 Bytes: -{(1 - lean_kb / max(full_kb, 0.001)) * 100:.0f}%   "
+          f"Carga: -{(1 - lean_ms / max(full_ms, 0.001)) * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
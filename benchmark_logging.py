@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de logging por fila extraída (extract_result_data sobre filas simuladas)
+- Sin logging: coste de la extracción sola, referencia para el resto
+- Antes: logging.basicConfig con FileHandler + StreamHandler síncronos y la traza por selector
+  emitida (las mismas líneas que antes salían en INFO, escritas en el hilo que extrae)
+- Después (INFO): configuración central de ScraperLogger; la traza por selector es DEBUG y no se emite
+- Después (DEBUG): la traza se emite, muestreada por línea de código, y se escribe en el hilo del listener
+- Reporta µs por fila en el hilo que extrae y el total hasta vaciar la cola, y las líneas escritas
+
+Uso:
+    python benchmark_logging.py [filas]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.common.exceptions import NoSuchElementException
+
+from src.config import Config
+from src.scraper.selenium_scraper import SeleniumSCJNScraper
+from src.utils import logger as scraper_logging
+
+ROWS = 3000
+METADATA = "SCJN;11a. Época;Semanario Judicial de la Federación;P./J. 5/2025 (11a.) ;J; Publicación: viernes 13 de junio de 2025 10:19 h"
+
+
+class FakeNode:
+    def __init__(self, text, href=None):
+        self.text = text
+        self.href = href
+
+    def get_attribute(self, name):
+        return self.href if name == 'href' else None
+
+
+class FakeRow:
+    """Fila de resultados: el primer selector de ID no existe (como en la página real tras un rediseño)"""
+
+    def __init__(self, n):
+        registro = 2030000 + n
+        self.nodes = {
+            ".list-item-text": FakeNode(f"{n + 1}. Registro digital: {registro}"),
+            ".tesis-rubro-completo": FakeNode(f"DERECHO DE PRUEBA NÚMERO {n}. SU ALCANCE EN EL JUICIO DE AMPARO",
+                                              f"https://sjf2.scjn.gob.mx/detalle/tesis/{registro}"),
+            ".list-item-text2": FakeNode(METADATA),
+        }
+        self.text = "\n".join(node.text for node in self.nodes.values())
+
+    def find_element(self, by, selector):
+        node = self.nodes.get(selector)
+        if node is None:
+            raise NoSuchElementException(f"Unable to locate element: {selector}")
+        return node
+
+
+def count_lines(directory):
+    total = 0
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), 'rb') as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run(scraper, rows):
+    start = time.perf_counter()
+    extracted = sum(1 for row in rows if scraper.extract_result_data(row))
+    return time.perf_counter() - start, extracted
+
+
+def measure(label, setup, teardown, scraper, rows, directory):
+    setup()
+    elapsed, extracted = run(scraper, rows)
+    drain = time.perf_counter()
+    teardown()
+    total = elapsed + time.perf_counter() - drain
+    lines = count_lines(directory)
+    return {'modo': label, 'filas': extracted, 'us_fila': elapsed / len(rows) * 1e6,
+            'us_fila_total': total / len(rows) * 1e6, 'lineas': lines}
+
+
+def main():
+    """Función principal"""
+    rows_count = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    rows = [FakeRow(n) for n in range(rows_count)]
+    scraper = SeleniumSCJNScraper()
+    print(f"🧪 === BENCHMARK DE LOGGING POR FILA ({rows_count} filas) ===\n")
+
+    results = []
+    tmp = tempfile.mkdtemp()
+    try:
+        for label in ('sin logging', 'antes', 'después (INFO)', 'después (DEBUG)'):
+            directory = os.path.join(tmp, label.replace(' ', '_').strip('()'))
+            os.makedirs(directory)
+            stream = open(os.path.join(directory, 'consola.log'), 'w', encoding='utf-8')
+
+            if label == 'sin logging':
+                def setup():
+                    logging.disable(logging.CRITICAL)
+
+                def teardown():
+                    logging.disable(logging.NOTSET)
+            elif label == 'antes':
+                def setup(directory=directory, stream=stream):
+                    reset_root()
+                    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                        handlers=[logging.FileHandler(os.path.join(directory, 'scraper.log')),
+                                                  logging.StreamHandler(stream)])
+
+                def teardown():
+                    reset_root()
+            else:
+                level = 'INFO' if 'INFO' in label else 'DEBUG'
+                logs_dir = type(Config.LOGS_DIR)(directory)
+                config = type('BenchmarkConfig', (Config,), {'LOG_LEVEL': level, 'LOGS_DIR': logs_dir,
+                                                             'LOG_FILE': logs_dir / 'scraper.log'})
+
+                def setup(config=config, stream=stream):
+                    scraper_logging.ScraperLogger("benchmark", config).setup_logging()
+                    # La consola del listener a archivo, como en un servicio con la salida redirigida
+                    for handler in scraper_logging._listener.handlers:
+                        if type(handler) is logging.StreamHandler:
+                            handler.setStream(stream)
+
+                def teardown():
+                    scraper_logging.stop_queue_logging()
+
+            results.append(measure(label, setup, teardown, scraper, rows, directory))
+            stream.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    base = results[0]['us_fila']
+    print(f"{'modo':<18}{'µs/fila':>10}{'logging':>10}{'µs/fila con vaciado':>22}{'líneas':>10}")
+    for r in results:
+        print(f"{r['modo']:<18}{r['us_fila']:>10.1f}{r['us_fila'] - base:>10.1f}{r['us_fila_total']:>22.1f}{r['lineas']:>10}")
+    return 0 if all(r['filas'] == rows_count for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
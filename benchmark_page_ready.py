@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo hasta extraer una página de detalle en sjf2 (requiere navegador y red)
+- Método anterior: espera implícita de Config.SELENIUM_IMPLICIT_WAIT + pausa fija de 3 s tras cargar
+- Método nuevo: PageReady (sin espera implícita, contenido o página asentada)
+- Muestra de registros digitales: existentes y, opcionalmente, inexistentes (donde la espera implícita
+  se paga en cada selector que no aparece)
+- Reporta p50/p95 por método y si ambos extrajeron el mismo contenido
+
+Uso:
+    python benchmark_page_ready.py [registro ...]
+    BENCHMARK_MISSING=3 python benchmark_page_ready.py
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.webdriver.common.by import By
+
+from src.config import Config
+from src.scraper.page_ready import PageReady
+from src.scraper.scjn_config import READY_SELECTORS, URL_PATTERNS
+from src.scraper.selenium_scraper import SeleniumSCJNScraper
+
+OLD_FIXED_SLEEP = 3
+DEFAULT_REGISTROS = [2031000, 2030758, 2030500, 2030250, 2030000, 2029750, 2029500, 2029250]
+FIELDS = {
+    'rubro': [".rubro", ".rubro-tesis", ".categoria"],
+    'texto': [".texto", ".contenido", ".tesis-text", "#contenido"],
+}
+
+
+def extract(driver):
+    """Extracción igual a get_tesis_detail: primer selector existente por campo"""
+    data = {}
+    for field, selectors in FIELDS.items():
+        for selector in selectors:
+            try:
+                data[field] = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+                break
+            except Exception:
+                continue
+    return data
+
+
+def old_method(driver, url):
+    driver.implicitly_wait(Config.SELENIUM_IMPLICIT_WAIT)
+    start = time.perf_counter()
+    driver.get(url)
+    time.sleep(OLD_FIXED_SLEEP)
+    data = extract(driver)
+    return time.perf_counter() - start, data
+
+
+def new_method(driver, url):
+    ready = PageReady(driver)
+    start = time.perf_counter()
+    driver.get(url)
+    ready.wait(READY_SELECTORS['detail'])
+    data = extract(driver)
+    return time.perf_counter() - start, data
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(name, latencies):
+    print(f"   {name:<38} p50: {percentile(latencies, 50):.2f} s   p95: {percentile(latencies, 95):.2f} s   "
+          f"total: {sum(latencies):.1f} s")
+
+
+def main():
+    """Función principal"""
+    registros = [int(arg) for arg in sys.argv[1:]] or DEFAULT_REGISTROS
+    missing = int(os.getenv("BENCHMARK_MISSING", "2"))
+    # Registros por encima de los publicados: página sin contenido
+    registros += [max(registros) + 500000 + offset for offset in range(missing)]
+    print(f"📊 Benchmark de página lista ({len(registros)} registros, {missing} inexistentes)")
+
+    scraper = SeleniumSCJNScraper()
+    if not scraper.setup_driver():
+        print("❌ No se pudo iniciar el navegador")
+        return 1
+    driver = scraper.driver
+
+    results = {'old': [], 'new': []}
+    mismatches = 0
+    try:
+        for index, registro in enumerate(registros):
+            url = f"{URL_PATTERNS['base_url']}/detalle/tesis/{registro}"
+            # Alternar el orden para no favorecer al segundo con la cache del navegador
+            order = ('old', 'new') if index % 2 == 0 else ('new', 'old')
+            extracted = {}
+            for method in order:
+                seconds, data = (old_method if method == 'old' else new_method)(driver, url)
+                results[method].append(seconds)
+                extracted[method] = data
+            if extracted['old'] != extracted['new']:
+                mismatches += 1
+            print(f"   {registro}: anterior {results['old'][-1]:.2f}s, nuevo {results['new'][-1]:.2f}s, "
+                  f"rubro {'sí' if extracted['new'].get('rubro') else 'no'}")
+    finally:
+        driver.quit()
+
+    print()
+    report(f"Implícita {Config.SELENIUM_IMPLICIT_WAIT}s + pausa {OLD_FIXED_SLEEP}s", results['old'])
+    report("PageReady", results['new'])
+    print(f"   🚀 Aceleración: {sum(results['old']) / max(sum(results['new']), 0.001):.1f}x   "
+          f"extracciones distintas: {mismatches}/{len(registros)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
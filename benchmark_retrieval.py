@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de recuperación para /api/consulta
+- Corpus de prueba local (no requiere base de datos ni red)
+- Compara búsqueda LIKE por palabras clave (método anterior) contra BM25 + re-ranking
+- Reporta recall@k y latencia p50/p95
+
+Uso:
+    python benchmark_retrieval.py
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.analysis.retrieval import RetrievalEngine, HashingEmbedder
+
+# Tesis de referencia: (scjn_id, titulo, texto)
+FIXTURE_TESIS = [
+    ("2027001", "PENSIÓN ALIMENTICIA. SU MONTO DEBE FIJARSE CONFORME AL PRINCIPIO DE PROPORCIONALIDAD.",
+     "El juzgador, al fijar la pensión alimenticia, debe atender a la capacidad económica del deudor "
+     "alimentario y a las necesidades del acreedor. La proporcionalidad exige valorar ingresos, gastos "
+     "ordinarios y el nivel de vida que el menor tenía antes de la separación de sus progenitores."),
+    ("2027002", "SUSPENSIÓN DEFINITIVA EN EL JUICIO DE AMPARO. PROCEDE CONTRA EL COBRO DE CRÉDITOS FISCALES.",
+     "La suspensión definitiva en el juicio de amparo procede contra el procedimiento administrativo de "
+     "ejecución cuando el quejoso garantiza el interés fiscal ante la autoridad exactora, en términos de "
+     "la Ley de Amparo y del Código Fiscal de la Federación."),
+    ("2027003", "PRUEBA ILÍCITA. DEBE EXCLUIRSE LA OBTENIDA CON VIOLACIÓN DE DERECHOS FUNDAMENTALES.",
+     "Toda prueba obtenida directa o indirectamente mediante la violación de derechos fundamentales "
+     "carece de eficacia probatoria en el proceso penal. La regla de exclusión alcanza a las pruebas "
+     "derivadas cuando no existe una fuente independiente."),
+    ("2027004", "DESPIDO INJUSTIFICADO. CARGA DE LA PRUEBA CUANDO EL PATRÓN NIEGA LA RELACIÓN LABORAL.",
+     "Si el patrón niega la existencia de la relación de trabajo, corresponde al trabajador acreditarla; "
+     "acreditada ésta, la carga de probar la causa justificada de la rescisión recae en el empleador, "
+     "conforme a la Ley Federal del Trabajo."),
+    ("2027005", "INTERÉS SUPERIOR DEL MENOR. RECTOR EN LA GUARDA Y CUSTODIA.",
+     "En las controversias sobre guarda y custodia, el interés superior del menor obliga al juez a "
+     "privilegiar el entorno que garantice su desarrollo integral, escuchando la opinión del niño "
+     "conforme a su edad y madurez."),
+    ("2027006", "PRESCRIPCIÓN DE LA ACCIÓN PENAL. SE INTERRUMPE CON LA ORDEN DE APREHENSIÓN.",
+     "El plazo para la prescripción de la acción penal se interrumpe con las actuaciones del Ministerio "
+     "Público y de la autoridad judicial encaminadas a la aprehensión del inculpado, reiniciándose a "
+     "partir de la última diligencia."),
+    ("2027007", "USUCAPIÓN. LA POSESIÓN DEBE SER EN CONCEPTO DE PROPIETARIO, PACÍFICA, CONTINUA Y PÚBLICA.",
+     "Para que opere la prescripción adquisitiva de un inmueble, el poseedor debe demostrar la causa "
+     "generadora de su posesión y que ésta se ejerció en concepto de dueño de forma pacífica, continua "
+     "y pública durante el plazo legal."),
+    ("2027008", "LIBERTAD DE EXPRESIÓN. LOS SERVIDORES PÚBLICOS TIENEN UN UMBRAL DE TOLERANCIA MAYOR A LA CRÍTICA.",
+     "Quienes desempeñan funciones públicas están sujetos a un escrutinio más intenso; la protección "
+     "de su honor frente a opiniones sobre su desempeño es menor, salvo que medie malicia efectiva en "
+     "la difusión de hechos falsos."),
+]
+
+# Preguntas con la tesis esperada; redactadas como las haría un usuario (sinónimos, sin acentos)
+FIXTURE_QUERIES = [
+    ("¿Cómo se calcula la pensión de alimentos para un hijo según la capacidad del deudor?", "2027001"),
+    ("suspension en amparo contra cobro de impuestos garantizando el interes fiscal", "2027002"),
+    ("¿Qué pasa con las pruebas obtenidas violando derechos fundamentales en materia penal?", "2027003"),
+    ("quien debe probar el despido cuando el patron niega que existia relacion de trabajo", "2027004"),
+    ("¿Con quién se queda el niño? custodia e interés superior del menor", "2027005"),
+    ("¿Cuándo se interrumpe la prescripción de la acción penal?", "2027006"),
+    ("requisitos de la posesión para adquirir un inmueble por prescripción", "2027007"),
+    ("críticas a funcionarios públicos y libertad de expresión", "2027008"),
+]
+
+# Texto de relleno para simular tesis largas y un corpus de tamaño realista
+FILLER_WORDS = (
+    "artículo constitucional tribunal colegiado circuito recurso revisión sentencia resolución autoridad "
+    "responsable quejoso tercero interesado agravio concepto violación fundamento motivación garantía "
+    "audiencia legalidad seguridad jurídica procedimiento competencia jurisdicción materia administrativa "
+    "civil mercantil agraria notificación término plazo ejecutoria precedente contradicción criterio"
+).split()
+
+
+def build_corpus(distractors: int, seed: int = 7):
+    """Construir corpus con las tesis de referencia y tesis de relleno"""
+    rng = random.Random(seed)
+    records = []
+    for i, (scjn_id, titulo, texto) in enumerate(FIXTURE_TESIS, start=1):
+        padding = " ".join(rng.choice(FILLER_WORDS) for _ in range(400))
+        records.append({'id': i, 'scjn_id': scjn_id, 'titulo': titulo, 'rubro': titulo,
+                        'texto': f"{padding}\n\n{texto}\n\n{padding}"})
+
+    for j in range(distractors):
+        words = " ".join(rng.choice(FILLER_WORDS) for _ in range(600))
+        records.append({'id': len(FIXTURE_TESIS) + j + 1, 'scjn_id': f"19{j:05d}",
+                        'titulo': " ".join(rng.choice(FILLER_WORDS) for _ in range(8)).upper(),
+                        'rubro': '', 'texto': words})
+    return records
+
+
+def like_baseline(records, question: str, limit: int):
+    """Método anterior: todas las palabras (>3 letras) contenidas en título o texto"""
+    keywords = [k for k in question.lower().split() if len(k) > 3]
+    results = []
+    for record in records:
+        haystack = f"{record['titulo']} {record['texto']}".lower()
+        if all(k in haystack for k in keywords):
+            results.append(record['scjn_id'])
+            if len(results) >= limit:
+                break
+    return results
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(name, hits, latencies, k):
+    recall = hits / len(FIXTURE_QUERIES)
+    print(f"   {name:<28} recall@{k}: {recall:.2f}   "
+          f"p50: {percentile(latencies, 50) * 1000:.2f} ms   p95: {percentile(latencies, 95) * 1000:.2f} ms")
+
+
+def main():
+    """Función principal"""
+    k = 5
+    distractors = int(os.getenv("BENCHMARK_DISTRACTORS", "2000"))
+    print(f"📊 Benchmark de recuperación ({len(FIXTURE_TESIS)} tesis objetivo + {distractors} de relleno)")
+
+    records = build_corpus(distractors)
+
+    # Método anterior
+    hits, latencies = 0, []
+    for question, expected in FIXTURE_QUERIES:
+        start = time.perf_counter()
+        found = like_baseline(records, question, k)
+        latencies.append(time.perf_counter() - start)
+        hits += expected in found
+    report("LIKE palabras clave", hits, latencies, k)
+
+    # Motor nuevo
+    engine = RetrievalEngine(embedder=HashingEmbedder(), top_k=k)
+    start = time.perf_counter()
+    engine.build_from_records(records)
+    print(f"   ⏱️ Construcción del índice: {time.perf_counter() - start:.2f}s")
+
+    for label in ("BM25 + re-ranking (frío)", "BM25 + re-ranking (cache)"):
+        hits, latencies, tokens = 0, [], []
+        for question, expected in FIXTURE_QUERIES:
+            start = time.perf_counter()
+            result = engine.retrieve(question)
+            latencies.append(time.perf_counter() - start)
+            hits += expected in result.scjn_ids
+            tokens.append(len(result.context) // 4)
+        report(label, hits, latencies, k)
+
+    print(f"   📦 Contexto promedio: {statistics.mean(tokens):.0f} tokens "
+          f"(presupuesto {engine.token_budget})")
+    print(f"   📊 Cache: {engine.query_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
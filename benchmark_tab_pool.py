@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia por pestañas contra un navegador por tarea (requiere Chrome, red y Linux)
+- Un navegador por hilo (K drivers, como REGISTRO_PROBE=drivers) contra un navegador con K pestañas
+- Páginas por minuto, memoria máxima del árbol de procesos de Chrome (RSS leído de /proc)
+- Métrica principal: páginas por minuto por GB de RAM
+
+Uso:
+    python benchmark_tab_pool.py [pestañas] [páginas]
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.browser_profile import create_chrome_driver
+from src.scraper.page_ready import PageReady
+from src.scraper.scjn_config import READY_SELECTORS, URL_PATTERNS
+from src.scraper.selenium_scraper import SeleniumSCJNScraper
+from src.scraper.tab_pool import TabExecutor
+
+FIRST_REGISTRO = 2030000
+
+
+def tree_rss_mb(root_pids):
+    """RSS total (MB) de los procesos root_pids y todos sus descendientes"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                ppid = int(handle.read().rsplit(')', 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, list(root_pids)
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status') as handle:
+                for line in handle:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total / 1024
+
+
+class MemorySampler:
+    """Máximo de RSS del árbol de procesos muestreado cada medio segundo"""
+
+    def __init__(self, root_pids):
+        self.root_pids = root_pids
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss_mb(self.root_pids))
+            self._stop.wait(0.5)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def driver_pid(driver):
+    return driver.service.process.pid
+
+
+def run_drivers(urls, workers):
+    """Un navegador por hilo, cada uno cargando sus páginas en serie"""
+    extractor = SeleniumSCJNScraper()
+    drivers = [create_chrome_driver() for _ in range(workers)]
+    readies = [PageReady(driver) for driver in drivers]
+    found = 0
+    try:
+        with MemorySampler([driver_pid(driver) for driver in drivers]) as memory:
+            begin = time.perf_counter()
+
+            def work(index):
+                hits = 0
+                for url in urls[index::workers]:
+                    drivers[index].get(url)
+                    readies[index].wait(READY_SELECTORS['detail'])
+                    detail = extractor.extract_tesis_detail(drivers[index])
+                    hits += bool(detail.get('rubro') or detail.get('texto'))
+                return hits
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                found = sum(pool.map(work, range(workers)))
+            seconds = time.perf_counter() - begin
+    finally:
+        for driver in drivers:
+            driver.quit()
+    return seconds, memory.peak, found
+
+
+def run_tabs(urls, tabs):
+    """Un navegador con tabs pestañas atendidas por TabExecutor"""
+    extractor = SeleniumSCJNScraper()
+    executor = TabExecutor(tabs=tabs)
+    try:
+        with MemorySampler([driver_pid(executor.driver)]) as memory:
+            begin = time.perf_counter()
+            found = 0
+            for detail in executor.map(urls, extractor.extract_tesis_detail):
+                found += bool(detail.get('rubro') or detail.get('texto'))
+            seconds = time.perf_counter() - begin
+    finally:
+        executor.shutdown()
+    return seconds, memory.peak, found
+
+
+def report(name, pages, seconds, peak_mb, found):
+    per_minute = pages / seconds * 60
+    print(f"   {name:<26} {per_minute:>6.1f} páginas/min   RAM máx. {peak_mb:>7.0f} MB   "
+          f"{per_minute / (peak_mb / 1024):>7.1f} páginas/min/GB   con tesis {found}/{pages}")
+    return per_minute / (peak_mb / 1024)
+
+
+def main():
+    """Función principal"""
+    tabs = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    urls = [f"{URL_PATTERNS['base_url']}/detalle/tesis/{FIRST_REGISTRO + index}" for index in range(pages)]
+    print(f"📊 Benchmark de pestañas: {pages} páginas de detalle, concurrencia {tabs}")
+
+    drivers = run_drivers(urls, tabs)
+    tabbed = run_tabs(urls, tabs)
+
+    print()
+    base = report(f"{tabs} navegadores", pages, *drivers)
+    gain = report(f"1 navegador, {tabs} pestañas", pages, *tabbed)
+    print(f"   🚀 Páginas/min por GB: {gain / base:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark del fetcher por niveles sobre páginas de detalle de sjf2 (requiere red; Chrome para el respaldo)
+- Solo navegador (FETCH_HTTP_FIRST=false) contra HTTP primero con navegador de respaldo
+- Tasa de páginas servidas sin navegador y tiempo medio por página y por nivel
+- Comprueba que ambos caminos extraen el mismo rubro
+
+Uso:
+    python benchmark_tiered_fetch.py [registro ...]
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.scjn_config import URL_PATTERNS
+from src.scraper.selenium_scraper import SeleniumSCJNScraper
+from src.scraper.tiered_fetcher import TieredFetcher, TierStats
+
+DEFAULT_REGISTROS = [2031000, 2030758, 2030500, 2030250, 2030000, 2029750, 2029500, 2029250,
+                     2029000, 2028750, 2028500, 2028250]
+
+
+def run(scraper, urls, http_first):
+    stats = TierStats()
+    fetcher = TieredFetcher(rate=scraper.rate, http_first=http_first, stats=stats)
+    rubros = {}
+    begin = time.perf_counter()
+    for url in urls:
+        detail = fetcher.fetch(url, browser=scraper.get_tesis_detail_browser)
+        rubros[url] = (detail or {}).get('rubro')
+    return time.perf_counter() - begin, stats.summary(), rubros
+
+
+def main():
+    """Función principal"""
+    registros = [int(arg) for arg in sys.argv[1:]] or DEFAULT_REGISTROS
+    urls = [f"{URL_PATTERNS['base_url']}/detalle/tesis/{registro}" for registro in registros]
+    print(f"📊 Benchmark del fetcher por niveles ({len(urls)} tesis)")
+
+    scraper = SeleniumSCJNScraper()
+    try:
+        browser_seconds, browser_stats, browser_rubros = run(scraper, urls, http_first=False)
+        tiered_seconds, tiered_stats, tiered_rubros = run(scraper, urls, http_first=True)
+    finally:
+        scraper.close_driver()
+
+    same = sum(1 for url in urls if tiered_rubros[url] == browser_rubros[url])
+    print()
+    print(f"   Solo navegador        {browser_seconds / len(urls):>6.2f} s/página")
+    print(f"   HTTP + respaldo       {tiered_seconds / len(urls):>6.2f} s/página   "
+          f"sin navegador {tiered_stats['sin_navegador'] * 100:.0f}%   "
+          f"http {tiered_stats['segundos_medios_http']} s, navegador {tiered_stats['segundos_medios_browser']} s")
+    print(f"   🚀 Aceleración: {browser_seconds / max(tiered_seconds, 0.001):.1f}x   "
+          f"rubro idéntico en {same}/{len(urls)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Nodo de rastreo distribuido de registros digitales
+- Todos los nodos comparten DATABASE_URL (PostgreSQL, o SQLite en WAL para varios procesos locales)
+- sembrar: crea en work_queue los tramos de REGISTRO_RANGES (idempotente, basta en un nodo)
+- trabajar: arrienda tramos, los recorre con latidos y guarda cada tesis una sola vez
+- estado: tareas por estado y arrendamientos vigentes por nodo
+
+Uso:
+    python distributed_worker.py sembrar [--rangos 2000000-2032000]
+    python distributed_worker.py trabajar [--horas 3] [--max-tareas N] [--nodo vm-1] [--metrics-port 9108]
+    python distributed_worker.py estado
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import Config
+from src.database.models import create_tables
+from src.automation.registro_crawler import parse_ranges
+from src.automation.work_queue import DistributedWorker, WorkQueue
+from src.utils.telemetry import start_metrics_server
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rastreo de registros digitales repartido entre nodos")
+    parser.add_argument('accion', choices=['sembrar', 'trabajar', 'estado'])
+    parser.add_argument('--rangos', default=Config.REGISTRO_RANGES, help="Rangos inicio-fin separados por comas")
+    parser.add_argument('--horas', type=float, default=Config.MAX_HOURS_PER_SESSION, help="Duración de la sesión")
+    parser.add_argument('--max-tareas', type=int, help="Tramos como máximo en esta sesión")
+    parser.add_argument('--nodo', default=None, help="Nombre del nodo (por defecto WORKER_ID o host-pid)")
+    parser.add_argument('--metrics-port', type=int, default=Config.METRICS_PORT,
+                        help="Puerto de /metrics de este nodo (0 = sin servidor)")
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    create_tables()
+    queue = WorkQueue(worker_id=args.nodo)
+
+    if args.accion == 'sembrar':
+        added = queue.seed_registro_ranges(parse_ranges(args.rangos))
+        print(f"🌱 {added} tramos nuevos; cola: {queue.counts()}")
+        return 0
+
+    if args.accion == 'estado':
+        print("\n📊 === COLA DISTRIBUIDA ===")
+        for estado, count in queue.counts().items():
+            print(f"   {estado:<10} {count}")
+        for lease in queue.leases():
+            state = f"vence en {lease['vence_en']}s" if lease['vence_en'] >= 0 else "vencido"
+            print(f"   🛰️ {lease['nodo']}: {lease['clave']} (intento {lease['intentos']}, {state})")
+        return 0
+
+    start_metrics_server(args.metrics_port)
+    worker = DistributedWorker(queue)
+    stats = worker.run(deadline=time.time() + args.horas * 3600, max_tasks=args.max_tareas)
+    print(f"\n🎉 Nodo {stats['nodo']}: {stats['completadas']} tramos completados, {stats['nuevas']} tesis nuevas, "
+          f"{stats['duplicadas']} ya guardadas por otro nodo, {stats['fallidas']} tramos con error")
+    return 0 if stats['fallidas'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.database.models import Tesis, get_session
+from src.database.streaming import count_rows, iter_keyset
 from src.storage.google_drive import GoogleDriveManager
 from src.scraper.selenium_scraper import SeleniumSCJNScraper
 
@@ -49,14 +50,15 @@ def download_and_upload_missing_pdfs():
         print(f"❌ Error autenticando Google Drive: {e}")
         return False
     
-    # Obtener tesis sin PDF en Google Drive
+    # Contar tesis sin PDF en Google Drive (las filas se leen después por trozos)
     session = get_session()
-    tesis_sin_pdf = session.query(Tesis).filter(Tesis.google_drive_link.is_(None)).all()
-    session.close()
+    sin_pdf = Tesis.google_drive_link.is_(None)
+    total_sin_pdf = count_rows(session, Tesis.id, filters=[sin_pdf])
     
-    print(f"📊 Total de tesis sin PDF en Drive: {len(tesis_sin_pdf)}")
+    print(f"📊 Total de tesis sin PDF en Drive: {total_sin_pdf}")
     
-    if not tesis_sin_pdf:
+    if not total_sin_pdf:
+        session.close()
         print("✅ Todas las tesis ya tienen PDF en Google Drive")
         return True
     
@@ -66,22 +68,25 @@ def download_and_upload_missing_pdfs():
     # Procesar tesis
     success_count = 0
     error_count = 0
+    limite = min(10, total_sin_pdf)  # Limitar a 10 para prueba
     
-    for i, tesis in enumerate(tesis_sin_pdf[:10]):  # Limitar a 10 para prueba
-        print(f"\n📄 Procesando tesis {i+1}/{min(10, len(tesis_sin_pdf))}: {tesis.scjn_id}")
+    pendientes = iter_keyset(session, Tesis.id, Tesis.scjn_id, Tesis.url, Tesis.titulo,
+                             filters=[sin_pdf], limit=limite)
+    for i, (tesis_id, scjn_id, url, titulo) in enumerate(pendientes):
+        print(f"\n📄 Procesando tesis {i+1}/{limite}: {scjn_id}")
         
         try:
             # Verificar si ya existe el PDF localmente
-            pdf_path = f"data/pdfs/tesis_{tesis.scjn_id}.pdf"
+            pdf_path = f"data/pdfs/tesis_{scjn_id}.pdf"
             
             if not os.path.exists(pdf_path):
                 print(f"  📥 Descargando PDF...")
                 
                 # Descargar PDF
-                pdf_downloaded = scraper.download_pdf(tesis.url, tesis.scjn_id)
+                pdf_downloaded = scraper.download_pdf(url, scjn_id)
                 
                 if not pdf_downloaded:
-                    print(f"  ❌ No se pudo descargar PDF para tesis {tesis.scjn_id}")
+                    print(f"  ❌ No se pudo descargar PDF para tesis {scjn_id}")
                     error_count += 1
                     continue
                 
@@ -100,7 +105,7 @@ def download_and_upload_missing_pdfs():
             print(f"  ☁️ Subiendo a Google Drive...")
             
             # Generar nombre del archivo
-            filename = f"Tesis_{tesis.scjn_id}_{tesis.titulo[:50].replace('/', '_').replace(':', '_')}.pdf"
+            filename = f"Tesis_{scjn_id}_{(titulo or '')[:50].replace('/', '_').replace(':', '_')}.pdf"
             
             result = gdrive.upload_file(pdf_path, filename)
             
@@ -109,15 +114,13 @@ def download_and_upload_missing_pdfs():
                 print(f"  ✅ Subido exitosamente")
                 print(f"  🔗 Enlace: {web_link}")
                 
-                # Actualizar base de datos
-                session = get_session()
-                tesis_db = session.query(Tesis).filter(Tesis.id == tesis.id).first()
-                if tesis_db:
-                    tesis_db.google_drive_id = file_id
-                    tesis_db.google_drive_link = web_link
-                    session.commit()
+                # Actualizar base de datos (sin cargar la fila completa)
+                updated = session.query(Tesis).filter(Tesis.id == tesis_id).update(
+                    {'google_drive_id': file_id, 'google_drive_link': web_link}, synchronize_session=False
+                )
+                session.commit()
+                if updated:
                     print(f"  💾 Base de datos actualizada")
-                session.close()
                 
                 success_count += 1
             else:
@@ -128,9 +131,12 @@ def download_and_upload_missing_pdfs():
             time.sleep(3)
             
         except Exception as e:
-            print(f"  ❌ Error procesando tesis {tesis.scjn_id}: {e}")
+            session.rollback()
+            print(f"  ❌ Error procesando tesis {scjn_id}: {e}")
             error_count += 1
     
+    session.close()
+    
     # Cerrar scraper
     scraper.close_driver()
     
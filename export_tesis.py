@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Exportación masiva de tesis (NDJSON / Parquet / Arrow) con memoria constante
+- Lee la tabla tesis en streaming (yield_per)
+- Permite elegir columnas
+- Exportación incremental con --since (fecha_descarga)
+
+Uso:
+    python export_tesis.py --formato ndjson --salida data/exports/tesis.ndjson
+    python export_tesis.py --formato parquet --columnas id,scjn_id,titulo,texto
+    python export_tesis.py --since 2025-06-01T00:00:00 --salida -   # a stdout
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import Config
+from src.database.models import get_session
+from src.database.export import (
+    ExportError, resolve_columns, parse_since, iter_ndjson, iter_arrow_stream, write_parquet
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'ndjson': 'ndjson', 'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exportar tesis en streaming")
+    parser.add_argument('--formato', choices=sorted(EXTENSIONS), default='ndjson')
+    parser.add_argument('--salida', help="Archivo de salida ('-' = stdout, no válido para parquet)")
+    parser.add_argument('--columnas', help="Columnas separadas por coma")
+    parser.add_argument('--since', help="Solo tesis con fecha_descarga posterior (ISO 8601)")
+    parser.add_argument('--batch-size', type=int, default=Config.EXPORT_BATCH_SIZE)
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+
+    try:
+        columns = resolve_columns(args.columnas.split(',') if args.columnas else None)
+        since = parse_since(args.since)
+    except ExportError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(2)
+
+    output = args.salida
+    if not output:
+        Config.EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = str(Config.EXPORTS_DIR / f"tesis_{timestamp}.{EXTENSIONS[args.formato]}")
+
+    if output == '-' and args.formato == 'parquet':
+        logger.error("❌ Parquet requiere un archivo de salida (el pie del archivo no es transmisible)")
+        sys.exit(2)
+
+    session = get_session()
+    start = time.time()
+
+    try:
+        if args.formato == 'parquet':
+            total = write_parquet(output, session, columns, since, args.batch_size)
+        else:
+            generator = iter_ndjson if args.formato == 'ndjson' else iter_arrow_stream
+            stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+            total_bytes = 0
+            try:
+                for chunk in generator(session, columns, since, args.batch_size):
+                    stream.write(chunk)
+                    total_bytes += len(chunk)
+            finally:
+                if stream is not sys.stdout.buffer:
+                    stream.close()
+            total = None
+            logger.info(f"✅ Exportados {total_bytes / 1024 / 1024:.1f} MB a {output}")
+
+        elapsed = time.time() - start
+        logger.info(f"⏱️ Exportación completada en {elapsed:.1f}s ({args.formato}, columnas: {','.join(columns)})")
+        if total is not None:
+            logger.info(f"📊 Tesis exportadas: {total} ({total / max(elapsed, 0.001):.0f}/s)")
+
+    except ExportError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
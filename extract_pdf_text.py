@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Extracción de texto de los PDFs descargados (data/pdfs)
+- PyMuPDF en paralelo (un proceso por núcleo), pdfplumber como respaldo
+- Solo procesa PDFs nuevos o modificados (sha256)
+- Guarda texto y páginas en tesis_pdf e indexa pasajes (fuente 'pdf')
+
+Uso:
+    python extract_pdf_text.py
+    python extract_pdf_text.py --workers 8 --limit 500
+    python extract_pdf_text.py --sin-pasajes
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import Config
+from src.database.models import get_session, create_tables
+from src.analysis.pdf_extractor import PDFExtractionStage, fitz, pdfplumber
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extraer texto de PDFs de tesis")
+    parser.add_argument('--workers', type=int, default=Config.PDF_EXTRACTION_WORKERS)
+    parser.add_argument('--limit', type=int, help="Máximo de PDFs a revisar")
+    parser.add_argument('--sin-pasajes', action='store_true', help="No indexar pasajes en tesis_chunk")
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+
+    if fitz is None and pdfplumber is None:
+        logger.error("❌ Instale PyMuPDF o pdfplumber: pip install pymupdf pdfplumber")
+        sys.exit(1)
+    if fitz is None:
+        logger.warning("⚠️ PyMuPDF no disponible, se usará solo pdfplumber (más lento)")
+
+    create_tables()
+    session = get_session()
+
+    try:
+        stage = PDFExtractionStage(workers=args.workers, index_passages=not args.sin_pasajes)
+        stats = stage.run(session, limit=args.limit)
+
+        print("\n📊 === RESUMEN DE EXTRACCIÓN ===")
+        print(f"📄 PDFs revisados: {stats['archivos']}")
+        print(f"✅ Extraídos: {stats['extraidos']} (PyMuPDF: {stats['pymupdf']}, pdfplumber: {stats['pdfplumber']})")
+        print(f"⏭️ Sin cambios: {stats['sin_cambios']}")
+        print(f"❌ Errores: {stats['errores']}")
+        print(f"📑 Páginas: {stats['paginas']} ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        print(f"⏱️ {stats['duracion']:.1f}s — {stats['paginas_por_segundo']:.1f} páginas/s")
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Error en la extracción: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -336,13 +336,15 @@ sudo systemctl start scjn-scraper
 sudo tee /etc/google-fluentd/config.d/scjn-scraper.conf > /dev/null << 'LOGGING_EOF'
 <source>
   @type tail
-  path /home/ubuntu/scjn-scraper/logs/*.log
+  # Logs de src/utils/logger.py: un objeto JSON por línea (LOG_JSON=true)
+  path /home/ubuntu/scjn-scraper/logs/scraper.log,/home/ubuntu/scjn-scraper/logs/auto_scraper.log,/home/ubuntu/scjn-scraper/logs/errors.log
   pos_file /var/lib/google-fluentd/pos/scjn-scraper.pos
   read_from_head true
   tag scjn-scraper
   <parse>
-    @type regexp
-    expression /^(?<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - (?<level>\w+) - (?<message>.*)$/
+    @type json
+    time_key ts
+    time_format %Y-%m-%dT%H:%M:%S.%L%z
   </parse>
 </source>
 LOGGING_EOF
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Indexación incremental de pasajes de tesis (tabla tesis_chunk)
+- Divide el texto de cada tesis (y el texto de su PDF) en pasajes con offsets
+- Solo re-procesa documentos cuyo contenido cambió (hash)
+- Calcula embeddings por pasaje para el re-ranking de /api/consulta
+
+Uso:
+    python indexar_pasajes.py
+    python indexar_pasajes.py --sin-embeddings
+    python indexar_pasajes.py --fuente pdf    # tras extract_pdf_text.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.database.models import get_session, create_tables
+from src.analysis.chunk_index import ChunkIndexer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Indexar pasajes de tesis para búsqueda")
+    parser.add_argument('--sin-embeddings', action='store_true', help="Solo texto completo, sin vectores")
+    parser.add_argument('--fuente', choices=['texto', 'pdf', 'todas'], default='todas')
+    parser.add_argument('--batch-size', type=int, default=500)
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+
+    # Asegura la tabla tesis_chunk y su índice de texto completo
+    create_tables()
+
+    session = get_session()
+    start = time.time()
+
+    try:
+        indexer = ChunkIndexer(with_embeddings=not args.sin_embeddings)
+        if args.fuente in ('texto', 'todas'):
+            indexer.sync_texto(session, batch_size=args.batch_size)
+        if args.fuente in ('pdf', 'todas'):
+            indexer.sync_pdf(session, batch_size=args.batch_size)
+        stats = indexer.stats
+
+        elapsed = time.time() - start
+        print(f"📊 Documentos revisados: {stats['documentos']}")
+        print(f"   ✅ Re-indexados: {stats['reindexados']} ({stats['pasajes']} pasajes)")
+        print(f"   ⏭️ Sin cambios: {stats['sin_cambios']}")
+        print(f"   🧹 Pasajes reemplazados: {stats['eliminados']}")
+        print(f"⏱️ Tiempo total: {elapsed:.1f}s")
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Error indexando pasajes: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
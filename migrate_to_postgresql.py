@@ -1,16 +1,43 @@
 #!/usr/bin/env python3
 """
 Script de migración de SQLite a PostgreSQL para el sistema de scraping SCJN
+- Todas las tablas de src/database/models.py (esquema creado desde los modelos, ids conservados)
+- Lectura en trozos por clave (id > último, LIMIT N): memoria acotada aunque html_content sea grande
+- Carga con COPY a una tabla temporal de staging y upsert por conjuntos (INSERT ... SELECT ... ON CONFLICT)
+- Tablas y particiones por rango de id en paralelo, cada una con su propia conexión
+- Reanudable: punto de control por partición en migration_checkpoint, confirmado junto con cada trozo
+- Verificación por checksum: recuento y suma de huellas MD5 de las filas normalizadas en ambos lados
+  (en PostgreSQL con cursor del lado del servidor)
+
+Uso:
+    python3 migrate_to_postgresql.py [--workers 4] [--chunk 500] [--tablas tesis,tesis_chunk]
+    python3 migrate_to_postgresql.py --solo-verificar
+    python3 migrate_to_postgresql.py --reiniciar
 """
 
-import sqlite3
-import psycopg2
+import io
+import os
+import sys
 import json
+import hashlib
+import sqlite3
+import argparse
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import psycopg2
+from sqlalchemy import Boolean, DateTime, Float, Integer, JSON, LargeBinary, create_engine
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.database.models import Base, create_chunk_search_index
+
 # Configurar logging
+os.makedirs("logs", exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -22,298 +49,390 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_SQL = """
+CREATE TABLE IF NOT EXISTS migration_checkpoint (
+    tabla VARCHAR(100) NOT NULL,
+    particion INTEGER NOT NULL,
+    desde BIGINT NOT NULL,
+    hasta BIGINT,
+    ultimo_id BIGINT NOT NULL,
+    filas BIGINT NOT NULL DEFAULT 0,
+    completado BOOLEAN NOT NULL DEFAULT FALSE,
+    actualizado TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (tabla, particion)
+)
+"""
+
+
+def column_kind(column):
+    """Tipo de valor para normalizar una columna del modelo"""
+    kinds = ((Boolean, 'bool'), (DateTime, 'datetime'), (JSON, 'json'), (LargeBinary, 'bytes'),
+             (Float, 'float'), (Integer, 'int'))
+    for sql_type, kind in kinds:
+        if isinstance(column.type, sql_type):
+            return kind
+    return 'text'
+
+
+def normalize(kind, value):
+    """Mismo valor en Python venga de SQLite (texto, 0/1) o de PostgreSQL (tipos nativos)"""
+    if value is None:
+        return None
+    if kind == 'bool':
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 't', 'true')
+        return bool(value)
+    if kind == 'datetime':
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return value.replace('\x00', '')
+        return value.isoformat(sep=' ', timespec='microseconds')
+    if kind == 'json':
+        if isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return None
+        if value is None:
+            return None
+        return json.dumps(value, ensure_ascii=False, sort_keys=True).replace('\x00', '')
+    if kind == 'bytes':
+        return bytes(value)
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    # PostgreSQL no admite el carácter NUL en columnas de texto
+    return str(value).replace('\x00', '')
+
+
+def copy_field(value):
+    """Valor normalizado en el formato de texto de COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def row_digest(fields):
+    """Huella de 64 bits de una fila ya codificada"""
+    return int(hashlib.md5('\x1f'.join(fields).encode('utf-8')).hexdigest()[:16], 16)
+
+
+class TablePlan:
+    """Columnas comunes a SQLite, PostgreSQL y el modelo para una tabla"""
+
+    def __init__(self, table, columns):
+        self.name = table.name
+        self.pk = table.primary_key.columns.values()[0].name
+        self.columns = [column.name for column in table.columns if column.name in columns]
+        self.kinds = [column_kind(table.columns[name]) for name in self.columns]
+        self.pk_index = self.columns.index(self.pk)
+        self.column_list = ', '.join(f'"{name}"' for name in self.columns)
+
+    def encode(self, row):
+        return [copy_field(normalize(kind, value)) for kind, value in zip(self.kinds, row)]
+
+
 class SQLiteToPostgreSQLMigrator:
-    def __init__(self, sqlite_db_path, pg_config):
+    def __init__(self, sqlite_db_path, pg_config, workers=4, chunk_size=500, tables=None):
         """
         Inicializar migrador
-        
+
         Args:
             sqlite_db_path: Ruta al archivo SQLite
             pg_config: Diccionario con configuración de PostgreSQL
+            workers: Particiones migradas o verificadas a la vez (una conexión por partición)
+            chunk_size: Filas por trozo de lectura, COPY y punto de control
+            tables: Nombres de tablas a migrar (por defecto, todas las de los modelos)
         """
         self.sqlite_db_path = sqlite_db_path
         self.pg_config = pg_config
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.tables = set(tables) if tables else None
         self.sqlite_conn = None
         self.pg_conn = None
-        
+        self.plans = []
+        self._progress_lock = threading.Lock()
+        self.progress = {}
+
     def connect_sqlite(self):
         """Conectar a SQLite"""
         try:
-            self.sqlite_conn = sqlite3.connect(self.sqlite_db_path)
-            self.sqlite_conn.row_factory = sqlite3.Row
+            self.sqlite_conn = self._sqlite()
             logger.info("✅ Conexión a SQLite establecida")
             return True
         except Exception as e:
             logger.error(f"❌ Error conectando a SQLite: {e}")
             return False
-    
+
     def connect_postgresql(self):
         """Conectar a PostgreSQL"""
         try:
-            self.pg_conn = psycopg2.connect(**self.pg_config)
+            self.pg_conn = self._pg()
             logger.info("✅ Conexión a PostgreSQL establecida")
             return True
         except Exception as e:
             logger.error(f"❌ Error conectando a PostgreSQL: {e}")
             return False
-    
+
+    def _sqlite(self):
+        # Solo lectura: la base de origen no se modifica
+        return sqlite3.connect(f"file:{self.sqlite_db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _pg(self):
+        return psycopg2.connect(**self.pg_config)
+
     def create_postgresql_schema(self):
-        """Crear esquema en PostgreSQL"""
-        schema_sql = """
-        -- Tabla tesis
-        CREATE TABLE IF NOT EXISTS tesis (
-            id SERIAL PRIMARY KEY,
-            scjn_id VARCHAR(50) NOT NULL UNIQUE,
-            titulo TEXT,
-            url VARCHAR(500),
-            rubro TEXT,
-            texto TEXT,
-            precedente TEXT,
-            pdf_url VARCHAR(500),
-            google_drive_id VARCHAR(100),
-            google_drive_link VARCHAR(500),
-            metadata_json JSONB,
-            fecha_descarga TIMESTAMP,
-            html_content TEXT,
-            procesado BOOLEAN DEFAULT FALSE,
-            analizado BOOLEAN DEFAULT FALSE
-        );
-        
-        -- Tabla scraping_sessions
-        CREATE TABLE IF NOT EXISTS scraping_sessions (
-            id SERIAL PRIMARY KEY,
-            session_id VARCHAR(100) NOT NULL UNIQUE,
-            fase VARCHAR(20) NOT NULL,
-            fecha_inicio TIMESTAMP,
-            fecha_fin TIMESTAMP,
-            archivos_descargados INTEGER DEFAULT 0,
-            duplicados_encontrados INTEGER DEFAULT 0,
-            errores INTEGER DEFAULT 0,
-            duracion_minutos INTEGER DEFAULT 0,
-            estado VARCHAR(20)
-        );
-        
-        -- Tabla scraping_stats
-        CREATE TABLE IF NOT EXISTS scraping_stats (
-            id SERIAL PRIMARY KEY,
-            fecha TIMESTAMP,
-            total_descargado INTEGER DEFAULT 0,
-            total_duplicados INTEGER DEFAULT 0,
-            total_errores INTEGER DEFAULT 0,
-            fase_actual VARCHAR(20),
-            progreso_porcentual INTEGER DEFAULT 0
-        );
-        
-        -- Índices
-        CREATE INDEX IF NOT EXISTS idx_tesis_scjn_id ON tesis(scjn_id);
-        CREATE INDEX IF NOT EXISTS idx_tesis_fecha_descarga ON tesis(fecha_descarga);
-        CREATE INDEX IF NOT EXISTS idx_tesis_procesado ON tesis(procesado);
-        CREATE INDEX IF NOT EXISTS idx_tesis_analizado ON tesis(analizado);
-        CREATE INDEX IF NOT EXISTS idx_tesis_metadata ON tesis USING GIN(metadata_json);
-        
-        CREATE INDEX IF NOT EXISTS idx_sessions_session_id ON scraping_sessions(session_id);
-        CREATE INDEX IF NOT EXISTS idx_sessions_fecha ON scraping_sessions(fecha_inicio);
-        
-        CREATE INDEX IF NOT EXISTS idx_stats_fecha ON scraping_stats(fecha);
-        """
-        
+        """Crear en PostgreSQL las tablas de los modelos, el índice de pasajes y la tabla de puntos de control"""
         try:
+            pg_engine = create_engine("postgresql+psycopg2://", creator=self._pg)
+            Base.metadata.create_all(bind=pg_engine)
+            with pg_engine.connect() as conn:
+                create_chunk_search_index(conn)
+                conn.commit()
+            pg_engine.dispose()
             with self.pg_conn.cursor() as cursor:
-                cursor.execute(schema_sql)
-                self.pg_conn.commit()
-                logger.info("✅ Esquema PostgreSQL creado exitosamente")
-                return True
-        except Exception as e:
-            logger.error(f"❌ Error creando esquema PostgreSQL: {e}")
-            return False
-    
-    def migrate_tesis_table(self):
-        """Migrar tabla tesis"""
-        try:
-            # Obtener datos de SQLite
-            cursor_sqlite = self.sqlite_conn.cursor()
-            cursor_sqlite.execute("SELECT * FROM tesis")
-            tesis_data = cursor_sqlite.fetchall()
-            
-            logger.info(f"📊 Migrando {len(tesis_data)} registros de tesis...")
-            
-            # Migrar a PostgreSQL
-            cursor_pg = self.pg_conn.cursor()
-            
-            for i, row in enumerate(tesis_data):
-                # Convertir metadata_json si es necesario
-                metadata = row['metadata_json']
-                if metadata and isinstance(metadata, str):
-                    try:
-                        metadata = json.loads(metadata)
-                    except:
-                        metadata = None
-                
-                # Insertar en PostgreSQL
-                cursor_pg.execute("""
-                    INSERT INTO tesis (
-                        scjn_id, titulo, url, rubro, texto, precedente,
-                        pdf_url, google_drive_id, google_drive_link,
-                        metadata_json, fecha_descarga, html_content,
-                        procesado, analizado
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (scjn_id) DO UPDATE SET
-                        titulo = EXCLUDED.titulo,
-                        url = EXCLUDED.url,
-                        rubro = EXCLUDED.rubro,
-                        texto = EXCLUDED.texto,
-                        precedente = EXCLUDED.precedente,
-                        pdf_url = EXCLUDED.pdf_url,
-                        google_drive_id = EXCLUDED.google_drive_id,
-                        google_drive_link = EXCLUDED.google_drive_link,
-                        metadata_json = EXCLUDED.metadata_json,
-                        fecha_descarga = EXCLUDED.fecha_descarga,
-                        html_content = EXCLUDED.html_content,
-                        procesado = EXCLUDED.procesado,
-                        analizado = EXCLUDED.analizado
-                """, (
-                    row['scjn_id'], row['titulo'], row['url'], row['rubro'],
-                    row['texto'], row['precedente'], row['pdf_url'],
-                    row['google_drive_id'], row['google_drive_link'],
-                    json.dumps(metadata) if metadata else None,
-                    row['fecha_descarga'], row['html_content'],
-                    row['procesado'], row['analizado']
-                ))
-                
-                if (i + 1) % 10 == 0:
-                    logger.info(f"   Progreso: {i + 1}/{len(tesis_data)} tesis migradas")
-            
+                cursor.execute(CHECKPOINT_SQL)
             self.pg_conn.commit()
-            logger.info(f"✅ Tabla tesis migrada exitosamente: {len(tesis_data)} registros")
+            logger.info("✅ Esquema PostgreSQL creado exitosamente")
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Error migrando tabla tesis: {e}")
+            logger.error(f"❌ Error creando esquema PostgreSQL: {e}")
             return False
-    
-    def migrate_scraping_sessions_table(self):
-        """Migrar tabla scraping_sessions"""
-        try:
-            cursor_sqlite = self.sqlite_conn.cursor()
-            cursor_sqlite.execute("SELECT * FROM scraping_sessions")
-            sessions_data = cursor_sqlite.fetchall()
-            
-            logger.info(f"📊 Migrando {len(sessions_data)} registros de sesiones...")
-            
-            cursor_pg = self.pg_conn.cursor()
-            
-            for row in sessions_data:
-                cursor_pg.execute("""
-                    INSERT INTO scraping_sessions (
-                        session_id, fase, fecha_inicio, fecha_fin,
-                        archivos_descargados, duplicados_encontrados,
-                        errores, duracion_minutos, estado
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (session_id) DO UPDATE SET
-                        fase = EXCLUDED.fase,
-                        fecha_inicio = EXCLUDED.fecha_inicio,
-                        fecha_fin = EXCLUDED.fecha_fin,
-                        archivos_descargados = EXCLUDED.archivos_descargados,
-                        duplicados_encontrados = EXCLUDED.duplicados_encontrados,
-                        errores = EXCLUDED.errores,
-                        duracion_minutos = EXCLUDED.duracion_minutos,
-                        estado = EXCLUDED.estado
-                """, (
-                    row['session_id'], row['fase'], row['fecha_inicio'],
-                    row['fecha_fin'], row['archivos_descargados'],
-                    row['duplicados_encontrados'], row['errores'],
-                    row['duracion_minutos'], row['estado']
-                ))
-            
+
+    def plan_tables(self):
+        """Tablas de los modelos presentes en SQLite, con las columnas que existen en ambos lados"""
+        self.plans = []
+        for table in Base.metadata.sorted_tables:
+            if self.tables and table.name not in self.tables:
+                continue
+            sqlite_columns = {row[1] for row in self.sqlite_conn.execute(f'PRAGMA table_info("{table.name}")')}
+            if not sqlite_columns:
+                logger.info(f"   Tabla {table.name}: no existe en SQLite, se omite")
+                continue
+            with self.pg_conn.cursor() as cursor:
+                cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+                               (table.name,))
+                pg_columns = {row[0] for row in cursor.fetchall()}
+            plan = TablePlan(table, sqlite_columns & pg_columns)
+            if plan.pk not in plan.columns:
+                logger.warning(f"⚠️ Tabla {table.name} sin clave primaria común, se omite")
+                continue
+            self.plans.append(plan)
+        return self.plans
+
+    # ------------------------------------------------------------------
+    # Puntos de control
+    # ------------------------------------------------------------------
+    def reset_checkpoints(self):
+        """Olvidar el avance de migraciones anteriores"""
+        with self.pg_conn.cursor() as cursor:
+            cursor.execute(CHECKPOINT_SQL)
+            cursor.execute("DELETE FROM migration_checkpoint")
+        self.pg_conn.commit()
+        logger.info("♻️ Puntos de control de la migración reiniciados")
+
+    def plan_partitions(self, plan):
+        """Particiones (desde, hasta] por id de la tabla; las de una ejecución anterior se reutilizan"""
+        with self.pg_conn.cursor() as cursor:
+            cursor.execute("SELECT particion, desde, hasta, ultimo_id, filas, completado FROM migration_checkpoint "
+                           "WHERE tabla = %s ORDER BY particion", (plan.name,))
+            rows = cursor.fetchall()
+        if not rows:
+            low, high, count = self.sqlite_conn.execute(
+                f'SELECT MIN("{plan.pk}"), MAX("{plan.pk}"), COUNT(*) FROM "{plan.name}"'
+            ).fetchone()
+            start = (low or 1) - 1
+            parts = max(1, min(self.workers, (count or 0) // (self.chunk_size * 4)))
+            step = -(-((high or start) - start) // parts) or 1
+            bounds = [(index, start + index * step, None if index == parts - 1 else start + (index + 1) * step)
+                      for index in range(parts)]
+            with self.pg_conn.cursor() as cursor:
+                for index, desde, hasta in bounds:
+                    cursor.execute("INSERT INTO migration_checkpoint (tabla, particion, desde, hasta, ultimo_id) "
+                                   "VALUES (%s, %s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                                   (plan.name, index, desde, hasta, desde))
             self.pg_conn.commit()
-            logger.info(f"✅ Tabla scraping_sessions migrada exitosamente: {len(sessions_data)} registros")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Error migrando tabla scraping_sessions: {e}")
+            rows = [(index, desde, hasta, desde, 0, False) for index, desde, hasta in bounds]
+        # La última partición no tiene tope: se repasa siempre por si SQLite recibió filas nuevas
+        return [{'particion': index, 'desde': desde, 'hasta': hasta, 'ultimo_id': last, 'filas': moved}
+                for index, desde, hasta, last, moved, done in rows if not done or hasta is None]
+
+    # ------------------------------------------------------------------
+    # Migración
+    # ------------------------------------------------------------------
+    def _read_chunk(self, sqlite_conn, plan, after, until):
+        query = f'SELECT {plan.column_list} FROM "{plan.name}" WHERE "{plan.pk}" > ?'
+        params = [after]
+        if until is not None:
+            query += f' AND "{plan.pk}" <= ?'
+            params.append(until)
+        query += f' ORDER BY "{plan.pk}" LIMIT ?'
+        params.append(self.chunk_size)
+        return sqlite_conn.execute(query, params).fetchall()
+
+    def migrate_partition(self, plan, part):
+        """Migrar una partición por trozos: COPY a staging, upsert y punto de control en una transacción"""
+        sqlite_conn = self._sqlite()
+        pg_conn = self._pg()
+        staging = f"staging_{plan.name}"
+        updates = ', '.join(f'"{name}" = EXCLUDED."{name}"' for name in plan.columns if name != plan.pk)
+        upsert = (f'INSERT INTO "{plan.name}" ({plan.column_list}) SELECT {plan.column_list} FROM {staging} '
+                  f'ON CONFLICT ("{plan.pk}") ' + (f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'))
+        last, moved = part['ultimo_id'], part['filas']
+        try:
+            with pg_conn.cursor() as cursor:
+                cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} '
+                               f'(LIKE "{plan.name}" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+            pg_conn.commit()
+            while True:
+                rows = self._read_chunk(sqlite_conn, plan, last, part['hasta'])
+                if not rows:
+                    break
+                buffer = io.StringIO()
+                for row in rows:
+                    buffer.write('\t'.join(plan.encode(row)))
+                    buffer.write('\n')
+                buffer.seek(0)
+                last = rows[-1][plan.pk_index]
+                moved += len(rows)
+                with pg_conn.cursor() as cursor:
+                    cursor.copy_expert(f'COPY {staging} ({plan.column_list}) FROM STDIN', buffer)
+                    cursor.execute(upsert)
+                    cursor.execute("UPDATE migration_checkpoint SET ultimo_id = %s, filas = %s, actualizado = now() "
+                                   "WHERE tabla = %s AND particion = %s", (last, moved, plan.name, part['particion']))
+                pg_conn.commit()
+                with self._progress_lock:
+                    self.progress[plan.name] = self.progress.get(plan.name, 0) + len(rows)
+                del rows, buffer
+            with pg_conn.cursor() as cursor:
+                cursor.execute("UPDATE migration_checkpoint SET completado = TRUE, actualizado = now() "
+                               "WHERE tabla = %s AND particion = %s", (plan.name, part['particion']))
+            pg_conn.commit()
+            return moved
+        except Exception:
+            pg_conn.rollback()
+            raise
+        finally:
+            sqlite_conn.close()
+            pg_conn.close()
+
+    def migrate_tables(self):
+        """Migrar todas las particiones de todas las tablas en paralelo"""
+        jobs = [(plan, part) for plan in self.plans for part in self.plan_partitions(plan)]
+        logger.info(f"📊 Migrando {len(self.plans)} tablas en {len(jobs)} particiones "
+                    f"({self.workers} a la vez, trozos de {self.chunk_size} filas)...")
+        begin = datetime.now()
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.migrate_partition, plan, part): (plan.name, part['particion'])
+                       for plan, part in jobs}
+            for future, (name, index) in futures.items():
+                try:
+                    moved = future.result()
+                    logger.info(f"   ✅ {name} partición {index}: {moved} filas")
+                except Exception as e:
+                    logger.error(f"❌ Error migrando {name} partición {index}: {e}")
+                    failed.append((name, index))
+        seconds = (datetime.now() - begin).total_seconds()
+        copied = sum(self.progress.values())
+        logger.info(f"📦 {copied} filas copiadas en {seconds:.1f}s ({copied / seconds if seconds else 0:.0f} filas/s)")
+        if failed:
+            logger.error(f"❌ {len(failed)} particiones con error; vuelve a ejecutar para retomarlas")
             return False
-    
-    def migrate_scraping_stats_table(self):
-        """Migrar tabla scraping_stats"""
+        return self.reset_sequences()
+
+    def reset_sequences(self):
+        """Ajustar las secuencias SERIAL al id máximo copiado (los ids se conservan)"""
         try:
-            cursor_sqlite = self.sqlite_conn.cursor()
-            cursor_sqlite.execute("SELECT * FROM scraping_stats")
-            stats_data = cursor_sqlite.fetchall()
-            
-            logger.info(f"📊 Migrando {len(stats_data)} registros de estadísticas...")
-            
-            cursor_pg = self.pg_conn.cursor()
-            
-            for row in stats_data:
-                cursor_pg.execute("""
-                    INSERT INTO scraping_stats (
-                        fecha, total_descargado, total_duplicados,
-                        total_errores, fase_actual, progreso_porcentual
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    row['fecha'], row['total_descargado'],
-                    row['total_duplicados'], row['total_errores'],
-                    row['fase_actual'], row['progreso_porcentual']
-                ))
-            
+            with self.pg_conn.cursor() as cursor:
+                for plan in self.plans:
+                    cursor.execute(
+                        f"SELECT setval(pg_get_serial_sequence('\"{plan.name}\"', '{plan.pk}'), "
+                        f"GREATEST(COALESCE(MAX(\"{plan.pk}\"), 0), 1), COALESCE(MAX(\"{plan.pk}\"), 0) > 0) "
+                        f"FROM \"{plan.name}\""
+                    )
             self.pg_conn.commit()
-            logger.info(f"✅ Tabla scraping_stats migrada exitosamente: {len(stats_data)} registros")
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Error migrando tabla scraping_stats: {e}")
+            self.pg_conn.rollback()
+            logger.error(f"❌ Error ajustando secuencias: {e}")
             return False
-    
+
+    # ------------------------------------------------------------------
+    # Verificación
+    # ------------------------------------------------------------------
+    def sqlite_checksum(self, plan):
+        """(filas, huella) de la tabla en SQLite, leída por trozos"""
+        sqlite_conn = self._sqlite()
+        try:
+            count, digest, last = 0, 0, None
+            while True:
+                rows = self._read_chunk(sqlite_conn, plan, last if last is not None else -2 ** 63, None)
+                if not rows:
+                    return count, digest
+                for row in rows:
+                    digest = (digest + row_digest(plan.encode(row))) % 2 ** 64
+                count += len(rows)
+                last = rows[-1][plan.pk_index]
+        finally:
+            sqlite_conn.close()
+
+    def postgresql_checksum(self, plan):
+        """(filas, huella) de la tabla en PostgreSQL con un cursor del lado del servidor"""
+        pg_conn = self._pg()
+        try:
+            count, digest = 0, 0
+            with pg_conn.cursor(name=f"verificar_{plan.name}") as cursor:
+                cursor.itersize = self.chunk_size
+                cursor.execute(f'SELECT {plan.column_list} FROM "{plan.name}"')
+                for row in cursor:
+                    digest = (digest + row_digest(plan.encode(row))) % 2 ** 64
+                    count += 1
+            pg_conn.commit()
+            return count, digest
+        finally:
+            pg_conn.close()
+
+    def verify_table(self, plan):
+        sqlite_count, sqlite_digest = self.sqlite_checksum(plan)
+        pg_count, pg_digest = self.postgresql_checksum(plan)
+        return {'tabla': plan.name, 'sqlite': sqlite_count, 'postgresql': pg_count,
+                'checksum_sqlite': f"{sqlite_digest:016x}", 'checksum_postgresql': f"{pg_digest:016x}",
+                'ok': sqlite_count == pg_count and sqlite_digest == pg_digest}
+
     def verify_migration(self):
-        """Verificar que la migración fue exitosa"""
+        """Verificar que la migración fue exitosa (recuento y checksum de contenido por tabla)"""
         try:
-            # Contar registros en ambas bases de datos
-            cursor_sqlite = self.sqlite_conn.cursor()
-            cursor_pg = self.pg_conn.cursor()
-            
-            # Contar tesis
-            cursor_sqlite.execute("SELECT COUNT(*) FROM tesis")
-            sqlite_tesis_count = cursor_sqlite.fetchone()[0]
-            
-            cursor_pg.execute("SELECT COUNT(*) FROM tesis")
-            pg_tesis_count = cursor_pg.fetchone()[0]
-            
-            # Contar sesiones
-            cursor_sqlite.execute("SELECT COUNT(*) FROM scraping_sessions")
-            sqlite_sessions_count = cursor_sqlite.fetchone()[0]
-            
-            cursor_pg.execute("SELECT COUNT(*) FROM scraping_sessions")
-            pg_sessions_count = cursor_pg.fetchone()[0]
-            
-            # Contar estadísticas
-            cursor_sqlite.execute("SELECT COUNT(*) FROM scraping_stats")
-            sqlite_stats_count = cursor_sqlite.fetchone()[0]
-            
-            cursor_pg.execute("SELECT COUNT(*) FROM scraping_stats")
-            pg_stats_count = cursor_pg.fetchone()[0]
-            
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(self.verify_table, self.plans))
+
             logger.info("📊 Verificación de migración:")
-            logger.info(f"   Tesis: SQLite={sqlite_tesis_count}, PostgreSQL={pg_tesis_count}")
-            logger.info(f"   Sesiones: SQLite={sqlite_sessions_count}, PostgreSQL={pg_sessions_count}")
-            logger.info(f"   Estadísticas: SQLite={sqlite_stats_count}, PostgreSQL={pg_stats_count}")
-            
-            success = (
-                sqlite_tesis_count == pg_tesis_count and
-                sqlite_sessions_count == pg_sessions_count and
-                sqlite_stats_count == pg_stats_count
-            )
-            
+            for result in results:
+                mark = "✅" if result['ok'] else "❌"
+                logger.info(f"   {mark} {result['tabla']}: SQLite={result['sqlite']} ({result['checksum_sqlite']}), "
+                            f"PostgreSQL={result['postgresql']} ({result['checksum_postgresql']})")
+
+            success = all(result['ok'] for result in results)
             if success:
                 logger.info("✅ Verificación exitosa: todos los registros migrados correctamente")
             else:
                 logger.warning("⚠️ Verificación fallida: algunos registros no coinciden")
-            
+
             return success
-            
+
         except Exception as e:
             logger.error(f"❌ Error en verificación: {e}")
             return False
-    
+
     def close_connections(self):
         """Cerrar conexiones"""
         if self.sqlite_conn:
@@ -321,51 +440,53 @@ class SQLiteToPostgreSQLMigrator:
         if self.pg_conn:
             self.pg_conn.close()
         logger.info("🔌 Conexiones cerradas")
-    
-    def run_migration(self):
-        """Ejecutar migración completa"""
+
+    def run_migration(self, verify_only=False, restart=False):
+        """Ejecutar migración completa (o retomar la anterior)"""
         logger.info("🚀 Iniciando migración de SQLite a PostgreSQL")
-        
+
         try:
             # Conectar a ambas bases de datos
             if not self.connect_sqlite():
                 return False
-            
+
             if not self.connect_postgresql():
                 return False
-            
+
             # Crear esquema en PostgreSQL
-            if not self.create_postgresql_schema():
+            if not verify_only and not self.create_postgresql_schema():
                 return False
-            
+
+            if restart:
+                self.reset_checkpoints()
+
+            self.plan_tables()
+
             # Migrar tablas
-            if not self.migrate_tesis_table():
-                return False
-            
-            if not self.migrate_scraping_sessions_table():
+            if not verify_only and not self.migrate_tables():
                 return False
-            
-            if not self.migrate_scraping_stats_table():
-                return False
-            
+
             # Verificar migración
             if not self.verify_migration():
                 return False
-            
+
             logger.info("🎉 Migración completada exitosamente")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Error en migración: {e}")
             return False
         finally:
             self.close_connections()
 
-def main():
-    """Función principal"""
-    
+def load_pg_config(config_path):
+    """Configuración de PostgreSQL de setup_cloud_sql.py (config/postgresql_config.json) si existe"""
+    if Path(config_path).exists():
+        with open(config_path, 'r') as f:
+            return json.load(f)['postgresql']
+
     # Configuración de PostgreSQL (ajusta según tu configuración)
-    pg_config = {
+    return {
         'host': 'localhost',  # Cambiar por IP de Cloud SQL
         'port': 5432,
         'database': 'scjn_database',
@@ -373,26 +494,43 @@ def main():
         'password': 'TU_PASSWORD_AQUI',  # Cambiar por tu password
         'sslmode': 'require'  # Para Cloud SQL
     }
-    
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrar la base SQLite del scraper a PostgreSQL")
+    parser.add_argument('--sqlite', default="data/scjn_database.db", help="Ruta a la base de datos SQLite")
+    parser.add_argument('--config', default="config/postgresql_config.json", help="Configuración de PostgreSQL")
+    parser.add_argument('--workers', type=int, default=4, help="Particiones en paralelo")
+    parser.add_argument('--chunk', type=int, default=500, help="Filas por trozo")
+    parser.add_argument('--tablas', help="Tablas separadas por comas (por defecto, todas)")
+    parser.add_argument('--solo-verificar', action='store_true', help="Solo comparar recuentos y checksums")
+    parser.add_argument('--reiniciar', action='store_true', help="Ignorar los puntos de control anteriores")
+    return parser.parse_args()
+
+def main():
+    """Función principal"""
+    args = parse_args()
+
     # Ruta a la base de datos SQLite
-    sqlite_db_path = "data/scjn_database.db"
-    
+    sqlite_db_path = args.sqlite
+
     # Verificar que existe el archivo SQLite
     if not Path(sqlite_db_path).exists():
         logger.error(f"❌ No se encontró el archivo SQLite: {sqlite_db_path}")
         return False
-    
+
     # Crear migrador y ejecutar
-    migrator = SQLiteToPostgreSQLMigrator(sqlite_db_path, pg_config)
-    success = migrator.run_migration()
-    
+    tables = [name.strip() for name in args.tablas.split(',')] if args.tablas else None
+    migrator = SQLiteToPostgreSQLMigrator(sqlite_db_path, load_pg_config(args.config), workers=args.workers,
+                                          chunk_size=args.chunk, tables=tables)
+    success = migrator.run_migration(verify_only=args.solo_verificar, restart=args.reiniciar)
+
     if success:
         print("🎉 Migración completada exitosamente")
         print("📝 Recuerda actualizar la configuración de tu aplicación para usar PostgreSQL")
     else:
         print("❌ Error en la migración. Revisa los logs para más detalles")
-    
+
     return success
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(0 if main() else 1)
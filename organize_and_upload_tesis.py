@@ -14,7 +14,10 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.database.models import get_session, Tesis
+from src.database.streaming import count_rows, iter_chunks
 from src.storage.google_drive import GoogleDriveManager
+from src.storage.folder_cache import DriveFolderCache
+from src.storage.backends import get_storage_backend
 from src.config import Config
 
 # Configurar logging
@@ -22,12 +25,28 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TesisOrganizer:
-    """Organizador de tesis con estructura de carpetas automática"""
+    """Organizador de tesis con estructura de carpetas automática (Drive, local o S3 según STORAGE_BACKEND)"""
     
-    def __init__(self):
+    def __init__(self, backend=None):
+        self.uses_drive = (backend.name if backend else Config.STORAGE_BACKEND) == 'drive'
+        if not self.uses_drive:
+            # Local / S3: la estructura Materia/Época/Sala es un prefijo de la clave, sin llamadas a Drive
+            self.backend = backend or get_storage_backend()
+            self.drive_manager = None
+            self.folder_cache = None
+            return
+        
+        self.backend = None
         self.drive_manager = GoogleDriveManager()
         self.drive_manager.authenticate()  # Forzar autenticación al inicializar
-        self.folder_cache = {}  # Cache de carpetas creadas
+        # Cache persistente de carpetas (padre + nombre -> ID), compartido entre ejecuciones
+        self.folder_cache = DriveFolderCache(lambda: self.drive_manager.service, Config.GOOGLE_DRIVE_FOLDER_ID)
+        self.folder_cache.load()
+        if Config.DRIVE_FOLDER_PREWARM:
+            try:
+                self.folder_cache.prewarm()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precargar el árbol de carpetas: {e}")
         
     def analyze_tesis_info(self, tesis_data):
         """Analizar información de la tesis para determinar categorías"""
@@ -114,64 +133,52 @@ class TesisOrganizer:
     def get_or_create_folder(self, folder_name, parent_id=None):
         """Obtener o crear carpeta en Google Drive"""
         try:
-            # Verificar cache
-            cache_key = f"{parent_id}_{folder_name}"
-            if cache_key in self.folder_cache:
-                return self.folder_cache[cache_key]
-            
             # Verificar que el servicio esté disponible
             if not self.drive_manager.service:
                 logger.error("❌ Servicio de Google Drive no disponible")
                 return None
             
-            # Buscar carpeta existente
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
-            if parent_id:
-                query += f" and '{parent_id}' in parents"
-            
-            files = self.drive_manager.service.files().list(
-                q=query,
-                fields="files(id, name)"
-            ).execute()
-            
-            if files.get('files'):
-                folder_id = files['files'][0]['id']
-                self.folder_cache[cache_key] = folder_id
-                logger.info(f"✅ Carpeta encontrada: {folder_name}")
-                return folder_id
-            
-            # Crear nueva carpeta
-            if parent_id:
-                folder_id = self.drive_manager.create_folder(folder_name, parent_id)
-            else:
-                folder_id = self.drive_manager.create_folder(folder_name)
-                
-            if folder_id:
-                self.folder_cache[cache_key] = folder_id
-                logger.info(f"✅ Carpeta creada: {folder_name}")
-                return folder_id
-            
-            return None
+            parent_id = parent_id or Config.GOOGLE_DRIVE_FOLDER_ID
+            return self.folder_cache.get_or_create(folder_name, parent_id, self.drive_manager.create_folder)
             
         except Exception as e:
             logger.error(f"❌ Error con carpeta {folder_name}: {e}")
             return None
     
+    def prepare_upload(self, tesis_data):
+        """Determinar destino y nombre de archivo de una tesis (None si no hay carpeta)
+        
+        El destino es el ID de la carpeta en Drive, o el prefijo "Materia/Época/Sala" en otros backends.
+        """
+        # Analizar información de la tesis
+        categories = self.analyze_tesis_info(tesis_data)
+        logger.info(f"📊 Categorías detectadas: {categories}")
+        filename = f"Tesis_{tesis_data['scjn_id']}_{categories['materia'].replace(' ', '_')}.pdf"
+        
+        if not self.uses_drive:
+            prefix = '/'.join(categories[level].replace('/', '_') for level in ('materia', 'epoca', 'sala'))
+            return prefix, filename, categories
+        
+        # Crear estructura de carpetas
+        target_folder_id = self.create_folder_structure(categories)
+        if not target_folder_id:
+            logger.error("❌ No se pudo crear estructura de carpetas")
+            return None
+        
+        return target_folder_id, filename, categories
+    
     def upload_tesis_with_organization(self, tesis_data, pdf_path):
-        """Subir tesis organizada a Google Drive"""
+        """Subir tesis organizada al backend de almacenamiento; devuelve (id, enlace)"""
         try:
-            # Analizar información de la tesis
-            categories = self.analyze_tesis_info(tesis_data)
-            logger.info(f"📊 Categorías detectadas: {categories}")
-            
-            # Crear estructura de carpetas
-            target_folder_id = self.create_folder_structure(categories)
-            if not target_folder_id:
-                logger.error("❌ No se pudo crear estructura de carpetas")
+            prepared = self.prepare_upload(tesis_data)
+            if not prepared:
                 return None
+            target_folder_id, filename, categories = prepared
             
-            # Crear nombre descriptivo del archivo
-            filename = f"Tesis_{tesis_data['scjn_id']}_{categories['materia'].replace(' ', '_')}.pdf"
+            if not self.uses_drive:
+                stored = self.backend.put(pdf_path, f"{target_folder_id}/{filename}")
+                logger.info(f"✅ Tesis guardada en {self.backend.name}: {stored.key}")
+                return (stored.object_id, stored.link)
             
             # Subir archivo a la carpeta correspondiente
             result = self.drive_manager.upload_file(pdf_path, filename, target_folder_id)
@@ -189,8 +196,8 @@ class TesisOrganizer:
             logger.error(f"❌ Error subiendo tesis organizada: {e}")
             return None
 
-def complete_tesis_with_organization():
-    """Completar proceso de tesis con organización automática"""
+def complete_tesis_with_organization(scjn_ids=None):
+    """Subir con organización automática las tesis sin enlace de Drive que tienen PDF local (por trozos)"""
     
     logger.info("🚀 INICIANDO PROCESO CON ORGANIZACIÓN AUTOMÁTICA")
     logger.info("="*60)
@@ -200,57 +207,66 @@ def complete_tesis_with_organization():
     os.environ['GOOGLE_DRIVE_SERVICE_ACCOUNT_PATH'] = 'credentials/service_account.json'
     os.environ['GOOGLE_DRIVE_FOLDER_ID'] = '1IPkvCqNToQCmeF4J2mqDxDVbFsTGS1Bb'  # Carpeta real encontrada
     
-    # Verificar PDF
-    pdf_path = "data/pdfs/tesis_2030758.pdf"
-    if not os.path.exists(pdf_path):
-        logger.error(f"❌ PDF no encontrado: {pdf_path}")
-        return False
-    
-    logger.info(f"✅ PDF encontrado: {pdf_path}")
+    filters = [Tesis.google_drive_link.is_(None)]
+    if scjn_ids:
+        filters.append(Tesis.scjn_id.in_(list(scjn_ids)))
     
-    # Obtener datos de la tesis
     session = get_session()
+    organizer = None
+    subidas = 0
+    errores = 0
     try:
-        # Buscar por el scjn_id correcto
-        tesis = session.query(Tesis).filter_by(scjn_id="2030758").first()
-        if not tesis:
-            logger.error("❌ Tesis no encontrada en la base de datos con scjn_id=2030758")
-            return False
+        logger.info(f"📊 Tesis sin enlace de Google Drive: {count_rows(session, Tesis.id, filters=filters)}")
         
-        # Solo actualizar los campos de Google Drive y pdf_url
-        tesis.pdf_url = "https://sjf2.scjn.gob.mx/detalle/tesis/2030758"
-        
-        # Crear organizador
-        organizer = TesisOrganizer()
-        
-        # Preparar datos de tesis
-        tesis_data = {
-            'scjn_id': tesis.scjn_id,
-            'titulo': tesis.titulo,
-            'texto': tesis.texto,
-            'rubro': tesis.rubro
-        }
-        
-        # Subir con organización
-        result = organizer.upload_tesis_with_organization(tesis_data, pdf_path)
+        # Solo las columnas que usa el organizador; html_content nunca se carga
+        columns = (Tesis.id, Tesis.scjn_id, Tesis.titulo, Tesis.texto, Tesis.rubro)
+        for chunk in iter_chunks(session, *columns, filters=filters):
+            for tesis_id, scjn_id, titulo, texto, rubro in chunk:
+                pdf_path = f"data/pdfs/tesis_{scjn_id}.pdf"
+                if not os.path.exists(pdf_path):
+                    continue
+                
+                logger.info(f"✅ PDF encontrado: {pdf_path}")
+                
+                # Crear organizador solo si hay algo que subir
+                organizer = organizer or TesisOrganizer()
+                
+                # Preparar datos de tesis
+                tesis_data = {
+                    'scjn_id': scjn_id,
+                    'titulo': titulo,
+                    'texto': texto,
+                    'rubro': rubro
+                }
+                
+                # Subir con organización
+                result = organizer.upload_tesis_with_organization(tesis_data, pdf_path)
+                
+                if not result:
+                    logger.error(f"❌ Error en el proceso de subida de la tesis {scjn_id}")
+                    errores += 1
+                    continue
+                
+                # Solo actualizar los campos de Google Drive y pdf_url
+                file_id, web_link = result
+                session.query(Tesis).filter(Tesis.id == tesis_id).update({
+                    'pdf_url': f"https://sjf2.scjn.gob.mx/detalle/tesis/{scjn_id}",
+                    'google_drive_id': file_id,
+                    'google_drive_link': web_link
+                }, synchronize_session=False)
+                
+                # Guardar en base de datos
+                session.commit()
+                subidas += 1
         
-        if result:
-            file_id, web_link = result
-            tesis.google_drive_id = file_id
-            tesis.google_drive_link = web_link
-            
-            # Guardar en base de datos
-            session.commit()
-            
+        logger.info(f"📊 Tesis subidas: {subidas}, errores: {errores}")
+        if subidas:
             logger.info("🎉 PROCESO COMPLETADO EXITOSAMENTE")
             logger.info("✅ PDF descargado y subido a Google Drive")
             logger.info("✅ Organización automática aplicada")
             logger.info("✅ Base de datos actualizada")
-            
-            return True
-        else:
-            logger.error("❌ Error en el proceso de subida")
-            return False
+        
+        return errores == 0
             
     except Exception as e:
         logger.error(f"❌ Error en el proceso: {e}")
@@ -261,7 +277,8 @@ def complete_tesis_with_organization():
 
 def main():
     """Función principal"""
-    success = complete_tesis_with_organization()
+    # Opcional: scjn_id de las tesis a procesar (por defecto, todas las pendientes con PDF local)
+    success = complete_tesis_with_organization(sys.argv[1:] or None)
     
     if success:
         logger.info("🎉 ¡Tesis procesada y organizada exitosamente!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Reconciliación de enlaces de Google Drive
+- Verifica que cada google_drive_id de la tabla tesis existe en Drive y no está en la papelera
+- Usa la API HTTP batch: 100 archivos por petición (10k tesis ≈ 100 peticiones)
+- Con --limpiar borra los enlaces rotos para que upload_existing_pdfs.py vuelva a subirlos
+- Con --reindexar-md5 reconstruye el índice MD5 de deduplicación con un listado completo
+
+Uso:
+    python reconciliar_drive.py
+    python reconciliar_drive.py --limpiar --reporte data/reconciliacion.json
+    python reconciliar_drive.py --reindexar-md5
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import Config
+from src.storage.drive_batch import DriveBatcher, verify_drive_links
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verificar en lotes los enlaces de Google Drive de las tesis")
+    parser.add_argument('--batch-size', type=int, default=Config.DRIVE_BATCH_SIZE,
+                        help="Archivos por petición batch (máx. 100)")
+    parser.add_argument('--limite', type=int, help="Revisar como máximo N tesis")
+    parser.add_argument('--limpiar', action='store_true', help="Borrar enlaces de archivos faltantes o en papelera")
+    parser.add_argument('--reporte', help="Guardar el detalle de problemas en un archivo JSON")
+    parser.add_argument('--reindexar-md5', action='store_true',
+                        help="Reconstruir el índice MD5 de Drive (drive_md5_index) con un listado completo")
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+
+    from src.storage.google_drive import GoogleDriveManager
+
+    gdrive = GoogleDriveManager()
+    gdrive.authenticate()
+
+    if args.reindexar_md5:
+        from src.storage.md5_index import DriveMD5Index
+
+        index = DriveMD5Index(lambda: gdrive.service, gdrive.folder_id)
+        result = index.refresh(full=True)
+        print(f"🧮 Índice MD5: {len(index)} contenidos distintos ({result['listados']} archivos listados, "
+              f"{index.stats['listado_paginas']} páginas)")
+
+    batcher = DriveBatcher(gdrive.service, batch_size=args.batch_size)
+    summary = verify_drive_links(batcher, clear_missing=args.limpiar, limit=args.limite)
+
+    print("\n📊 === RECONCILIACIÓN DE GOOGLE DRIVE ===")
+    print(f"🔍 Tesis revisadas: {summary['revisadas']}")
+    print(f"✅ Correctas: {summary['ok']}")
+    print(f"❌ Faltantes en Drive: {summary['faltantes']}")
+    print(f"🗑️ En papelera: {summary['en_papelera']}")
+    print(f"⚠️ Errores de consulta: {summary['errores']}")
+    if summary['omitidas']:
+        print(f"⏭️ Omitidas (objetos de backends local/S3, no de Drive): {summary['omitidas']}")
+    if args.limpiar:
+        print(f"♻️ Enlaces limpiados: {summary['limpiadas']}")
+    print(f"⏱️ {summary['peticiones_http']} peticiones HTTP en {summary['duracion']:.1f}s")
+
+    if args.reporte:
+        with open(args.reporte, 'w', encoding='utf-8') as f:
+            json.dump(summary['problemas'], f, ensure_ascii=False, indent=2)
+        print(f"📄 Reporte guardado en {args.reporte}")
+
+    sys.exit(0 if summary['faltantes'] + summary['en_papelera'] + summary['errores'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
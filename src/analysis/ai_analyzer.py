@@ -237,11 +237,12 @@ class AIAnalyzer:
             logger.error(f"Error evaluando relevancia: {e}")
             return 0.5
     
-    def answer_question(self, question: str, context_documents: List[Dict]) -> str:
-        """Responder pregunta basada en documentos"""
+    def answer_question(self, question: str, context_documents: List[Dict], context: Optional[str] = None) -> str:
+        """Responder pregunta basada en documentos (context: contexto ya empaquetado por el motor de recuperación)"""
         try:
             # Preparar contexto
-            context = self._prepare_context_for_question(context_documents)
+            if context is None:
+                context = self._prepare_context_for_question(context_documents)
             
             prompt = f"""
             Basándote en los siguientes documentos jurídicos, responde la pregunta:
@@ -280,7 +281,10 @@ class AIAnalyzer:
             if doc.get('titulo'):
                 doc_context += f"Título: {doc['titulo']}\n"
             
-            if doc.get('resumen'):
+            if doc.get('pasajes'):
+                # Pasajes seleccionados por el motor de recuperación
+                doc_context += "Pasajes:\n" + "\n[...]\n".join(p['texto'] for p in doc['pasajes']) + "\n"
+            elif doc.get('resumen'):
                 doc_context += f"Resumen: {doc['resumen']}\n"
             elif doc.get('texto'):
                 doc_context += f"Texto: {doc['texto'][:500]}...\n"
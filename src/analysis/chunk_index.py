@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Índice de pasajes de tesis (tabla tesis_chunk)
+- División de texto y PDF en pasajes con offsets
+- Re-indexación incremental por hash del documento
+- Puesta al día de tesis insertadas o cambiadas desde una marca (id, fecha_actualizacion)
+- Embeddings por pasaje calculados en lotes (columna JSON; el re-ranking los compara solo con los candidatos)
+- Búsqueda de texto completo (FTS5 / tsvector)
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import Tesis, TesisChunk, TesisPDF
+from src.analysis.chunking import chunk_text
+from src.analysis.retrieval import IndexedPassage, get_embedder, tokenize
+
+logger = logging.getLogger(__name__)
+
+FUENTES = ('texto', 'pdf')
+
+
+def document_hash(text_value: str) -> str:
+    """Hash del documento (incluye parámetros de división para forzar re-indexación si cambian)"""
+    params = f"{Config.RETRIEVAL_PASSAGE_CHARS}:{Config.RETRIEVAL_PASSAGE_OVERLAP}:"
+    return hashlib.sha256((params + (text_value or '')).encode('utf-8')).hexdigest()
+
+
+class ChunkIndexer:
+    """Mantener la tabla tesis_chunk sincronizada con los documentos"""
+
+    def __init__(self, embedder=None, with_embeddings: bool = True):
+        self.embedder = embedder or get_embedder()
+        self.with_embeddings = with_embeddings
+        self.stats = {'documentos': 0, 'sin_cambios': 0, 'reindexados': 0, 'pasajes': 0, 'eliminados': 0}
+
+    def existing_hashes(self, session: Session, fuente: str) -> Dict[int, str]:
+        """Obtener hash actual por tesis para una fuente"""
+        rows = session.query(TesisChunk.tesis_id, TesisChunk.doc_hash).filter(
+            TesisChunk.fuente == fuente, TesisChunk.orden == 0
+        )
+        return {tesis_id: doc_hash for tesis_id, doc_hash in rows}
+
+    def sync_document(self, session: Session, tesis_id: int, fuente: str, text_value: Optional[str],
+                      current_hash: Optional[str] = None) -> int:
+        """Re-dividir un documento solo si cambió; devuelve pasajes escritos"""
+        self.stats['documentos'] += 1
+        new_hash = document_hash(text_value)
+
+        if current_hash == new_hash:
+            self.stats['sin_cambios'] += 1
+            return 0
+
+        if current_hash is not None:
+            deleted = session.query(TesisChunk).filter(
+                TesisChunk.tesis_id == tesis_id, TesisChunk.fuente == fuente
+            ).delete(synchronize_session=False)
+            self.stats['eliminados'] += deleted
+
+        passages = chunk_text(text_value or '', Config.RETRIEVAL_PASSAGE_CHARS, Config.RETRIEVAL_PASSAGE_OVERLAP)
+        embeddings = self._embed([p.texto for p in passages])
+
+        for passage, embedding in zip(passages, embeddings):
+            session.add(TesisChunk(
+                tesis_id=tesis_id, fuente=fuente, orden=passage.orden,
+                inicio=passage.inicio, fin=passage.fin, texto=passage.texto,
+                doc_hash=new_hash, embedding=embedding,
+                embedding_modelo=self.embedder.name if embedding is not None else None
+            ))
+
+        self.stats['reindexados'] += 1
+        self.stats['pasajes'] += len(passages)
+        return len(passages)
+
+    def _embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if not self.with_embeddings or not texts:
+            return [None] * len(texts)
+        try:
+            return self.embedder.embed(texts)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron calcular embeddings, se guardan pasajes sin vector: {e}")
+            return [None] * len(texts)
+
+    def sync_documents(self, session: Session, fuente: str, documents: Iterable[Tuple[int, Optional[str]]],
+                       hashes: Optional[Dict[int, str]] = None, commit_every: int = 200) -> Dict[str, int]:
+        """Sincronizar documentos (tesis_id, texto) de una fuente, confirmando por lotes"""
+        if hashes is None:
+            hashes = self.existing_hashes(session, fuente)
+        pending = 0
+
+        for tesis_id, text_value in documents:
+            if not text_value and tesis_id not in hashes:
+                continue
+            if self.sync_document(session, tesis_id, fuente, text_value, hashes.get(tesis_id)):
+                pending += 1
+            if pending >= commit_every:
+                session.commit()
+                pending = 0
+
+        session.commit()
+        return dict(self.stats)
+
+    def sync_texto(self, session: Session, batch_size: int = 500) -> Dict[str, int]:
+        """Sincronizar pasajes del campo texto de todas las tesis (lotes por id, memoria acotada)"""
+        start = time.time()
+        hashes = self.existing_hashes(session, 'texto')
+        last_id = 0
+
+        while True:
+            batch = session.query(Tesis.id, Tesis.texto).filter(Tesis.id > last_id).order_by(Tesis.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            self.sync_documents(session, 'texto', batch, hashes=hashes)
+
+        logger.info(f"✅ Pasajes de texto sincronizados en {time.time() - start:.1f}s: {self.stats}")
+        return dict(self.stats)
+
+    def sync_pdf(self, session: Session, batch_size: int = 200) -> Dict[str, int]:
+        """Sincronizar pasajes del texto extraído de PDFs (tabla tesis_pdf)"""
+        start = time.time()
+        hashes = self.existing_hashes(session, 'pdf')
+        last_id = 0
+
+        while True:
+            batch = session.query(TesisPDF.id, TesisPDF.tesis_id, TesisPDF.texto).filter(
+                TesisPDF.id > last_id
+            ).order_by(TesisPDF.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            self.sync_documents(session, 'pdf', [(tesis_id, texto) for _, tesis_id, texto in batch], hashes=hashes)
+
+        logger.info(f"✅ Pasajes de PDF sincronizados en {time.time() - start:.1f}s: {self.stats}")
+        return dict(self.stats)
+
+
+def sync_changed_tesis(session: Session, indexer: ChunkIndexer,
+                       since: Optional[Tuple[int, Optional[datetime]]] = None) -> Tuple[Tuple[int, Optional[datetime]], int]:
+    """Dividir las tesis insertadas o cambiadas desde la marca (id máximo, fecha_actualizacion máxima)
+
+    Sin marca se parte de tesis_chunk (última tesis dividida y fecha del último pasaje). Devuelve la marca
+    nueva y las tesis revisadas.
+    """
+    if since is None:
+        last_id, last_chunk = session.query(func.max(TesisChunk.tesis_id), func.max(TesisChunk.fecha_creacion)).filter(
+            TesisChunk.fuente == 'texto'
+        ).one()
+        since = (last_id or 0, last_chunk)
+
+    since_id, since_fecha = since
+    condition = Tesis.id > since_id
+    if since_fecha is not None:
+        condition = condition | (Tesis.fecha_actualizacion > since_fecha)
+    rows = session.query(Tesis.id, Tesis.texto, Tesis.fecha_actualizacion).filter(condition).order_by(Tesis.id).all()
+    if not rows:
+        return since, 0
+
+    ids = [row[0] for row in rows]
+    hashes = {}
+    for start in range(0, len(ids), 500):
+        hashes.update(session.query(TesisChunk.tesis_id, TesisChunk.doc_hash).filter(
+            TesisChunk.fuente == 'texto', TesisChunk.orden == 0, TesisChunk.tesis_id.in_(ids[start:start + 500])
+        ))
+    indexer.sync_documents(session, 'texto', [(row[0], row[1]) for row in rows], hashes=hashes)
+
+    fechas = [row[2] for row in rows if row[2] is not None] + ([since_fecha] if since_fecha else [])
+    return (max(since_id, ids[-1]), max(fechas) if fechas else None), len(rows)
+
+
+def chunk_index_available(session: Session) -> bool:
+    """Verificar si existen pasajes indexados"""
+    try:
+        return session.query(TesisChunk.id).first() is not None
+    except SQLAlchemyError:
+        return False
+
+
+def search_chunks(session: Session, question: str, limit: int) -> List[Tuple[IndexedPassage, float, Optional[List[float]], Optional[str]]]:
+    """Buscar pasajes por texto completo; devuelve (pasaje, puntuación, embedding, modelo)"""
+    tokens = tokenize(question)
+    if not tokens:
+        return []
+
+    dialect = session.bind.dialect.name
+    if dialect == 'sqlite':
+        match = ' OR '.join(f'"{t}"' for t in dict.fromkeys(tokens))
+        sql = text(
+            "SELECT rowid, -bm25(tesis_chunk_fts) AS score FROM tesis_chunk_fts "
+            "WHERE tesis_chunk_fts MATCH :q ORDER BY bm25(tesis_chunk_fts) LIMIT :limit"
+        )
+        params = {'q': match, 'limit': limit}
+    elif dialect == 'postgresql':
+        sql = text(
+            "SELECT id, ts_rank_cd(to_tsvector('spanish', texto), to_tsquery('spanish', :q)) AS score "
+            "FROM tesis_chunk WHERE to_tsvector('spanish', texto) @@ to_tsquery('spanish', :q) "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+        params = {'q': ' | '.join(dict.fromkeys(tokens)), 'limit': limit}
+    else:
+        return []
+
+    scored = [(row[0], float(row[1])) for row in session.execute(sql, params)]
+    if not scored:
+        return []
+
+    ids = [chunk_id for chunk_id, _ in scored]
+    rows = session.query(
+        TesisChunk.id, TesisChunk.tesis_id, TesisChunk.fuente, TesisChunk.orden, TesisChunk.inicio,
+        TesisChunk.fin, TesisChunk.texto, TesisChunk.embedding, TesisChunk.embedding_modelo,
+        Tesis.scjn_id, Tesis.titulo
+    ).join(Tesis, Tesis.id == TesisChunk.tesis_id).filter(TesisChunk.id.in_(ids)).all()
+    by_id = {row[0]: row for row in rows}
+
+    results = []
+    for chunk_id, score in scored:
+        row = by_id.get(chunk_id)
+        if row is None:
+            continue
+        passage = IndexedPassage(
+            tesis_id=row[1], scjn_id=row[9], titulo=row[10] or '', orden=row[3],
+            inicio=row[4], fin=row[5], texto=row[6], fuente=row[2]
+        )
+        results.append((passage, score, row[7], row[8]))
+    return results
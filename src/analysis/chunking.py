@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+División de textos largos en pasajes
+- Pasajes con solapamiento
+- Cortes preferentes en fin de párrafo / oración
+- Offsets de carácter respecto al texto original
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Separadores preferidos para cortar, de mayor a menor prioridad
+_BREAK_PATTERNS = [
+    re.compile(r'\n\s*\n'),   # párrafo
+    re.compile(r'[.;:]\s'),   # oración
+    re.compile(r'\s')         # palabra
+]
+
+
+@dataclass
+class Passage:
+    """Pasaje de un texto con sus offsets [inicio, fin)"""
+    orden: int
+    inicio: int
+    fin: int
+    texto: str
+
+
+def _find_break(text: str, start: int, end: int, min_end: int) -> int:
+    """Buscar el mejor punto de corte en text[min_end:end]"""
+    window = text[min_end:end]
+    for pattern in _BREAK_PATTERNS:
+        matches = list(pattern.finditer(window))
+        if matches:
+            return min_end + matches[-1].end()
+    return end
+
+
+def chunk_text(text: str, max_chars: int = 800, overlap: int = 150) -> List[Passage]:
+    """Dividir texto en pasajes de hasta max_chars con solapamiento aproximado"""
+    if not text:
+        return []
+
+    overlap = max(0, min(overlap, max_chars // 2))
+    length = len(text)
+    passages = []
+    start = 0
+
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            # No cortar en la primera mitad del pasaje
+            end = _find_break(text, start, end, start + max_chars // 2)
+
+        fragment = text[start:end].strip()
+        if fragment:
+            # Ajustar offsets al fragmento sin espacios
+            leading = len(text[start:end]) - len(text[start:end].lstrip())
+            inicio = start + leading
+            passages.append(Passage(orden=len(passages), inicio=inicio, fin=inicio + len(fragment), texto=fragment))
+
+        if end >= length:
+            break
+
+        next_start = end - overlap
+        if overlap:
+            # Iniciar el siguiente pasaje en límite de palabra
+            space = text.find(' ', next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = max(next_start, start + 1)
+
+    return passages
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimar tokens de un texto (aprox. 4 caracteres por token en español)"""
+    return max(1, len(text) // 4) if text else 0
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Extracción de texto de PDFs de tesis
+- PyMuPDF en un pool de procesos
+- Respaldo con pdfplumber para diseños problemáticos
+- Incremental por hash del archivo (sha256)
+- Reporte de páginas por segundo
+"""
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import Tesis, TesisPDF
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+logger = logging.getLogger(__name__)
+
+
+def find_pdf_path(scjn_id: str, pdfs_dir: Path = None) -> Optional[Path]:
+    """Ubicar el PDF local de una tesis (nombres usados por los distintos scrapers)"""
+    pdfs_dir = Path(pdfs_dir or Config.PDFS_DIR)
+    for name in (f"tesis_{scjn_id}.pdf", f"{scjn_id}.pdf"):
+        path = pdfs_dir / name
+        if path.exists():
+            return path
+    return None
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Calcular sha256 de un archivo leyendo por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_pymupdf(path: str) -> Tuple[int, str]:
+    with fitz.open(path) as doc:
+        pages = [page.get_text("text") for page in doc]
+    return len(pages), "\n\n".join(p.strip() for p in pages)
+
+
+def _extract_pdfplumber(path: str) -> Tuple[int, str]:
+    with pdfplumber.open(path) as pdf:
+        pages = [(page.extract_text() or '') for page in pdf.pages]
+    return len(pages), "\n\n".join(p.strip() for p in pages)
+
+
+def extract_pdf(path: str, min_chars_per_page: int = 40) -> Dict[str, Any]:
+    """Extraer texto y número de páginas (PyMuPDF, con respaldo pdfplumber)"""
+    result = {'paginas': 0, 'texto': '', 'extractor': None, 'error': None}
+    errors = []
+
+    if fitz is not None:
+        try:
+            result['paginas'], result['texto'] = _extract_pymupdf(path)
+            result['extractor'] = 'pymupdf'
+        except Exception as e:
+            errors.append(f"pymupdf: {e}")
+
+    # Poco texto por página suele indicar columnas/tablas mal resueltas o capas de texto raras
+    sparse = len(result['texto'].strip()) < min_chars_per_page * max(result['paginas'], 1)
+    if (result['extractor'] is None or sparse) and pdfplumber is not None:
+        try:
+            paginas, texto = _extract_pdfplumber(path)
+            if result['extractor'] is None or len(texto.strip()) > len(result['texto'].strip()):
+                result.update(paginas=paginas, texto=texto, extractor='pdfplumber')
+        except Exception as e:
+            errors.append(f"pdfplumber: {e}")
+
+    if result['extractor'] is None:
+        result['error'] = '; '.join(errors) or "PyMuPDF y pdfplumber no están instalados"
+    return result
+
+
+def _process_job(job: Tuple[int, str, Optional[str], int]) -> Dict[str, Any]:
+    """Tarea del pool: hash del archivo y extracción solo si cambió"""
+    tesis_id, path, known_hash, min_chars = job
+    start = time.perf_counter()
+    try:
+        sha256 = file_sha256(path)
+        size = os.path.getsize(path)
+    except OSError as e:
+        return {'tesis_id': tesis_id, 'ruta': path, 'error': str(e), 'sin_cambios': False}
+
+    if sha256 == known_hash:
+        return {'tesis_id': tesis_id, 'ruta': path, 'sha256': sha256, 'sin_cambios': True}
+
+    result = extract_pdf(path, min_chars)
+    result.update(tesis_id=tesis_id, ruta=path, sha256=sha256, bytes=size, sin_cambios=False,
+                  segundos=time.perf_counter() - start)
+    return result
+
+
+class PDFExtractionStage:
+    """Etapa de ingesta: extrae texto de los PDFs locales y lo guarda en tesis_pdf"""
+
+    def __init__(self, workers: int = None, pdfs_dir: Path = None, index_passages: bool = True,
+                 commit_every: int = 50):
+        self.workers = workers or Config.PDF_EXTRACTION_WORKERS
+        self.pdfs_dir = Path(pdfs_dir or Config.PDFS_DIR)
+        self.index_passages = index_passages
+        self.commit_every = commit_every
+        self.stats = {
+            'archivos': 0, 'extraidos': 0, 'sin_cambios': 0, 'errores': 0,
+            'paginas': 0, 'bytes': 0, 'pymupdf': 0, 'pdfplumber': 0, 'segundos': 0.0
+        }
+
+    def pending_jobs(self, session: Session, limit: int = None) -> List[Tuple[int, str, Optional[str], int]]:
+        """Tesis con PDF local, junto con el hash conocido de su última extracción"""
+        known = dict(session.query(TesisPDF.tesis_id, TesisPDF.sha256))
+        jobs = []
+        for tesis_id, scjn_id in session.query(Tesis.id, Tesis.scjn_id).order_by(Tesis.id):
+            path = find_pdf_path(scjn_id, self.pdfs_dir)
+            if path is None:
+                continue
+            jobs.append((tesis_id, str(path), known.get(tesis_id), Config.PDF_MIN_CHARS_PER_PAGE))
+            if limit and len(jobs) >= limit:
+                break
+        return jobs
+
+    def _results(self, jobs) -> Iterator[Dict[str, Any]]:
+        if self.workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                yield _process_job(job)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for result in executor.map(_process_job, jobs, chunksize=4):
+                yield result
+
+    def run(self, session: Session, limit: int = None) -> Dict[str, Any]:
+        """Procesar todos los PDFs pendientes y guardar resultados"""
+        jobs = self.pending_jobs(session, limit)
+        self.stats['archivos'] = len(jobs)
+        logger.info(f"📄 PDFs locales encontrados: {len(jobs)} (procesos: {self.workers})")
+
+        indexer = None
+        chunk_hashes = {}
+        if self.index_passages:
+            from src.analysis.chunk_index import ChunkIndexer
+            indexer = ChunkIndexer()
+            chunk_hashes = indexer.existing_hashes(session, 'pdf')
+
+        start = time.time()
+        pending = 0
+
+        for result in self._results(jobs):
+            if result.get('sin_cambios'):
+                self.stats['sin_cambios'] += 1
+                continue
+
+            self._store(session, result)
+            if result.get('error'):
+                self.stats['errores'] += 1
+                logger.warning(f"⚠️ Error extrayendo {result['ruta']}: {result['error']}")
+            else:
+                self.stats['extraidos'] += 1
+                self.stats['paginas'] += result['paginas']
+                self.stats['bytes'] += result.get('bytes') or 0
+                self.stats['segundos'] += result.get('segundos', 0.0)
+                self.stats[result['extractor']] += 1
+                if indexer is not None:
+                    indexer.sync_document(session, result['tesis_id'], 'pdf', result['texto'],
+                                          chunk_hashes.get(result['tesis_id']))
+
+            pending += 1
+            if pending >= self.commit_every:
+                session.commit()
+                pending = 0
+                self._log_progress(start)
+
+        session.commit()
+        elapsed = time.time() - start
+        self.stats['duracion'] = elapsed
+        self.stats['paginas_por_segundo'] = self.stats['paginas'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"✅ Extracción completada: {self.stats['extraidos']} PDFs, {self.stats['paginas']} páginas "
+            f"en {elapsed:.1f}s ({self.stats['paginas_por_segundo']:.1f} páginas/s), "
+            f"{self.stats['sin_cambios']} sin cambios, {self.stats['errores']} errores"
+        )
+        return dict(self.stats)
+
+    def _store(self, session: Session, result: Dict[str, Any]):
+        """Insertar o actualizar el registro tesis_pdf"""
+        record = session.query(TesisPDF).filter(TesisPDF.tesis_id == result['tesis_id']).first()
+        if record is None:
+            record = TesisPDF(tesis_id=result['tesis_id'])
+            session.add(record)
+
+        record.ruta = result['ruta']
+        record.sha256 = result.get('sha256') if not result.get('error') else None
+        record.bytes = result.get('bytes')
+        record.paginas = result.get('paginas', 0)
+        record.texto = result.get('texto') or None
+        record.extractor = result.get('extractor')
+        record.error = result.get('error')
+        record.fecha_extraccion = datetime.now()
+
+    def _log_progress(self, start: float):
+        elapsed = time.time() - start
+        rate = self.stats['paginas'] / elapsed if elapsed > 0 else 0.0
+        logger.info(f"📊 Progreso: {self.stats['extraidos']}/{self.stats['archivos']} PDFs, {rate:.1f} páginas/s")
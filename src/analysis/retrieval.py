@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Motor de recuperación para consultas sobre tesis (RAG)
+- Candidatos por BM25 sobre pasajes (tabla tesis_chunk con FTS, o índice en memoria)
+- tesis_chunk se pone al día con las tesis nuevas o cambiadas antes de buscar
+- Índice en memoria incremental: solo re-indexa tesis nuevas o cambiadas; reconstrucción completa en segundo plano
+- Re-ranking por similitud vectorial
+- Empaquetado de contexto por presupuesto de tokens
+- Cache de recuperación por consulta
+"""
+
+import hashlib
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import Config
+from src.analysis.chunking import chunk_text, estimate_tokens
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías frecuentes en preguntas jurídicas en español
+STOPWORDS = {
+    'que', 'los', 'las', 'del', 'por', 'para', 'con', 'una', 'uno', 'unos', 'unas', 'sobre',
+    'como', 'cual', 'cuales', 'cuando', 'donde', 'este', 'esta', 'estos', 'estas', 'ese', 'esa',
+    'son', 'sus', 'hay', 'dice', 'debe', 'pueden', 'puede', 'entre', 'sin', 'mas', 'tiene',
+    'ser', 'fue', 'han', 'ante', 'bajo', 'segun', 'dicha', 'dicho', 'misma', 'mismo', 'qué',
+    'cuál', 'cuáles', 'establece', 'criterio', 'criterios', 'tesis', 'jurisprudencia', 'scjn'
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Proporción de pasajes retirados a partir de la cual se reconstruye el índice en memoria
+REBUILD_DEAD_RATIO = 0.3
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin acentos"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenizar texto para BM25 y embeddings locales"""
+    if not text:
+        return []
+    stop = _NORMALIZED_STOPWORDS
+    return [t for t in _TOKEN_RE.findall(normalize(text)) if len(t) > 2 and t not in stop and not t.isdigit()]
+
+
+_NORMALIZED_STOPWORDS = {normalize(w) for w in STOPWORDS}
+
+
+@dataclass
+class IndexedPassage:
+    """Pasaje indexado de una tesis"""
+    tesis_id: int
+    scjn_id: str
+    titulo: str
+    orden: int
+    inicio: int
+    fin: int
+    texto: str
+    fuente: str = 'texto'
+
+    @property
+    def key(self) -> str:
+        return f"{self.tesis_id}:{self.fuente}:{self.orden}"
+
+
+class BM25Index:
+    """Índice invertido BM25 en memoria sobre pasajes"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[IndexedPassage] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        self.avg_length = 0.0
+        self.by_tesis: Dict[int, List[int]] = defaultdict(list)
+        self.removed: Set[int] = set()
+        self.total_length = 0
+
+    def add(self, passage: IndexedPassage, tokens: List[str]):
+        """Agregar pasaje con sus tokens"""
+        idx = len(self.passages)
+        self.passages.append(passage)
+        self.lengths.append(len(tokens))
+        self.by_tesis[passage.tesis_id].append(idx)
+        self.total_length += len(tokens)
+
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, tf in counts.items():
+            self.postings[token].append((idx, tf))
+
+    def remove_tesis(self, tesis_id: int) -> int:
+        """Retirar los pasajes de una tesis (quedan como huecos hasta la siguiente reconstrucción)"""
+        indices = self.by_tesis.pop(tesis_id, [])
+        for idx in indices:
+            self.removed.add(idx)
+            self.total_length -= self.lengths[idx]
+        return len(indices)
+
+    @property
+    def live_count(self) -> int:
+        return len(self.passages) - len(self.removed)
+
+    @property
+    def dead_ratio(self) -> float:
+        return len(self.removed) / len(self.passages) if self.passages else 0.0
+
+    def finalize(self):
+        """Calcular longitud promedio tras la carga o tras cambios incrementales"""
+        live = self.live_count
+        self.avg_length = self.total_length / live if live else 0.0
+
+    def search(self, query_tokens: List[str], limit: int) -> List[Tuple[int, float]]:
+        """Obtener los mejores pasajes (índice, puntuación)"""
+        n = self.live_count
+        if not n or not query_tokens:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(query_tokens):
+            postings = self.postings.get(token)
+            if postings and self.removed:
+                postings = [(idx, tf) for idx, tf in postings if idx not in self.removed]
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / (self.avg_length or 1))
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+class HashingEmbedder:
+    """Embeddings locales por hashing de unigramas y bigramas (sin servicios externos)"""
+
+    name = 'hashing'
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        tokens = tokenize(text)
+        features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        counts: Dict[str, int] = defaultdict(int)
+        for feature in features:
+            counts[feature] += 1
+
+        for feature, count in counts.items():
+            digest = hashlib.md5(feature.encode('utf-8')).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+class OpenAIEmbedder:
+    """Embeddings de OpenAI (text-embedding-ada-002) en lotes"""
+
+    name = 'openai'
+
+    def __init__(self, model: str = "text-embedding-ada-002"):
+        import openai
+        openai.api_key = Config.OPENAI_API_KEY
+        self._openai = openai
+        self.model = model
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = self._openai.Embedding.create(input=texts, model=self.model)
+        return [item['embedding'] for item in sorted(response['data'], key=lambda d: d['index'])]
+
+
+def get_embedder():
+    """Seleccionar embedder según configuración"""
+    if Config.RETRIEVAL_EMBEDDINGS == 'openai' and Config.OPENAI_ENABLED:
+        try:
+            return OpenAIEmbedder()
+        except Exception as e:
+            logger.warning(f"⚠️ Embeddings de OpenAI no disponibles, usando hashing local: {e}")
+    return HashingEmbedder()
+
+
+def cosine(vec1: List[float], vec2: List[float]) -> float:
+    """Similitud coseno"""
+    if not vec1 or not vec2 or len(vec1) != len(vec2):
+        return 0.0
+    dot = sum(a * b for a, b in zip(vec1, vec2))
+    n1 = math.sqrt(sum(a * a for a in vec1))
+    n2 = math.sqrt(sum(b * b for b in vec2))
+    return dot / (n1 * n2) if n1 and n2 else 0.0
+
+
+@dataclass
+class RetrievalResult:
+    """Resultado de la recuperación para una pregunta"""
+    question: str
+    documents: List[Dict[str, Any]]
+    context: str
+    timings: Dict[str, float] = field(default_factory=dict)
+    cached: bool = False
+
+    @property
+    def scjn_ids(self) -> List[str]:
+        return [doc['scjn_id'] for doc in self.documents]
+
+
+class RetrievalEngine:
+    """Recuperación multi-etapa: BM25 -> re-ranking vectorial -> empaquetado de contexto"""
+
+    def __init__(self, embedder=None, candidates: int = None, top_k: int = None,
+                 token_budget: int = None, alpha: float = None):
+        self.embedder = embedder or get_embedder()
+        self.candidates = candidates or Config.RETRIEVAL_CANDIDATES
+        self.top_k = top_k or Config.RETRIEVAL_TOP_K
+        self.token_budget = token_budget or Config.RETRIEVAL_TOKEN_BUDGET
+        self.alpha = Config.RETRIEVAL_ALPHA if alpha is None else alpha
+
+        self.index: Optional[BM25Index] = None
+        self._index_signature = None  # tesis_change_marker de la última sincronización del índice en memoria
+        self._index_lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._chunk_signature = None  # tesis_change_marker de la última puesta al día de tesis_chunk
+        self._chunk_since = None
+        self._chunk_indexer = None
+        self.index_stats = {'reconstrucciones': 0, 'incrementales': 0, 'tesis_reindexadas': 0}
+        self.query_cache = TTLCache(max_entries=512, ttl_seconds=Config.RETRIEVAL_CACHE_TTL, name="retrieval")
+        self.embedding_cache = TTLCache(max_entries=20000, ttl_seconds=24 * 3600, name="embeddings")
+
+    # ------------------------------------------------------------------
+    # Construcción del índice
+    # ------------------------------------------------------------------
+    def build_from_records(self, records: Iterable[Dict[str, Any]], signature: Any = None):
+        """Construir índice a partir de diccionarios con id, scjn_id, titulo, rubro y texto"""
+        start = time.perf_counter()
+        index = BM25Index()
+
+        for record in records:
+            self._add_record(index, record)
+
+        index.finalize()
+        with self._index_lock:
+            self.index = index
+            self._index_signature = signature
+            self.index_stats['reconstrucciones'] += 1
+            self.query_cache.clear()
+
+        logger.info(f"📚 Índice de recuperación: {len(index.passages)} pasajes en {time.perf_counter() - start:.2f}s")
+
+    def _add_record(self, index: BM25Index, record: Dict[str, Any]):
+        for passage in self._passages_for_record(record):
+            title_tokens = tokenize(f"{passage.titulo} {record.get('rubro') or ''}")
+            index.add(passage, tokenize(passage.texto) + title_tokens)
+
+    def _passages_for_record(self, record: Dict[str, Any]) -> List[IndexedPassage]:
+        body = record.get('texto') or record.get('rubro') or record.get('titulo') or ''
+        return [
+            IndexedPassage(
+                tesis_id=record['id'], scjn_id=record['scjn_id'], titulo=record.get('titulo') or '',
+                orden=p.orden, inicio=p.inicio, fin=p.fin, texto=p.texto
+            )
+            for p in chunk_text(body, Config.RETRIEVAL_PASSAGE_CHARS, Config.RETRIEVAL_PASSAGE_OVERLAP)
+        ]
+
+    @staticmethod
+    def _record_rows(query):
+        return ({'id': r[0], 'scjn_id': r[1], 'titulo': r[2], 'rubro': r[3], 'texto': r[4]} for r in query)
+
+    def ensure_index(self, session):
+        """Construir el índice la primera vez y después aplicar solo las tesis nuevas o cambiadas"""
+        from src.database.models import Tesis, tesis_change_marker
+
+        signature = tesis_change_marker(session)
+        if self.index is not None and signature == self._index_signature:
+            return
+
+        columns = (Tesis.id, Tesis.scjn_id, Tesis.titulo, Tesis.rubro, Tesis.texto)
+        if self.index is None:
+            rows = session.query(*columns).order_by(Tesis.id).yield_per(500)
+            self.build_from_records(self._record_rows(rows), signature=signature)
+            return
+
+        count, max_id, changed_at = self._index_signature
+        condition = Tesis.id > (max_id or 0)
+        if changed_at is not None:
+            condition = condition | (Tesis.fecha_actualizacion > changed_at)
+        else:
+            condition = condition | Tesis.fecha_actualizacion.isnot(None)
+        records = list(self._record_rows(session.query(*columns).filter(condition).order_by(Tesis.id)))
+
+        with self._index_lock:
+            index = self.index
+            for record in records:
+                index.remove_tesis(record['id'])
+                self._add_record(index, record)
+            index.finalize()
+            self._index_signature = signature
+            self.index_stats['incrementales'] += 1
+            self.index_stats['tesis_reindexadas'] += len(records)
+            self.query_cache.clear()
+
+        # Los borrados no dejan marca por fila: si faltan tesis, o hay demasiados huecos, reconstruir aparte
+        inserted = sum(1 for record in records if record['id'] > (max_id or 0))
+        if signature[0] < count + inserted or index.dead_ratio > REBUILD_DEAD_RATIO:
+            self._rebuild_in_background(session.get_bind())
+
+    def _rebuild_in_background(self, bind):
+        """Reconstruir el índice completo en un hilo; las consultas siguen usando el índice actual"""
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+
+        def _run():
+            from sqlalchemy.orm import Session
+            from src.database.models import Tesis, tesis_change_marker
+
+            session = Session(bind=bind)
+            try:
+                signature = tesis_change_marker(session)
+                columns = (Tesis.id, Tesis.scjn_id, Tesis.titulo, Tesis.rubro, Tesis.texto)
+                rows = session.query(*columns).order_by(Tesis.id).yield_per(500)
+                self.build_from_records(self._record_rows(rows), signature=signature)
+            except Exception as e:
+                logger.warning(f"⚠️ Error reconstruyendo el índice de recuperación: {e}")
+            finally:
+                session.close()
+
+        self._rebuild_thread = threading.Thread(target=_run, name="retrieval-rebuild", daemon=True)
+        self._rebuild_thread.start()
+
+    # ------------------------------------------------------------------
+    # Recuperación
+    # ------------------------------------------------------------------
+    def retrieve(self, question: str, session=None, top_k: int = None, token_budget: int = None) -> RetrievalResult:
+        """Recuperar documentos y contexto empaquetado para una pregunta"""
+        use_chunks = session is not None and self._chunk_index_ready(session)
+        if session is not None and not use_chunks:
+            self.ensure_index(session)
+
+        top_k = top_k or self.top_k
+        token_budget = token_budget or self.token_budget
+        query_tokens = tokenize(question)
+        cache_key = (' '.join(sorted(set(query_tokens))), top_k, token_budget)
+
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return RetrievalResult(question, cached.documents, cached.context, dict(cached.timings), cached=True)
+
+        timings = {}
+        start = time.perf_counter()
+        candidates = self._candidates(question, query_tokens, session if use_chunks else None)
+        timings['bm25'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ranked = self._rerank(question, candidates)
+        timings['rerank'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        documents, context = self._pack_context(ranked, top_k, token_budget)
+        timings['pack'] = time.perf_counter() - start
+        timings['total'] = timings['bm25'] + timings['rerank'] + timings['pack']
+
+        result = RetrievalResult(question, documents, context, timings)
+        self.query_cache.set(cache_key, result)
+        return result
+
+    def _chunk_index_ready(self, session) -> bool:
+        """Usar la tabla tesis_chunk si está habilitada y tiene pasajes (puesta al día antes de buscar)"""
+        if not Config.RETRIEVAL_CHUNK_INDEX:
+            return False
+        from src.analysis.chunk_index import chunk_index_available
+        if not chunk_index_available(session):
+            return False
+        self._sync_chunks(session)
+        return True
+
+    def _sync_chunks(self, session):
+        """Dividir en pasajes las tesis insertadas o cambiadas desde la última consulta"""
+        from src.analysis.chunk_index import ChunkIndexer, sync_changed_tesis
+        from src.database.models import tesis_change_marker
+
+        signature = tesis_change_marker(session)
+        if signature == self._chunk_signature:
+            return
+
+        if self._chunk_indexer is None:
+            self._chunk_indexer = ChunkIndexer(embedder=self.embedder)
+        try:
+            self._chunk_since, revisadas = sync_changed_tesis(session, self._chunk_indexer, self._chunk_since)
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"⚠️ No se pudo poner al día tesis_chunk, se busca en los pasajes existentes: {e}")
+            return
+
+        self._chunk_signature = signature
+        if revisadas:
+            self.query_cache.clear()
+            logger.info(f"📚 tesis_chunk al día: {revisadas} tesis nuevas o cambiadas revisadas")
+
+    def _candidates(self, question: str, query_tokens: List[str],
+                    session=None) -> List[Tuple[IndexedPassage, float, Optional[List[float]]]]:
+        """Candidatos (pasaje, puntuación léxica, embedding guardado) desde tesis_chunk o el índice en memoria"""
+        if session is not None:
+            from src.analysis.chunk_index import search_chunks
+            try:
+                return [
+                    (passage, score, vec if modelo == self.embedder.name else None)
+                    for passage, score, vec, modelo in search_chunks(session, question, self.candidates)
+                ]
+            except Exception as e:
+                logger.warning(f"⚠️ Búsqueda en tesis_chunk no disponible, usando índice en memoria: {e}")
+                self.ensure_index(session)
+
+        with self._index_lock:
+            index = self.index
+            if not index:
+                return []
+            return [(index.passages[idx], score, None) for idx, score in index.search(query_tokens, self.candidates)]
+
+    def _rerank(self, question: str,
+                candidates: List[Tuple[IndexedPassage, float, Optional[List[float]]]]) -> List[Tuple[IndexedPassage, float]]:
+        """Combinar puntuación léxica normalizada con similitud vectorial"""
+        if not candidates:
+            return []
+
+        max_lexical = max(score for _, score, _ in candidates) or 1.0
+
+        try:
+            query_vec = self.embedder.embed([question])[0]
+            passage_vecs = self._embed_passages(candidates)
+        except Exception as e:
+            logger.warning(f"⚠️ Re-ranking vectorial no disponible, usando solo BM25: {e}")
+            return [(p, s / max_lexical) for p, s, _ in candidates]
+
+        ranked = []
+        for (passage, lexical, _), vec in zip(candidates, passage_vecs):
+            score = self.alpha * (lexical / max_lexical) + (1 - self.alpha) * cosine(query_vec, vec)
+            ranked.append((passage, score))
+
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def _embed_passages(self, candidates: List[Tuple[IndexedPassage, float, Optional[List[float]]]]) -> List[List[float]]:
+        """Embeddings de pasajes: guardados en tesis_chunk, en cache o calculados en un lote"""
+        vectors: Dict[str, List[float]] = {}
+        missing = []
+        passages = [passage for passage, _, _ in candidates]
+        for passage, _, stored in candidates:
+            if stored:
+                vectors[passage.key] = stored
+                continue
+            cache_key = (self.embedder.name, passage.key, passage.fin)
+            vec = self.embedding_cache.get(cache_key)
+            if vec is None:
+                missing.append(passage)
+            else:
+                vectors[passage.key] = vec
+
+        if missing:
+            for passage, vec in zip(missing, self.embedder.embed([p.texto for p in missing])):
+                self.embedding_cache.set((self.embedder.name, passage.key, passage.fin), vec)
+                vectors[passage.key] = vec
+
+        return [vectors[p.key] for p in passages]
+
+    def _pack_context(self, ranked: List[Tuple[IndexedPassage, float]], top_k: int,
+                      token_budget: int) -> Tuple[List[Dict[str, Any]], str]:
+        """Seleccionar pasajes hasta agotar el presupuesto de tokens, agrupados por tesis"""
+        documents: Dict[int, Dict[str, Any]] = {}
+        used_tokens = 0
+
+        for passage, score in ranked:
+            if passage.tesis_id not in documents and len(documents) >= top_k:
+                continue
+
+            cost = estimate_tokens(passage.texto)
+            if used_tokens + cost > token_budget:
+                if used_tokens:
+                    continue
+                # Garantizar al menos un pasaje aunque exceda el presupuesto
+                passage_text = passage.texto[:token_budget * 4]
+                cost = estimate_tokens(passage_text)
+            else:
+                passage_text = passage.texto
+
+            doc = documents.setdefault(passage.tesis_id, {
+                'id': passage.tesis_id,
+                'scjn_id': passage.scjn_id,
+                'titulo': passage.titulo,
+                'score': score,
+                'pasajes': []
+            })
+            doc['pasajes'].append({
+                'orden': passage.orden, 'inicio': passage.inicio, 'fin': passage.fin,
+                'fuente': passage.fuente, 'texto': passage_text, 'score': round(score, 4)
+            })
+            used_tokens += cost
+
+        ordered = sorted(documents.values(), key=lambda d: d['score'], reverse=True)
+        for doc in ordered:
+            doc['pasajes'].sort(key=lambda p: (p['fuente'], p['inicio']))
+            doc['texto'] = "\n[...]\n".join(p['texto'] for p in doc['pasajes'])
+
+        context = "\n\n".join(
+            f"Documento {i + 1} (registro {doc['scjn_id']}):\nTítulo: {doc['titulo']}\n{doc['texto']}"
+            for i, doc in enumerate(ordered)
+        )
+        return ordered, context
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del motor"""
+        return {
+            'passages': self.index.live_count if self.index else 0,
+            'index': dict(self.index_stats),
+            'embedder': self.embedder.name,
+            'query_cache': self.query_cache.stats(),
+            'embedding_cache': self.embedding_cache.stats()
+        }
+
+
+_engine: Optional[RetrievalEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_retrieval_engine() -> RetrievalEngine:
+    """Obtener motor de recuperación compartido (función global)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RetrievalEngine()
+        return _engine
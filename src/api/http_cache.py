@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Cache HTTP para la API de tesis SCJN
+- ETags fuertes derivados del contenido serializado
+- GET condicional (If-None-Match -> 304)
+- Cache de respuestas LRU + TTL con invalidación en escrituras
+- Revalidación contra la versión de la fila (fecha_actualizacion): los cambios hechos por otros procesos,
+  INSERT ... ON CONFLICT o UPDATE masivos no pasan por los eventos del ORM de la API
+- Compresión gzip/brotli de payloads grandes
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from src.config import Config
+from src.utils.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def compute_etag(body: bytes) -> str:
+    """Calcular ETag fuerte a partir del contenido serializado"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparar cabecera If-None-Match contra un ETag (comparación débil, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+@dataclass
+class CachedResponse:
+    """Respuesta serializada lista para servir"""
+    body: bytes
+    etag: str
+    tesis_id: Optional[int] = None
+    scjn_id: Optional[str] = None
+    version: Any = None
+    _encoded: Dict[str, bytes] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def encoded(self, encoding: str) -> bytes:
+        """Obtener el cuerpo comprimido (se calcula una sola vez por entrada)"""
+        with self._lock:
+            if encoding not in self._encoded:
+                if encoding == 'br':
+                    self._encoded[encoding] = brotli.compress(self.body, quality=5)
+                elif encoding == 'gzip':
+                    self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+                else:
+                    return self.body
+            return self._encoded[encoding]
+
+
+class TesisResponseCache:
+    """Cache de respuestas de tesis con invalidación por tesis"""
+
+    def __init__(self, max_entries: int = None, ttl_seconds: int = None, enabled: bool = None):
+        self.enabled = Config.API_CACHE_ENABLED if enabled is None else enabled
+        self.cache = TTLCache(
+            max_entries=max_entries or Config.API_CACHE_MAX_ENTRIES,
+            ttl_seconds=ttl_seconds or Config.API_CACHE_TTL,
+            name="api_tesis",
+            on_remove=self._forget_key
+        )
+        # Índice tesis -> claves cacheadas y su inverso; se poda cuando el cache expulsa o expira una clave
+        self._keys_by_tesis: Dict[Any, Set[Hashable]] = {}
+        self._owners_by_key: Dict[Hashable, Tuple[Any, ...]] = {}
+        self._index_lock = threading.Lock()
+        self.not_modified = 0
+        self.stale = 0  # entradas descartadas porque la fila cambió fuera de este proceso
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Obtener respuesta cacheada"""
+        if not self.enabled:
+            return None
+        return self.cache.get(key)
+
+    def store(self, key: Hashable, payload: Any, tesis_id: int = None, scjn_id: str = None,
+              version: Any = None) -> CachedResponse:
+        """Serializar payload, calcular ETag y guardarlo en cache"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        cached = CachedResponse(body=body, etag=compute_etag(body), tesis_id=tesis_id, scjn_id=scjn_id,
+                                version=version)
+
+        if self.enabled:
+            owners = tuple(owner for owner in (('id', tesis_id), ('scjn', scjn_id)) if owner[1] is not None)
+            with self._index_lock:
+                self._owners_by_key[key] = owners
+                for owner in owners:
+                    self._keys_by_tesis.setdefault(owner, set()).add(key)
+            self.cache.set(key, cached)
+
+        return cached
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Dict[str, Any]]],
+                    version: Callable[[], Any] = None) -> Optional[CachedResponse]:
+        """Obtener respuesta cacheada o cargarla con loader (None si no existe)
+
+        version() devuelve la versión actual de la fila (None si ya no existe); con ella una entrada cacheada
+        solo se sirve si la fila no cambió desde que se guardó, aunque la escritura fuera en otro proceso.
+        """
+        current = None
+        if version is not None:
+            current = version()
+            if current is None:
+                self.invalidate_key(key)
+                return None
+
+        cached = self.get(key)
+        if cached is not None and (version is None or cached.version == current):
+            return cached
+        if cached is not None:
+            self.stale += 1
+
+        payload = loader()
+        if payload is None:
+            return None
+        return self.store(key, payload, tesis_id=payload.get('id'), scjn_id=payload.get('scjn_id'),
+                          version=current)
+
+    def invalidate_key(self, key: Hashable):
+        """Invalidar una sola respuesta cacheada"""
+        with self._index_lock:
+            self._unindex(key)
+        self.cache.invalidate(key)
+
+    def invalidate_tesis(self, tesis_id: Optional[int] = None, scjn_id: Optional[str] = None):
+        """Invalidar todas las respuestas asociadas a una tesis"""
+        keys = set()
+        with self._index_lock:
+            for owner in (('id', tesis_id), ('scjn', scjn_id)):
+                if owner[1] is not None:
+                    keys |= self._keys_by_tesis.get(owner, set())
+            for key in keys:
+                self._unindex(key)
+
+        for key in keys:
+            self.cache.invalidate(key)
+
+        if keys:
+            logger.debug(f"🧹 Cache invalidado para tesis {tesis_id}/{scjn_id}: {len(keys)} entradas")
+
+    def clear(self):
+        """Vaciar cache completo"""
+        self.cache.clear()
+        with self._index_lock:
+            self._keys_by_tesis.clear()
+            self._owners_by_key.clear()
+
+    def _forget_key(self, key: Hashable):
+        """Quitar del índice una clave que el cache expulsó o dejó expirar"""
+        with self._index_lock:
+            self._unindex(key)
+
+    def _unindex(self, key: Hashable):
+        """Quitar una clave del índice (con _index_lock tomado)"""
+        for owner in self._owners_by_key.pop(key, ()):
+            keys = self._keys_by_tesis.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tesis[owner]
+
+    def build_response(self, request: Request, cached: CachedResponse) -> Response:
+        """Construir respuesta HTTP con ETag, 304 condicional y compresión negociada"""
+        headers = {
+            'ETag': cached.etag,
+            'Cache-Control': f"public, max-age={Config.API_CACHE_MAX_AGE}",
+            'Vary': 'Accept-Encoding'
+        }
+
+        if etag_matches(request.headers.get('if-none-match'), cached.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        encoding = self._negotiate_encoding(request.headers.get('accept-encoding', ''), len(cached.body))
+        body = cached.encoded(encoding) if encoding else cached.body
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    def _negotiate_encoding(self, accept_encoding: str, size: int) -> Optional[str]:
+        """Elegir codificación según Accept-Encoding (brotli > gzip)"""
+        if size < Config.API_COMPRESSION_MIN_BYTES:
+            return None
+
+        accepted = set()
+        for part in accept_encoding.lower().split(','):
+            token, _, params = part.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+                continue
+            accepted.add(token.strip())
+
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del cache, incluida la tasa de aciertos"""
+        stats = self.cache.stats()
+        stats['enabled'] = self.enabled
+        stats['not_modified'] = self.not_modified
+        stats['stale'] = self.stale
+        with self._index_lock:
+            stats['indexed_tesis'] = len(self._keys_by_tesis)
+        stats['brotli_available'] = brotli is not None
+        return stats
+
+
+# Instancia global usada por la API
+response_cache = TesisResponseCache()
+
+
+def register_invalidation_listeners(cache: TesisResponseCache = None):
+    """Invalidar el cache cuando el scraper inserta, actualiza o borra tesis en este proceso"""
+    from src.database.models import on_tesis_change
+
+    target = cache or response_cache
+    return on_tesis_change(lambda tesis_id, scjn_id: target.invalidate_tesis(tesis_id, scjn_id))
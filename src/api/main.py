@@ -12,14 +12,23 @@ from datetime import datetime
 # Agregar el directorio raíz al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from src.database.models import get_session, Tesis, Consulta
 from src.analysis.ai_analyzer import AIAnalyzer
+from src.analysis.retrieval import get_retrieval_engine
 from src.config import Config
+from src.api.http_cache import response_cache, register_invalidation_listeners
+from src.database.export import (
+    ExportError, resolve_columns, parse_since, iter_ndjson, iter_arrow_stream, arrow_schema
+)
+from src.utils.metrics import PROMETHEUS_CONTENT_TYPE, get_registry
+from src.utils.telemetry import install_collectors
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -37,11 +46,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Invalidar cache de respuestas cuando cambian tesis en este proceso
+register_invalidation_listeners()
+
+# Profundidad de colas, pool de pestañas y controladores de tasa en /metrics
+install_collectors()
+
 # Modelos Pydantic
 class TesisResponse(BaseModel):
     id: int
     scjn_id: str
-    titulo: str
+    titulo: Optional[str] = None
     rubro: Optional[str] = None
     texto: Optional[str] = None
     precedente: Optional[str] = None
@@ -83,6 +98,30 @@ def get_db():
     finally:
         db.close()
 
+def _serialize_tesis(tesis: Tesis) -> Dict:
+    """Convertir una tesis al formato de TesisResponse (solo columnas del modelo; el resto queda vacío)"""
+    return {
+        'id': tesis.id,
+        'scjn_id': tesis.scjn_id,
+        'titulo': tesis.titulo,
+        'rubro': tesis.rubro,
+        'texto': tesis.texto,
+        'precedente': tesis.precedente,
+        'pdf_url': tesis.pdf_url,
+        'google_drive_id': tesis.google_drive_id
+    }
+
+def _tesis_version(db: Session, condition):
+    """Versión de la fila (fecha_actualizacion) para revalidar el cache; None si la tesis no existe"""
+    return db.query(Tesis.fecha_actualizacion).filter(condition).first()
+
+def _load_tesis_payload(db: Session, condition) -> Optional[Dict]:
+    """Cargar una tesis y convertirla a payload JSON validado por TesisResponse"""
+    tesis = db.query(Tesis).filter(condition).first()
+    if not tesis:
+        return None
+    return jsonable_encoder(TesisResponse(**_serialize_tesis(tesis)))
+
 # Rutas
 @app.get("/")
 async def root():
@@ -94,6 +133,9 @@ async def root():
             "tesis": "/api/tesis",
             "consulta": "/api/consulta",
             "estadisticas": "/api/estadisticas",
+            "cache": "/api/cache/estadisticas",
+            "export": "/api/export",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -125,30 +167,7 @@ async def get_tesis(
         tesis_list = query.offset(skip).limit(limit).all()
         
         # Convertir a respuesta
-        response = []
-        for tesis in tesis_list:
-            tesis_dict = {
-                'id': tesis.id,
-                'scjn_id': tesis.scjn_id,
-                'titulo': tesis.titulo,
-                'rubro': tesis.rubro,
-                'texto': tesis.texto,
-                'precedente': tesis.precedente,
-                'fecha_publicacion': tesis.fecha_publicacion,
-                'tipo_documento': tesis.tipo_documento,
-                'materia': tesis.materia,
-                'epoca': tesis.epoca,
-                'sala': tesis.sala,
-                'registro': tesis.registro,
-                'resumen': tesis.resumen,
-                'categorias': json.loads(tesis.categorias) if tesis.categorias else [],
-                'conceptos_clave': json.loads(tesis.conceptos_clave) if tesis.conceptos_clave else [],
-                'sentimiento': tesis.sentimiento,
-                'relevancia': tesis.relevancia,
-                'pdf_url': tesis.pdf_url,
-                'google_drive_id': tesis.google_drive_id
-            }
-            response.append(tesis_dict)
+        response = [_serialize_tesis(tesis) for tesis in tesis_list]
         
         return response
         
@@ -156,35 +175,19 @@ async def get_tesis(
         raise HTTPException(status_code=500, detail=f"Error obteniendo tesis: {str(e)}")
 
 @app.get("/api/tesis/{tesis_id}", response_model=TesisResponse)
-async def get_tesis_by_id(tesis_id: int, db: Session = Depends(get_db)):
-    """Obtener una tesis específica por ID"""
+async def get_tesis_by_id(tesis_id: int, request: Request, db: Session = Depends(get_db)):
+    """Obtener una tesis específica por ID (con ETag y cache de respuesta)"""
     try:
-        tesis = db.query(Tesis).filter(Tesis.id == tesis_id).first()
+        cached = response_cache.get_or_load(
+            ('id', tesis_id),
+            lambda: _load_tesis_payload(db, Tesis.id == tesis_id),
+            version=lambda: _tesis_version(db, Tesis.id == tesis_id)
+        )
         
-        if not tesis:
+        if not cached:
             raise HTTPException(status_code=404, detail="Tesis no encontrada")
         
-        return {
-            'id': tesis.id,
-            'scjn_id': tesis.scjn_id,
-            'titulo': tesis.titulo,
-            'rubro': tesis.rubro,
-            'texto': tesis.texto,
-            'precedente': tesis.precedente,
-            'fecha_publicacion': tesis.fecha_publicacion,
-            'tipo_documento': tesis.tipo_documento,
-            'materia': tesis.materia,
-            'epoca': tesis.epoca,
-            'sala': tesis.sala,
-            'registro': tesis.registro,
-            'resumen': tesis.resumen,
-            'categorias': json.loads(tesis.categorias) if tesis.categorias else [],
-            'conceptos_clave': json.loads(tesis.conceptos_clave) if tesis.conceptos_clave else [],
-            'sentimiento': tesis.sentimiento,
-            'relevancia': tesis.relevancia,
-            'pdf_url': tesis.pdf_url,
-            'google_drive_id': tesis.google_drive_id
-        }
+        return response_cache.build_response(request, cached)
         
     except HTTPException:
         raise
@@ -192,76 +195,53 @@ async def get_tesis_by_id(tesis_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error obteniendo tesis: {str(e)}")
 
 @app.get("/api/tesis/scjn/{scjn_id}", response_model=TesisResponse)
-async def get_tesis_by_scjn_id(scjn_id: str, db: Session = Depends(get_db)):
-    """Obtener una tesis específica por ID de SCJN"""
+async def get_tesis_by_scjn_id(scjn_id: str, request: Request, db: Session = Depends(get_db)):
+    """Obtener una tesis específica por ID de SCJN (con ETag y cache de respuesta)"""
     try:
-        tesis = db.query(Tesis).filter(Tesis.scjn_id == scjn_id).first()
+        cached = response_cache.get_or_load(
+            ('scjn', scjn_id),
+            lambda: _load_tesis_payload(db, Tesis.scjn_id == scjn_id),
+            version=lambda: _tesis_version(db, Tesis.scjn_id == scjn_id)
+        )
         
-        if not tesis:
+        if not cached:
             raise HTTPException(status_code=404, detail="Tesis no encontrada")
         
-        return {
-            'id': tesis.id,
-            'scjn_id': tesis.scjn_id,
-            'titulo': tesis.titulo,
-            'rubro': tesis.rubro,
-            'texto': tesis.texto,
-            'precedente': tesis.precedente,
-            'fecha_publicacion': tesis.fecha_publicacion,
-            'tipo_documento': tesis.tipo_documento,
-            'materia': tesis.materia,
-            'epoca': tesis.epoca,
-            'sala': tesis.sala,
-            'registro': tesis.registro,
-            'resumen': tesis.resumen,
-            'categorias': json.loads(tesis.categorias) if tesis.categorias else [],
-            'conceptos_clave': json.loads(tesis.conceptos_clave) if tesis.conceptos_clave else [],
-            'sentimiento': tesis.sentimiento,
-            'relevancia': tesis.relevancia,
-            'pdf_url': tesis.pdf_url,
-            'google_drive_id': tesis.google_drive_id
-        }
+        return response_cache.build_response(request, cached)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo tesis: {str(e)}")
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato de exposición de Prometheus (etapas del pipeline, colas, Drive)"""
+    return PlainTextResponse(get_registry().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/api/cache/estadisticas")
+async def get_cache_estadisticas():
+    """Obtener estadísticas del cache de respuestas (tasa de aciertos, tamaño, 304 servidos)"""
+    return response_cache.stats()
+
+@app.get("/api/consulta/estadisticas")
+async def get_consulta_estadisticas():
+    """Obtener estadísticas del motor de recuperación (pasajes indexados, caches)"""
+    return get_retrieval_engine().stats()
+
 @app.post("/api/consulta", response_model=ConsultaResponse)
 async def consultar_tesis(consulta: ConsultaRequest, db: Session = Depends(get_db)):
     """Realizar consulta sobre tesis usando IA"""
     try:
         ai_analyzer = AIAnalyzer()
         
-        # Buscar documentos relevantes
-        relevant_docs = []
-        query = db.query(Tesis)
-        
-        # Búsqueda por palabras clave
-        keywords = consulta.pregunta.lower().split()
-        for keyword in keywords:
-            if len(keyword) > 3:
-                query = query.filter(
-                    (Tesis.titulo.contains(keyword)) |
-                    (Tesis.texto.contains(keyword)) |
-                    (Tesis.resumen.contains(keyword))
-                )
-        
-        results = query.limit(5).all()
-        
-        for tesis in results:
-            doc = {
-                'id': tesis.id,
-                'scjn_id': tesis.scjn_id,
-                'titulo': tesis.titulo,
-                'texto': tesis.texto,
-                'resumen': tesis.resumen
-            }
-            relevant_docs.append(doc)
+        # Recuperar pasajes relevantes (BM25 + re-ranking + presupuesto de tokens)
+        retrieval = get_retrieval_engine().retrieve(consulta.pregunta, session=db)
+        relevant_docs = retrieval.documents
         
         # Generar respuesta
         if relevant_docs:
-            respuesta = ai_analyzer.answer_question(consulta.pregunta, relevant_docs)
+            respuesta = ai_analyzer.answer_question(consulta.pregunta, relevant_docs, context=retrieval.context)
         else:
             respuesta = "No encontré documentos relevantes para tu pregunta. ¿Podrías reformularla?"
         
@@ -358,6 +338,44 @@ async def buscar_tesis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en búsqueda: {str(e)}")
 
+@app.get("/api/export")
+async def exportar_tesis(
+    formato: str = Query("ndjson", regex="^(ndjson|arrow)$", description="Formato: ndjson o arrow (IPC stream)"),
+    columnas: Optional[str] = Query(None, description="Columnas separadas por coma (por defecto todas salvo html_content)"),
+    since: Optional[str] = Query(None, description="Solo tesis con fecha_descarga posterior (ISO 8601)")
+):
+    """Exportar el corpus completo en streaming con memoria acotada"""
+    try:
+        columns = resolve_columns(columnas.split(',') if columnas else None)
+        since_dt = parse_since(since)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if formato == "arrow":
+        # Validar que pyarrow esté disponible antes de empezar a transmitir
+        try:
+            arrow_schema(columns)
+        except ExportError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        generator, media_type, extension = iter_arrow_stream, "application/vnd.apache.arrow.stream", "arrow"
+    else:
+        generator, media_type, extension = iter_ndjson, "application/x-ndjson", "ndjson"
+    
+    def _stream():
+        # Sesión propia: debe vivir mientras dure la transmisión
+        session = get_session()
+        try:
+            yield from generator(session, columns, since_dt)
+        finally:
+            session.close()
+    
+    filename = f"tesis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        _stream(),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 def main():
     """Función principal para ejecutar la API"""
     import uvicorn
@@ -4,6 +4,9 @@ Sistema de scraping automático inteligente para SCJN
 - Fase inicial: 3 horas diarias hasta descargar todo el historial
 - Fase de mantenimiento: Lunes semanal para nuevas publicaciones
 - Control inteligente de tiempo y duplicados
+- Frontera de rastreo persistente: cada sesión retoma la búsqueda y página donde quedó la anterior
+- Rastreo exhaustivo por rangos de registro digital con cobertura medible
+- Mantenimiento incremental desde la marca de agua de registro digital
 """
 
 import time
@@ -20,24 +23,25 @@ import sqlite3
 from pathlib import Path
 
 from src.scraper.selenium_scraper import SeleniumSCJNScraper
-from src.database.models import get_session, Tesis, create_tables
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.tiered_fetcher import fetch_tier_stats
+from src.database.models import get_session, Tesis, create_tables, insert_tesis_once, tesis_row
+from src.database.streaming import count_rows
 from src.config import Config
+from src.automation.frontier import CrawlFrontier, SEARCH
+from src.automation.registro_crawler import RegistroCrawler, parse_ranges, registro_probe_factory
+from src.automation.incremental import IncrementalSync
+from src.utils.telemetry import DB, stage, start_metrics_server
+from src.utils.logger import get_logger
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/auto_scraper.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class IntelligentAutoScraper:
     """Sistema de scraping automático inteligente con fases"""
     
     def __init__(self):
+        # Logging central (cola + JSON); si el proceso ya lo configuró, se reutiliza
+        get_logger("auto_scraper", log_file=Config.LOGS_DIR / "auto_scraper.log")
         self.scraper = SeleniumSCJNScraper()
         self.session = get_session()
         self.stats_file = "data/scraping_stats.json"
@@ -62,6 +66,10 @@ class IntelligentAutoScraper:
         # Crear tablas si no existen
         create_tables()
         
+        # Frontera de rastreo (punto de control entre sesiones) y cortesía por host
+        self.frontier = CrawlFrontier()
+        self.rate = get_rate_controller()  # compartido con los scrapers: pausa y concurrencia adaptativas
+        
         # Cargar configuración y estadísticas
         self.load_config()
         self.load_stats()
@@ -134,6 +142,8 @@ class IntelligentAutoScraper:
     
     def save_stats(self):
         """Guardar estadísticas de scraping"""
+        self.stats['rate_control'] = self.rate.state()
+        self.stats['fetch_tiers'] = fetch_tier_stats()
         try:
             with open(self.stats_file, 'w') as f:
                 json.dump(self.stats, f, indent=2, default=str)
@@ -154,6 +164,10 @@ class IntelligentAutoScraper:
         if self.initial_phase_completed:
             return True
         
+        if self.frontier.is_exhausted() and (not Config.REGISTRO_CRAWL_ENABLED or self.registro_crawl_complete()):
+            logger.info(f"🎯 Fase inicial completada: frontera de rastreo agotada {self.frontier.counts()}")
+            return True
+        
         # Calcular progreso de fase inicial
         progress_percentage = (self.files_downloaded_initial / self.total_estimated_files) * 100
         
@@ -184,30 +198,18 @@ class IntelligentAutoScraper:
         return days_since_maintenance >= 7
     
     def get_search_terms_for_phase(self) -> List[str]:
-        """Obtener términos de búsqueda según la fase"""
-        if self.current_phase == 'initial':
-            # Términos amplios para fase inicial
-            return [
-                "amparo", "derechos humanos", "responsabilidad civil", "contrato",
-                "propiedad", "familia", "laboral", "penal", "administrativo",
-                "constitucional", "fiscal", "mercantil", "agrario", "ambiental",
-                "electoral", "comercial", "civil", "procesal", "internacional",
-                "tributario", "seguridad social", "competencia", "consumidor"
-            ]
-        else:
-            # Términos recientes para mantenimiento
-            current_year = datetime.now().year
-            return [
-                str(current_year),
-                str(current_year - 1),
-                "reciente",
-                "nuevo",
-                "actualizado",
-                "modificado"
-            ]
+        """Términos amplios con los que se siembra la frontera de la fase inicial
+        (el mantenimiento no busca por palabras clave: sincroniza desde la marca de agua)"""
+        return [
+            "amparo", "derechos humanos", "responsabilidad civil", "contrato",
+            "propiedad", "familia", "laboral", "penal", "administrativo",
+            "constitucional", "fiscal", "mercantil", "agrario", "ambiental",
+            "electoral", "comercial", "civil", "procesal", "internacional",
+            "tributario", "seguridad social", "competencia", "consumidor"
+        ]
     
     def initial_phase_job(self):
-        """Trabajo de fase inicial (3 horas diarias)"""
+        """Trabajo de fase inicial (3 horas diarias) sobre la frontera de rastreo"""
         logger.info("🚀 Iniciando fase inicial (3 horas diarias)...")
         
         if self.should_transition_to_maintenance():
@@ -219,13 +221,19 @@ class IntelligentAutoScraper:
         downloaded_count = 0
         
         try:
+            if Config.REGISTRO_CRAWL_ENABLED and not self.registro_crawl_complete():
+                downloaded_count += self.run_registro_crawl(session_end, self.max_files_per_session)
+            
             if not self.scraper.setup_driver():
                 logger.error("❌ No se pudo configurar el driver")
                 return
             
-            search_terms = self.get_search_terms_for_phase()
+            # Retomar la sesión anterior: lo que quedó a medias vuelve a la frontera
+            self.frontier.recover_stale()
+            self.frontier.seed_search_terms(self.get_search_terms_for_phase())
+            logger.info(f"🧭 Frontera de rastreo: {self.frontier.counts()}")
             
-            for term in search_terms:
+            while True:
                 # Verificar límites de tiempo y archivos
                 if datetime.now() >= session_end:
                     logger.info("⏰ Tiempo de sesión agotado")
@@ -235,59 +243,30 @@ class IntelligentAutoScraper:
                     logger.info("📊 Límite de archivos por sesión alcanzado")
                     break
                 
-                logger.info(f"🔍 Buscando: {term}")
+                task = self.frontier.next_task()
+                if task is None:
+                    logger.info("🏁 No quedan tareas disponibles en la frontera de rastreo")
+                    break
                 
                 try:
-                    if not self.scraper.navigate_to_search_page():
-                        continue
-                    
-                    if not self.scraper.search_for_tesis(term):
-                        continue
-                    
-                    results = self.scraper.extract_search_results()
-                    
-                    for result in results:
-                        # Verificar límites
-                        if datetime.now() >= session_end:
-                            break
-                        
-                        if downloaded_count >= self.max_files_per_session:
-                            break
-                        
-                        scjn_id = result.get('scjn_id')
-                        if not scjn_id:
-                            continue
-                        
-                        # Verificar duplicado
-                        if self.is_duplicate(scjn_id):
-                            self.stats['duplicates_found'] += 1
-                            continue
-                        
-                        # Obtener detalles
-                        try:
-                            detail_data = self.scraper.get_tesis_detail(result['url'])
-                            if detail_data:
-                                self.save_tesis_to_db(result, detail_data)
-                                downloaded_count += 1
-                                self.files_downloaded_initial += 1
-                                self.update_session_stats(downloaded_count)
-                                
-                                logger.info(f"✅ Descargado: {scjn_id} ({downloaded_count})")
-                                time.sleep(2)
-                            
-                        except Exception as e:
-                            logger.error(f"❌ Error procesando {scjn_id}: {e}")
-                            self.stats['errors'] += 1
-                            continue
-                    
-                    time.sleep(5)
+                    if task['tipo'] == SEARCH:
+                        self.process_search_task(task)
+                    elif self.process_detail_task(task):
+                        downloaded_count += 1
+                        self.files_downloaded_initial += 1
+                        self.update_session_stats()
+                        logger.info(f"✅ Descargado: {task['scjn_id']} ({downloaded_count})")
+                    self.frontier.complete(task['id'])
                     
                 except Exception as e:
-                    logger.error(f"❌ Error en búsqueda '{term}': {e}")
-                    continue
+                    logger.error(f"❌ Error en tarea de rastreo {task['tipo']} "
+                                 f"{task['termino'] or task['scjn_id']}: {e}")
+                    self.stats['errors'] += 1
+                    self.frontier.fail(task['id'], str(e))
             
             session_duration = datetime.now() - session_start
             logger.info(f"🎉 Sesión inicial completada: {downloaded_count} archivos en {session_duration}")
+            logger.info(f"🧭 Frontera de rastreo: {self.frontier.counts()}")
             
             # Verificar si debe transicionar
             if self.should_transition_to_maintenance():
@@ -301,8 +280,94 @@ class IntelligentAutoScraper:
             self.save_stats()
             self.save_config()
     
+    def run_registro_crawl(self, session_end: datetime, max_hits: int) -> int:
+        """Recorrer los rangos de registro digital hasta session_end; devuelve las tesis nuevas guardadas"""
+        ranges = parse_ranges(Config.REGISTRO_RANGES)
+        logger.info(f"🧮 Rastreo por registro digital en {len(ranges)} rangos...")
+        saved = 0
+        
+        def on_hit(registro: int, detail_data: Dict):
+            nonlocal saved
+            if not self.save_registro_hit(registro, detail_data):
+                return
+            saved += 1
+            self.files_downloaded_initial += 1
+            logger.info(f"✅ Descargado por registro: {registro} ({saved})")
+        
+        crawler = RegistroCrawler(registro_probe_factory())
+        try:
+            summaries = crawler.crawl_ranges(ranges, deadline=session_end.timestamp(), max_hits=max_hits,
+                                             on_hit=on_hit)
+        except Exception as e:
+            logger.error(f"❌ Error en rastreo por registro digital: {e}")
+            self.stats['errors'] += 1
+            return saved
+        
+        coverage = self.stats.setdefault('registro_coverage', {})
+        for summary in summaries:
+            coverage[f"{summary['inicio']}-{summary['fin']}"] = {
+                key: summary[key] for key in ('completo', 'cobertura', 'cubiertos', 'total', 'pendientes',
+                                              'sin_cubrir_atras', 'eta_minutos', 'sondeos_por_minuto')
+            }
+        return saved
+    
+    def save_registro_hit(self, registro: int, detail_data: Dict) -> bool:
+        """Guardar la tesis de un registro digital encontrado; False si ya estaba en la base de datos"""
+        scjn_id = str(registro)
+        if self.is_duplicate(scjn_id):
+            self.stats['duplicates_found'] += 1
+            return False
+        if not self.save_tesis_to_db({'scjn_id': scjn_id, 'titulo': detail_data.get('titulo', ''),
+                                      'url': detail_data.get('url', '')}, detail_data):
+            return False
+        self.update_session_stats()
+        return True
+    
+    def registro_crawl_complete(self) -> bool:
+        """True si todos los rangos configurados se recorrieron hasta el final"""
+        coverage = self.stats.get('registro_coverage', {})
+        return all(coverage.get(f"{start}-{end}", {}).get('completo')
+                   for start, end in parse_ranges(Config.REGISTRO_RANGES))
+    
+    def process_search_task(self, task: Dict):
+        """Listar una página de resultados y encolar sus detalles y la página siguiente"""
+        term, page = task['termino'], task['pagina']
+        logger.info(f"🔍 Buscando: {term} (página {page})")
+        
+        # Sigue desde la página que ya muestra el navegador si la tarea anterior fue del mismo término
+        if not self.scraper.open_results_page(term, page):
+            # Última página del término superada: la tarea queda visitada sin sucesoras
+            return
+        
+        results = self.scraper.extract_search_results()
+        new_results = []
+        for result in results:
+            if not result.get('scjn_id'):
+                continue
+            if self.is_duplicate(result['scjn_id']):
+                self.stats['duplicates_found'] += 1
+                continue
+            new_results.append(result)
+        
+        added = self.frontier.add_details(new_results)
+        if results:
+            self.frontier.add_search_page(term, page + 1)
+        logger.info(f"🧭 '{term}' página {page}: {len(results)} resultados, {added} detalles nuevos en la frontera")
+    
+    def process_detail_task(self, task: Dict) -> bool:
+        """Descargar el detalle de una tesis; False si ya estaba en la base de datos"""
+        if task['scjn_id'] and self.is_duplicate(task['scjn_id']):
+            self.stats['duplicates_found'] += 1
+            return False
+        
+        detail_data = self.scraper.get_tesis_detail(task['url'])
+        if not detail_data:
+            raise RuntimeError(f"Detalle vacío para {task['url']}")
+        
+        return self.save_tesis_to_db(task['datos'], detail_data)
+    
     def maintenance_phase_job(self):
-        """Trabajo de fase de mantenimiento (lunes semanal)"""
+        """Trabajo de fase de mantenimiento (lunes semanal): sincronización incremental desde la marca de agua"""
         logger.info("🔧 Iniciando fase de mantenimiento (lunes semanal)...")
         
         if not self.should_run_maintenance():
@@ -310,54 +375,22 @@ class IntelligentAutoScraper:
             return
         
         session_start = datetime.now()
+        session_end = session_start + timedelta(hours=self.initial_phase_hours)
         downloaded_count = 0
         
+        def on_new(registro: int, detail_data: Dict):
+            nonlocal downloaded_count
+            if self.save_registro_hit(registro, detail_data):
+                downloaded_count += 1
+                logger.info(f"✅ Nuevo archivo: {registro}")
+        
         try:
-            if not self.scraper.setup_driver():
-                logger.error("❌ No se pudo configurar el driver")
-                return
-            
-            search_terms = self.get_search_terms_for_phase()
-            
-            for term in search_terms:
-                logger.info(f"🔍 Verificando: {term}")
-                
-                try:
-                    if not self.scraper.navigate_to_search_page():
-                        continue
-                    
-                    if not self.scraper.search_for_tesis(term):
-                        continue
-                    
-                    results = self.scraper.extract_search_results()
-                    
-                    for result in results[:50]:  # Limitar a 50 por término
-                        scjn_id = result.get('scjn_id')
-                        if not scjn_id:
-                            continue
-                        
-                        # Verificar duplicado
-                        if self.is_duplicate(scjn_id):
-                            continue
-                        
-                        # Obtener detalles
-                        try:
-                            detail_data = self.scraper.get_tesis_detail(result['url'])
-                            if detail_data:
-                                self.save_tesis_to_db(result, detail_data)
-                                downloaded_count += 1
-                                self.update_session_stats(downloaded_count)
-                                logger.info(f"✅ Nuevo archivo: {scjn_id}")
-                                time.sleep(2)
-                        except Exception as e:
-                            logger.error(f"❌ Error procesando {scjn_id}: {e}")
-                            continue
-                    
-                    time.sleep(5)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error verificando '{term}': {e}")
-                    continue
+            sync = IncrementalSync(registro_probe_factory())
+            summary = sync.run(on_new=on_new, deadline=session_end.timestamp(),
+                               max_new=self.max_files_per_session)
+            self.stats['last_incremental_sync'] = {
+                key: summary[key] for key in ('desde', 'hasta', 'nuevas', 'sondeados', 'completo')
+            }
             
             # Actualizar fecha de último mantenimiento
             self.last_maintenance_date = datetime.now().isoformat()
@@ -368,8 +401,8 @@ class IntelligentAutoScraper:
             
         except Exception as e:
             logger.error(f"❌ Error en mantenimiento: {e}")
+            self.stats['errors'] += 1
         finally:
-            self.scraper.close_driver()
             self.save_stats()
     
     def transition_to_maintenance_phase(self):
@@ -410,32 +443,20 @@ class IntelligentAutoScraper:
         self.stats['session_downloads'][session_id] += count
         self.stats['total_downloaded'] += count
     
-    def save_tesis_to_db(self, result: Dict, detail_data: Dict):
-        """Guardar tesis en base de datos"""
+    def save_tesis_to_db(self, result: Dict, detail_data: Dict) -> bool:
+        """Guardar tesis en base de datos (una sola vez por scjn_id); False si ya estaba o hubo error"""
         try:
-            tesis = Tesis(
-                scjn_id=result.get('scjn_id'),
-                titulo=result.get('titulo', ''),
-                url=result.get('url', ''),
-                rubro=detail_data.get('rubro', ''),
-                texto=detail_data.get('texto', ''),
-                precedente=detail_data.get('precedente', ''),
-                pdf_url=detail_data.get('pdf_url', ''),
-                metadata=json.dumps(result.get('metadata', {})),
-                fecha_descarga=datetime.now(),
-                html_content=detail_data.get('html_content', '')
-            )
-            
-            self.session.add(tesis)
-            self.session.commit()
+            with stage(DB):
+                return insert_tesis_once(self.session, tesis_row(result, detail_data))
             
         except Exception as e:
             logger.error(f"❌ Error guardando en BD: {e}")
             self.session.rollback()
+            return False
     
     def get_status(self) -> Dict:
         """Obtener estado completo del sistema"""
-        total_in_db = self.session.query(Tesis).count()
+        total_in_db = count_rows(self.session, Tesis)
         
         # Calcular progreso de fase inicial
         progress_percentage = 0
@@ -460,6 +481,9 @@ class IntelligentAutoScraper:
             'errors': self.stats.get('errors', 0),
             'last_maintenance_date': self.last_maintenance_date,
             'next_maintenance_date': next_maintenance.isoformat() if next_maintenance else None,
+            'registro_coverage': self.stats.get('registro_coverage', {}),
+            'rate_control': self.rate.state(),
+            'fetch_tiers': fetch_tier_stats(),
             'should_run_maintenance': self.should_run_maintenance(),
             'should_transition': self.should_transition_to_maintenance()
         }
@@ -471,6 +495,7 @@ class IntelligentAutoScraper:
             return
             
         logger.info("⏰ Configurando programador inteligente...")
+        start_metrics_server()
         
         if self.current_phase == 'initial':
             # Fase inicial: todos los días a las 9:00 AM por 3 horas
@@ -505,6 +530,7 @@ class IntelligentAutoScraper:
             self.initial_phase_hours = max_hours
         
         logger.info(f"🔄 Ejecutando sesión manual: {self.current_phase} ({max_hours or self.initial_phase_hours} horas)")
+        start_metrics_server()
         
         if self.current_phase == 'initial':
             self.initial_phase_job()
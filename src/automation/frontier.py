@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Frontera de rastreo persistente para el scraper automático
+- Tareas de búsqueda (término × página) y de detalle de tesis en la tabla crawl_frontier
+- Prioridad, estado, intentos, última visita y próxima visita por tarea
+- Punto de control en cada transición: una sesión nueva retoma donde se detuvo la anterior
+- Cortesía por host con cubeta de fichas según scjn_config.TIMING
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import func, or_
+
+from src.database.models import CrawlTask, get_session
+from src.scraper.scjn_config import TIMING, PAGINATION, URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+SEARCH = 'busqueda'
+DETAIL = 'detalle'
+
+# Los detalles de una página ya listada se visitan antes de pasar a la siguiente página
+SEARCH_PRIORITY = 0
+DETAIL_PRIORITY = 10
+
+
+def host_of(url: str) -> str:
+    """Host de una URL (el de SCJN si es relativa)"""
+    return urlparse(url).netloc or urlparse(URL_PATTERNS['base_url']).netloc
+
+
+class HostTokenBucket:
+    """Cubeta de fichas por host: ráfaga de host_burst y después una petición cada request_delay segundos"""
+
+    def __init__(self, delay: float = None, burst: int = None):
+        delay = TIMING['request_delay'] if delay is None else delay
+        self.rate = 1.0 / delay if delay > 0 else float('inf')
+        self.burst = max(1, burst or TIMING.get('host_burst', 1))
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {'peticiones': 0, 'esperas': 0, 'segundos_espera': 0.0}
+
+    def acquire(self, host: str) -> float:
+        """Bloquear hasta que el host tenga una ficha; devuelve los segundos esperados"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    self.stats['peticiones'] += 1
+                    if waited:
+                        self.stats['esperas'] += 1
+                        self.stats['segundos_espera'] += waited
+                    return waited
+                self._buckets[host] = (tokens, now)
+                pause = (1 - tokens) / self.rate
+            time.sleep(pause)
+            waited += pause
+
+
+class CrawlFrontier:
+    """Frontera de rastreo (tabla crawl_frontier)"""
+
+    def __init__(self, session_factory: Callable = None, max_attempts: int = None,
+                 retry_delay: float = None, max_pages: int = None):
+        self.session_factory = session_factory or get_session
+        self.max_attempts = max_attempts or TIMING['max_retries']
+        self.retry_delay = TIMING['retry_delay'] if retry_delay is None else retry_delay
+        self.max_pages = max_pages or PAGINATION['max_pages']
+
+    @staticmethod
+    def search_key(term: str, page: int) -> str:
+        return f"{SEARCH}:{term}:{page}"
+
+    @staticmethod
+    def detail_key(url: str) -> str:
+        return f"{DETAIL}:{url}"
+
+    def _add_many(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        """Insertar tareas nuevas (las claves ya presentes se ignoran, en cualquier estado)"""
+        tasks = {task['clave']: task for task in tasks}
+        if not tasks:
+            return 0
+        session = self.session_factory()
+        try:
+            keys = list(tasks)
+            existing = set()
+            for start in range(0, len(keys), 500):
+                existing.update(key for (key,) in session.query(CrawlTask.clave).filter(
+                    CrawlTask.clave.in_(keys[start:start + 500])
+                ))
+            added = 0
+            for key, task in tasks.items():
+                if key not in existing:
+                    session.add(CrawlTask(estado=PENDING, intentos=0, **task))
+                    added += 1
+            session.commit()
+            return added
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def seed_search_terms(self, terms: Iterable[str], prioridad: int = SEARCH_PRIORITY) -> int:
+        """Sembrar la primera página de cada término (idempotente)"""
+        added = self._add_many(self._search_task(term, 1, prioridad) for term in terms)
+        if added:
+            logger.info(f"🌱 {added} términos nuevos en la frontera de rastreo")
+        return added
+
+    def _search_task(self, term: str, page: int, prioridad: int) -> Dict[str, Any]:
+        return {'clave': self.search_key(term, page), 'tipo': SEARCH, 'termino': term, 'pagina': page,
+                'host': host_of(URL_PATTERNS['search_url']), 'prioridad': prioridad}
+
+    def add_search_page(self, term: str, page: int, prioridad: int = SEARCH_PRIORITY) -> bool:
+        """Encolar la página siguiente de un término (hasta PAGINATION['max_pages'])"""
+        if page > self.max_pages:
+            return False
+        return self._add_many([self._search_task(term, page, prioridad)]) == 1
+
+    def add_details(self, results: Iterable[Dict[str, Any]], prioridad: int = DETAIL_PRIORITY) -> int:
+        """Encolar el detalle de cada resultado de búsqueda con URL"""
+        return self._add_many({
+            'clave': self.detail_key(result['url']), 'tipo': DETAIL, 'url': result['url'],
+            'scjn_id': result.get('scjn_id'), 'host': host_of(result['url']), 'prioridad': prioridad,
+            'datos': json.dumps(result, ensure_ascii=False, default=str)
+        } for result in results if result.get('url'))
+
+    def next_task(self) -> Optional[Dict[str, Any]]:
+        """Tomar la tarea pendiente de mayor prioridad (la más antigua en caso de empate)"""
+        session = self.session_factory()
+        try:
+            now = datetime.now()
+            while True:
+                task = session.query(CrawlTask).filter(
+                    CrawlTask.estado == PENDING,
+                    or_(CrawlTask.proxima_visita.is_(None), CrawlTask.proxima_visita <= now)
+                ).order_by(CrawlTask.prioridad.desc(), CrawlTask.id).first()
+                if task is None:
+                    return None
+
+                # Actualización condicional: otra instancia pudo tomarla entre el SELECT y el UPDATE
+                updated = session.query(CrawlTask).filter(
+                    CrawlTask.id == task.id, CrawlTask.estado == PENDING
+                ).update({'estado': IN_FLIGHT, 'intentos': CrawlTask.intentos + 1}, synchronize_session=False)
+                claimed = {
+                    'id': task.id, 'tipo': task.tipo, 'termino': task.termino, 'pagina': task.pagina,
+                    'url': task.url, 'scjn_id': task.scjn_id, 'host': task.host,
+                    'datos': json.loads(task.datos) if task.datos else {},
+                    'intentos': (task.intentos or 0) + 1
+                }
+                session.commit()
+                if updated:
+                    return claimed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def complete(self, task_id: int):
+        """Marcar una tarea como visitada"""
+        self._update(task_id, {'estado': DONE, 'ultima_visita': datetime.now(), 'ultimo_error': None})
+
+    def fail(self, task_id: int, error: str) -> bool:
+        """Registrar un fallo; se reintenta más tarde hasta max_attempts. Devuelve True si queda pendiente"""
+        session = self.session_factory()
+        try:
+            task = session.get(CrawlTask, task_id)
+            if task is None:
+                return False
+            task.ultimo_error = error
+            task.ultima_visita = datetime.now()
+            if (task.intentos or 0) >= self.max_attempts:
+                task.estado = FAILED
+            else:
+                task.estado = PENDING
+                task.proxima_visita = datetime.now() + timedelta(
+                    seconds=self.retry_delay * (2 ** max(0, (task.intentos or 1) - 1))
+                )
+            session.commit()
+            return task.estado == PENDING
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _update(self, task_id: int, values: Dict[str, Any]):
+        session = self.session_factory()
+        try:
+            session.query(CrawlTask).filter(CrawlTask.id == task_id).update(values, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def recover_stale(self) -> int:
+        """Devolver a pending tareas in_flight de una sesión interrumpida"""
+        session = self.session_factory()
+        try:
+            count = session.query(CrawlTask).filter(CrawlTask.estado == IN_FLIGHT).update(
+                {'estado': PENDING}, synchronize_session=False
+            )
+            session.commit()
+            if count:
+                logger.info(f"♻️ {count} tareas de rastreo interrumpidas devueltas a la frontera")
+            return count
+        finally:
+            session.close()
+
+    def retry_failed(self) -> int:
+        """Re-encolar tareas fallidas (reinicia el contador de intentos)"""
+        session = self.session_factory()
+        try:
+            count = session.query(CrawlTask).filter(CrawlTask.estado == FAILED).update(
+                {'estado': PENDING, 'intentos': 0, 'proxima_visita': None}, synchronize_session=False
+            )
+            session.commit()
+            return count
+        finally:
+            session.close()
+
+    def counts(self) -> Dict[str, int]:
+        """Tareas por estado"""
+        session = self.session_factory()
+        try:
+            rows = session.query(CrawlTask.estado, func.count(CrawlTask.id)).group_by(CrawlTask.estado)
+            counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+            counts.update(dict(rows))
+            return counts
+        finally:
+            session.close()
+
+    def is_exhausted(self) -> bool:
+        """True si la frontera tiene tareas y ya no queda ninguna por visitar"""
+        counts = self.counts()
+        return sum(counts.values()) > 0 and counts[PENDING] + counts[IN_FLIGHT] == 0
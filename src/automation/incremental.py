@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Sincronización incremental de tesis a partir de una marca de agua
+- Marca persistida en sync_watermark: registro digital más alto y fecha de publicación más reciente
+- Los registros digitales crecen con cada publicación: solo se sondea lo que está por encima de la marca
+- Recorrido por páginas de registros con el rastreador de registro_crawler (paralelo, cortés, reintentos)
+- Se detiene en las primeras páginas sin tesis: una ejecución semanal solo toca lo nuevo
+- Un registro sin respuesta tras todos los reintentos detiene la sincronización y la marca queda por
+  debajo de él: la próxima ejecución lo vuelve a sondear
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.config import Config
+from src.database.models import SyncWatermark, Tesis, get_session
+from src.automation.registro_crawler import RegistroCrawler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = 'tesis'
+
+
+class WatermarkStore:
+    """Marcas de agua de sincronización (tabla sync_watermark)"""
+
+    def __init__(self, session_factory: Callable = None):
+        self.session_factory = session_factory or get_session
+
+    def get(self, clave: str = DEFAULT_KEY) -> Optional[Dict[str, Any]]:
+        session = self.session_factory()
+        try:
+            row = session.query(SyncWatermark).filter(SyncWatermark.clave == clave).first()
+            if row is None:
+                return None
+            return {'registro_max': row.registro_max, 'fecha_publicacion_max': row.fecha_publicacion_max,
+                    'resumen': row.resumen, 'fecha_sync': row.fecha_sync}
+        finally:
+            session.close()
+
+    def bootstrap(self, clave: str = DEFAULT_KEY, min_registro: int = None) -> Optional[Dict[str, Any]]:
+        """Crear la marca con el registro más alto de la tabla tesis (desde min_registro)"""
+        min_registro = Config.INCREMENTAL_MIN_REGISTRO if min_registro is None else min_registro
+        session = self.session_factory()
+        try:
+            highest = None
+            for (scjn_id,) in session.query(Tesis.scjn_id).filter(Tesis.scjn_id.isnot(None)):
+                if scjn_id.isdigit() and int(scjn_id) >= min_registro:
+                    highest = max(highest or 0, int(scjn_id))
+        finally:
+            session.close()
+
+        if highest is None:
+            return None
+        logger.info(f"📌 Marca de agua inicial '{clave}': registro {highest}")
+        self.save(clave, highest)
+        return self.get(clave)
+
+    def save(self, clave: str, registro_max: int, fecha_publicacion: str = None, resumen: Dict = None):
+        """Avanzar la marca (nunca retrocede)"""
+        session = self.session_factory()
+        try:
+            row = session.query(SyncWatermark).filter(SyncWatermark.clave == clave).first()
+            if row is None:
+                row = SyncWatermark(clave=clave, registro_max=registro_max)
+                session.add(row)
+            row.registro_max = max(row.registro_max, registro_max)
+            if fecha_publicacion and (not row.fecha_publicacion_max or fecha_publicacion > row.fecha_publicacion_max):
+                row.fecha_publicacion_max = fecha_publicacion
+            if resumen is not None:
+                row.resumen = resumen
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+def _publication_date(detail: Dict) -> Optional[str]:
+    """Fecha de publicación del detalle si el scraper la extrajo"""
+    value = detail.get('fecha_publicacion') or (detail.get('metadata') or {}).get('fecha')
+    return str(value) if value else None
+
+
+class IncrementalSync:
+    """Sondeo de los registros posteriores a la marca de agua hasta dejar de encontrar tesis"""
+
+    def __init__(self, probe_factory: Callable, session_factory: Callable = None, store: WatermarkStore = None,
+                 clave: str = DEFAULT_KEY, page_size: int = None, empty_pages: int = None,
+                 crawler: RegistroCrawler = None, **crawler_kwargs):
+        self.session_factory = session_factory or get_session
+        self.store = store or WatermarkStore(self.session_factory)
+        self.clave = clave
+        self.page_size = page_size or Config.INCREMENTAL_PAGE_SIZE
+        self.empty_pages = empty_pages or Config.INCREMENTAL_EMPTY_PAGES
+        self.crawler = crawler or RegistroCrawler(probe_factory, session_factory=self.session_factory,
+                                                  **crawler_kwargs)
+
+    def run(self, on_new: Callable[[int, Dict], Any] = None, deadline: float = None,
+            max_new: int = None) -> Dict[str, Any]:
+        """Sincronizar lo nuevo; on_new(registro, detalle) por cada tesis que no estaba en la base de datos"""
+        begin = time.time()
+        summary = {'desde': None, 'hasta': None, 'paginas': 0, 'nuevas': 0, 'conocidas': 0,
+                   'sondeados': 0, 'errores': 0, 'completo': False, 'duracion': 0.0}
+
+        mark = self.store.get(self.clave) or self.store.bootstrap(self.clave)
+        if mark is None:
+            logger.warning("⚠️ Sin marca de agua ni tesis de la serie vigente: ejecute primero la fase inicial")
+            return summary
+
+        cursor = summary['desde'] = mark['registro_max'] + 1
+        highest = mark['registro_max']
+        newest_date = None
+        empty = 0
+
+        def hit(registro: int, detail: Dict):
+            nonlocal newest_date
+            date = _publication_date(detail)
+            if date and (newest_date is None or date > newest_date):
+                newest_date = date
+            if on_new:
+                on_new(registro, detail)
+
+        try:
+            while empty < self.empty_pages:
+                if deadline and time.time() >= deadline:
+                    logger.info("⏰ Tiempo agotado en la sincronización incremental")
+                    break
+                remaining = max_new - summary['nuevas'] if max_new else None
+                if remaining is not None and remaining <= 0:
+                    logger.info("📊 Límite de tesis nuevas alcanzado en la sincronización incremental")
+                    break
+
+                end = cursor + self.page_size
+                # Un registro vacío por encima de la marca puede haberse publicado desde la última ejecución
+                self.crawler.bitmap.load(cursor, end)
+                self.crawler.bitmap.forget_probes(cursor, end)
+                page = self.crawler.crawl(cursor, end, deadline=deadline, max_hits=remaining, on_hit=hit,
+                                          dense=True, resume=False)
+                summary['paginas'] += 1
+                summary['nuevas'] += page['encontrados']
+                summary['conocidas'] += page['conocidos']
+                summary['sondeados'] += page['sondeados']
+                summary['errores'] += page['errores']
+
+                found = self.crawler.bitmap.found_in(cursor, end)
+                if page['agotados']:
+                    # Registros sin respuesta: la marca no los pasa aunque haya tesis por encima
+                    lowest = min(page['agotados'])
+                    highest = max([highest] + [registro for registro in found if registro < lowest])
+                    logger.warning(f"⚠️ {len(page['agotados'])} registros sin respuesta desde {lowest}: "
+                                   f"la marca se detiene antes de ellos")
+                    break
+                if not page['completo']:
+                    # Página a medias: la marca no pasa de lo ya cubierto por completo
+                    break
+
+                if found:
+                    highest = max(highest, found[-1])
+                    empty = 0
+                else:
+                    empty += 1
+                cursor = end
+            else:
+                summary['completo'] = True
+        finally:
+            self.crawler.close()
+
+        summary['hasta'] = highest
+        summary['duracion'] = time.time() - begin
+        self.store.save(self.clave, highest, newest_date, resumen={
+            key: summary[key] for key in ('desde', 'hasta', 'paginas', 'nuevas', 'conocidas', 'sondeados', 'errores')
+        })
+        logger.info(f"🔄 Sincronización incremental: {summary['nuevas']} nuevas, {summary['conocidas']} ya conocidas, "
+                    f"{summary['sondeados']} registros sondeados en {summary['paginas']} páginas, "
+                    f"marca {mark['registro_max']} -> {highest} ({summary['duracion']:.0f}s)")
+        return summary
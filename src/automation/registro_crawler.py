@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Rastreo exhaustivo del espacio de registros digitales de SCJN
+- Recorre rangos de IDs numéricos (/detalle/tesis/{registro}) con varios navegadores en paralelo
+- Mapa de bits compacto por bloques (sondeados / encontrados) persistido en registro_bitmap
+- Omite los registros que ya están en la tabla tesis
+- Detección adaptativa de huecos: tras muchos vacíos seguidos se muestrea con saltos crecientes
+  y al reaparecer tesis se rellena hacia atrás el último tramo saltado
+- Cobertura medible y tiempo restante estimado por rango
+- Sondas con un navegador por hilo o con pestañas de un único navegador compartido (REGISTRO_PROBE)
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from src.config import Config
+from src.database.models import RegistroBlock, Tesis, get_session
+from src.automation.frontier import HostTokenBucket, host_of
+from src.scraper.scjn_config import TIMING, URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# IDs por bloque del mapa de bits (1 KB por mapa)
+BLOCK_SIZE = 8192
+# IDs por lote en modo denso
+WINDOW = 32
+
+
+def parse_ranges(spec: str) -> List[Tuple[int, int]]:
+    """'159000-260000,2000000-2032000' -> [(159000, 260000), (2000000, 2032000)]"""
+    ranges = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        start, end = int(start), int(end)
+        if end <= start:
+            raise ValueError(f"Rango de registros inválido: {part}")
+        ranges.append((start, end))
+    return ranges
+
+
+class RegistroBitmap:
+    """Dos bits por registro digital (sondeado, encontrado) agrupados en bloques de BLOCK_SIZE"""
+
+    def __init__(self, session_factory: Callable = None):
+        self.session_factory = session_factory or get_session
+        self._blocks: Dict[int, Tuple[bytearray, bytearray]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def load(self, start: int, end: int):
+        """Cargar los bloques que cubren [start, end)"""
+        session = self.session_factory()
+        try:
+            rows = session.query(RegistroBlock).filter(
+                RegistroBlock.bloque >= start // BLOCK_SIZE, RegistroBlock.bloque <= (end - 1) // BLOCK_SIZE
+            )
+            with self._lock:
+                for row in rows:
+                    if row.bloque not in self._dirty:
+                        self._blocks[row.bloque] = (bytearray(row.probados), bytearray(row.encontrados))
+        finally:
+            session.close()
+
+    def _block(self, registro: int) -> Tuple[bytearray, bytearray]:
+        number = registro // BLOCK_SIZE
+        block = self._blocks.get(number)
+        if block is None:
+            block = self._blocks[number] = (bytearray(BLOCK_SIZE // 8), bytearray(BLOCK_SIZE // 8))
+        return block
+
+    @staticmethod
+    def _bit(bits: bytearray, registro: int) -> bool:
+        offset = registro % BLOCK_SIZE
+        return bool(bits[offset >> 3] & (1 << (offset & 7)))
+
+    def is_probed(self, registro: int) -> bool:
+        return self._bit(self._block(registro)[0], registro)
+
+    def is_found(self, registro: int) -> bool:
+        return self._bit(self._block(registro)[1], registro)
+
+    def is_known(self, registro: int) -> bool:
+        """Sondeado o ya presente en la base de datos: no hace falta visitarlo"""
+        probed, found = self._block(registro)
+        return self._bit(probed, registro) or self._bit(found, registro)
+
+    def mark(self, registro: int, probed: bool = True, found: bool = False):
+        offset = registro % BLOCK_SIZE
+        mask = 1 << (offset & 7)
+        with self._lock:
+            block = self._block(registro)
+            if probed:
+                block[0][offset >> 3] |= mask
+            if found:
+                block[1][offset >> 3] |= mask
+            self._dirty.add(registro // BLOCK_SIZE)
+
+    def flush(self) -> int:
+        """Guardar los bloques modificados (punto de control)"""
+        with self._lock:
+            dirty = {number: (bytes(self._blocks[number][0]), bytes(self._blocks[number][1]))
+                     for number in self._dirty}
+            self._dirty.clear()
+        if not dirty:
+            return 0
+
+        session = self.session_factory()
+        try:
+            existing = {row.bloque: row for row in session.query(RegistroBlock).filter(
+                RegistroBlock.bloque.in_(list(dirty))
+            )}
+            for number, (probed, found) in dirty.items():
+                row = existing.get(number)
+                if row is None:
+                    session.add(RegistroBlock(bloque=number, probados=probed, encontrados=found))
+                else:
+                    row.probados, row.encontrados = probed, found
+            session.commit()
+            return len(dirty)
+        except Exception:
+            session.rollback()
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+        finally:
+            session.close()
+
+    def forget_probes(self, start: int, end: int) -> int:
+        """Borrar los bits de sondeo de [start, end): lo vacío se vuelve a sondear y lo encontrado sigue conocido"""
+        forgotten = 0
+        with self._lock:
+            for registro in range(start, end):
+                probed = self._block(registro)[0]
+                offset = registro % BLOCK_SIZE
+                mask = 1 << (offset & 7)
+                if probed[offset >> 3] & mask:
+                    probed[offset >> 3] &= ~mask
+                    self._dirty.add(registro // BLOCK_SIZE)
+                    forgotten += 1
+        return forgotten
+
+    def found_in(self, start: int, end: int) -> List[int]:
+        """Registros con tesis en [start, end)"""
+        return [registro for registro in range(start, end) if self.is_found(registro)]
+
+    def counts(self, start: int, end: int) -> Dict[str, Any]:
+        """Sondeados, encontrados, cubiertos y último sondeado en [start, end)"""
+        probed = found = covered = 0
+        last_probed = None
+        for registro in range(start, end):
+            block = self._blocks.get(registro // BLOCK_SIZE)
+            if block is None:
+                continue
+            is_probed = self._bit(block[0], registro)
+            is_found = self._bit(block[1], registro)
+            probed += is_probed
+            found += is_found
+            covered += is_probed or is_found
+            if is_probed:
+                last_probed = registro
+        return {'sondeados': probed, 'encontrados': found, 'cubiertos': covered, 'ultimo_sondeado': last_probed}
+
+
+class RegistroCrawler:
+    """Enumerador del espacio de registros digitales con huecos adaptativos"""
+
+    def __init__(self, probe_factory: Callable[[], Callable[[int], Optional[Dict]]],
+                 session_factory: Callable = None, workers: int = None, gap_threshold: int = None,
+                 max_stride: int = None, politeness: HostTokenBucket = None, max_attempts: int = None):
+        self.probe_factory = probe_factory
+        self.session_factory = session_factory or get_session
+        # Las sondas por pestañas fijan sus hilos (uno por pestaña) con el atributo workers de la fábrica
+        self.workers = max(1, workers or getattr(probe_factory, 'workers', None) or Config.REGISTRO_WORKERS)
+        self.gap_threshold = gap_threshold or Config.REGISTRO_GAP_THRESHOLD
+        self.max_stride = max(WINDOW, max_stride or Config.REGISTRO_MAX_STRIDE)
+        # Las sondas Selenium ya pasan por el controlador adaptativo; politeness añade una cubeta propia
+        self.politeness = politeness
+        self.max_attempts = max_attempts or TIMING['max_retries']
+        self.host = host_of(URL_PATTERNS['base_url'])
+        self.bitmap = RegistroBitmap(self.session_factory)
+        self._local = threading.local()
+        self._probes = []
+        self._probes_lock = threading.Lock()
+        self._pool = None
+
+    # ------------------------------------------------------------------
+    # Sondeo
+    # ------------------------------------------------------------------
+    def _probe(self, registro: int) -> Tuple[int, Optional[Dict], Optional[str]]:
+        """(registro, detalle o None si no existe, error) con la sonda propia del hilo"""
+        try:
+            probe = getattr(self._local, 'probe', None)
+            if probe is None:
+                probe = self._local.probe = self.probe_factory()
+                with self._probes_lock:
+                    self._probes.append(probe)
+            if self.politeness:
+                self.politeness.acquire(self.host)
+            return registro, probe(registro), None
+        except Exception as e:
+            return registro, None, str(e)
+
+    def close(self):
+        """Cerrar los hilos y las sondas (navegadores) que crearon"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._probes_lock:
+            probes, self._probes = self._probes, []
+        for probe in probes:
+            closer = getattr(probe, 'close', None)
+            if closer:
+                try:
+                    closer()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error cerrando sonda de registros: {e}")
+
+    def mark_known(self, start: int, end: int) -> int:
+        """Marcar como encontrados los registros de [start, end) que ya están en la tabla tesis"""
+        session = self.session_factory()
+        try:
+            known = 0
+            query = session.query(Tesis.scjn_id).filter(Tesis.scjn_id.isnot(None))
+            if len(str(start)) == len(str(end - 1)):
+                # Mismo número de dígitos: el orden de texto coincide con el numérico y filtra en SQL
+                query = query.filter(func.length(Tesis.scjn_id) == len(str(start)),
+                                     Tesis.scjn_id >= str(start), Tesis.scjn_id <= str(end - 1))
+            for (scjn_id,) in query:
+                if scjn_id.isdigit() and start <= int(scjn_id) < end and not self.bitmap.is_found(int(scjn_id)):
+                    self.bitmap.mark(int(scjn_id), probed=False, found=True)
+                    known += 1
+            return known
+        finally:
+            session.close()
+
+    # ------------------------------------------------------------------
+    # Recorrido
+    # ------------------------------------------------------------------
+    def crawl(self, start: int, end: int, deadline: float = None, max_hits: int = None,
+              on_hit: Callable[[int, Dict], Any] = None, dense: bool = False, resume: bool = True,
+              stop: threading.Event = None) -> Dict[str, Any]:
+        """Recorrer [start, end) hasta terminar, agotar el tiempo (deadline, epoch), alcanzar max_hits
+        o activarse stop"""
+        begin = time.time()
+        self.bitmap.load(start, end)
+        summary = {'inicio': start, 'fin': end, 'sondeados': 0, 'encontrados': 0, 'vacios': 0, 'errores': 0,
+                   'conocidos': self.mark_known(start, end), 'saltados': 0, 'huecos': 0, 'completo': False,
+                   'agotados': []}
+
+        cursor = start
+        if resume:
+            last = self.bitmap.counts(start, end)['ultimo_sondeado']
+            cursor = last + 1 if last is not None else start
+        if cursor > start:
+            logger.info(f"♻️ Registros {start}-{end}: se retoma desde {cursor}")
+
+        retries: Dict[int, int] = {}
+        empty_run = 0
+        stride = 0  # 0 = modo denso; >0 = muestreo de un hueco con saltos de stride IDs
+        batches = 0
+
+        if self._pool is None:
+            # Hilos (y sus navegadores) persistentes entre llamadas hasta close()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        pool = self._pool
+        try:
+            while cursor < end or retries:
+                if deadline and time.time() >= deadline:
+                    logger.info("⏰ Tiempo agotado en el rastreo de registros")
+                    break
+                if stop is not None and stop.is_set():
+                    logger.info("🛑 Rastreo de registros detenido")
+                    break
+                if max_hits and summary['encontrados'] >= max_hits:
+                    logger.info("📊 Límite de tesis nuevas alcanzado en el rastreo de registros")
+                    break
+
+                batch = [registro for registro in retries if not self.bitmap.is_known(registro)]
+                retries = {registro: retries[registro] for registro in batch}
+                if stride == 0:
+                    scan = cursor
+                    while scan < end and len(batch) < WINDOW:
+                        if not self.bitmap.is_known(scan):
+                            batch.append(scan)
+                        scan += 1
+                    next_cursor = scan
+                    skipped = 0
+                    scanned = range(cursor, next_cursor)
+                else:
+                    # Saltar stride IDs y sondear un tramo corto (los huecos internos son frecuentes)
+                    sample_start = min(cursor + stride, end)
+                    next_cursor = min(sample_start + self.workers, end)
+                    batch.extend(registro for registro in range(sample_start, next_cursor)
+                                 if not self.bitmap.is_known(registro) and registro not in retries)
+                    skipped = sum(1 for registro in range(cursor, sample_start) if not self.bitmap.is_known(registro))
+                    scanned = range(sample_start, next_cursor)
+
+                # Las tesis ya conocidas en el tramo también indican que la zona está viva
+                hits = sum(1 for registro in scanned if self.bitmap.is_found(registro))
+                errored = False
+                for registro, detail, error in pool.map(self._probe, batch):
+                    if error:
+                        errored = True
+                        attempts = retries.get(registro, 0) + 1
+                        summary['errores'] += 1
+                        if attempts < self.max_attempts:
+                            retries[registro] = attempts
+                        else:
+                            retries.pop(registro, None)
+                            # Sin sondeo marcado: queda sin cubrir y una ejecución posterior lo vuelve a intentar
+                            summary['agotados'].append(registro)
+                            logger.warning(f"⚠️ Registro {registro} sin respuesta tras {attempts} intentos: {error}")
+                        continue
+                    retries.pop(registro, None)
+                    summary['sondeados'] += 1
+                    self.bitmap.mark(registro, probed=True, found=detail is not None)
+                    if detail is None:
+                        summary['vacios'] += 1
+                        continue
+                    hits += 1
+                    summary['encontrados'] += 1
+                    if on_hit:
+                        on_hit(registro, detail)
+
+                if stride == 0:
+                    empty_run = 0 if hits else empty_run + len(batch)
+                    cursor = next_cursor
+                    if not dense and empty_run >= self.gap_threshold and cursor < end:
+                        stride = WINDOW
+                        summary['huecos'] += 1
+                        logger.info(f"🕳️ Hueco de registros desde {cursor - empty_run}: muestreo con saltos")
+                elif hits:
+                    # Fin del hueco: rellenar desde la última muestra vacía (cursor no avanza)
+                    logger.info(f"🎯 Tesis de nuevo en {sample_start}: relleno denso desde {cursor}")
+                    stride = 0
+                    empty_run = 0
+                elif not errored:
+                    summary['saltados'] += skipped
+                    cursor = next_cursor
+                    stride = min(stride * 2, self.max_stride)
+                # Muestra con errores: se repite antes de saltar (una tesis ahí obliga a rellenar desde cursor)
+
+                batches += 1
+                if batches % 20 == 0:
+                    self.bitmap.flush()
+
+            summary['completo'] = cursor >= end and not retries
+        finally:
+            if retries:
+                # Reintentos pendientes al cortar: el punto de reanudación (último sondeado) vuelve a ellos
+                self.bitmap.forget_probes(min(retries), end)
+            self.bitmap.flush()
+
+        summary['duracion'] = time.time() - begin
+        summary['sondeos_por_minuto'] = summary['sondeados'] / summary['duracion'] * 60 if summary['duracion'] else 0.0
+        summary.update(self.coverage(start, end, rate=summary['sondeos_por_minuto']))
+        logger.info(f"🧮 Registros {start}-{end}: {summary['sondeados']} sondeados, {summary['encontrados']} nuevas, "
+                    f"{summary['conocidos']} ya en BD, {summary['saltados']} saltados en {summary['huecos']} huecos, "
+                    f"cobertura {summary['cobertura']:.1f}% ({summary['duracion']:.0f}s)")
+        return summary
+
+    def crawl_ranges(self, ranges: Iterable[Tuple[int, int]], deadline: float = None, max_hits: int = None,
+                     on_hit: Callable[[int, Dict], Any] = None) -> List[Dict[str, Any]]:
+        """Recorrer varios rangos en orden compartiendo tiempo y límite de tesis"""
+        summaries = []
+        found = 0
+        try:
+            for start, end in ranges:
+                remaining = max_hits - found if max_hits else None
+                if (deadline and time.time() >= deadline) or (remaining is not None and remaining <= 0):
+                    break
+                summary = self.crawl(start, end, deadline=deadline, max_hits=remaining, on_hit=on_hit)
+                found += summary['encontrados']
+                summaries.append(summary)
+        finally:
+            self.close()
+        return summaries
+
+    def coverage(self, start: int, end: int, rate: float = 0.0) -> Dict[str, Any]:
+        """Cobertura del rango y tiempo restante estimado al ritmo indicado (sondeos por minuto)"""
+        counts = self.bitmap.counts(start, end)
+        total = end - start
+        frontier = counts['ultimo_sondeado'] + 1 if counts['ultimo_sondeado'] is not None else start
+        # Lo que queda por delante del último sondeado más lo no cubierto por detrás (huecos saltados, errores)
+        ahead = sum(1 for registro in range(frontier, end) if not self.bitmap.is_known(registro))
+        return {
+            'total': total,
+            'cubiertos': counts['cubiertos'],
+            'cobertura': counts['cubiertos'] / total * 100 if total else 100.0,
+            'pendientes': ahead,
+            'sin_cubrir_atras': (frontier - start) - sum(
+                1 for registro in range(start, frontier) if self.bitmap.is_known(registro)
+            ),
+            'eta_minutos': ahead / rate if rate else None
+        }
+
+
+class SeleniumRegistroProbe:
+    """Sonda de registros con un navegador propio (uno por hilo del rastreo, abierto solo si HTTP no basta)"""
+
+    def __init__(self):
+        from src.scraper.selenium_scraper import SeleniumSCJNScraper
+
+        self.scraper = SeleniumSCJNScraper()
+
+    def __call__(self, registro: int) -> Optional[Dict]:
+        return self.scraper.get_tesis_by_registro(registro)
+
+    def close(self):
+        self.scraper.close_driver()
+
+
+class TabRegistroProbe:
+    """Sonda de registros sobre las pestañas de un navegador compartido por todos los hilos del rastreo"""
+
+    workers = Config.BROWSER_TABS  # un hilo del rastreo por pestaña las mantiene todas ocupadas
+    _shared = None
+    _users = 0
+    _lock = threading.Lock()
+
+    def __init__(self):
+        from src.scraper.selenium_scraper import SeleniumSCJNScraper
+
+        # El scraper aporta el nivel HTTP y la extracción; las páginas con navegador las carga el executor
+        self.scraper = SeleniumSCJNScraper()
+        self.fetcher = self.scraper.fetcher
+        self.base_url = URL_PATTERNS['base_url']
+        with TabRegistroProbe._lock:
+            TabRegistroProbe._users += 1
+
+    @classmethod
+    def executor(cls):
+        """Executor de pestañas compartido, abierto al primer uso (se recrea si el navegador quedó inutilizable)"""
+        from src.scraper.tab_pool import TabExecutor
+
+        with cls._lock:
+            if cls._shared is None or cls._shared.broken:
+                if cls._shared is not None:
+                    cls._shared.shutdown()
+                cls._shared = TabExecutor()
+            return cls._shared
+
+    def __call__(self, registro: int) -> Optional[Dict]:
+        url = f"{self.base_url}/detalle/tesis/{registro}"
+        detail = self.fetcher.fetch(url, browser=self._browser_detail)
+        if not detail or not (detail.get('rubro') or detail.get('texto')):
+            return None
+        detail['url'] = url
+        return detail
+
+    def _browser_detail(self, url: str) -> Dict:
+        return self.executor().submit(url, self.scraper.extract_tesis_detail).result()
+
+    def close(self):
+        with TabRegistroProbe._lock:
+            TabRegistroProbe._users -= 1
+            executor = None
+            if TabRegistroProbe._users <= 0:
+                executor, TabRegistroProbe._shared = TabRegistroProbe._shared, None
+        if executor is not None:
+            executor.shutdown()
+
+
+def registro_probe_factory():
+    """Fábrica de sondas según REGISTRO_PROBE: pestañas de un navegador (tabs) o un navegador por hilo"""
+    return TabRegistroProbe if Config.REGISTRO_PROBE == 'tabs' else SeleniumRegistroProbe
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Cola de trabajo distribuida: varios procesos o nodos rastrean contra la misma base de datos
+- Tareas en la tabla work_queue; cada nodo arrienda una tarea por DISTRIBUTED_LEASE_SECONDS
+  y la renueva con latidos mientras trabaja
+- Reparto sin esperas entre nodos: SELECT ... FOR UPDATE SKIP LOCKED en PostgreSQL; en SQLite (WAL)
+  la actualización condicional sobre el estado decide qué nodo se queda la tarea
+- Arrendamiento vencido (nodo caído o colgado): la tarea se vuelve a repartir; el token del
+  arrendamiento impide que el nodo anterior la cierre o la renueve después
+- Tramos de registros digitales alineados con los bloques de registro_bitmap: cada bloque del
+  mapa de bits tiene un único dueño y un tramo retomado continúa desde su último punto de control
+- Inserción única de tesis por scjn_id: repetir un tramo nunca duplica filas
+- Cupo global de peticiones en rate_gate: todos los nodos juntos respetan la pausa hacia SCJN
+  (los relojes de los nodos deben estar sincronizados, p. ej. NTP en GCP)
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config import Config
+from src.database.models import RateGate, WorkItem, get_session, insert_ignore, insert_tesis_once, tesis_row
+from src.automation.registro_crawler import BLOCK_SIZE, RegistroCrawler, registro_probe_factory
+from src.scraper.rate_control import set_rate_gate
+from src.scraper.scjn_config import TIMING
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+REGISTRO = 'registro'
+
+
+def default_worker_id() -> str:
+    """Nombre del nodo: WORKER_ID o host-pid"""
+    return Config.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def registro_tramos(start: int, end: int) -> List[Tuple[int, int]]:
+    """Partir [start, end) por los bordes de los bloques del mapa de bits"""
+    tramos = []
+    cursor = start
+    while cursor < end:
+        block_end = min(end, (cursor // BLOCK_SIZE + 1) * BLOCK_SIZE)
+        tramos.append((cursor, block_end))
+        cursor = block_end
+    return tramos
+
+
+class WorkQueue:
+    """Cola de tareas con arrendamientos (tabla work_queue)"""
+
+    def __init__(self, session_factory: Callable = None, worker_id: str = None, lease_seconds: float = None,
+                 max_attempts: int = None, retry_delay: float = None):
+        self.session_factory = session_factory or get_session
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or Config.DISTRIBUTED_LEASE_SECONDS
+        self.max_attempts = max_attempts or TIMING['max_retries']
+        self.retry_delay = TIMING['retry_delay'] if retry_delay is None else retry_delay
+
+    # ------------------------------------------------------------------
+    # Alta de tareas
+    # ------------------------------------------------------------------
+    def add(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        """Insertar tareas {'clave', 'tipo', 'datos', 'prioridad'}; las claves ya presentes se ignoran"""
+        rows = [{'clave': task['clave'], 'tipo': task['tipo'], 'prioridad': task.get('prioridad', 0),
+                 'datos': json.dumps(task.get('datos') or {}, ensure_ascii=False), 'estado': PENDING,
+                 'intentos': 0} for task in tasks]
+        if not rows:
+            return 0
+        session = self.session_factory()
+        try:
+            return insert_ignore(session, WorkItem, rows, 'clave')
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def seed_registro_ranges(self, ranges: Iterable[Tuple[int, int]]) -> int:
+        """Sembrar los tramos de registros digitales de los rangos (idempotente)"""
+        added = self.add({'clave': f"{REGISTRO}:{start}-{end}", 'tipo': REGISTRO,
+                          'datos': {'inicio': start, 'fin': end}}
+                         for range_start, range_end in ranges
+                         for start, end in registro_tramos(range_start, range_end))
+        if added:
+            logger.info(f"🌱 {added} tramos de registros nuevos en la cola distribuida")
+        return added
+
+    # ------------------------------------------------------------------
+    # Arrendamientos
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(WorkItem.estado == PENDING,
+                 or_(WorkItem.disponible_desde.is_(None), WorkItem.disponible_desde <= now)),
+            and_(WorkItem.estado == LEASED, WorkItem.arriendo_hasta < now)
+        )
+
+    def claim(self, tipos: Iterable[str] = None) -> Optional[Dict[str, Any]]:
+        """Arrendar la tarea libre de mayor prioridad (pendiente o con el arrendamiento vencido)"""
+        session = self.session_factory()
+        try:
+            while True:
+                now = datetime.now()
+                query = select(WorkItem.id, WorkItem.clave, WorkItem.tipo, WorkItem.datos, WorkItem.intentos,
+                               WorkItem.estado, WorkItem.nodo).where(self._claimable(now))
+                if tipos:
+                    query = query.where(WorkItem.tipo.in_(list(tipos)))
+                # PostgreSQL: los nodos se saltan las filas que otro está arrendando; SQLite lo ignora
+                row = session.execute(query.order_by(WorkItem.prioridad.desc(), WorkItem.id)
+                                      .limit(1).with_for_update(skip_locked=True)).first()
+                if row is None:
+                    session.commit()
+                    return None
+
+                if (row.intentos or 0) >= self.max_attempts:
+                    # Arrendamiento vencido sin intentos restantes: el nodo murió en cada intento
+                    session.execute(update(WorkItem).where(WorkItem.id == row.id, self._claimable(now)).values(
+                        estado=FAILED, arriendo=None, ultimo_error=f"Arrendamiento vencido ({row.nodo})"
+                    ))
+                    session.commit()
+                    logger.warning(f"⚠️ Tarea {row.clave} fallida: {row.intentos} arrendamientos vencidos")
+                    continue
+
+                token = uuid.uuid4().hex
+                # Actualización condicional: otro nodo pudo arrendarla entre el SELECT y el UPDATE
+                updated = session.execute(update(WorkItem).where(WorkItem.id == row.id, self._claimable(now)).values(
+                    estado=LEASED, nodo=self.worker_id, arriendo=token, ultimo_latido=now,
+                    arriendo_hasta=now + timedelta(seconds=self.lease_seconds),
+                    intentos=WorkItem.intentos + 1
+                )).rowcount
+                session.commit()
+                if updated:
+                    if row.estado == LEASED:
+                        logger.info(f"♻️ Tarea {row.clave} reasignada: venció el arrendamiento de {row.nodo}")
+                    return {'id': row.id, 'clave': row.clave, 'tipo': row.tipo, 'arriendo': token,
+                            'datos': json.loads(row.datos) if row.datos else {},
+                            'intentos': (row.intentos or 0) + 1}
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _update_lease(self, lease: Dict[str, Any], values: Dict[str, Any]) -> bool:
+        """Actualizar la tarea solo si el arrendamiento sigue siendo nuestro"""
+        session = self.session_factory()
+        try:
+            updated = session.execute(update(WorkItem).where(
+                WorkItem.id == lease['id'], WorkItem.estado == LEASED, WorkItem.arriendo == lease['arriendo']
+            ).values(**values)).rowcount
+            session.commit()
+            return updated == 1
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def heartbeat(self, lease: Dict[str, Any]) -> bool:
+        """Renovar el arrendamiento; False si ya no es nuestro (venció y otro nodo tomó la tarea)"""
+        now = datetime.now()
+        return self._update_lease(lease, {'ultimo_latido': now,
+                                          'arriendo_hasta': now + timedelta(seconds=self.lease_seconds)})
+
+    def complete(self, lease: Dict[str, Any], resultado: Dict[str, Any] = None) -> bool:
+        """Marcar la tarea como hecha"""
+        return self._update_lease(lease, {'estado': DONE, 'arriendo': None, 'arriendo_hasta': None,
+                                          'resultado': resultado, 'ultimo_error': None})
+
+    def release(self, lease: Dict[str, Any], resultado: Dict[str, Any] = None) -> bool:
+        """Devolver una tarea a medias (fin de sesión) sin gastar un intento"""
+        return self._update_lease(lease, {'estado': PENDING, 'arriendo': None, 'arriendo_hasta': None,
+                                          'resultado': resultado, 'intentos': WorkItem.intentos - 1})
+
+    def fail(self, lease: Dict[str, Any], error: str) -> bool:
+        """Registrar un fallo; se reintenta más tarde hasta max_attempts. Devuelve True si queda pendiente"""
+        retry = lease['intentos'] < self.max_attempts
+        values = {'estado': PENDING if retry else FAILED, 'arriendo': None, 'arriendo_hasta': None,
+                  'ultimo_error': error}
+        if retry:
+            values['disponible_desde'] = datetime.now() + timedelta(
+                seconds=self.retry_delay * (2 ** max(0, lease['intentos'] - 1))
+            )
+        return self._update_lease(lease, values) and retry
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+    def counts(self) -> Dict[str, int]:
+        """Tareas por estado"""
+        session = self.session_factory()
+        try:
+            rows = session.query(WorkItem.estado, func.count(WorkItem.id)).group_by(WorkItem.estado)
+            counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+            counts.update(dict(rows))
+            return counts
+        finally:
+            session.close()
+
+    def leases(self) -> List[Dict[str, Any]]:
+        """Arrendamientos vigentes o vencidos: nodo, tarea y segundos hasta que venzan"""
+        session = self.session_factory()
+        try:
+            now = datetime.now()
+            return [{'nodo': item.nodo, 'clave': item.clave, 'intentos': item.intentos,
+                     'vence_en': round((item.arriendo_hasta - now).total_seconds(), 1)}
+                    for item in session.query(WorkItem).filter(WorkItem.estado == LEASED).order_by(WorkItem.id)]
+        finally:
+            session.close()
+
+    def is_exhausted(self) -> bool:
+        """True si no queda ninguna tarea pendiente ni arrendada"""
+        counts = self.counts()
+        return counts[PENDING] + counts[LEASED] == 0
+
+
+class LeaseKeeper:
+    """Hilo de latidos de un arrendamiento; lost se activa si se pierde"""
+
+    def __init__(self, queue: WorkQueue, lease: Dict[str, Any], interval: float = None):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval or Config.DISTRIBUTED_HEARTBEAT_SECONDS
+        self.lost = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            try:
+                if self.queue.heartbeat(self.lease):
+                    continue
+            except SQLAlchemyError as e:
+                # Sin base de datos no hay latido: si dura más que el arrendamiento, otro nodo la tomará
+                logger.warning(f"⚠️ Latido fallido para {self.lease['clave']}: {e}")
+                continue
+            logger.warning(f"⚠️ Arrendamiento de {self.lease['clave']} perdido: se abandona la tarea")
+            self.lost.set()
+            return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        return False
+
+
+class GlobalRateGate:
+    """Cupo de peticiones a un host compartido por todos los nodos (tabla rate_gate)
+
+    Cada petición reserva el siguiente hueco libre (proxima) y lo adelanta pausa segundos en una sola
+    sentencia UPDATE, así que la suma de todos los nodos no supera 1/pausa peticiones por segundo.
+    """
+
+    def __init__(self, host: str, delay: float = None, session_factory: Callable = None):
+        self.host = host
+        self.delay = Config.DISTRIBUTED_GLOBAL_DELAY if delay is None else delay
+        self.session_factory = session_factory or get_session
+        self._local_next = 0.0  # respaldo si la base de datos no responde
+        self._lock = threading.Lock()
+        self.stats = {'peticiones': 0, 'segundos_espera': 0.0, 'errores_bd': 0}
+        session = self.session_factory()
+        try:
+            insert_ignore(session, RateGate, [{'host': host, 'proxima': 0.0, 'pausa': self.delay}], 'host')
+        finally:
+            session.close()
+
+    def _execute(self, statement, fetch: bool = False):
+        session = self.session_factory()
+        try:
+            result = session.execute(statement)
+            rows = result.all() if fetch else result.rowcount
+            session.commit()
+            return rows
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _local_slot(self, now: float) -> float:
+        with self._lock:
+            slot = max(now, self._local_next)
+            self._local_next = slot + self.delay
+            return slot
+
+    def acquire(self) -> float:
+        """Reservar el siguiente hueco global y esperar hasta él; devuelve los segundos esperados"""
+        now = time.time()
+        try:
+            rows = self._execute(update(RateGate).where(RateGate.host == self.host).values(
+                proxima=case((RateGate.proxima > now, RateGate.proxima), else_=now) + RateGate.pausa
+            ).returning(RateGate.proxima, RateGate.pausa), fetch=True)
+            slot = rows[0].proxima - rows[0].pausa
+        except SQLAlchemyError as e:
+            self.stats['errores_bd'] += 1
+            logger.warning(f"⚠️ Cupo global de {self.host} no disponible, pausa local: {e}")
+            slot = self._local_slot(now)
+        waited = max(0.0, slot - now)
+        if waited:
+            time.sleep(waited)
+        with self._lock:
+            self.stats['peticiones'] += 1
+            self.stats['segundos_espera'] += waited
+        return waited
+
+    def try_acquire(self) -> bool:
+        """Reservar un hueco solo si ya está libre (bucles de eventos sin esperas)"""
+        now = time.time()
+        try:
+            taken = self._execute(update(RateGate).where(RateGate.host == self.host, RateGate.proxima <= now)
+                                  .values(proxima=now + RateGate.pausa)) == 1
+        except SQLAlchemyError as e:
+            self.stats['errores_bd'] += 1
+            logger.warning(f"⚠️ Cupo global de {self.host} no disponible, pausa local: {e}")
+            with self._lock:
+                taken = self._local_next <= now
+                if taken:
+                    self._local_next = now + self.delay
+        if taken:
+            with self._lock:
+                self.stats['peticiones'] += 1
+        return taken
+
+    def penalize(self, seconds: float):
+        """Ningún nodo envía peticiones al host durante seconds (circuito abierto en algún nodo)"""
+        until = time.time() + seconds
+        try:
+            self._execute(update(RateGate).where(RateGate.host == self.host, RateGate.proxima < until)
+                          .values(proxima=until))
+            logger.warning(f"⛔ Cupo global de {self.host} en pausa {seconds:.0f}s para todos los nodos")
+        except SQLAlchemyError as e:
+            logger.warning(f"⚠️ No se pudo pausar el cupo global de {self.host}: {e}")
+        with self._lock:
+            self._local_next = max(self._local_next, until)
+
+
+class DistributedWorker:
+    """Nodo de rastreo: arrienda tareas de la cola, las ejecuta con latidos y guarda las tesis una sola vez"""
+
+    def __init__(self, queue: WorkQueue = None, crawler: RegistroCrawler = None, heartbeat: float = None,
+                 poll: float = None, global_delay: float = None):
+        self.queue = queue or WorkQueue()
+        self.crawler = crawler or RegistroCrawler(registro_probe_factory())
+        self.heartbeat = heartbeat or Config.DISTRIBUTED_HEARTBEAT_SECONDS
+        self.poll = poll or Config.DISTRIBUTED_POLL_SECONDS
+        self.global_delay = Config.DISTRIBUTED_GLOBAL_DELAY if global_delay is None else global_delay
+        self.handlers: Dict[str, Callable[[Dict, threading.Event, Optional[float]], Tuple[bool, Dict]]] = {
+            REGISTRO: self.run_registro
+        }
+        self.stats = {'nodo': self.queue.worker_id, 'tareas': 0, 'completadas': 0, 'devueltas': 0,
+                      'fallidas': 0, 'perdidas': 0, 'nuevas': 0, 'duplicadas': 0}
+
+    def save_hit(self, registro: int, detail_data: Dict) -> bool:
+        """Guardar la tesis encontrada; False si otro nodo (u otro intento) ya la guardó"""
+        session = self.queue.session_factory()
+        try:
+            saved = insert_tesis_once(session, tesis_row({'scjn_id': str(registro),
+                                                          'titulo': detail_data.get('titulo', ''),
+                                                          'url': detail_data.get('url', '')}, detail_data))
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        self.stats['nuevas' if saved else 'duplicadas'] += 1
+        return saved
+
+    def run_registro(self, task: Dict, stop: threading.Event, deadline: float = None) -> Tuple[bool, Dict]:
+        """Recorrer un tramo de registros; (completo, resumen)"""
+        summary = self.crawler.crawl(task['datos']['inicio'], task['datos']['fin'], deadline=deadline,
+                                     on_hit=self.save_hit, stop=stop)
+        return summary['completo'], {key: summary[key] for key in
+                                     ('sondeados', 'encontrados', 'conocidos', 'cobertura', 'duracion')}
+
+    def run(self, deadline: float = None, max_tasks: int = None) -> Dict[str, Any]:
+        """Trabajar hasta agotar la cola, el tiempo (deadline, epoch) o max_tasks"""
+        if self.global_delay > 0:
+            set_rate_gate(lambda host: GlobalRateGate(host, self.global_delay, self.queue.session_factory))
+        logger.info(f"🛰️ Nodo {self.queue.worker_id} trabajando: {self.queue.counts()}")
+        try:
+            while not (deadline and time.time() >= deadline):
+                if max_tasks and self.stats['tareas'] >= max_tasks:
+                    break
+                task = self.queue.claim(self.handlers)
+                if task is None:
+                    if self.queue.is_exhausted():
+                        logger.info("🏁 Cola distribuida agotada")
+                        break
+                    # Tareas arrendadas por otros nodos: esperar por si vence algún arrendamiento
+                    time.sleep(self.poll)
+                    continue
+                self.stats['tareas'] += 1
+                self.run_task(task, deadline)
+        finally:
+            self.crawler.close()
+            if self.global_delay > 0:
+                set_rate_gate(None)
+        logger.info(f"🛰️ Nodo {self.queue.worker_id} terminado: {self.stats}")
+        return self.stats
+
+    def run_task(self, task: Dict, deadline: float = None):
+        """Ejecutar una tarea arrendada manteniendo el latido"""
+        logger.info(f"📦 {self.queue.worker_id}: tarea {task['clave']} (intento {task['intentos']})")
+        completed = False
+        resultado = None
+        try:
+            with LeaseKeeper(self.queue, task, self.heartbeat) as keeper:
+                completed, resultado = self.handlers[task['tipo']](task, keeper.lost, deadline)
+        except KeyboardInterrupt:
+            self.queue.release(task)
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error en tarea {task['clave']}: {e}")
+            self.stats['fallidas'] += 1
+            self.queue.fail(task, str(e))
+            return
+        if keeper.lost.is_set():
+            self.stats['perdidas'] += 1
+        elif completed:
+            self.stats['completadas'] += self.queue.complete(task, resultado)
+        else:
+            # Sesión terminada a mitad del tramo: otro nodo (o la próxima sesión) lo retoma
+            self.stats['devueltas'] += self.queue.release(task, resultado)
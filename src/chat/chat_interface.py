@@ -14,10 +14,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.database.models import get_session, Tesis, Consulta
 from src.analysis.ai_analyzer import AIAnalyzer
+from src.analysis.retrieval import get_retrieval_engine
 from src.config import Config
+from src.utils.logger import get_logger
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ChatInterface:
@@ -70,14 +70,15 @@ class ChatInterface:
     def process_question(self, question: str) -> str:
         """Procesar pregunta del usuario"""
         try:
-            # Buscar documentos relevantes
-            relevant_docs = self.find_relevant_documents(question)
+            # Recuperar pasajes relevantes (BM25 + re-ranking + presupuesto de tokens)
+            retrieval = get_retrieval_engine().retrieve(question, session=self.session)
+            relevant_docs = retrieval.documents
             
             if not relevant_docs:
                 return "No encontré documentos relevantes para tu pregunta. ¿Podrías reformularla?"
             
             # Generar respuesta usando IA
-            response = self.ai_analyzer.answer_question(question, relevant_docs)
+            response = self.ai_analyzer.answer_question(question, relevant_docs, context=retrieval.context)
             
             # Guardar consulta en base de datos
             self.save_consultation(question, response, relevant_docs)
@@ -91,54 +92,7 @@ class ChatInterface:
     def find_relevant_documents(self, question: str, limit: int = 5) -> List[Dict]:
         """Encontrar documentos relevantes para la pregunta"""
         try:
-            # Buscar en base de datos
-            query = self.session.query(Tesis)
-            
-            # Búsqueda por palabras clave en título y texto
-            keywords = question.lower().split()
-            for keyword in keywords:
-                if len(keyword) > 3:  # Solo palabras significativas
-                    query = query.filter(
-                        (Tesis.titulo.contains(keyword)) |
-                        (Tesis.texto.contains(keyword)) |
-                        (Tesis.resumen.contains(keyword))
-                    )
-            
-            # Obtener resultados
-            results = query.limit(limit).all()
-            
-            # Convertir a diccionarios
-            documents = []
-            for tesis in results:
-                doc = {
-                    'id': tesis.id,
-                    'scjn_id': tesis.scjn_id,
-                    'titulo': tesis.titulo,
-                    'texto': tesis.texto,
-                    'resumen': tesis.resumen,
-                    'categorias': json.loads(tesis.categorias) if tesis.categorias else [],
-                    'conceptos_clave': json.loads(tesis.conceptos_clave) if tesis.conceptos_clave else [],
-                    'relevancia': tesis.relevancia
-                }
-                documents.append(doc)
-            
-            # Si no hay resultados, buscar por similitud semántica
-            if not documents:
-                all_tesis = self.session.query(Tesis).limit(100).all()
-                all_docs = []
-                for tesis in all_tesis:
-                    all_docs.append({
-                        'id': tesis.id,
-                        'scjn_id': tesis.scjn_id,
-                        'titulo': tesis.titulo,
-                        'texto': tesis.texto,
-                        'resumen': tesis.resumen
-                    })
-                
-                documents = self.ai_analyzer.find_similar_documents(question, all_docs)
-            
-            return documents
-            
+            return get_retrieval_engine().retrieve(question, session=self.session, top_k=limit).documents
         except Exception as e:
             logger.error(f"Error buscando documentos relevantes: {e}")
             return []
@@ -221,6 +175,7 @@ class ChatInterface:
 
 def main():
     """Función principal"""
+    get_logger("chat")
     try:
         # Validar configuración
         Config.validate()
@@ -55,6 +55,36 @@ class Config:
     INITIAL_PHASE_START_TIME = os.getenv("INITIAL_PHASE_START_TIME", "09:00")
     MAINTENANCE_PHASE_START_TIME = os.getenv("MAINTENANCE_PHASE_START_TIME", "08:00")
     
+    # Rastreo exhaustivo por rangos de registro digital (fase inicial)
+    REGISTRO_CRAWL_ENABLED = os.getenv("REGISTRO_CRAWL_ENABLED", "true").lower() == "true"
+    REGISTRO_RANGES = os.getenv("REGISTRO_RANGES", "159000-260000,2000000-2032000")  # inicio-fin (fin excluido)
+    REGISTRO_WORKERS = int(os.getenv("REGISTRO_WORKERS", "2"))  # Navegadores en paralelo
+    REGISTRO_GAP_THRESHOLD = int(os.getenv("REGISTRO_GAP_THRESHOLD", "500"))  # Vacíos seguidos que abren un hueco
+    REGISTRO_MAX_STRIDE = int(os.getenv("REGISTRO_MAX_STRIDE", "4096"))  # Salto máximo al muestrear un hueco
+    REGISTRO_PROBE = os.getenv("REGISTRO_PROBE", "tabs").lower()  # tabs (un navegador, varias pestañas) | drivers
+    
+    # Sincronización incremental (mantenimiento) desde la marca de agua de registro digital
+    INCREMENTAL_MIN_REGISTRO = int(os.getenv("INCREMENTAL_MIN_REGISTRO", "2000000"))  # Serie de registros vigente
+    INCREMENTAL_PAGE_SIZE = int(os.getenv("INCREMENTAL_PAGE_SIZE", "100"))  # Registros por página de sondeo
+    INCREMENTAL_EMPTY_PAGES = int(os.getenv("INCREMENTAL_EMPTY_PAGES", "2"))  # Páginas sin tesis para detenerse
+    
+    # Control adaptativo de peticiones a SCJN (AIMD + cortacircuitos)
+    RATE_MIN_DELAY = float(os.getenv("RATE_MIN_DELAY", "0.25"))  # Pausa mínima entre peticiones (s)
+    RATE_MAX_DELAY = float(os.getenv("RATE_MAX_DELAY", "30"))  # Pausa máxima bajo congestión (s)
+    RATE_MAX_CONCURRENCY = int(os.getenv("RATE_MAX_CONCURRENCY", "4"))  # Peticiones simultáneas como máximo
+    RATE_LATENCY_TARGET = float(os.getenv("RATE_LATENCY_TARGET", "8"))  # Latencia (s) que se considera congestión
+    RATE_ERROR_THRESHOLD = float(os.getenv("RATE_ERROR_THRESHOLD", "0.5"))  # Tasa de errores que abre el circuito
+    RATE_WINDOW = int(os.getenv("RATE_WINDOW", "20"))  # Peticiones recientes para la tasa de errores
+    RATE_COOLDOWN = float(os.getenv("RATE_COOLDOWN", "30"))  # Segundos con el circuito abierto (se duplica)
+    RATE_MAX_COOLDOWN = float(os.getenv("RATE_MAX_COOLDOWN", "600"))
+    
+    # Modo distribuido: varios nodos con la misma DATABASE_URL reparten tramos de registros
+    WORKER_ID = os.getenv("WORKER_ID", "")  # Nombre del nodo (por defecto host-pid)
+    DISTRIBUTED_LEASE_SECONDS = int(os.getenv("DISTRIBUTED_LEASE_SECONDS", "300"))  # Sin latido en este tiempo, la tarea se reasigna
+    DISTRIBUTED_HEARTBEAT_SECONDS = float(os.getenv("DISTRIBUTED_HEARTBEAT_SECONDS", "60"))  # Intervalo de latidos
+    DISTRIBUTED_POLL_SECONDS = float(os.getenv("DISTRIBUTED_POLL_SECONDS", "15"))  # Espera si las tareas libres están arrendadas
+    DISTRIBUTED_GLOBAL_DELAY = float(os.getenv("DISTRIBUTED_GLOBAL_DELAY", "0.5"))  # Pausa entre peticiones a SCJN sumando todos los nodos (0 = sin cupo global)
+    
     # Configuración de archivos
     MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
     SUPPORTED_FORMATS = ['.pdf', '.doc', '.docx']
@@ -65,6 +95,15 @@ class Config:
     LOG_FILE = LOGS_DIR / "scraper.log"
     LOG_MAX_SIZE = int(os.getenv("LOG_MAX_SIZE", "10485760"))  # 10MB
     LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"  # Archivos de log en JSON por líneas (consola legible)
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Registros pendientes de escribir (cola llena = se descartan)
+    LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))  # Mensajes DEBUG por línea de código y ventana (0 = todos)
+    LOG_SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", "60"))  # Segundos
+    
+    # Configuración de métricas (histogramas de latencia y contadores por operación)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # false = temporizadores sin coste
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Puerto de /metrics en los procesos de scraping (0 = sin servidor)
+    METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
     
     # Configuración de Selenium optimizada
     SELENIUM_HEADLESS = os.getenv("SELENIUM_HEADLESS", "true").lower() == "true"
@@ -73,6 +112,12 @@ class Config:
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
     SELENIUM_IMPLICIT_WAIT = int(os.getenv("SELENIUM_IMPLICIT_WAIT", "10"))
     SELENIUM_PAGE_LOAD_TIMEOUT = int(os.getenv("SELENIUM_PAGE_LOAD_TIMEOUT", "30"))
+    BROWSER_BLOCK_RESOURCES = os.getenv("BROWSER_BLOCK_RESOURCES", "true").lower() == "true"  # Sin imágenes, fuentes, multimedia ni terceros
+    BROWSER_BLOCK_STYLESHEETS = os.getenv("BROWSER_BLOCK_STYLESHEETS", "false").lower() == "true"  # También hojas de estilo
+    BROWSER_TABS = int(os.getenv("BROWSER_TABS", "4"))  # Pestañas cargando en paralelo en un mismo navegador
+    BROWSER_TAB_RECYCLE = int(os.getenv("BROWSER_TAB_RECYCLE", "50"))  # Páginas por pestaña antes de reabrirla
+    FETCH_HTTP_FIRST = os.getenv("FETCH_HTTP_FIRST", "true").lower() == "true"  # Detalle por HTTP antes que con navegador
+    FETCH_HTTP_SKIP_AFTER = int(os.getenv("FETCH_HTTP_SKIP_AFTER", "20"))  # Fallos HTTP seguidos para probarlo solo 1 de cada N
     
     # Configuración de Google Drive robusta
     GOOGLE_DRIVE_ENABLED = os.getenv("GOOGLE_DRIVE_ENABLED", "false").lower() == "true"
@@ -82,6 +127,34 @@ class Config:
     GOOGLE_DRIVE_SERVICE_ACCOUNT_PATH = Path(os.getenv("GOOGLE_DRIVE_SERVICE_ACCOUNT_PATH", 
         str(CREDENTIALS_DIR / "service_account.json")))
     
+    # Motor de subidas concurrentes a Google Drive
+    DRIVE_UPLOAD_WORKERS = int(os.getenv("DRIVE_UPLOAD_WORKERS", "4"))
+    DRIVE_UPLOAD_MAX_RETRIES = int(os.getenv("DRIVE_UPLOAD_MAX_RETRIES", "5"))
+    DRIVE_UPLOAD_MAX_ATTEMPTS = int(os.getenv("DRIVE_UPLOAD_MAX_ATTEMPTS", "3"))  # Re-encolados antes de 'failed'
+    DRIVE_UPLOAD_BACKOFF_BASE = float(os.getenv("DRIVE_UPLOAD_BACKOFF_BASE", "1.0"))
+    DRIVE_UPLOAD_BACKOFF_MAX = float(os.getenv("DRIVE_UPLOAD_BACKOFF_MAX", "64"))
+    DRIVE_UPLOAD_WRITEBACK_BATCH = int(os.getenv("DRIVE_UPLOAD_WRITEBACK_BATCH", "25"))
+    DRIVE_UPLOAD_CHUNK_MB = max(1, int(os.getenv("DRIVE_UPLOAD_CHUNK_MB", "8")))  # Fragmentos de subida resumible
+    DRIVE_UPLOAD_CHUNK_BYTES = DRIVE_UPLOAD_CHUNK_MB * 1024 * 1024  # Múltiplo de 256 KB, como exige Drive
+    DRIVE_BATCH_SIZE = int(os.getenv("DRIVE_BATCH_SIZE", "100"))  # Llamadas de metadatos por petición batch (máx. 100)
+    DRIVE_DEDUP_ENABLED = os.getenv("DRIVE_DEDUP_ENABLED", "true").lower() == "true"  # Enlazar en lugar de resubir (MD5)
+    DRIVE_FOLDER_PREWARM = os.getenv("DRIVE_FOLDER_PREWARM", "true").lower() == "true"  # Listar árbol de carpetas al iniciar
+    
+    # Backend de almacenamiento de PDFs: 'drive', 'local' o 's3' (S3 compatible, p. ej. MinIO)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "drive").lower()
+    STORAGE_LOCAL_DIR = Path(os.getenv("STORAGE_LOCAL_DIR", str(DATA_DIR / "storage")))
+    STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", "8"))
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None  # None = AWS S3
+    S3_BUCKET = os.getenv("S3_BUCKET", "scjn-tesis")
+    S3_PREFIX = os.getenv("S3_PREFIX", "tesis")
+    S3_REGION = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID") or None  # None = cadena de credenciales de boto3
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY") or None
+    S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL", "")  # Vacío = enlaces s3://bucket/clave
+    S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+    S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+    S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "10"))  # Partes en paralelo por archivo
+    
     # Configuración de OpenAI robusta
     OPENAI_ENABLED = os.getenv("OPENAI_ENABLED", "false").lower() == "true"
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -101,6 +174,35 @@ class Config:
     PARALLEL_DOWNLOADS = int(os.getenv("PARALLEL_DOWNLOADS", "3"))
     BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10"))
     
+    # Configuración de cache HTTP de la API
+    API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "true").lower() == "true"
+    API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+    API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "300"))
+    API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "60"))
+    API_COMPRESSION_MIN_BYTES = int(os.getenv("API_COMPRESSION_MIN_BYTES", "1024"))
+    
+    # Configuración de exportación masiva
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    EXPORTS_DIR = DATA_DIR / "exports"
+    
+    # Recorrido por lotes de tablas completas (filas por trozo en los scripts de procesamiento masivo)
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    
+    # Configuración de recuperación para consultas (RAG)
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "50"))
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+    RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "1500"))
+    RETRIEVAL_ALPHA = float(os.getenv("RETRIEVAL_ALPHA", "0.5"))
+    RETRIEVAL_PASSAGE_CHARS = int(os.getenv("RETRIEVAL_PASSAGE_CHARS", "800"))
+    RETRIEVAL_PASSAGE_OVERLAP = int(os.getenv("RETRIEVAL_PASSAGE_OVERLAP", "150"))
+    RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+    RETRIEVAL_EMBEDDINGS = os.getenv("RETRIEVAL_EMBEDDINGS", "hashing").lower()  # hashing | openai
+    RETRIEVAL_CHUNK_INDEX = os.getenv("RETRIEVAL_CHUNK_INDEX", "true").lower() == "true"
+    
+    # Configuración de extracción de texto de PDFs
+    PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+    PDF_MIN_CHARS_PER_PAGE = int(os.getenv("PDF_MIN_CHARS_PER_PAGE", "40"))  # Menos = usar pdfplumber
+    
     @classmethod
     def get_timezone(cls):
         """Obtener zona horaria configurada"""
@@ -145,7 +247,11 @@ class Config:
             'format': cls.LOG_FORMAT,
             'file': str(cls.LOG_FILE),
             'max_size': cls.LOG_MAX_SIZE,
-            'backup_count': cls.LOG_BACKUP_COUNT
+            'backup_count': cls.LOG_BACKUP_COUNT,
+            'json': cls.LOG_JSON,
+            'queue_size': cls.LOG_QUEUE_SIZE,
+            'sample_burst': cls.LOG_SAMPLE_BURST,
+            'sample_window': cls.LOG_SAMPLE_WINDOW
         }
     
     @classmethod
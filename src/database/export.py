@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Exportación masiva de tesis en streaming
+- Lectura con yield_per (memoria acotada)
+- Selección de columnas
+- Exportación incremental por fecha_descarga (since=)
+- Formatos NDJSON, Arrow IPC (stream) y Parquet
+"""
+
+import io
+import json
+import logging
+from datetime import datetime, date
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import Tesis
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Columnas exportables y su tipo lógico (para el esquema Arrow)
+EXPORTABLE_COLUMNS = {
+    'id': 'int',
+    'scjn_id': 'string',
+    'titulo': 'string',
+    'url': 'string',
+    'rubro': 'string',
+    'texto': 'string',
+    'precedente': 'string',
+    'pdf_url': 'string',
+    'google_drive_id': 'string',
+    'google_drive_link': 'string',
+    'storage_key': 'string',
+    'storage_link': 'string',
+    'metadata_json': 'json',
+    'fecha_descarga': 'timestamp',
+    'html_content': 'string',
+    'procesado': 'bool',
+    'analizado': 'bool'
+}
+
+# html_content se excluye por defecto: es la columna más pesada y rara vez se necesita
+DEFAULT_EXPORT_COLUMNS = [c for c in EXPORTABLE_COLUMNS if c != 'html_content']
+
+
+class ExportError(Exception):
+    """Error en la exportación de tesis"""
+    pass
+
+
+def resolve_columns(columns: Optional[List[str]] = None) -> List[str]:
+    """Validar columnas solicitadas (None o vacío = columnas por defecto)"""
+    if not columns:
+        return list(DEFAULT_EXPORT_COLUMNS)
+
+    cleaned = [c.strip() for c in columns if c and c.strip()]
+    unknown = [c for c in cleaned if c not in EXPORTABLE_COLUMNS]
+    if unknown:
+        raise ExportError(f"Columnas desconocidas: {', '.join(unknown)}")
+    return cleaned
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime]:
+    """Convertir parámetro since (ISO 8601) a datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Fecha 'since' inválida (use ISO 8601): {value}")
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Normalizar valores para JSON"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_tesis_rows(session: Session, columns: List[str], since: Optional[datetime] = None,
+                    batch_size: int = None) -> Iterator[tuple]:
+    """Iterar filas (tuplas) de tesis proyectando solo las columnas pedidas"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    query = session.query(*[getattr(Tesis, c) for c in columns])
+
+    if since:
+        query = query.filter(Tesis.fecha_descarga > since)
+
+    for row in query.order_by(Tesis.id).yield_per(batch_size):
+        yield tuple(row)
+
+
+def iter_tesis_records(session: Session, columns: List[str], since: Optional[datetime] = None,
+                       batch_size: int = None) -> Iterator[Dict[str, Any]]:
+    """Iterar tesis como diccionarios"""
+    for row in iter_tesis_rows(session, columns, since, batch_size):
+        yield dict(zip(columns, row))
+
+
+def iter_ndjson(session: Session, columns: List[str], since: Optional[datetime] = None,
+                batch_size: int = None) -> Iterator[bytes]:
+    """Generar NDJSON (una tesis por línea), agrupando líneas para reducir escrituras"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    buffer = []
+
+    for record in iter_tesis_records(session, columns, since, batch_size):
+        line = json.dumps({k: _to_jsonable(v) for k, v in record.items()}, ensure_ascii=False)
+        buffer.append(line)
+        if len(buffer) >= batch_size:
+            yield ("\n".join(buffer) + "\n").encode('utf-8')
+            buffer = []
+
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode('utf-8')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ExportError("pyarrow no está instalado. Instale con: pip install pyarrow")
+
+
+def arrow_schema(columns: List[str]):
+    """Construir esquema Arrow para las columnas seleccionadas"""
+    _require_pyarrow()
+    types = {
+        'int': pa.int64(),
+        'string': pa.string(),
+        'json': pa.string(),
+        'timestamp': pa.timestamp('us'),
+        'bool': pa.bool_()
+    }
+    return pa.schema([(c, types[EXPORTABLE_COLUMNS[c]]) for c in columns])
+
+
+def iter_record_batches(session: Session, columns: List[str], since: Optional[datetime] = None,
+                        batch_size: int = None):
+    """Iterar lotes Arrow (RecordBatch) de tamaño acotado"""
+    _require_pyarrow()
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    schema = arrow_schema(columns)
+    json_columns = {i for i, c in enumerate(columns) if EXPORTABLE_COLUMNS[c] == 'json'}
+    rows = []
+
+    def _flush(rows_batch):
+        arrays = []
+        for i, column in enumerate(columns):
+            values = [r[i] for r in rows_batch]
+            if i in json_columns:
+                values = [json.dumps(v, ensure_ascii=False) if v is not None else None for v in values]
+            arrays.append(pa.array(values, type=schema.field(column).type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    for row in iter_tesis_rows(session, columns, since, batch_size):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield _flush(rows)
+            rows = []
+
+    if rows:
+        yield _flush(rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura que acumula bytes para vaciarlos por partes"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_arrow_stream(session: Session, columns: List[str], since: Optional[datetime] = None,
+                      batch_size: int = None) -> Iterator[bytes]:
+    """Generar formato Arrow IPC stream, apto para respuestas HTTP en streaming"""
+    _require_pyarrow()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), arrow_schema(columns))
+
+    for batch in iter_record_batches(session, columns, since, batch_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def write_parquet(path: str, session: Session, columns: List[str], since: Optional[datetime] = None,
+                  batch_size: int = None) -> int:
+    """Escribir Parquet lote a lote (un row group por lote), devuelve filas escritas"""
+    _require_pyarrow()
+    total = 0
+    with pq.ParquetWriter(path, arrow_schema(columns), compression='zstd') as writer:
+        for batch in iter_record_batches(session, columns, since, batch_size):
+            writer.write_batch(batch)
+            total += batch.num_rows
+    logger.info(f"✅ Parquet exportado: {path} ({total} tesis)")
+    return total
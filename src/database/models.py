@@ -2,6 +2,19 @@
 """
 Modelos de base de datos para el sistema de scraping SCJN
 - Tabla de tesis
+- Tabla de consultas de la API y el chat (consultas)
+- Tabla de pasajes (tesis_chunk) con índice de texto completo
+- Tabla de texto extraído de PDFs (tesis_pdf)
+- Cola persistente de subidas a Google Drive (upload_queue) y sesiones resumibles (upload_session)
+- Mapa persistente de carpetas de Google Drive (drive_folder)
+- Índice MD5 de archivos en Google Drive (drive_md5_index)
+- Frontera de rastreo persistente del scraper automático (crawl_frontier)
+- Mapa de bits de registros digitales sondeados y encontrados (registro_bitmap)
+- Marcas de agua de la sincronización incremental (sync_watermark)
+- Cola de trabajo distribuida con arrendamientos (work_queue) y cupo global de peticiones (rate_gate)
+- Inserción única de tesis por scjn_id (ON CONFLICT DO NOTHING en SQLite y PostgreSQL)
+- Marca de cambios de tesis (fecha_actualizacion) para mantener índices de forma incremental
+- Recuentos de salud con COUNT sobre la clave (src/database/streaming.py para recorrer tablas por trozos)
 - Configuración de SQLAlchemy
 - Funciones de utilidad
 """
@@ -9,7 +22,7 @@ Modelos de base de datos para el sistema de scraping SCJN
 import os
 import json
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, JSON, LargeBinary, UniqueConstraint, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
@@ -17,16 +30,25 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Configuración de base de datos
-DATABASE_URL = "sqlite:///data/scjn_database.db"
+# Configuración de base de datos (DATABASE_URL permite apuntar varios nodos a la misma base)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/scjn_database.db")
 
 # Crear engine
 engine = create_engine(
     DATABASE_URL,
     echo=False,  # Cambiar a True para debug
-    connect_args={"check_same_thread": False}  # Para SQLite
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}  # Para SQLite
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL y espera ante bloqueos: varios procesos escriben en la misma base"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
 # Crear sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -48,8 +70,11 @@ class Tesis(Base):
     pdf_url = Column(String(500), nullable=True)
     google_drive_id = Column(String(100), nullable=True)  # ID de Google Drive
     google_drive_link = Column(String(500), nullable=True)  # Enlace web de Google Drive
+    storage_key = Column(String(500), nullable=True)  # Objeto en backends no Drive (ruta local o s3://bucket/clave)
+    storage_link = Column(String(500), nullable=True)  # Enlace del objeto en ese backend
     metadata_json = Column(JSON, nullable=True)
     fecha_descarga = Column(DateTime, default=datetime.now)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # Marca de cambios para índices
     html_content = Column(Text, nullable=True)
     procesado = Column(Boolean, default=False)
     analizado = Column(Boolean, default=False)
@@ -70,6 +95,8 @@ class Tesis(Base):
             'pdf_url': self.pdf_url,
             'google_drive_id': self.google_drive_id,
             'google_drive_link': self.google_drive_link,
+            'storage_key': self.storage_key,
+            'storage_link': self.storage_link,
             'metadata': self.metadata_json,
             'fecha_descarga': self.fecha_descarga.isoformat() if self.fecha_descarga else None,
             'html_content': self.html_content,
@@ -112,6 +139,282 @@ class ScrapingStats(Base):
     def __repr__(self):
         return f"<ScrapingStats(fecha='{self.fecha}', total='{self.total_descargado}')>"
 
+class Consulta(Base):
+    """Modelo para registrar consultas hechas por la API y el chat"""
+    
+    __tablename__ = "consultas"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    pregunta = Column(Text, nullable=False)
+    respuesta = Column(Text, nullable=True)
+    documentos_referenciados = Column(Text, nullable=True)  # Lista JSON de scjn_id
+    usuario = Column(String(100), nullable=True)
+    fecha_consulta = Column(DateTime, default=datetime.now, index=True)
+    
+    def __repr__(self):
+        return f"<Consulta(usuario='{self.usuario}', fecha='{self.fecha_consulta}')>"
+
+class TesisChunk(Base):
+    """Modelo para pasajes de tesis (texto y PDF) indexados para búsqueda"""
+    
+    __tablename__ = "tesis_chunk"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tesis_id = Column(Integer, index=True, nullable=False)
+    fuente = Column(String(10), nullable=False, default='texto')  # 'texto' o 'pdf'
+    orden = Column(Integer, nullable=False)
+    inicio = Column(Integer, nullable=False)  # Offset de carácter en el documento original
+    fin = Column(Integer, nullable=False)
+    texto = Column(Text, nullable=False)
+    doc_hash = Column(String(64), nullable=False)  # Hash del documento completo al momento de dividirlo
+    embedding = Column(JSON, nullable=True)
+    embedding_modelo = Column(String(50), nullable=True)
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<TesisChunk(tesis_id={self.tesis_id}, fuente='{self.fuente}', orden={self.orden})>"
+
+class TesisPDF(Base):
+    """Modelo para el texto extraído de los PDFs de tesis"""
+    
+    __tablename__ = "tesis_pdf"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tesis_id = Column(Integer, unique=True, index=True, nullable=False)
+    ruta = Column(String(500), nullable=False)
+    sha256 = Column(String(64), index=True, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    paginas = Column(Integer, default=0)
+    texto = Column(Text, nullable=True)
+    extractor = Column(String(20), nullable=True)  # 'pymupdf' o 'pdfplumber'
+    error = Column(Text, nullable=True)
+    fecha_extraccion = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<TesisPDF(tesis_id={self.tesis_id}, paginas={self.paginas}, extractor='{self.extractor}')>"
+
+class UploadTask(Base):
+    """Modelo para la cola persistente de subidas a Google Drive"""
+    
+    __tablename__ = "upload_queue"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tesis_id = Column(Integer, index=True, nullable=True)
+    scjn_id = Column(String(50), index=True, nullable=True)
+    ruta = Column(String(500), nullable=False)
+    nombre = Column(String(300), nullable=False)
+    parent_id = Column(String(100), nullable=True)  # Carpeta destino en Drive (None = carpeta raíz configurada)
+    prefijo = Column(String(500), nullable=True)  # Prefijo de la clave del objeto en backends local/S3
+    estado = Column(String(20), index=True, default='pending')  # 'pending', 'in_flight', 'done', 'failed'
+    intentos = Column(Integer, default=0)
+    ultimo_error = Column(Text, nullable=True)
+    google_drive_id = Column(String(100), nullable=True)
+    google_drive_link = Column(String(500), nullable=True)
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<UploadTask(id={self.id}, scjn_id='{self.scjn_id}', estado='{self.estado}')>"
+
+class UploadSession(Base):
+    """Modelo para sesiones de subida resumible a Google Drive (una por tarea de upload_queue)"""
+    
+    __tablename__ = "upload_session"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, unique=True, index=True, nullable=False)
+    session_uri = Column(Text, nullable=False)
+    offset = Column(Integer, default=0)  # Bytes confirmados por Drive
+    bytes_total = Column(Integer, nullable=False)
+    md5 = Column(String(32), nullable=False)  # MD5 del archivo local al iniciar la sesión
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<UploadSession(task_id={self.task_id}, offset={self.offset}/{self.bytes_total})>"
+
+class DriveFileIndex(Base):
+    """Modelo para el índice md5Checksum -> archivo de Google Drive (deduplicación de subidas)"""
+    
+    __tablename__ = "drive_md5_index"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(String(100), unique=True, index=True, nullable=False)
+    md5 = Column(String(32), index=True, nullable=False)
+    nombre = Column(String(300), nullable=True)
+    parent_id = Column(String(100), nullable=True)
+    bytes = Column(Integer, nullable=True)
+    web_link = Column(String(500), nullable=True)
+    modificado = Column(String(40), nullable=True)  # modifiedTime de Drive (RFC 3339), marca para listados incrementales
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<DriveFileIndex(file_id='{self.file_id}', md5='{self.md5}')>"
+
+class DriveFolder(Base):
+    """Modelo para el mapa persistente de carpetas de Google Drive (padre + nombre -> ID)"""
+    
+    __tablename__ = "drive_folder"
+    __table_args__ = (UniqueConstraint('parent_id', 'nombre', name='uq_drive_folder_parent_nombre'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    parent_id = Column(String(100), nullable=False, index=True)
+    nombre = Column(String(300), nullable=False)
+    folder_id = Column(String(100), nullable=True)  # None = creación en curso (reserva de otro proceso)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<DriveFolder(nombre='{self.nombre}', folder_id='{self.folder_id}')>"
+
+class CrawlTask(Base):
+    """Modelo para la frontera de rastreo: páginas de búsqueda (término × página) y detalles de tesis"""
+    
+    __tablename__ = "crawl_frontier"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(500), unique=True, nullable=False)  # 'busqueda:<término>:<página>' o 'detalle:<url>'
+    tipo = Column(String(20), index=True, nullable=False)  # 'busqueda', 'detalle'
+    termino = Column(String(200), nullable=True)
+    pagina = Column(Integer, nullable=True)
+    url = Column(String(500), nullable=True)
+    scjn_id = Column(String(50), index=True, nullable=True)
+    host = Column(String(200), nullable=False)
+    datos = Column(Text, nullable=True)  # JSON del resultado de búsqueda que originó la tarea
+    prioridad = Column(Integer, index=True, default=0)  # Mayor = antes
+    estado = Column(String(20), index=True, default='pending')  # 'pending', 'in_flight', 'done', 'failed'
+    intentos = Column(Integer, default=0)
+    ultimo_error = Column(Text, nullable=True)
+    ultima_visita = Column(DateTime, nullable=True)
+    proxima_visita = Column(DateTime, nullable=True)  # No antes de esta fecha (reintentos con espera)
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<CrawlTask(id={self.id}, clave='{self.clave}', estado='{self.estado}')>"
+
+class RegistroBlock(Base):
+    """Modelo para un bloque del mapa de bits de registros digitales (un bit por ID)"""
+    
+    __tablename__ = "registro_bitmap"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bloque = Column(Integer, unique=True, index=True, nullable=False)  # registro // tamaño de bloque
+    probados = Column(LargeBinary, nullable=False)  # Bit a 1: ID sondeado (con o sin tesis)
+    encontrados = Column(LargeBinary, nullable=False)  # Bit a 1: ID con tesis
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<RegistroBlock(bloque={self.bloque})>"
+
+class SyncWatermark(Base):
+    """Modelo para la marca de agua de la sincronización incremental (lo más nuevo ya visto)"""
+    
+    __tablename__ = "sync_watermark"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(50), unique=True, nullable=False)  # p. ej. 'tesis'
+    registro_max = Column(Integer, nullable=False)  # Registro digital más alto ya sincronizado
+    fecha_publicacion_max = Column(String(20), nullable=True)  # Fecha de publicación más reciente vista (ISO)
+    resumen = Column(JSON, nullable=True)  # Resumen de la última sincronización
+    fecha_sync = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<SyncWatermark(clave='{self.clave}', registro_max={self.registro_max})>"
+
+class WorkItem(Base):
+    """Modelo para una tarea de la cola de trabajo distribuida (arrendada por un nodo cada vez)"""
+    
+    __tablename__ = "work_queue"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(200), unique=True, nullable=False)  # p. ej. 'registro:2000000-2000704'
+    tipo = Column(String(20), index=True, nullable=False)  # 'registro'
+    datos = Column(Text, nullable=True)  # JSON con los parámetros de la tarea
+    prioridad = Column(Integer, index=True, default=0)  # Mayor = antes
+    estado = Column(String(20), index=True, default='pending')  # 'pending', 'leased', 'done', 'failed'
+    intentos = Column(Integer, default=0)
+    nodo = Column(String(100), nullable=True)  # Trabajador que tiene (o tuvo) el arrendamiento
+    arriendo = Column(String(36), nullable=True)  # Token del arrendamiento vigente
+    arriendo_hasta = Column(DateTime, index=True, nullable=True)  # Sin latido antes de esta fecha, se reasigna
+    ultimo_latido = Column(DateTime, nullable=True)
+    disponible_desde = Column(DateTime, nullable=True)  # No antes de esta fecha (reintentos con espera)
+    resultado = Column(JSON, nullable=True)  # Resumen de la última ejecución
+    ultimo_error = Column(Text, nullable=True)
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<WorkItem(id={self.id}, clave='{self.clave}', estado='{self.estado}')>"
+
+class RateGate(Base):
+    """Modelo para el cupo global de peticiones a un host compartido por todos los nodos"""
+    
+    __tablename__ = "rate_gate"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    host = Column(String(200), unique=True, nullable=False)
+    proxima = Column(Float, nullable=False, default=0.0)  # Epoch del siguiente hueco libre
+    pausa = Column(Float, nullable=False)  # Segundos entre peticiones sumando todos los nodos
+    
+    def __repr__(self):
+        return f"<RateGate(host='{self.host}', pausa={self.pausa})>"
+
+def insert_ignore(session: Session, model, rows: list, key: str) -> int:
+    """INSERT ... ON CONFLICT (key) DO NOTHING en SQLite y PostgreSQL; devuelve las filas insertadas"""
+    if session.bind.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    inserted = 0
+    for start in range(0, len(rows), 500):
+        statement = insert(model).values(rows[start:start + 500]).on_conflict_do_nothing(index_elements=[key])
+        inserted += session.execute(statement).rowcount
+    session.commit()
+    return inserted
+
+def tesis_row(result: dict, detail_data: dict) -> dict:
+    """Columnas de la tabla tesis a partir de un resultado de búsqueda y su detalle"""
+    return {
+        'scjn_id': result.get('scjn_id'),
+        'titulo': result.get('titulo', ''),
+        'url': result.get('url', ''),
+        'rubro': detail_data.get('rubro', ''),
+        'texto': detail_data.get('texto', ''),
+        'precedente': detail_data.get('precedente', ''),
+        'pdf_url': detail_data.get('pdf_url', ''),
+        'metadata_json': result.get('metadata', {}),
+        'fecha_descarga': datetime.now(),
+        'html_content': detail_data.get('html_content', '')
+    }
+
+def insert_tesis_once(session: Session, values: dict) -> bool:
+    """Insertar una tesis si su scjn_id no existe; False si ya estaba (seguro entre procesos y nodos)"""
+    return insert_ignore(session, Tesis, [values], 'scjn_id') == 1
+
+def tesis_change_marker(session: Session) -> tuple:
+    """Marca de cambios de la tabla tesis: (filas, id máximo, fecha_actualizacion máxima)
+
+    Cambia con inserciones (también las de insert_tesis_once, que no pasan por el ORM), borrados y
+    actualizaciones hechas con el ORM en cualquier proceso.
+    """
+    from sqlalchemy import func
+    
+    return tuple(session.query(func.count(Tesis.id), func.max(Tesis.id), func.max(Tesis.fecha_actualizacion)).one())
+
+def on_tesis_change(callback):
+    """Registrar callback(tesis_id, scjn_id) para inserciones, cambios y borrados de tesis"""
+    def _listener(mapper, connection, target):
+        try:
+            callback(target.id, target.scjn_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Error en listener de cambios de tesis: {e}")
+    
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(Tesis, event_name, _listener)
+    
+    return _listener
+
 def get_session() -> Session:
     """Obtener sesión de base de datos"""
     return SessionLocal()
@@ -142,31 +445,112 @@ def create_indexes():
     try:
         with engine.connect() as conn:
             from sqlalchemy import text
+            # Columnas añadidas después de crear la tabla en bases existentes
+            add_missing_columns(conn)
+            
             # Índices para búsquedas frecuentes
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tesis_fecha_descarga ON tesis(fecha_descarga)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tesis_fecha_actualizacion ON tesis(fecha_actualizacion)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tesis_procesado ON tesis(procesado)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tesis_analizado ON tesis(analizado)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_sessions_fecha ON scraping_sessions(fecha_inicio)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_stats_fecha ON scraping_stats(fecha)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_chunk_tesis_fuente ON tesis_chunk(tesis_id, fuente)"))
             conn.commit()
             
+            # Índice de texto completo de pasajes (opcional: requiere FTS5 en SQLite)
+            try:
+                create_chunk_search_index(conn)
+                conn.commit()
+            except SQLAlchemyError as e:
+                conn.rollback()
+                logger.warning(f"⚠️ Índice de texto completo de pasajes no disponible: {e}")
+            
         logger.info("✅ Índices creados correctamente")
         
     except SQLAlchemyError as e:
         logger.error(f"❌ Error creando índices: {e}")
 
+def add_missing_columns(conn):
+    """Añadir a tablas existentes las columnas nuevas del modelo (create_all no altera tablas)"""
+    from sqlalchemy import inspect, text
+    
+    inspector = inspect(conn)
+    added = set()
+    for table, column in (('upload_queue', UploadTask.__table__.c.prefijo),
+                          ('tesis', Tesis.__table__.c.fecha_actualizacion),
+                          ('tesis', Tesis.__table__.c.storage_key),
+                          ('tesis', Tesis.__table__.c.storage_link)):
+        if not inspector.has_table(table):
+            continue
+        if column.name not in {c['name'] for c in inspector.get_columns(table)}:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"))
+            added.add(column.name)
+            logger.info(f"🧱 Columna {table}.{column.name} añadida")
+    if 'storage_key' in added:
+        # Subidas a backends local/S3 anteriores a storage_key quedaron en las columnas de Drive
+        moved = conn.execute(text(
+            "UPDATE tesis SET storage_key = google_drive_id, storage_link = google_drive_link, "
+            "google_drive_id = NULL, google_drive_link = NULL "
+            "WHERE google_drive_id LIKE '%/%' OR google_drive_id LIKE '%:%'"
+        )).rowcount
+        if moved:
+            logger.info(f"🧱 {moved} enlaces de backends no Drive movidos a storage_key/storage_link")
+    conn.commit()
+
+def create_chunk_search_index(conn):
+    """Crear índice de texto completo sobre tesis_chunk (FTS5 en SQLite, GIN en PostgreSQL)"""
+    from sqlalchemy import text
+    
+    if conn.dialect.name == 'sqlite':
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tesis_chunk_fts'"
+        )).first() is not None
+        
+        # Tabla FTS5 de contenido externo, sincronizada por triggers
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tesis_chunk_fts USING fts5("
+            "texto, content='tesis_chunk', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tesis_chunk_ai AFTER INSERT ON tesis_chunk BEGIN "
+            "INSERT INTO tesis_chunk_fts(rowid, texto) VALUES (new.id, new.texto); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tesis_chunk_ad AFTER DELETE ON tesis_chunk BEGIN "
+            "INSERT INTO tesis_chunk_fts(tesis_chunk_fts, rowid, texto) VALUES ('delete', old.id, old.texto); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tesis_chunk_au AFTER UPDATE ON tesis_chunk BEGIN "
+            "INSERT INTO tesis_chunk_fts(tesis_chunk_fts, rowid, texto) VALUES ('delete', old.id, old.texto); "
+            "INSERT INTO tesis_chunk_fts(rowid, texto) VALUES (new.id, new.texto); END"
+        ))
+        
+        if not exists:
+            # Indexar pasajes que existieran antes de crear la tabla FTS
+            conn.execute(text("INSERT INTO tesis_chunk_fts(tesis_chunk_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_tesis_chunk_tsv ON tesis_chunk "
+            "USING GIN (to_tsvector('spanish', texto))"
+        ))
+
 def check_database_health():
     """Verificar salud de la base de datos"""
     try:
+        from sqlalchemy import text
+        from src.database.streaming import count_rows
+        
         session = get_session()
         
         # Verificar conexión
-        session.execute("SELECT 1")
+        session.execute(text("SELECT 1"))
         
-        # Contar registros
-        total_tesis = session.query(Tesis).count()
-        total_sessions = session.query(ScrapingSession).count()
-        total_stats = session.query(ScrapingStats).count()
+        # Contar registros (COUNT sobre la clave, sin cargar filas)
+        total_tesis = count_rows(session, Tesis)
+        total_sessions = count_rows(session, ScrapingSession)
+        total_stats = count_rows(session, ScrapingStats)
         
         session.close()
         
@@ -229,15 +613,18 @@ def cleanup_old_data(days_to_keep: int = 30):
 def get_database_info():
     """Obtener información de la base de datos"""
     try:
+        from sqlalchemy import func
+        from src.database.streaming import count_rows
+        
         session = get_session()
         
         # Estadísticas generales
-        total_tesis = session.query(Tesis).count()
-        tesis_procesadas = session.query(Tesis).filter(Tesis.procesado == True).count()
-        tesis_analizadas = session.query(Tesis).filter(Tesis.analizado == True).count()
+        total_tesis = count_rows(session, Tesis)
+        tesis_procesadas = count_rows(session, Tesis, filters=[Tesis.procesado == True])
+        tesis_analizadas = count_rows(session, Tesis, filters=[Tesis.analizado == True])
         
-        # Última descarga
-        ultima_descarga = session.query(Tesis).order_by(Tesis.fecha_descarga.desc()).first()
+        # Última descarga (solo la fecha, no la fila completa)
+        ultima_descarga = session.query(func.max(Tesis.fecha_descarga)).scalar()
         
         # Sesiones recientes
         sesiones_recientes = session.query(ScrapingSession).order_by(
@@ -250,7 +637,7 @@ def get_database_info():
             'total_tesis': total_tesis,
             'tesis_procesadas': tesis_procesadas,
             'tesis_analizadas': tesis_analizadas,
-            'ultima_descarga': ultima_descarga.fecha_descarga if ultima_descarga else None,
+            'ultima_descarga': ultima_descarga,
             'sesiones_recientes': [
                 {
                     'session_id': s.session_id,
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Recorrido de tablas completas con memoria acotada para los scripts por lotes
+- Solo columnas proyectadas (tuplas, sin objetos ORM ni mapa de identidades creciendo)
+- iter_chunks / iter_keyset: trozos por clave (id > último ORDER BY id LIMIT N); cada trozo es una
+  consulta corta, así que se puede escribir y confirmar entre trozos y las filas que dejan de cumplir
+  el filtro no desplazan a las siguientes (a diferencia de OFFSET)
+- iter_rows: una sola consulta con yield_per (cursor del lado del servidor en PostgreSQL) para
+  recorridos de solo lectura
+- count_rows: COUNT(clave) sin subconsulta sobre todas las columnas de Query.count()
+"""
+
+import logging
+from typing import Iterator, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def primary_key_of(column):
+    """Clave primaria de la tabla de la que sale una columna proyectada (Tesis.scjn_id → Tesis.id)"""
+    element = column.__clause_element__() if hasattr(column, '__clause_element__') else column
+    table = element.table
+    keys = list(table.primary_key.columns)
+    if len(keys) != 1:
+        raise ValueError(f"La tabla {table.name} no tiene una clave primaria simple para recorrerla por trozos")
+    return keys[0]
+
+
+def iter_chunks(session: Session, *columns, filters=(), key=None, batch_size: int = None,
+                limit: int = None) -> Iterator[List[tuple]]:
+    """Trozos de hasta batch_size tuplas de las columnas pedidas, en orden de clave ascendente"""
+    batch_size = batch_size or Config.STREAM_BATCH_SIZE
+    key = key if key is not None else primary_key_of(columns[0])
+    last = None
+    remaining = limit
+
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        query = session.query(key, *columns).filter(*filters)
+        if last is not None:
+            query = query.filter(key > last)
+        rows = query.order_by(key).limit(size).all()
+        if not rows:
+            return
+        last = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+        yield [tuple(row[1:]) for row in rows]
+        if len(rows) < size:
+            return
+
+
+def iter_keyset(session: Session, *columns, filters=(), key=None, batch_size: int = None,
+                limit: int = None) -> Iterator[tuple]:
+    """Filas (tuplas) de las columnas pedidas leídas por trozos de clave"""
+    for chunk in iter_chunks(session, *columns, filters=filters, key=key, batch_size=batch_size, limit=limit):
+        yield from chunk
+
+
+def iter_rows(session: Session, *columns, filters=(), order_by=None, batch_size: int = None) -> Iterator[tuple]:
+    """Filas de solo lectura en una única consulta con yield_per; no escribir en la sesión mientras dura"""
+    batch_size = batch_size or Config.STREAM_BATCH_SIZE
+    query = session.query(*columns).filter(*filters)
+    if order_by is not None:
+        query = query.order_by(order_by)
+    for row in query.yield_per(batch_size):
+        yield tuple(row)
+
+
+def count_rows(session: Session, column, filters=()) -> int:
+    """Número de filas de la tabla de `column` (un modelo o una de sus columnas) que cumplen los filtros"""
+    if hasattr(column, '__table__'):
+        column = list(column.__table__.primary_key.columns)[0]
+    return session.query(func.count(column)).filter(*filters).scalar() or 0
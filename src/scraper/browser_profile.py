@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Perfil ligero de navegador para los drivers de scraping
+- Headless nuevo de Chrome (--headless=new), con descargas y el mismo motor que el modo con ventana
+- Sin imágenes, fuentes, multimedia ni dominios de terceros: Network.setBlockedURLs vía CDP
+- Sin funciones de Chrome que no sirven para extraer texto (sincronización, traducción, extensiones...)
+- Firefox (alternativa sin CDP): mismas restricciones mediante preferencias
+- Un único punto de creación de drivers (Chrome y Firefox) en lugar de opciones copiadas en cada scraper
+"""
+
+import logging
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from src.config import Config
+from src.scraper.scjn_config import BLOCKED_RESOURCES
+
+logger = logging.getLogger(__name__)
+
+# User-Agent de Chrome de escritorio (el headless nuevo anuncia "HeadlessChrome" si no se fija)
+CHROME_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                     "Chrome/124.0.0.0 Safari/537.36")
+
+# Funciones de Chrome innecesarias para extraer texto
+LEAN_CHROME_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",  # las pestañas en segundo plano cargan a la misma velocidad
+    "--disable-backgrounding-occluded-windows",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-domain-reliability",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions,AutofillServerCommunication",
+    "--disable-notifications",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--metrics-recording-only",
+    "--blink-settings=imagesEnabled=false",
+    "--log-level=3",
+]
+
+
+def blocked_url_patterns(stylesheets: bool = None) -> List[str]:
+    """Patrones de URL bloqueados según la configuración"""
+    stylesheets = Config.BROWSER_BLOCK_STYLESHEETS if stylesheets is None else stylesheets
+    patterns = BLOCKED_RESOURCES['images'] + BLOCKED_RESOURCES['fonts'] + BLOCKED_RESOURCES['media']
+    if stylesheets:
+        patterns += BLOCKED_RESOURCES['stylesheets']
+    return patterns + BLOCKED_RESOURCES['third_party']
+
+
+def chrome_options(download_dir: str = None, headless: bool = None, user_agent: str = None,
+                   lean: bool = None) -> Options:
+    """Opciones de Chrome para scraping (perfil ligero salvo lean=False)"""
+    headless = Config.SELENIUM_HEADLESS if headless is None else headless
+    lean = Config.BROWSER_BLOCK_RESOURCES if lean is None else lean
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={Config.SELENIUM_WINDOW_SIZE}")
+    options.add_argument(f"--user-agent={user_agent or Config.SELENIUM_USER_AGENT}")
+    if lean:
+        for argument in LEAN_CHROME_ARGS:
+            options.add_argument(argument)
+    else:
+        for argument in ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"):
+            options.add_argument(argument)
+
+    prefs = {"profile.default_content_setting_values.notifications": 2}
+    if lean:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    if download_dir:
+        prefs.update({
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "plugins.always_open_pdf_externally": True
+        })
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def apply_blocking(driver, patterns: List[str] = None) -> bool:
+    """Bloquear recursos en el driver vía CDP; False si el navegador no expone CDP"""
+    if not hasattr(driver, 'execute_cdp_cmd'):
+        return False
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns or blocked_url_patterns()})
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo aplicar el bloqueo de recursos: {e}")
+        return False
+
+
+def create_chrome_driver(download_dir: str = None, headless: bool = None, user_agent: str = None,
+                         lean: bool = None, options: Optional[Options] = None):
+    """Driver Chrome con el perfil de scraping y el bloqueo de recursos aplicado"""
+    lean = Config.BROWSER_BLOCK_RESOURCES if lean is None else lean
+    options = options or chrome_options(download_dir, headless=headless, user_agent=user_agent, lean=lean)
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    if lean:
+        apply_blocking(driver)
+    return driver
+
+
+def firefox_options(headless: bool = None, lean: bool = None):
+    """Opciones de Firefox equivalentes (sin CDP: el bloqueo se hace por preferencias)"""
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+    headless = Config.SELENIUM_HEADLESS if headless is None else headless
+    lean = Config.BROWSER_BLOCK_RESOURCES if lean is None else lean
+    width, _, height = Config.SELENIUM_WINDOW_SIZE.partition(',')
+    options = FirefoxOptions()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument(f"--width={width}")
+    options.add_argument(f"--height={height or width}")
+    if lean:
+        options.set_preference("permissions.default.image", 2)
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+        options.set_preference("browser.display.use_document_fonts", 0)
+        options.set_preference("media.autoplay.default", 5)
+        options.set_preference("media.autoplay.blocking_policy", 2)
+        options.set_preference("privacy.trackingprotection.enabled", True)
+        options.set_preference("browser.safebrowsing.malware.enabled", False)
+        options.set_preference("browser.safebrowsing.phishing.enabled", False)
+        options.set_preference("datareporting.healthreport.uploadEnabled", False)
+        options.set_preference("toolkit.telemetry.enabled", False)
+        options.set_preference("app.update.enabled", False)
+    return options
+
+
+def create_firefox_driver(headless: bool = None, lean: bool = None):
+    """Driver Firefox con el perfil de scraping (preferencias de firefox_options)"""
+    from selenium.webdriver.firefox.service import Service as FirefoxService
+    from webdriver_manager.firefox import GeckoDriverManager
+
+    return webdriver.Firefox(service=FirefoxService(GeckoDriverManager().install()),
+                             options=firefox_options(headless=headless, lean=lean))
@@ -18,18 +18,12 @@ from src.storage.google_drive import GoogleDriveManager
 from src.analysis.ai_analyzer import AIAnalyzer
 from src.database.models import create_tables, get_session, Tesis
 from src.config import Config
+from src.storage.upload_queue import UploadQueue
+from src.storage.backends import get_upload_engine
 from organize_and_upload_tesis import TesisOrganizer
+from src.utils.logger import get_logger
 import time
 
-# Configurar logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class ScrapingOrchestrator:
@@ -79,10 +73,12 @@ class ScrapingOrchestrator:
                 start_time = time.time()
                 max_seconds = 3 * 3600  # 3 horas
                 processed_count = 0
-                pdfs_subidos = 0
-                enlaces_generados = 0
+                pdfs_encolados = 0
                 errores_count = 0
                 organizer = TesisOrganizer()
+                upload_queue = UploadQueue()
+                upload_engine = get_upload_engine(upload_queue)
+                upload_engine.start()
                 
                 for tesis_data in tesis_list:
                     # Limitar a 3 horas
@@ -97,39 +93,15 @@ class ScrapingOrchestrator:
                             if detail_data:
                                 tesis_data.update(detail_data)
                         
-                        # Descargar PDF si hay enlace
-                        pdf_local_path = None
-                        google_drive_id = None
-                        google_drive_link = None
-                        
-                        if tesis_data.get('pdf_url'):
-                            pdf_local_path = self.scraper.download_pdf(tesis_data['url'], tesis_data['scjn_id'])
-                            if pdf_local_path:
-                                logger.info(f"PDF descargado correctamente: {pdf_local_path}")
-                                # Subir a Google Drive con organización
-                                result = organizer.upload_tesis_with_organization(tesis_data, pdf_local_path)
-                                if result:
-                                    google_drive_id, google_drive_link = result
-                                    logger.info(f"PDF subido a Google Drive: {google_drive_link}")
-                                else:
-                                    logger.warning(f"No se pudo subir el PDF a Google Drive para tesis {tesis_data.get('scjn_id')}")
-                            else:
-                                logger.warning(f"No se pudo descargar el PDF para tesis {tesis_data.get('scjn_id')}")
-                        else:
-                            logger.info(f"Tesis {tesis_data.get('scjn_id')} no tiene enlace a PDF")
-                        
-                        # Guardar en base de datos
-                        self.save_tesis_to_database(tesis_data, google_drive_id, google_drive_link)
+                        if self.process_scraped_tesis(tesis_data, organizer, upload_queue):
+                            pdfs_encolados += 1
                         processed_count += 1
                         
-                        if google_drive_id:
-                            pdfs_subidos += 1
-                            enlaces_generados += 1
-                        
                         if processed_count % 10 == 0:
+                            pdfs_subidos = upload_engine.stats['subidos']
                             self.mostrar_resumen_periodico(
                                 processed_count, len(tesis_list), 
-                                pdfs_subidos, enlaces_generados, errores_count
+                                pdfs_subidos, pdfs_subidos, errores_count
                             )
                         
                         logger.info(f"Tesis procesada {processed_count}/{len(tesis_list)}")
@@ -139,9 +111,15 @@ class ScrapingOrchestrator:
                         logger.error(f"Error procesando tesis {tesis_data.get('scjn_id', 'unknown')}: {e}")
                         continue
                 
+                # Esperar a que el motor termine las subidas encoladas
+                logger.info(f"⏳ Esperando subidas pendientes ({pdfs_encolados} encoladas en esta ejecución)...")
+                upload_stats = upload_engine.stop()
+                pdfs_subidos = upload_stats['subidos']
+                logger.info(f"☁️ Throughput de subidas: {upload_stats['archivos_por_minuto']:.1f} archivos/min")
+                
                 self.mostrar_resumen_final(
                     processed_count, len(tesis_list), 
-                    pdfs_subidos, enlaces_generados, errores_count
+                    pdfs_subidos, pdfs_subidos, errores_count
                 )
                 
             finally:
@@ -152,6 +130,36 @@ class ScrapingOrchestrator:
             logger.error(f"Error en ejecución principal: {e}")
             raise
     
+    def process_scraped_tesis(self, tesis_data: Dict, organizer: TesisOrganizer, upload_queue: UploadQueue) -> bool:
+        """Descargar el PDF, guardar la tesis y encolar la subida; devuelve True si se encoló un PDF"""
+        pdf_local_path = None
+        upload = None
+        
+        if tesis_data.get('pdf_url'):
+            pdf_local_path = self.scraper.download_pdf(tesis_data['url'], tesis_data['scjn_id'])
+            if pdf_local_path:
+                logger.info(f"PDF descargado correctamente: {pdf_local_path}")
+                # Carpeta destino según la organización automática
+                upload = organizer.prepare_upload(tesis_data)
+                if not upload:
+                    logger.warning(f"No se pudo preparar la subida del PDF para tesis {tesis_data.get('scjn_id')}")
+            else:
+                logger.warning(f"No se pudo descargar el PDF para tesis {tesis_data.get('scjn_id')}")
+        else:
+            logger.info(f"Tesis {tesis_data.get('scjn_id')} no tiene enlace a PDF")
+        
+        # Guardar en base de datos (el enlace de Drive se escribe al completar la subida)
+        self.save_tesis_to_database(tesis_data)
+        
+        if upload:
+            # Encolar subida: el motor en segundo plano sube sin bloquear el scraping
+            # Drive recibe el ID de la carpeta; local/S3, el prefijo "Materia/Época/Sala" de la clave
+            destino, filename, _ = upload
+            target = {'parent_id': destino} if organizer.uses_drive else {'prefijo': destino}
+            upload_queue.enqueue(pdf_local_path, filename, scjn_id=tesis_data['scjn_id'], **target)
+            return True
+        return False
+    
     def mostrar_resumen_periodico(self, procesadas, total, pdfs_subidos, enlaces_generados, errores):
         """Mostrar resumen periódico del progreso"""
         porcentaje = (procesadas / total) * 100 if total > 0 else 0
@@ -257,21 +265,49 @@ class ScrapingOrchestrator:
             logger.error(f"Error guardando tesis en base de datos: {e}")
             raise
     
-    def run_incremental_scraping(self):
-        """Ejecutar scraping incremental (solo documentos nuevos)"""
+    def run_incremental_scraping(self, max_documents: Optional[int] = None):
+        """Ejecutar scraping incremental: solo registros digitales posteriores a la marca de agua"""
+        from src.automation.incremental import IncrementalSync
+        from src.automation.registro_crawler import registro_probe_factory
+        
         try:
             logger.info("=== INICIANDO SCRAPING INCREMENTAL ===")
+            create_tables()
             
-            # Obtener última fecha de scraping
-            session = get_session()
-            last_tesis = session.query(Tesis).order_by(Tesis.fecha_creacion.desc()).first()
-            session.close()
+            # El driver principal descarga los PDFs; las sondas de registros usan navegadores propios
+            if not self.scraper.setup_driver():
+                logger.error("❌ No se pudo configurar el driver de Selenium")
+                return None
+            
+            organizer = TesisOrganizer()
+            upload_queue = UploadQueue()
+            upload_engine = get_upload_engine(upload_queue)
+            upload_engine.start()
+            errores_count = 0
             
-            if last_tesis:
-                logger.info(f"Última tesis procesada: {last_tesis.fecha_creacion}")
+            def on_new(registro: int, detail_data: Dict):
+                nonlocal errores_count
+                tesis_data = {'scjn_id': str(registro), 'titulo': detail_data.get('titulo', ''), **detail_data}
+                try:
+                    self.process_scraped_tesis(tesis_data, organizer, upload_queue)
+                except Exception as e:
+                    errores_count += 1
+                    logger.error(f"Error procesando tesis {registro}: {e}")
             
-            # Ejecutar scraping con filtros de fecha si es necesario
-            self.run_full_scraping(max_documents=50)  # Procesar menos documentos en modo incremental
+            try:
+                summary = IncrementalSync(registro_probe_factory()).run(
+                    on_new=on_new, deadline=time.time() + 3 * 3600, max_new=max_documents
+                )
+            finally:
+                logger.info("⏳ Esperando subidas pendientes...")
+                upload_stats = upload_engine.stop()
+                self.scraper.close_driver()
+            
+            self.mostrar_resumen_final(
+                summary['nuevas'], summary['nuevas'],
+                upload_stats['subidos'], upload_stats['subidos'], errores_count
+            )
+            return summary
             
         except Exception as e:
             logger.error(f"Error en scraping incremental: {e}")
@@ -279,6 +315,7 @@ class ScrapingOrchestrator:
 
 def main():
     """Función principal"""
+    get_logger()
     try:
         # Validar configuración
         Config.validate()
@@ -308,6 +345,7 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    get_logger()
     try:
         orchestrator = ScrapingOrchestrator()
         
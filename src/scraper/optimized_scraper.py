@@ -6,6 +6,9 @@ Scraper optimizado para SCJN con:
 - Monitoreo de performance
 - Reintentos automáticos
 - Cache inteligente
+- Pausas y reintentos gobernados por el controlador adaptativo compartido (rate_control)
+- Esperas explícitas de página lista (page_ready) en lugar de espera implícita y pausas fijas
+- Perfil ligero de navegador (browser_profile): sin imágenes, fuentes, multimedia ni terceros
 """
 
 import os
@@ -23,16 +26,11 @@ from dataclasses import dataclass
 from urllib.parse import urljoin, urlparse
 
 # Selenium imports
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import (
-    TimeoutException, NoSuchElementException, WebDriverException,
+    NoSuchElementException, WebDriverException,
     StaleElementReferenceException, ElementClickInterceptedException
 )
-from webdriver_manager.chrome import ChromeDriverManager
 
 # Local imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -40,6 +38,20 @@ from src.config import Config, get_config
 from src.utils.logger import get_logger, get_performance_logger, performance_monitor
 from src.database.models import Tesis, get_session, create_tables
 from src.storage.google_drive_service import GoogleDriveServiceManager
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.page_ready import PageReady
+from src.scraper.browser_profile import create_chrome_driver
+from src.scraper.scjn_config import READY_SELECTORS
+
+# Selectores para diferentes estructuras de página de resultados
+RESULT_SELECTORS = [
+    ".resultado-tesis",
+    ".tesis-item",
+    ".resultado-item",
+    ".row-tesis",
+    "tr[onclick]",
+    "a[href*='tesis']"
+]
 
 @dataclass
 class ScrapingResult:
@@ -77,8 +89,10 @@ class OptimizedSCJNScraper:
         
         # Configuración de scraping
         self.driver = None
+        self.ready = None
         self.session = get_session()
         self.drive_manager = None
+        self.rate = get_rate_controller()
         
         # Cache para evitar reprocessamiento
         self.cache_file = self.config.DATA_DIR / "scraping_cache.json"
@@ -124,41 +138,15 @@ class OptimizedSCJNScraper:
     def setup_driver(self) -> bool:
         """Configurar driver de Selenium de forma robusta"""
         try:
-            chrome_options = Options()
-            
-            # Configuraciones optimizadas
-            if self.config.SELENIUM_HEADLESS:
-                chrome_options.add_argument("--headless")
-            
-            chrome_options.add_argument(f"--window-size={self.config.SELENIUM_WINDOW_SIZE}")
-            chrome_options.add_argument(f"--user-agent={self.config.SELENIUM_USER_AGENT}")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-logging")
-            chrome_options.add_argument("--silent")
-            chrome_options.add_argument("--log-level=3")
-            
-            # Prefs para optimizar descargas
-            prefs = {
-                "profile.default_content_settings.popups": 0,
-                "download.default_directory": str(self.config.PDFS_DIR),
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "plugins.always_open_pdf_externally": True,
-                "profile.default_content_setting_values.notifications": 2
-            }
-            chrome_options.add_experimental_option("prefs", prefs)
-            
-            # Inicializar driver
-            self.driver = webdriver.Chrome(
-                service=webdriver.chrome.service.Service(ChromeDriverManager().install()),
-                options=chrome_options
+            # Perfil ligero: headless nuevo, sin imágenes, fuentes, multimedia ni terceros
+            self.driver = create_chrome_driver(
+                download_dir=str(self.config.PDFS_DIR),
+                headless=self.config.SELENIUM_HEADLESS,
+                user_agent=self.config.SELENIUM_USER_AGENT
             )
             
             # Configurar timeouts
-            self.driver.implicitly_wait(self.config.SELENIUM_IMPLICIT_WAIT)
+            self.ready = PageReady(self.driver, timeout=self.config.DEFAULT_TIMEOUT)
             self.driver.set_page_load_timeout(self.config.SELENIUM_PAGE_LOAD_TIMEOUT)
             
             self.logger.info("✅ Driver de Selenium configurado correctamente")
@@ -174,12 +162,11 @@ class OptimizedSCJNScraper:
         for attempt in range(self.config.MAX_RETRIES):
             try:
                 self.logger.info(f"🌐 Navegando a: {self.config.SEARCH_URL}")
-                self.driver.get(self.config.SEARCH_URL)
-                
-                # Esperar que la página cargue
-                WebDriverWait(self.driver, self.config.DEFAULT_TIMEOUT).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
+                with self.rate.request():
+                    self.driver.get(self.config.SEARCH_URL)
+                    
+                    # Esperar que la página cargue
+                    self.ready.wait(READY_SELECTORS['search_page'])
                 
                 self.logger.info("✅ Página de búsqueda cargada correctamente")
                 return True
@@ -187,7 +174,7 @@ class OptimizedSCJNScraper:
             except Exception as e:
                 self.logger.warning(f"⚠️ Intento {attempt + 1} falló: {e}")
                 if attempt < self.config.MAX_RETRIES - 1:
-                    time.sleep(2 ** attempt)  # Backoff exponencial
+                    self.rate.backoff(attempt)
                     
         self.logger.error("❌ No se pudo navegar a la página de búsqueda")
         return False
@@ -205,15 +192,8 @@ class OptimizedSCJNScraper:
                 "#busqueda"
             ]
             
-            search_input = None
-            for selector in search_selectors:
-                try:
-                    search_input = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    break
-                except TimeoutException:
-                    continue
+            self.ready.wait(search_selectors)
+            search_input = self.ready.find_first(search_selectors)
             
             if not search_input:
                 self.logger.warning("⚠️ No se encontró campo de búsqueda")
@@ -240,8 +220,9 @@ class OptimizedSCJNScraper:
                     continue
             
             if search_button:
+                self.rate.acquire()
                 search_button.click()
-                time.sleep(3)  # Esperar resultados
+                self.ready.wait(RESULT_SELECTORS + READY_SELECTORS['results'])  # Esperar resultados
             
             self.logger.info(f"✅ Búsqueda realizada: '{search_term}'")
             return True
@@ -276,7 +257,6 @@ class OptimizedSCJNScraper:
                     break
                 
                 current_page += 1
-                time.sleep(2)  # Pausa entre páginas
                 
             except Exception as e:
                 self.logger.error(f"❌ Error en página {current_page}: {e}")
@@ -289,18 +269,8 @@ class OptimizedSCJNScraper:
         """Extraer resultados de una página específica"""
         results = []
         
-        # Selectores para diferentes estructuras de página
-        result_selectors = [
-            ".resultado-tesis",
-            ".tesis-item",
-            ".resultado-item",
-            ".row-tesis",
-            "tr[onclick]",
-            "a[href*='tesis']"
-        ]
-        
         elements = []
-        for selector in result_selectors:
+        for selector in RESULT_SELECTORS:
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 if elements:
@@ -388,8 +358,10 @@ class OptimizedSCJNScraper:
                 try:
                     next_button = self.driver.find_element(By.CSS_SELECTOR, selector)
                     if next_button.is_enabled():
+                        previous = self.ready.find_first(RESULT_SELECTORS)
+                        self.rate.acquire()
                         next_button.click()
-                        time.sleep(3)
+                        self.ready.wait(RESULT_SELECTORS + READY_SELECTORS['results'], stale=previous)
                         return True
                 except Exception:
                     continue
@@ -411,12 +383,11 @@ class OptimizedSCJNScraper:
                 self.logger.debug("ℹ️ URL ya procesada, saltando")
                 return None
             
-            self.driver.get(tesis_url)
-            
-            # Esperar que la página cargue
-            WebDriverWait(self.driver, self.config.DEFAULT_TIMEOUT).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            with self.rate.request():
+                self.driver.get(tesis_url)
+                
+                # Esperar que la página cargue
+                self.ready.wait(READY_SELECTORS['detail'])
             
             # Extraer información detallada
             detail_data = {
@@ -522,9 +493,6 @@ class OptimizedSCJNScraper:
                     except Exception as e:
                         self.logger.error(f"Error procesando tesis: {e}")
                         results.append(ScrapingResult(success=False, error=str(e)))
-            
-            # Pausa entre lotes
-            time.sleep(1)
         
         return results
     
@@ -675,6 +643,9 @@ class OptimizedSCJNScraper:
             for error in stats.errors[:5]:  # Mostrar solo los primeros 5
                 self.logger.warning(f"   - {error}")
         
+        # Latencias por operación instrumentada con @performance_monitor
+        self.perf_logger.log_summary()
+        
         self.logger.info("=" * 60)
     
     def _cleanup(self):
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Espera explícita de página lista para los drivers Selenium
+- Sin esperas implícitas: las sondas de selectores inexistentes vuelven al instante
+- Documento completo, Angular estable (sjf2 es una aplicación Angular) y contenedor esperado
+- Red inactiva: contador de XHR/fetch en vuelo instalado vía CDP antes de los scripts de la página
+  (Chrome); en otros navegadores se instala tras la carga y se complementa con Resource Timing
+- Una página asentada sin el contenedor esperado se da por vacía sin agotar el tiempo máximo
+- Tiempos por espera para medir el tiempo hasta extraer cada página
+- Sondeo sin espera (check) para repartir cargas entre varias pestañas (tab_pool)
+"""
+
+import glob
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+from selenium.webdriver.common.by import By
+
+from src.scraper.scjn_config import TIMING
+
+logger = logging.getLogger(__name__)
+
+# Contador de peticiones XHR/fetch en vuelo y marca de la última actividad de red
+PENDING_TRACKER_JS = """
+(function () {
+  if (window.__scjnPending !== undefined) { return; }
+  window.__scjnPending = 0;
+  window.__scjnLastActivity = Date.now();
+  function start() { window.__scjnPending++; window.__scjnLastActivity = Date.now(); }
+  function done() {
+    window.__scjnPending = Math.max(0, window.__scjnPending - 1);
+    window.__scjnLastActivity = Date.now();
+  }
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    start();
+    this.addEventListener('loadend', done);
+    return send.apply(this, arguments);
+  };
+  if (window.fetch) {
+    var originalFetch = window.fetch;
+    window.fetch = function () {
+      start();
+      return originalFetch.apply(this, arguments).finally(done);
+    };
+  }
+})();
+"""
+
+# Estado de la página en una sola ida y vuelta; arguments[0] = selectores CSS del contenido esperado
+PAGE_STATE_JS = """
+var selectors = arguments[0] || [];
+var state = {ready: document.readyState, angular: true, pending: -1, idle_ms: -1, match: -1,
+             previous: window.__scjnPrevious === true,
+             resources: window.performance ? performance.getEntriesByType('resource').length : 0};
+try {
+  if (window.getAllAngularTestabilities) {
+    state.angular = window.getAllAngularTestabilities().every(function (t) { return t.isStable(); });
+  } else if (window.angular && window.angular.element) {
+    var injector = window.angular.element(document.body).injector();
+    if (injector) { state.angular = injector.get('$http').pendingRequests.length === 0; }
+  }
+} catch (e) {}
+if (window.__scjnPending !== undefined) {
+  state.pending = window.__scjnPending;
+  state.idle_ms = Date.now() - window.__scjnLastActivity;
+}
+for (var i = 0; i < selectors.length && state.match < 0; i++) {
+  try {
+    var el = document.querySelector(selectors[i]);
+    if (el && ((el.textContent || '').trim().length > 0 ||
+               ['INPUT', 'BUTTON', 'SELECT', 'TEXTAREA', 'A'].indexOf(el.tagName) >= 0)) {
+      state.match = i;
+    }
+  } catch (e) {}
+}
+return state;
+"""
+
+
+class PageReady:
+    """Esperas explícitas de página lista para un driver (desactiva la espera implícita)"""
+
+    def __init__(self, driver, timeout: float = None, poll: float = None, network_idle: float = None):
+        self.driver = driver
+        self.timeout = timeout or TIMING['ready_timeout']
+        self.poll = poll or TIMING['ready_poll']
+        self.network_idle = TIMING['network_idle'] if network_idle is None else network_idle
+        self.cdp = False
+        self.last_wait = 0.0
+        self.stats = {'esperas': 0, 'con_contenido': 0, 'asentadas_sin_contenido': 0, 'agotadas': 0,
+                      'segundos': 0.0}
+
+        # Sin espera implícita: cada find_element fallido vuelve al instante
+        driver.implicitly_wait(0)
+        self.install_tracker()
+
+    def install_tracker(self) -> bool:
+        """Instalar el contador de red en los documentos nuevos de la pestaña actual (CDP es por pestaña)"""
+        if hasattr(self.driver, 'execute_cdp_cmd'):
+            try:
+                self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PENDING_TRACKER_JS})
+                self.cdp = True
+            except Exception as e:
+                logger.debug(f"CDP no disponible para el contador de red: {e}")
+        return self.cdp
+
+    @staticmethod
+    def _is_stale(element) -> bool:
+        try:
+            element.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return True
+
+    def check(self, selectors: List[str], watch: Dict[str, Any]) -> Optional[bool]:
+        """Un sondeo del estado de la pestaña actual, sin esperar.
+
+        True si algún selector tiene contenido (o, sin selectores, si la página se asentó), False si la
+        página se asentó sin ninguno y None si aún no está lista. watch guarda el estado entre sondeos
+        de una misma carga (se empieza con un dict vacío).
+        """
+        now = time.monotonic()
+        watch.setdefault('since', now)
+        try:
+            state = self.driver.execute_script(PAGE_STATE_JS, selectors) or {}
+        except WebDriverException as e:
+            logger.debug(f"Estado de página no disponible: {e}")
+            state = {}
+
+        if state.get('previous'):
+            # La navegación aún no sustituyó al documento anterior
+            return None
+        if state.get('pending', -1) < 0 and state.get('ready') == 'complete':
+            # Sin CDP (o página recién cargada sin el contador): instalarlo para lo que quede
+            try:
+                self.driver.execute_script(PENDING_TRACKER_JS)
+            except WebDriverException:
+                pass
+        if state.get('resources') != watch.get('resources'):
+            watch['resources'], watch['since'] = state.get('resources'), now
+
+        if selectors and state.get('match', -1) >= 0 and state.get('ready') != 'loading':
+            return True
+
+        if state.get('pending', -1) >= 0:
+            network_idle = state['pending'] == 0 and state['idle_ms'] >= self.network_idle * 1000
+        else:
+            network_idle = now - watch['since'] >= self.network_idle
+        if state.get('ready') == 'complete' and state.get('angular', True) and network_idle:
+            return not selectors
+        return None
+
+    def record(self, selectors: List[str], outcome: Optional[bool], seconds: float):
+        """Contabilizar una espera terminada (None = tiempo agotado)"""
+        self.last_wait = seconds
+        self.stats['esperas'] += 1
+        self.stats['segundos'] += seconds
+        if outcome is None:
+            self.stats['agotadas'] += 1
+        elif selectors:
+            self.stats['con_contenido' if outcome else 'asentadas_sin_contenido'] += 1
+
+    def wait(self, selectors: Iterable[str] = None, timeout: float = None, stale=None) -> bool:
+        """Esperar a que la página esté lista.
+
+        Con selectores devuelve True en cuanto alguno tiene contenido y False si la página se asienta
+        (documento completo, Angular estable, red inactiva) sin ninguno. Sin selectores devuelve True
+        al asentarse. stale: elemento de la página anterior que debe desaparecer antes (paginación).
+        """
+        selectors = list(selectors or [])
+        begin = time.monotonic()
+        deadline = begin + (timeout or self.timeout)
+        watch: Dict[str, Any] = {}
+        outcome = None
+
+        while True:
+            now = time.monotonic()
+            if stale is not None and self._is_stale(stale):
+                stale = None
+            if stale is None:
+                outcome = self.check(selectors, watch)
+                if outcome is not None:
+                    break
+            if now >= deadline:
+                logger.debug(f"⏰ Página no lista tras {now - begin:.1f}s (selectores: {selectors[:3]})")
+                break
+            time.sleep(self.poll)
+
+        self.record(selectors, outcome, time.monotonic() - begin)
+        return bool(outcome)
+
+    def find_first(self, selectors: Iterable[str], clickable: bool = False, by: str = By.CSS_SELECTOR):
+        """Primer elemento que coincide con alguno de los selectores (sin esperar)"""
+        for selector in selectors:
+            try:
+                for element in self.driver.find_elements(by, selector):
+                    if not clickable or (element.is_displayed() and element.is_enabled()):
+                        return element
+            except WebDriverException:
+                continue
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        """Esperas realizadas y segundos medios por espera"""
+        stats = dict(self.stats)
+        stats['segundos_medios'] = stats['segundos'] / stats['esperas'] if stats['esperas'] else 0.0
+        return stats
+
+
+def wait_for_download(directory: str, since: float, timeout: float = None, poll: float = 0.25) -> Optional[str]:
+    """PDF completo más reciente creado en directory después de since (epoch); None al agotar timeout"""
+    deadline = time.time() + (timeout or TIMING['download_timeout'])
+    while time.time() < deadline:
+        partial = glob.glob(os.path.join(directory, '*.crdownload')) + glob.glob(os.path.join(directory, '*.part'))
+        done: List[str] = [path for path in glob.glob(os.path.join(directory, '*.pdf'))
+                           if os.path.getmtime(path) >= since]
+        if done and not partial:
+            return max(done, key=os.path.getmtime)
+        time.sleep(poll)
+    return None
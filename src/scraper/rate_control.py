@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Control adaptativo de peticiones a SCJN
+- Un controlador compartido por host: todos los scrapers pasan por el mismo
+- Pausa entre peticiones y concurrencia ajustadas con AIMD según latencia y errores
+- Cortacircuitos: con errores sostenidos deja de enviar peticiones durante un enfriamiento creciente
+- Reintentos con espera exponencial sobre la pausa vigente (con jitter)
+- Estado consultable: circuito, concurrencia, pausa, latencia media y tasa de errores
+- Cupo global opcional entre procesos y nodos (set_rate_gate): cada petición reserva además un hueco
+  compartido y la apertura del circuito pausa a todos los nodos
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from src.config import Config
+from src.scraper.scjn_config import TIMING, URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'cerrado'
+OPEN = 'abierto'
+HALF_OPEN = 'semiabierto'
+
+
+class CircuitOpenError(RuntimeError):
+    """El circuito del host está abierto y la petición no puede esperar"""
+
+
+class RateController:
+    """Pausa y concurrencia AIMD con cortacircuitos para un host"""
+
+    def __init__(self, host: str = None, min_delay: float = None, max_delay: float = None,
+                 initial_delay: float = None, max_concurrency: int = None, latency_target: float = None,
+                 error_threshold: float = None, window: int = None, cooldown: float = None,
+                 max_cooldown: float = None, gate=None, clock=None, sleep=None):
+        self.host = host or urlparse(URL_PATTERNS['base_url']).netloc
+        self.min_delay = Config.RATE_MIN_DELAY if min_delay is None else min_delay
+        self.max_delay = Config.RATE_MAX_DELAY if max_delay is None else max_delay
+        initial_delay = TIMING['request_delay'] if initial_delay is None else initial_delay
+        self.delay = min(max(initial_delay, self.min_delay), self.max_delay)
+        self.max_concurrency = max(1, max_concurrency or Config.RATE_MAX_CONCURRENCY)
+        self.latency_target = latency_target or Config.RATE_LATENCY_TARGET
+        self.error_threshold = error_threshold or Config.RATE_ERROR_THRESHOLD
+        self.window = max(1, window or Config.RATE_WINDOW)
+        self.cooldown = Config.RATE_COOLDOWN if cooldown is None else cooldown
+        self.max_cooldown = max(self.cooldown, Config.RATE_MAX_COOLDOWN if max_cooldown is None else max_cooldown)
+        self.gate = gate  # cupo global: acquire(), try_acquire() y penalize(segundos)
+        self.clock = clock or time.monotonic  # reloj y espera inyectables (pruebas deterministas)
+        self.sleep = sleep or time.sleep
+
+        self.limit = 1.0  # ventana de concurrencia (AIMD)
+        self.latency = None  # media móvil exponencial de la latencia
+        self._outcomes = deque(maxlen=self.window)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._next_start = 0.0
+        self._started = 0
+        self._cut_at = 0  # las peticiones iniciadas antes del último recorte no vuelven a recortar
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._open_streak = 0
+        self._trial = 0  # número de la petición de prueba en semiabierto
+        self.stats = {'peticiones': 0, 'errores': 0, 'lentas': 0, 'aperturas': 0, 'rechazadas': 0,
+                      'segundos_espera': 0.0}
+
+    # ------------------------------------------------------------------
+    # Circuito
+    # ------------------------------------------------------------------
+    def _refresh_state(self, now: float):
+        if self._state == OPEN and now >= self._open_until:
+            self._state = HALF_OPEN
+            logger.info(f"🔌 Circuito de {self.host} semiabierto: petición de prueba")
+
+    def _open(self, now: float) -> float:
+        self._open_streak += 1
+        pause = min(self.max_cooldown, self.cooldown * 2 ** (self._open_streak - 1))
+        self._state = OPEN
+        self._open_until = now + pause
+        self._outcomes.clear()
+        self.limit = 1.0
+        self.delay = min(self.max_delay, max(self.delay * 2, self.min_delay, 0.1))
+        self.stats['aperturas'] += 1
+        logger.warning(f"⛔ Circuito de {self.host} abierto {pause:.0f}s por errores sostenidos "
+                       f"(pausa entre peticiones {self.delay:.2f}s)")
+        return pause
+
+    def _wait_turn(self, block: bool, slot: bool) -> int:
+        """Esperar circuito, hueco de concurrencia (si slot) y pausa; devuelve el número de petición"""
+        begin = self.clock()
+        trial = False
+        with self._cond:
+            while True:
+                now = self.clock()
+                self._refresh_state(now)
+                if self._state == OPEN:
+                    if not block:
+                        self.stats['rechazadas'] += 1
+                        raise CircuitOpenError(f"Circuito de {self.host} abierto "
+                                               f"({self._open_until - now:.0f}s restantes)")
+                    self._cond.wait(self._open_until - now)
+                    continue
+                if self._state == HALF_OPEN and slot:
+                    if not self._trial:
+                        trial = True
+                        break
+                elif not slot or self._active < int(self.limit):
+                    break
+                self._cond.wait()
+
+            if slot:
+                self._active += 1
+                self._started += 1
+            ticket = self._started
+            if trial:
+                self._trial = ticket
+            start = max(now, self._next_start)
+            self._next_start = start + self.delay
+
+        if start > now:
+            self.sleep(start - now)
+        if self.gate is not None:
+            try:
+                self.gate.acquire()
+            except Exception:
+                if slot:
+                    with self._cond:
+                        self._active -= 1
+                        self._cond.notify_all()
+                raise
+        waited = self.clock() - begin
+        if waited > 0.001:
+            with self._cond:
+                self.stats['segundos_espera'] += waited
+        return ticket
+
+    def _release(self, ticket: int, ok: bool, latency: float):
+        opened = None
+        with self._cond:
+            now = self.clock()
+            self._active -= 1
+            self.stats['peticiones'] += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            slow = ok and latency > self.latency_target
+            self.stats['errores'] += not ok
+            self.stats['lentas'] += slow
+
+            if self._state == HALF_OPEN and ticket == self._trial:
+                self._trial = 0
+                if ok:
+                    self._state = CLOSED
+                    self._open_streak = 0
+                    logger.info(f"✅ Circuito de {self.host} cerrado de nuevo")
+                else:
+                    opened = self._open(now)
+            elif self._state == CLOSED:
+                self._outcomes.append(ok)
+                if ok and not slow:
+                    # Aumento aditivo: +1 de concurrencia por ventana completa de éxitos (si la ventana se usa)
+                    if self._active + 1 >= int(self.limit):
+                        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+                    self.delay = max(self.min_delay, self.delay * 0.9)
+                elif ticket > self._cut_at:
+                    # Disminución multiplicativa, una vez por ventana de peticiones en vuelo;
+                    # la lentitud solo recorta concurrencia, los errores también alargan la pausa
+                    self.limit = max(1.0, self.limit / 2)
+                    if not ok:
+                        self.delay = min(self.max_delay, max(self.delay * 2, self.min_delay, 0.1))
+                    self._cut_at = self._started
+
+                failures = self._outcomes.count(False)
+                if (len(self._outcomes) >= max(3, self.window // 2)
+                        and failures / len(self._outcomes) >= self.error_threshold):
+                    opened = self._open(now)
+            self._cond.notify_all()
+        if opened and self.gate is not None:
+            # El resto de nodos también deja de enviar peticiones durante el enfriamiento
+            self.gate.penalize(opened)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    @contextmanager
+    def request(self, host: str = None, block: bool = True):
+        """Contexto de una petición: espera turno, mide la latencia y registra éxito o error (excepción)"""
+        ticket = self._wait_turn(block, slot=True)
+        start = self.clock()
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self._release(ticket, ok, self.clock() - start)
+
+    def try_begin(self, host: str = None) -> Optional[int]:
+        """request() sin esperas para bucles de eventos: número de petición, o None si aún no toca
+        (circuito abierto, sin hueco de concurrencia, pausa vigente o sin hueco global); cerrar con finish()"""
+        if self.gate is not None:
+            with self._cond:
+                if not self._may_begin(self.clock()):
+                    return None
+            if not self.gate.try_acquire():
+                return None
+        with self._cond:
+            now = self.clock()
+            if not self._may_begin(now):
+                return None
+            self._active += 1
+            self._started += 1
+            if self._state == HALF_OPEN:
+                self._trial = self._started
+            self._next_start = now + self.delay
+            return self._started
+
+    def _may_begin(self, now: float) -> bool:
+        self._refresh_state(now)
+        if self._state == OPEN or now < self._next_start:
+            return False
+        if self._state == HALF_OPEN:
+            return not self._trial
+        return self._active < int(self.limit)
+
+    def finish(self, ticket: int, ok: bool, latency: float):
+        """Cerrar una petición abierta con try_begin()"""
+        self._release(ticket, ok, latency)
+
+    def acquire(self, host: str = None, block: bool = True) -> float:
+        """Solo cortesía: esperar el circuito y la pausa vigente (acciones dentro de una página ya cargada)"""
+        begin = self.clock()
+        self._wait_turn(block, slot=False)
+        return self.clock() - begin
+
+    def backoff(self, attempt: int) -> float:
+        """Esperar antes del reintento attempt (0, 1, ...): exponencial sobre la pausa vigente, con jitter"""
+        pause = min(self.max_delay, max(self.delay, 1.0) * 2 ** attempt) * random.uniform(0.5, 1.0)
+        self.sleep(pause)
+        return pause
+
+    def state(self) -> Dict[str, Any]:
+        """Estado del controlador"""
+        with self._cond:
+            now = self.clock()
+            self._refresh_state(now)
+            outcomes = list(self._outcomes)
+            return {
+                'host': self.host,
+                'circuito': self._state,
+                'reabre_en': round(max(0.0, self._open_until - now), 1) if self._state == OPEN else 0.0,
+                'concurrencia': round(self.limit, 2),
+                'en_vuelo': self._active,
+                'pausa': round(self.delay, 3),
+                'latencia_media': round(self.latency, 3) if self.latency is not None else None,
+                'tasa_errores': round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                **{key: round(value, 1) if isinstance(value, float) else value for key, value in self.stats.items()}
+            }
+
+
+_controllers: Dict[str, RateController] = {}
+_controllers_lock = threading.Lock()
+_gate_factory = None
+
+
+def get_rate_controller(host: str = None) -> RateController:
+    """Controlador compartido del host (por defecto, el de SCJN)"""
+    host = host or urlparse(URL_PATTERNS['base_url']).netloc
+    with _controllers_lock:
+        controller = _controllers.get(host)
+        if controller is None:
+            controller = _controllers[host] = RateController(
+                host, gate=_gate_factory(host) if _gate_factory else None
+            )
+        return controller
+
+
+def set_rate_gate(gate_factory):
+    """Instalar gate_factory(host) -> cupo global en los controladores existentes y futuros (None lo quita)"""
+    global _gate_factory
+    with _controllers_lock:
+        _gate_factory = gate_factory
+        for host, controller in _controllers.items():
+            controller.gate = gate_factory(host) if gate_factory else None
+
+
+def rate_control_states() -> List[Dict[str, Any]]:
+    """Estado de todos los controladores creados"""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [controller.state() for controller in controllers]
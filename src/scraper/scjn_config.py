@@ -134,7 +134,47 @@ TIMING = {
     'page_load_timeout': 30,
     'download_timeout': 60,
     'max_retries': 3,
-    'retry_delay': 5
+    'retry_delay': 5,
+    'host_burst': 3,  # peticiones seguidas permitidas por host antes de esperar request_delay
+    'ready_timeout': 20,  # espera máxima de página lista (sin esperas implícitas)
+    'ready_poll': 0.1,  # intervalo de sondeo del estado de la página
+    'network_idle': 0.5  # segundos sin peticiones en vuelo para considerar la red inactiva
+}
+
+# Contenedores que indican que cada tipo de página ya tiene contenido extraíble
+READY_SELECTORS = {
+    'search_page': ["input.sjf-input-search", "input[placeholder*='Escriba el tema']", "input[type='text']"],
+    'results': [".list-group-item", "div.resultado-busqueda", "tr.tesis-row", "div.tesis-item"],
+    'paginator': ["ul.pagination", "nav[aria-label*='aginación']", ".pagination", ".paginador"],
+    'detail': [".rubro", ".rubro-tesis", ".texto", ".contenido", ".tesis-text", "#contenido"],
+    'download': ["button[aria-label*='Descargar']", "button[title*='Descargar']", ".fa-download",
+                 ".icon-download", "a[href$='.pdf']", ".btn-download", ".download-btn", ".pdf-download"]
+}
+
+# Campos de la página de detalle: selectores CSS en orden de preferencia (navegador y HTTP)
+DETAIL_FIELDS = {
+    'titulo': ["h1", ".titulo", ".tesis-title", "#titulo"],
+    'rubro': [".rubro", ".rubro-tesis", ".categoria"],
+    'texto': [".texto", ".contenido", ".tesis-text", "#contenido"],
+    'precedente': [".precedente", ".precedent", ".antecedente"],
+}
+DETAIL_PDF_SELECTORS = ["a[href*='.pdf']", ".pdf-link", "#pdf-download"]
+# Basta con uno de estos campos para dar por extraída una tesis
+DETAIL_REQUIRED = ('rubro', 'texto')
+# Los contenedores genéricos (.contenido, #contenido, .categoria) también existen en la app sin renderizar
+# y en páginas de error: el nivel HTTP exige además el registro digital de la URL en el texto de la página
+# y al menos estos caracteres en rubro o texto
+DETAIL_MIN_CHARS = 50
+
+# Recursos que los navegadores de scraping no descargan (patrones de Network.setBlockedURLs)
+BLOCKED_RESOURCES = {
+    'images': ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico", "*.bmp"],
+    'fonts': ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    'media': ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav"],
+    'stylesheets': ["*.css"],
+    'third_party': ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                    "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*facebook.net*", "*facebook.com/tr*",
+                    "*hotjar.com*", "*clarity.ms*", "*addthis.com*", "*sharethis.com*", "*youtube.com*"]
 }
 
 # Headers para requests
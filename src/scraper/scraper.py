@@ -1,6 +1,5 @@
 import requests
 from bs4 import BeautifulSoup
-import time
 import logging
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
@@ -8,23 +7,14 @@ import os
 from typing import List, Dict, Optional
 import json
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 
 from src.config import Config
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.page_ready import PageReady, wait_for_download
+from src.scraper.scjn_config import READY_SELECTORS
+from src.scraper.browser_profile import CHROME_USER_AGENT, create_chrome_driver
 
-# Configurar logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class SCJNScraper:
@@ -37,6 +27,7 @@ class SCJNScraper:
         })
         self.base_url = Config.SCJN_BASE_URL
         self.search_url = Config.SEARCH_URL
+        self.rate = get_rate_controller()
         
     def get_search_page(self, page=1, filters=None):
         """Obtener página de búsqueda con filtros"""
@@ -49,8 +40,9 @@ class SCJNScraper:
             if filters:
                 params.update(filters)
             
-            response = self.session.get(self.search_url, params=params, timeout=Config.DOWNLOAD_TIMEOUT)
-            response.raise_for_status()
+            with self.rate.request():
+                response = self.session.get(self.search_url, params=params, timeout=Config.DOWNLOAD_TIMEOUT)
+                response.raise_for_status()
             
             return response.text
             
@@ -149,8 +141,9 @@ class SCJNScraper:
     def get_tesis_detail(self, tesis_url: str) -> Optional[Dict]:
         """Obtener detalles completos de una tesis"""
         try:
-            response = self.session.get(tesis_url, timeout=Config.DOWNLOAD_TIMEOUT)
-            response.raise_for_status()
+            with self.rate.request():
+                response = self.session.get(tesis_url, timeout=Config.DOWNLOAD_TIMEOUT)
+                response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
             
@@ -186,13 +179,8 @@ class SCJNScraper:
     def download_pdf(self, tesis_url: str, scjn_id: str) -> Optional[str]:
         """Descargar PDF de la página de detalle usando Selenium y asociarlo a la tesis (cada descarga en nueva sesión)"""
         from selenium.webdriver.common.action_chains import ActionChains
-        from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
         from selenium.common.exceptions import StaleElementReferenceException
-        from webdriver_manager.chrome import ChromeDriverManager
         import time
         import os
         import glob
@@ -200,22 +188,10 @@ class SCJNScraper:
         PDF_DIR = os.path.abspath("data/pdfs")
         max_retries = 3
         for attempt in range(max_retries):
-            chrome_options = Options()
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-            # chrome_options.add_argument("--headless")  # Puedes activar headless si todo funciona
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_prefs = {
-                "download.default_directory": PDF_DIR,
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "plugins.always_open_pdf_externally": True
-            }
-            chrome_options.add_experimental_option("prefs", chrome_prefs)
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            if attempt:
+                self.rate.backoff(attempt - 1)
+            driver = create_chrome_driver(download_dir=PDF_DIR, user_agent=CHROME_USER_AGENT)
+            ready = PageReady(driver)
             pdf_path = None
             try:
                 # Limpiar PDFs temporales antes de descargar
@@ -224,25 +200,11 @@ class SCJNScraper:
                         os.remove(f)
                     except Exception:
                         pass
-                driver.get(tesis_url)
-                time.sleep(8)
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                download_button = None
-                # 1. Esperar botón por aria-label, title, íconos
-                selectors = [
-                    "button[aria-label*='Descargar']", "button[title*='Descargar']",
-                    ".fa-download", ".icon-download"
-                ]
-                for selector in selectors:
-                    try:
-                        download_button = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                        if download_button:
-                            break
-                    except Exception:
-                        continue
+                with self.rate.request():
+                    driver.get(tesis_url)
+                ready.wait(READY_SELECTORS['download'])
+                # 1. Botón por aria-label, title, íconos (la página ya está lista: sin esperas por selector)
+                download_button = ready.find_first(READY_SELECTORS['download'], clickable=True)
                 # 2. Buscar enlaces <a> con texto o href
                 if not download_button:
                     try:
@@ -275,6 +237,7 @@ class SCJNScraper:
                     logger.warning(f"No se encontró botón/enlace de descarga en {tesis_url}")
                     driver.quit()
                     continue
+                clicked_at = time.time()
                 try:
                     ActionChains(driver).move_to_element(download_button).click().perform()
                 except StaleElementReferenceException:
@@ -292,12 +255,9 @@ class SCJNScraper:
                         logger.warning(f"No se pudo hacer click en el botón/enlace de descarga en {tesis_url}")
                         driver.quit()
                         continue
-                time.sleep(18)
-                # Buscar PDF descargado
-                pdf_files = [f for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')]
-                if pdf_files:
-                    pdf_files_full = [os.path.join(PDF_DIR, f) for f in pdf_files]
-                    latest_pdf = max(pdf_files_full, key=os.path.getctime)
+                # Esperar a que el PDF termine de descargarse
+                latest_pdf = wait_for_download(PDF_DIR, since=clicked_at)
+                if latest_pdf:
                     pdf_filename = f"tesis_{scjn_id}.pdf"
                     pdf_path = os.path.join(PDF_DIR, pdf_filename)
                     if os.path.basename(latest_pdf) != pdf_filename:
@@ -337,38 +297,31 @@ class SCJNScraper:
 
     def get_tesis_detail_urls(self, max_documents: int = 100) -> List[str]:
         """Extraer URLs de detalle de tesis como texto, no como elementos Selenium"""
-        from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.service import Service
-        from webdriver_manager.chrome import ChromeDriverManager
-        import time
-        chrome_options = Options()
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver = create_chrome_driver(user_agent=CHROME_USER_AGENT)
+        ready = PageReady(driver)
         urls = []
         try:
             logger.info("🌐 Navegando a página inicial de búsqueda...")
-            driver.get(self.search_url)
-            time.sleep(12)
+            with self.rate.request():
+                driver.get(self.search_url)
+            ready.wait(READY_SELECTORS['search_page'])
             # Seleccionar todas las épocas y hacer click en 'Ver todo' (ajusta según tu flujo)
             try:
                 # Seleccionar todas las épocas
                 epocas_btn = driver.find_element(By.XPATH, "//*[contains(text(),'Todo')]")
+                self.rate.acquire()
                 epocas_btn.click()
-                time.sleep(2)
+                ready.wait()
                 logger.info("🔘 Seleccionando todas las épocas...")
                 logger.info("✅ Épocas seleccionadas")
             except Exception:
                 logger.warning("No se pudo seleccionar todas las épocas")
             try:
                 ver_todo_btn = driver.find_element(By.ID, "button-addon1_add")
+                self.rate.acquire()
                 ver_todo_btn.click()
-                time.sleep(10)
+                ready.wait(READY_SELECTORS['results'])
                 logger.info("👁️ Haciendo click en 'Ver todo'...")
                 logger.info("✅ Navegando al listado de tesis")
             except Exception:
@@ -389,23 +342,14 @@ class SCJNScraper:
 
     def get_tesis_detail_robust(self, url: str) -> Optional[Dict]:
         """Obtener detalles completos de una tesis abriendo cada URL en una nueva sesión de Selenium"""
-        from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.service import Service
-        from webdriver_manager.chrome import ChromeDriverManager
-        import time
-        chrome_options = Options()
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver = create_chrome_driver(user_agent=CHROME_USER_AGENT)
+        ready = PageReady(driver)
         detail_data = None
         try:
-            driver.get(url)
-            time.sleep(8)
+            with self.rate.request():
+                driver.get(url)
+            ready.wait(READY_SELECTORS['detail'])
             # Extraer información relevante (ajusta selectores según la página)
             detail_data = {'url': url}
             try:
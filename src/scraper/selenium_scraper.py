@@ -4,22 +4,26 @@ Scraper Selenium para la página de tesis y jurisprudencia de SCJN
 - Navegación automática
 - Extracción de resultados
 - Manejo de detalles de tesis
+- Peticiones a SCJN a través del controlador adaptativo compartido (rate_control)
+- Esperas explícitas de página lista (page_ready) en lugar de pausas fijas
+- Perfil ligero de navegador (browser_profile): sin imágenes, fuentes, multimedia ni terceros
+- Detalle por HTTP primero (tiered_fetcher); el navegador se abre solo cuando hace falta
 """
 
-import time
 import logging
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import NoSuchElementException
 from bs4 import BeautifulSoup
 import re
 from typing import List, Dict, Optional
 
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.page_ready import PageReady, wait_for_download
+from src.scraper.scjn_config import DETAIL_FIELDS, DETAIL_PDF_SELECTORS, READY_SELECTORS
+from src.scraper.browser_profile import CHROME_USER_AGENT, create_chrome_driver, create_firefox_driver
+from src.scraper.tiered_fetcher import TieredFetcher
+from src.utils.telemetry import EXTRACCION, NAVEGACION, PDF, record_stage, stage
+
 logger = logging.getLogger(__name__)
 
 class SeleniumSCJNScraper:
@@ -28,33 +32,25 @@ class SeleniumSCJNScraper:
     def __init__(self):
         self.driver = None
         self.wait = None
+        self.ready = None
         self.base_url = "https://sjf2.scjn.gob.mx"
         self.search_url = "https://sjf2.scjn.gob.mx/busqueda-principal-tesis"
+        self.rate = get_rate_controller()
+        self.fetcher = TieredFetcher(rate=self.rate)
+        # (término, página) de resultados que muestra el navegador; None tras navegar a otra página
+        self.results_position = None
         
     def setup_driver(self) -> bool:
         """Configurar el driver de Firefox como alternativa"""
         try:
-            from selenium.webdriver.firefox.options import Options as FirefoxOptions
-            from selenium.webdriver.firefox.service import Service as FirefoxService
-            from webdriver_manager.firefox import GeckoDriverManager
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
-            from selenium.webdriver.support import expected_conditions as EC
             import logging
 
-            firefox_options = FirefoxOptions()
-            firefox_options.add_argument("--headless")  # Ejecutar sin interfaz
-            firefox_options.add_argument("--no-sandbox")
-            firefox_options.add_argument("--disable-dev-shm-usage")
-            firefox_options.add_argument("--width=1920")
-            firefox_options.add_argument("--height=1080")
-
-            # Usar GeckoDriverManager para obtener la ruta correcta
-            service = FirefoxService(GeckoDriverManager().install())
-
-            # Crear driver
-            self.driver = webdriver.Firefox(service=service, options=firefox_options)
+            # Ejecutar sin interfaz, perfil ligero (GeckoDriverManager resuelve el driver)
+            self.driver = create_firefox_driver(headless=True)
             self.wait = WebDriverWait(self.driver, 10)
+            self.ready = PageReady(self.driver)
 
             logger.info("✅ Driver configurado correctamente (usando Firefox)")
             return True
@@ -74,12 +70,15 @@ class SeleniumSCJNScraper:
     
     def navigate_to_search_page(self) -> bool:
         """Navegar a la página de búsqueda"""
+        self.results_position = None
         try:
             logger.info(f"🌐 Navegando a: {self.search_url}")
-            self.driver.get(self.search_url)
-            
-            # Esperar a que cargue la página
-            time.sleep(5)
+            with stage(NAVEGACION):
+                with self.rate.request():
+                    self.driver.get(self.search_url)
+                
+                # Esperar a que cargue la página
+                self.ready.wait(READY_SELECTORS['search_page'])
             
             # Verificar que estamos en la página correcta
             page_title = self.driver.title.lower()
@@ -107,7 +106,7 @@ class SeleniumSCJNScraper:
                 if epoca_links:
                     # Hacer click en la primera época disponible
                     epoca_links[0].click()
-                    time.sleep(2)
+                    self.ready.wait()
                     logger.info("✅ Época seleccionada")
                 else:
                     logger.warning("⚠️ No se encontraron enlaces de épocas")
@@ -142,7 +141,6 @@ class SeleniumSCJNScraper:
             # 3. Limpiar y escribir término de búsqueda
             search_input.clear()
             search_input.send_keys(search_term)
-            time.sleep(2)
             
             # 4. Buscar botón de búsqueda
             search_button_selectors = [
@@ -167,6 +165,7 @@ class SeleniumSCJNScraper:
                 except:
                     continue
             
+            self.rate.acquire()
             if search_button:
                 search_button.click()
                 logger.info("🔍 Botón de búsqueda clickeado")
@@ -177,7 +176,7 @@ class SeleniumSCJNScraper:
             
             # 5. Esperar resultados y verificar navegación
             logger.info("⏳ Esperando resultados...")
-            time.sleep(10)  # Más tiempo para que carguen los resultados
+            self.ready.wait(READY_SELECTORS['results'])
             
             # Verificar si la URL cambió a la página de resultados
             current_url = self.driver.current_url
@@ -194,6 +193,7 @@ class SeleniumSCJNScraper:
                 logger.warning("⚠️ No se encontraron elementos de resultado")
             
             logger.info("✅ Búsqueda realizada")
+            self.results_position = (search_term, 1)
             return True
             
         except Exception as e:
@@ -248,7 +248,10 @@ class SeleniumSCJNScraper:
             
             for element in result_elements:
                 try:
-                    result = self.extract_result_data(element)
+                    with stage(EXTRACCION) as extraccion:
+                        result = self.extract_result_data(element)
+                        if not result:
+                            extraccion.fail()
                     if result:
                         results.append(result)
                 except Exception as e:
@@ -263,9 +266,9 @@ class SeleniumSCJNScraper:
             return results
     
     def extract_result_data(self, element) -> Optional[Dict]:
-        """Extraer datos de un resultado individual"""
+        """Extraer datos de un resultado individual (traza por selector en DEBUG, muestreada)"""
         try:
-            logger.info("🔍 Iniciando extracción de datos de elemento...")
+            logger.debug("🔍 Iniciando extracción de datos de elemento...")
             
             # Extraer ID de la tesis
             id_selectors = [
@@ -280,16 +283,16 @@ class SeleniumSCJNScraper:
                 try:
                     id_elem = element.find_element(By.CSS_SELECTOR, selector)
                     id_text = id_elem.text.strip()
-                    logger.info(f"  ID selector '{selector}': '{id_text}'")
+                    logger.debug("  ID selector '%s': '%s'", selector, id_text)
                     # Extraer número del texto "1. Registro digital: 2030542"
                     import re
                     numbers = re.findall(r'\d{6,}', id_text)
                     if numbers:
                         scjn_id = numbers[0]
-                        logger.info(f"  ✅ ID extraído: {scjn_id}")
+                        logger.debug("  ✅ ID extraído: %s", scjn_id)
                         break
                 except Exception as e:
-                    logger.info(f"  ❌ Error con selector ID '{selector}': {e}")
+                    logger.debug("  ❌ Error con selector ID '%s': %s", selector, e)
                     continue
             
             # Extraer título
@@ -307,13 +310,12 @@ class SeleniumSCJNScraper:
                     title_elem = element.find_element(By.CSS_SELECTOR, selector)
                     titulo = title_elem.text.strip()
                     url = title_elem.get_attribute("href")
-                    logger.info(f"  Título selector '{selector}': '{titulo[:50]}...'")
-                    logger.info(f"  URL: {url}")
+                    logger.debug("  Título selector '%s': '%.50s...' URL: %s", selector, titulo, url)
                     if titulo and url:
-                        logger.info(f"  ✅ Título extraído: {titulo[:50]}...")
+                        logger.debug("  ✅ Título extraído: %.50s...", titulo)
                         break
                 except Exception as e:
-                    logger.info(f"  ❌ Error con selector título '{selector}': {e}")
+                    logger.debug("  ❌ Error con selector título '%s': %s", selector, e)
                     continue
             
             # Extraer metadatos
@@ -327,7 +329,7 @@ class SeleniumSCJNScraper:
                 try:
                     meta_elem = element.find_element(By.CSS_SELECTOR, selector)
                     metadata_text = meta_elem.text.strip()
-                    logger.info(f"  Metadatos selector '{selector}': '{metadata_text[:50]}...'")
+                    logger.debug("  Metadatos selector '%s': '%.50s...'", selector, metadata_text)
                     if metadata_text:
                         # Parsear metadatos: "SCJN;11a. Época;Semanario Judicial de la Federación;P./J. 5/2025 (11a.) ;J; Publicación: viernes 13 de junio de 2025 10:19 h"
                         parts = metadata_text.split(';')
@@ -340,24 +342,24 @@ class SeleniumSCJNScraper:
                                 metadata['tipo'] = parts[4].strip()
                             if len(parts) > 5:
                                 metadata['fecha_publicacion'] = parts[5].strip()
-                            logger.info(f"  ✅ Metadatos extraídos: {metadata}")
+                            logger.debug("  ✅ Metadatos extraídos: %s", metadata)
                         break
                 except Exception as e:
-                    logger.info(f"  ❌ Error con selector metadatos '{selector}': {e}")
+                    logger.debug("  ❌ Error con selector metadatos '%s': %s", selector, e)
                     continue
             
             # Si no encontramos datos válidos, intentar extraer del texto completo
             if not scjn_id or not titulo:
-                logger.info("  🔍 Intentando extracción del texto completo...")
+                logger.debug("  🔍 Intentando extracción del texto completo...")
                 full_text = element.text.strip()
                 if full_text:
-                    logger.info(f"  Texto completo: {full_text[:100]}...")
+                    logger.debug("  Texto completo: %.100s...", full_text)
                     # Extraer ID del texto completo
                     import re
                     numbers = re.findall(r'\d{6,}', full_text)
                     if numbers and not scjn_id:
                         scjn_id = numbers[0]
-                        logger.info(f"  ✅ ID extraído del texto completo: {scjn_id}")
+                        logger.debug("  ✅ ID extraído del texto completo: %s", scjn_id)
                     
                     # Extraer título (buscar texto en mayúsculas que parezca un título)
                     lines = full_text.split('\n')
@@ -369,7 +371,7 @@ class SeleniumSCJNScraper:
                             not line.startswith('SCJN') and
                             not line.startswith('Publicación')):
                             titulo = line
-                            logger.info(f"  ✅ Título extraído del texto completo: {titulo[:50]}...")
+                            logger.debug("  ✅ Título extraído del texto completo: %.50s...", titulo)
                             break
             
             # Verificar que tenemos datos mínimos
@@ -380,7 +382,7 @@ class SeleniumSCJNScraper:
             # Si no tenemos URL, construirla con el ID
             if not url and scjn_id:
                 url = f"https://sjf2.scjn.gob.mx/detalle/tesis/{scjn_id}"
-                logger.info(f"  🔗 URL construida: {url}")
+                logger.debug("  🔗 URL construida: %s", url)
             
             result = {
                 'scjn_id': scjn_id,
@@ -389,81 +391,91 @@ class SeleniumSCJNScraper:
                 'metadata': metadata
             }
             
-            logger.info(f"  ✅ Resultado final: ID={scjn_id}, Título={titulo[:30]}...")
+            logger.debug("  ✅ Resultado final: ID=%s, Título=%.30s...", scjn_id, titulo)
             return result
             
         except Exception as e:
             logger.error(f"❌ Error extrayendo datos de resultado: {e}")
             return None
-    
+
+    def open_results_page(self, term: str, page: int) -> bool:
+        """Mostrar la página indicada de resultados de term (False si no existe)
+
+        Si el navegador ya muestra una página anterior de la misma búsqueda se avanza desde ahí:
+        las tareas consecutivas de un término no repiten la búsqueda ni recorren desde la página 1.
+        """
+        position = self.results_position
+        if not position or position[0] != term or position[1] > page:
+            if not self.navigate_to_search_page():
+                raise RuntimeError("No se pudo abrir la página de búsqueda")
+            if not self.search_for_tesis(term):
+                raise RuntimeError(f"No se pudo buscar '{term}'")
+        return self.go_to_results_page(page)
+
+    def go_to_results_page(self, page: int) -> bool:
+        """Avanzar desde la página de resultados actual hasta la indicada (False si no existe)"""
+        term, current = self.results_position or (None, 1)
+        while current < page:
+            target = None
+            jump = False
+            try:
+                # Solo enlaces del paginador: otros enlaces de la página pueden tener el mismo número
+                paginator = self.ready.find_first(READY_SELECTORS['paginator'])
+                if paginator is not None:
+                    # Enlace directo al número de página si el paginador lo muestra
+                    links = [a for a in paginator.find_elements(By.XPATH, f".//a[normalize-space(text())='{page}']")
+                             if a.is_displayed()]
+                    if links:
+                        target, jump = links[0], True
+                    else:
+                        links = [a for a in paginator.find_elements(
+                            By.XPATH,
+                            ".//a[contains(@aria-label, 'iguiente') or contains(@title, 'iguiente') "
+                            "or normalize-space(text())='›' or normalize-space(text())='>']"
+                        ) if a.is_displayed() and a.is_enabled()]
+                        target = links[0] if links else None
+            except Exception as e:
+                logger.warning(f"⚠️ Error buscando el paginador: {e}")
+
+            if target is None:
+                logger.info(f"ℹ️ No hay página {page} de resultados (última alcanzada: {current})")
+                return False
+
+            # La página actual deja de existir antes de esperar los resultados nuevos
+            previous = self.ready.find_first(READY_SELECTORS['results'])
+            self.results_position = None
+            self.rate.acquire()
+            target.click()
+            self.ready.wait(READY_SELECTORS['results'], stale=previous)
+            current = page if jump else current + 1
+            self.results_position = (term, current)
+        return True
+
     def get_tesis_detail(self, url: str) -> Optional[Dict]:
-        """Obtener detalles completos de una tesis"""
+        """Obtener detalles completos de una tesis (HTTP simple si basta, navegador si no)"""
+        if not url:
+            return None
+        logger.info(f"📄 Obteniendo detalles: {url}")
+        detail_data = self.fetcher.fetch(url, browser=self.get_tesis_detail_browser)
+        if detail_data is not None and detail_data.get('nivel') == 'http':
+            logger.info("✅ Detalles extraídos sin navegador")
+        return detail_data
+    
+    def get_tesis_detail_browser(self, url: str) -> Optional[Dict]:
+        """Obtener detalles completos de una tesis con el navegador (se abre al primer uso)"""
         try:
-            if not url:
+            if self.driver is None and not self.setup_driver():
                 return None
             
-            logger.info(f"📄 Obteniendo detalles: {url}")
-            
             # Navegar a la página de detalles
-            self.driver.get(url)
-            time.sleep(3)
-            
-            # Extraer contenido
-            detail_data = {}
-            
-            # Título
-            title_selectors = ["h1", ".titulo", ".tesis-title", "#titulo"]
-            for selector in title_selectors:
-                try:
-                    title_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    detail_data['titulo'] = title_elem.text.strip()
-                    break
-                except:
-                    continue
-            
-            # Rubro
-            rubro_selectors = [".rubro", ".rubro-tesis", ".categoria"]
-            for selector in rubro_selectors:
-                try:
-                    rubro_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    detail_data['rubro'] = rubro_elem.text.strip()
-                    break
-                except:
-                    continue
-            
-            # Texto de la tesis
-            texto_selectors = [".texto", ".contenido", ".tesis-text", "#contenido"]
-            for selector in texto_selectors:
-                try:
-                    texto_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    detail_data['texto'] = texto_elem.text.strip()
-                    break
-                except:
-                    continue
-            
-            # Precedente
-            precedente_selectors = [".precedente", ".precedent", ".antecedente"]
-            for selector in precedente_selectors:
-                try:
-                    precedente_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    detail_data['precedente'] = precedente_elem.text.strip()
-                    break
-                except:
-                    continue
-            
-            # URL del PDF
-            pdf_selectors = ["a[href*='.pdf']", ".pdf-link", "#pdf-download"]
-            for selector in pdf_selectors:
-                try:
-                    pdf_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    detail_data['pdf_url'] = pdf_elem.get_attribute("href")
-                    break
-                except:
-                    continue
-            
-            # HTML completo para análisis posterior
-            detail_data['html_content'] = self.driver.page_source
-            
+            self.results_position = None
+            with stage(NAVEGACION):
+                with self.rate.request():
+                    self.driver.get(url)
+                self.ready.wait(READY_SELECTORS['detail'])
+            
+            with stage(EXTRACCION):
+                detail_data = self.extract_tesis_detail()
             logger.info("✅ Detalles extraídos correctamente")
             return detail_data
             
@@ -471,39 +483,58 @@ class SeleniumSCJNScraper:
             logger.error(f"❌ Error obteniendo detalles: {e}")
             return None
     
+    def extract_tesis_detail(self, driver=None) -> Dict:
+        """Extraer los campos de la página de detalle ya cargada (en driver o en el driver propio)"""
+        driver = driver or self.driver
+        detail_data = {}
+        for field, selectors in DETAIL_FIELDS.items():
+            for selector in selectors:
+                try:
+                    detail_data[field] = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+                    break
+                except:
+                    continue
+        
+        # URL del PDF
+        for selector in DETAIL_PDF_SELECTORS:
+            try:
+                pdf_elem = driver.find_element(By.CSS_SELECTOR, selector)
+                detail_data['pdf_url'] = pdf_elem.get_attribute("href")
+                break
+            except:
+                continue
+        
+        # HTML completo para análisis posterior
+        detail_data['html_content'] = driver.page_source
+        return detail_data
+    
+    def get_tesis_by_registro(self, registro: int) -> Optional[Dict]:
+        """Detalle de la tesis con ese registro digital; None si el registro no existe"""
+        url = f"{self.base_url}/detalle/tesis/{registro}"
+        detail_data = self.get_tesis_detail(url)
+        if detail_data is None:
+            # get_tesis_detail devuelve None solo ante errores de navegación: no es un registro vacío
+            raise RuntimeError(f"No se pudo cargar {url}")
+        if not (detail_data.get('rubro') or detail_data.get('texto')):
+            return None
+        detail_data['url'] = url
+        return detail_data
+    
     def download_pdf(self, tesis_url: str, scjn_id: str) -> Optional[str]:
         """Descargar PDF de la página de detalle usando Selenium y asociarlo a la tesis (cada descarga en nueva sesión)"""
         from selenium.webdriver.common.action_chains import ActionChains
-        from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
         from selenium.common.exceptions import StaleElementReferenceException
-        from webdriver_manager.chrome import ChromeDriverManager
         import time
         import os
         import glob
 
         PDF_DIR = os.path.abspath("data/pdfs")
         max_retries = 3
+        started = time.perf_counter()
         for attempt in range(max_retries):
-            chrome_options = Options()
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-            # chrome_options.add_argument("--headless")  # Puedes activar headless si todo funciona
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_prefs = {
-                "download.default_directory": PDF_DIR,
-                "download.prompt_for_download": False,
-                "download.directory_upgrade": True,
-                "plugins.always_open_pdf_externally": True
-            }
-            chrome_options.add_experimental_option("prefs", chrome_prefs)
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver = create_chrome_driver(download_dir=PDF_DIR, user_agent=CHROME_USER_AGENT)
+            ready = PageReady(driver)
             pdf_path = None
             try:
                 # Limpiar PDFs temporales antes de descargar
@@ -512,25 +543,11 @@ class SeleniumSCJNScraper:
                         os.remove(f)
                     except Exception:
                         pass
-                driver.get(tesis_url)
-                time.sleep(8)
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                download_button = None
-                # 1. Esperar botón por aria-label, title, íconos
-                selectors = [
-                    "button[aria-label*='Descargar']", "button[title*='Descargar']",
-                    ".fa-download", ".icon-download"
-                ]
-                for selector in selectors:
-                    try:
-                        download_button = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                        if download_button:
-                            break
-                    except Exception:
-                        continue
+                with self.rate.request():
+                    driver.get(tesis_url)
+                ready.wait(READY_SELECTORS['download'])
+                # 1. Botón por aria-label, title, íconos (la página ya está lista: sin esperas por selector)
+                download_button = ready.find_first(READY_SELECTORS['download'], clickable=True)
                 # 2. Buscar enlaces <a> con texto o href
                 if not download_button:
                     try:
@@ -564,15 +581,12 @@ class SeleniumSCJNScraper:
                     try:
                         # Hacer scroll hacia el botón
                         driver.execute_script("arguments[0].scrollIntoView(true);", download_button)
-                        time.sleep(2)
                         # Intentar click directo
+                        clicked_at = time.time()
                         download_button.click()
-                        time.sleep(5)
-                        # Verificar si se descargó el archivo
-                        pdf_files = glob.glob(os.path.join(PDF_DIR, '*.pdf'))
-                        if pdf_files:
-                            # Tomar el archivo más reciente
-                            pdf_path = max(pdf_files, key=os.path.getctime)
+                        # Esperar a que el archivo termine de descargarse
+                        pdf_path = wait_for_download(PDF_DIR, since=clicked_at)
+                        if pdf_path:
                             # Renombrar con el ID de la tesis
                             new_name = os.path.join(PDF_DIR, f"tesis_{scjn_id}.pdf")
                             if os.path.exists(new_name):
@@ -596,8 +610,12 @@ class SeleniumSCJNScraper:
                     pass
             if pdf_path:
                 break
+            if attempt < max_retries - 1:
+                self.rate.backoff(attempt)
         if not pdf_path:
             logger.error(f"❌ No se pudo descargar PDF después de {max_retries} intentos")
+        # Una descarga por tesis, reintentos incluidos
+        record_stage(PDF, time.perf_counter() - started, ok=bool(pdf_path))
         return pdf_path
 
     def test_connection(self) -> bool:
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Concurrencia por pestañas dentro de un único Chrome
+- Un navegador con K pestañas en lugar de K navegadores (cada proceso Chrome cuesta cientos de MB)
+- Se lanza la navegación en todas las pestañas libres y se recogen a medida que quedan listas
+  (PageReady.check, sin bloquear en ninguna)
+- Cada carga pasa por el controlador adaptativo compartido sin esperas (try_begin/finish)
+- Pestañas recicladas tras BROWSER_TAB_RECYCLE páginas para contener la memoria del renderizador
+- Interfaz de executor: submit(url, extract) -> Future, map(urls, extract), shutdown()
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from selenium.common.exceptions import WebDriverException
+
+from src.config import Config
+from src.scraper.browser_profile import apply_blocking, create_chrome_driver
+from src.scraper.page_ready import PageReady
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.scjn_config import READY_SELECTORS, TIMING
+from src.utils.telemetry import EXTRACCION, NAVEGACION, record_stage, stage, track_driver_pool
+
+logger = logging.getLogger(__name__)
+
+# Marca el documento actual como anterior y navega sin esperar a la carga
+NAVIGATE_JS = "window.__scjnPrevious = true; window.location.href = arguments[0];"
+
+
+def page_source(driver) -> str:
+    """Extracción por defecto: HTML de la página cargada"""
+    return driver.page_source
+
+
+class TabExecutor:
+    """Cargas de páginas repartidas entre las pestañas de un navegador, atendidas por un hilo propio"""
+
+    def __init__(self, driver=None, tabs: int = None, selectors: Iterable[str] = None, timeout: float = None,
+                 recycle_after: int = None, rate=None, poll: float = None):
+        self.owns_driver = driver is None
+        self.driver = driver or create_chrome_driver()
+        self.tab_count = max(1, tabs or Config.BROWSER_TABS)
+        self.selectors = list(READY_SELECTORS['detail'] if selectors is None else selectors)
+        self.timeout = timeout or TIMING['ready_timeout']
+        self.recycle_after = recycle_after or Config.BROWSER_TAB_RECYCLE
+        self.rate = rate or get_rate_controller()
+        self.ready = PageReady(self.driver, timeout=self.timeout, poll=poll)
+        self.poll = self.ready.poll
+        self.broken = False
+        self.stats = {'paginas': 0, 'errores': 0, 'agotadas': 0, 'reciclajes': 0, 'segundos': 0.0}
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._failures = 0
+        self._tabs: List[Dict[str, Any]] = []
+        first = self.driver.current_window_handle
+        self._tabs.append(self._new_slot(first))
+        for _ in range(self.tab_count - 1):
+            self.driver.switch_to.new_window('tab')
+            self._tabs.append(self._new_slot(self.driver.current_window_handle))
+
+        track_driver_pool(self)
+        self._thread = threading.Thread(target=self._loop, name='tab-executor', daemon=True)
+        self._thread.start()
+        logger.info(f"🗂️ {self.tab_count} pestañas listas en un mismo navegador")
+
+    # ------------------------------------------------------------------
+    # Pestañas
+    # ------------------------------------------------------------------
+    def _new_slot(self, handle: str) -> Dict[str, Any]:
+        """Preparar una pestaña: el bloqueo de recursos y el contador de red de CDP son por pestaña"""
+        self.driver.switch_to.window(handle)
+        if Config.BROWSER_BLOCK_RESOURCES:
+            apply_blocking(self.driver)
+        self.ready.install_tracker()
+        return {'handle': handle, 'task': None, 'ticket': None, 'started': 0.0, 'watch': {}, 'uses': 0}
+
+    def _recycle(self, tab: Dict[str, Any]):
+        """Sustituir la pestaña por una nueva (se abre antes de cerrar para no dejar el navegador sin ventanas)"""
+        old = tab['handle']
+        self.driver.switch_to.new_window('tab')
+        fresh = self._new_slot(self.driver.current_window_handle)
+        self.driver.switch_to.window(old)
+        self.driver.close()
+        tab.update(fresh)
+        self.stats['reciclajes'] += 1
+
+    # ------------------------------------------------------------------
+    # Bucle
+    # ------------------------------------------------------------------
+    def _start_idle(self) -> bool:
+        """Lanzar la navegación en las pestañas libres mientras haya tareas y el controlador lo permita"""
+        started = False
+        for tab in self._tabs:
+            if tab['task'] is not None:
+                continue
+            with self._cond:
+                if not self._queue:
+                    break
+                task = self._queue.popleft()
+            if task['future'].cancelled():
+                continue
+            ticket = self.rate.try_begin()
+            if ticket is None:
+                with self._cond:
+                    self._queue.appendleft(task)
+                break
+            try:
+                self.driver.switch_to.window(tab['handle'])
+                self.driver.execute_script(NAVIGATE_JS, task['url'])
+            except WebDriverException as e:
+                self.rate.finish(ticket, False, 0.0)
+                self._fail(task, e)
+                continue
+            tab.update(task=task, ticket=ticket, started=time.monotonic(), watch={})
+            started = True
+        return started
+
+    def _harvest(self) -> bool:
+        """Recoger las pestañas cuya página ya está lista (o agotó su tiempo)"""
+        harvested = False
+        for tab in self._tabs:
+            task = tab['task']
+            if task is None:
+                continue
+            elapsed = time.monotonic() - tab['started']
+            try:
+                self.driver.switch_to.window(tab['handle'])
+                outcome = self.ready.check(self.selectors, tab['watch'])
+            except WebDriverException as e:
+                self._finish_tab(tab, ok=False, elapsed=elapsed)
+                self._fail(task, e)
+                harvested = True
+                continue
+            if outcome is None and elapsed < self.timeout:
+                continue
+
+            harvested = True
+            self.ready.record(self.selectors, outcome, elapsed)
+            if outcome is None:
+                self.stats['agotadas'] += 1
+                try:
+                    self.driver.execute_script("window.stop();")
+                except WebDriverException:
+                    pass
+                self._finish_tab(tab, ok=False, elapsed=elapsed)
+                self._fail(task, TimeoutError(f"Página no lista tras {elapsed:.1f}s: {task['url']}"))
+                continue
+
+            self._finish_tab(tab, ok=True, elapsed=elapsed)
+            try:
+                with stage(EXTRACCION):
+                    result = task['extract'](self.driver)
+            except Exception as e:
+                self._fail(task, e)
+                continue
+            self._failures = 0
+            self.stats['paginas'] += 1
+            self.stats['segundos'] += elapsed
+            task['future'].set_result(result)
+
+            if tab['uses'] >= self.recycle_after:
+                try:
+                    self._recycle(tab)
+                except WebDriverException as e:
+                    logger.warning(f"⚠️ No se pudo reciclar una pestaña: {e}")
+        return harvested
+
+    def _finish_tab(self, tab: Dict[str, Any], ok: bool, elapsed: float):
+        self.rate.finish(tab['ticket'], ok, elapsed)
+        record_stage(NAVEGACION, elapsed, ok=ok)
+        tab.update(task=None, ticket=None, watch={})
+        tab['uses'] += 1
+
+    def _fail(self, task: Dict[str, Any], error: Exception):
+        self.stats['errores'] += 1
+        if isinstance(error, WebDriverException):
+            self._failures += 1
+            if self._failures >= 3 * self.tab_count:
+                self.broken = True
+                logger.error(f"❌ Navegador de pestañas inutilizable tras {self._failures} fallos seguidos: {error}")
+        if not task['future'].done():
+            task['future'].set_exception(error)
+
+    def _busy(self) -> bool:
+        return any(tab['task'] is not None for tab in self._tabs)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self.broken or (self._closed and not self._queue and not self._busy()):
+                    break
+                if not self._queue and not self._busy():
+                    self._cond.wait(self.poll * 10)
+                    continue
+            started = self._start_idle()
+            harvested = self._harvest()
+            if not (started or harvested):
+                time.sleep(self.poll)
+
+        # Tareas que ya no se atenderán
+        with self._cond:
+            pending, self._queue = list(self._queue), deque()
+        pending += [tab['task'] for tab in self._tabs if tab['task'] is not None]
+        for tab in self._tabs:
+            if tab['ticket'] is not None:
+                self.rate.finish(tab['ticket'], False, time.monotonic() - tab['started'])
+                tab.update(task=None, ticket=None)
+        for task in pending:
+            if not task['future'].done():
+                task['future'].set_exception(RuntimeError("Executor de pestañas cerrado"))
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def submit(self, url: str, extract: Callable = None) -> Future:
+        """Cargar url en la primera pestaña libre; el Future recibe extract(driver) con la página lista"""
+        future = Future()
+        with self._cond:
+            if self._closed or self.broken:
+                raise RuntimeError("Executor de pestañas cerrado")
+            self._queue.append({'url': url, 'extract': extract or page_source, 'future': future})
+            self._cond.notify_all()
+        return future
+
+    def map(self, urls: Iterable[str], extract: Callable = None) -> Iterator[Any]:
+        """Resultados en el orden de urls (las cargas avanzan en paralelo en todas las pestañas)"""
+        futures = [self.submit(url, extract) for url in urls]
+        for future in futures:
+            yield future.result()
+
+    def shutdown(self, wait: bool = True):
+        """Terminar las tareas en curso, cerrar el hilo y el navegador propio"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self._thread.join()
+        if self.owns_driver and not self._thread.is_alive():
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error cerrando el navegador de pestañas: {e}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Páginas, errores, tiempos medios y esperas de las pestañas"""
+        stats = dict(self.stats)
+        stats['pestanas'] = self.tab_count
+        stats['segundos_medios'] = stats['segundos'] / stats['paginas'] if stats['paginas'] else 0.0
+        stats['esperas'] = self.ready.summary()
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Obtención de páginas de detalle por niveles: HTTP simple primero, navegador solo si hace falta
+- Nivel http: sesión requests compartida (keep-alive, gzip, pool de conexiones) + BeautifulSoup
+- Se comprueba que la respuesta trae los campos necesarios (rubro o texto) con contenido de tesis: el
+  registro digital de la URL en la página y un mínimo de caracteres; si no (página que requiere
+  JavaScript, error o bloqueo) se escala al nivel browser
+- Tras FETCH_HTTP_SKIP_AFTER fallos seguidos del nivel http solo se prueba 1 de cada N páginas
+  (si el sitio solo se renderiza con JavaScript no se paga una petición inútil por página)
+- Nivel que sirvió cada URL anotado en el detalle ('nivel') y estadísticas compartidas: tasa de
+  páginas sin navegador y tiempo medio por nivel
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from src.config import Config
+from src.scraper.rate_control import get_rate_controller
+from src.scraper.scjn_config import (DETAIL_FIELDS, DETAIL_MIN_CHARS, DETAIL_PDF_SELECTORS, DETAIL_REQUIRED,
+                                     HEADERS, URL_PATTERNS)
+from src.utils.telemetry import EXTRACCION, NAVEGACION, stage
+
+logger = logging.getLogger(__name__)
+
+HTTP = 'http'
+BROWSER = 'browser'
+
+_session = None
+_session_lock = threading.Lock()
+
+_MARKUP = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.S | re.I)
+
+
+def get_http_session() -> requests.Session:
+    """Sesión HTTP compartida por todos los hilos (conexiones persistentes al host de SCJN)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, Config.RATE_MAX_CONCURRENCY * 2))
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def parse_detail_html(html: str, base_url: str) -> Dict[str, Any]:
+    """Campos de la página de detalle con los mismos selectores que la extracción con navegador"""
+    soup = BeautifulSoup(html, 'html.parser')
+    detail_data = {}
+    for field, selectors in DETAIL_FIELDS.items():
+        for selector in selectors:
+            element = soup.select_one(selector)
+            if element is not None:
+                detail_data[field] = element.get_text(' ', strip=True)
+                break
+    for selector in DETAIL_PDF_SELECTORS:
+        element = soup.select_one(selector)
+        if element is not None and element.get('href'):
+            detail_data['pdf_url'] = urljoin(base_url, element['href'])
+            break
+    detail_data['html_content'] = html
+    return detail_data
+
+
+def registro_from_url(url: str) -> Optional[str]:
+    """Registro digital de una URL de detalle (None si la URL no lo trae)"""
+    match = re.search(URL_PATTERNS['detail_pattern'], url)
+    return match.group(1) if match else None
+
+
+def has_required_fields(detail: Optional[Dict], registro: str = None) -> bool:
+    """True si el detalle es de una tesis y no la app sin renderizar o una página de error"""
+    if not detail or max(len(detail.get(field) or '') for field in DETAIL_REQUIRED) < DETAIL_MIN_CHARS:
+        return False
+    if registro is None:
+        return True
+    # Solo el texto visible: la URL pedida puede aparecer en scripts o enlaces de la app vacía
+    visible = _MARKUP.sub(' ', detail.get('html_content') or '')
+    return re.search(rf'\b{registro}\b', visible) is not None
+
+
+class TierStats:
+    """Contadores por nivel compartidos entre fetchers"""
+
+    def __init__(self, recent: int = 200):
+        self._lock = threading.Lock()
+        self.counts = {HTTP: 0, BROWSER: 0, 'http_fallidos': 0, 'http_omitidos': 0, 'sin_resultado': 0}
+        self.seconds = {HTTP: 0.0, BROWSER: 0.0}
+        self.recent = deque(maxlen=recent)  # (url, nivel, segundos)
+
+    def record(self, url: str, tier: Optional[str], seconds: float, http_failed: bool = False,
+               http_skipped: bool = False):
+        with self._lock:
+            if tier:
+                self.counts[tier] += 1
+                self.seconds[tier] += seconds
+            else:
+                self.counts['sin_resultado'] += 1
+            self.counts['http_fallidos'] += http_failed
+            self.counts['http_omitidos'] += http_skipped
+            self.recent.append((url, tier, round(seconds, 3)))
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.counts[HTTP] + self.counts[BROWSER]
+            mean = {tier: self.seconds[tier] / self.counts[tier] if self.counts[tier] else None
+                    for tier in (HTTP, BROWSER)}
+            return {
+                **self.counts,
+                'sin_navegador': round(self.counts[HTTP] / served, 3) if served else 0.0,
+                'segundos_medios_http': round(mean[HTTP], 3) if mean[HTTP] is not None else None,
+                'segundos_medios_browser': round(mean[BROWSER], 3) if mean[BROWSER] is not None else None,
+                'aceleracion_http': round(mean[BROWSER] / mean[HTTP], 1) if mean[HTTP] and mean[BROWSER] else None,
+            }
+
+
+_stats = TierStats()
+
+
+def fetch_tier_stats() -> Dict[str, Any]:
+    """Estadísticas de niveles de todos los fetchers"""
+    return _stats.summary()
+
+
+class TieredFetcher:
+    """Detalle de tesis por HTTP si basta, si no con el navegador que se indique"""
+
+    def __init__(self, session: requests.Session = None, rate=None, http_first: bool = None,
+                 skip_after: int = None, stats: TierStats = None, timeout: float = None):
+        self.session = session or get_http_session()
+        self.rate = rate or get_rate_controller()
+        self.http_first = Config.FETCH_HTTP_FIRST if http_first is None else http_first
+        self.skip_after = skip_after or Config.FETCH_HTTP_SKIP_AFTER
+        self.stats = stats or _stats
+        self.timeout = timeout or Config.DOWNLOAD_TIMEOUT
+        self._misses = 0  # fallos seguidos del nivel http
+        self._skipped = 0
+
+    def _should_try_http(self) -> bool:
+        if not self.http_first:
+            return False
+        if self._misses < self.skip_after:
+            return True
+        # Nivel http en racha de fallos: sondear de vez en cuando por si vuelve a servir
+        self._skipped += 1
+        if self._skipped >= self.skip_after:
+            self._skipped = 0
+            return True
+        return False
+
+    def fetch_http(self, url: str) -> Optional[Dict]:
+        """Nivel http: detalle si la respuesta trae los campos necesarios, None si hay que escalar"""
+        with stage(NAVEGACION) as navegacion:
+            try:
+                with self.rate.request():
+                    response = self.session.get(url, timeout=self.timeout)
+                    if response.status_code == 429 or response.status_code >= 500:
+                        # Congestión del servidor: cuenta como error para el controlador
+                        response.raise_for_status()
+            except requests.RequestException as e:
+                navegacion.fail()
+                logger.debug(f"Nivel http falló en {url}: {e}")
+                return None
+        if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None
+        with stage(EXTRACCION):
+            detail = parse_detail_html(response.text, url)
+        return detail if has_required_fields(detail, registro_from_url(url)) else None
+
+    def fetch(self, url: str, browser: Callable[[str], Optional[Dict]] = None) -> Optional[Dict]:
+        """Detalle de url por el nivel más barato que lo sirva; browser(url) es el nivel de respaldo"""
+        begin = time.monotonic()
+        tried_http = self._should_try_http()
+        if tried_http:
+            detail = self.fetch_http(url)
+            if detail is not None:
+                self._misses = 0
+                detail['nivel'] = HTTP
+                self.stats.record(url, HTTP, time.monotonic() - begin)
+                return detail
+            self._misses += 1
+
+        detail = browser(url) if browser else None
+        if detail is not None:
+            detail['nivel'] = BROWSER
+        self.stats.record(url, BROWSER if detail is not None else None, time.monotonic() - begin,
+                          http_failed=tried_http, http_skipped=self.http_first and not tried_http)
+        return detail
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Backends de almacenamiento intercambiables para los PDFs de tesis
+- Interfaz StorageBackend: put / get / exists / link / batch_put
+- Google Drive (carpetas resueltas con DriveFolderCache), sistema de archivos local y S3 compatible (MinIO)
+- S3: subida multipart en paralelo con TransferConfig de boto3
+- Motor de la cola upload_queue para cualquier backend
+- Selección por configuración (STORAGE_BACKEND)
+
+Las claves son rutas relativas con '/' (p. ej. "Derecho Civil/10a. Época/Pleno/Tesis_123.pdf").
+En Drive cada segmento es una carpeta bajo GOOGLE_DRIVE_FOLDER_ID; en local y S3 es un prefijo.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from src.config import Config
+from src.storage.upload_queue import (
+    DRIVE_LINK_COLUMNS, STORAGE_LINK_COLUMNS, DriveUploadEngine, UploadEngine, UploadQueue, default_service_factory, file_md5,
+    is_retryable
+)
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    boto3 = None
+    TransferConfig = None
+    BotoConfig = None
+    BotoCoreError = None
+    ClientError = None
+
+try:
+    from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+except ImportError:
+    MediaFileUpload = None
+    MediaIoBaseDownload = None
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+# Códigos de error de S3 que indican saturación o fallo temporal del servidor
+S3_RETRYABLE_CODES = {'SlowDown', 'RequestTimeout', 'RequestTimeTooSkewed', 'Throttling', 'InternalError',
+                      'ServiceUnavailable'}
+
+
+class StorageError(Exception):
+    """Error de almacenamiento no recuperable (objeto inexistente, clave inválida, MD5 distinto...)"""
+
+
+@dataclass
+class StoredObject:
+    """Objeto guardado en un backend"""
+    key: str
+    object_id: str
+    link: Optional[str]
+    bytes: int
+    md5: Optional[str] = None
+
+
+def normalize_key(key: str) -> str:
+    """Normalizar una clave a segmentos separados por '/' (sin rutas absolutas ni '..')"""
+    parts = [part for part in str(key).replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts:
+        raise StorageError(f"Clave de almacenamiento inválida: {key!r}")
+    return '/'.join(parts)
+
+
+class StorageBackend(ABC):
+    """Interfaz común de los destinos de almacenamiento"""
+
+    name = 'base'
+    # Columnas de tesis para (id del objeto, enlace): rutas locales y s3://bucket/clave no son IDs de Drive
+    link_columns = STORAGE_LINK_COLUMNS
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or Config.STORAGE_UPLOAD_WORKERS
+
+    @abstractmethod
+    def put(self, path: str, key: str, content_type: str = 'application/pdf') -> StoredObject:
+        """Guardar el archivo local path bajo key"""
+
+    @abstractmethod
+    def get(self, key: str, dest_path: str) -> str:
+        """Descargar key a dest_path"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Comprobar si existe key"""
+
+    @abstractmethod
+    def link(self, key: str) -> Optional[str]:
+        """Enlace estable para key (None si no existe)"""
+
+    def batch_put(self, items: Iterable[Tuple[str, str]], workers: int = None) -> List[Union[StoredObject, Exception]]:
+        """Guardar varios (ruta, clave) en paralelo; devuelve StoredObject o la excepción, en el mismo orden"""
+        items = list(items)
+        if not items:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(workers or self.workers, len(items)),
+                                thread_name_prefix=f"{self.name}-put") as pool:
+            futures = [pool.submit(self.put, path, key) for path, key in items]
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Determinar si un error del backend es transitorio"""
+        if isinstance(error, StorageError):
+            return False
+        return is_retryable(error)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Almacenamiento en un directorio local (o montado)"""
+
+    name = 'local'
+
+    def __init__(self, root: str = None, workers: int = None):
+        super().__init__(workers)
+        self.root = Path(root or Config.STORAGE_LOCAL_DIR).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / normalize_key(key)
+
+    def put(self, path: str, key: str, content_type: str = 'application/pdf') -> StoredObject:
+        key = normalize_key(key)
+        dest = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        # Copia a un temporal y renombrado atómico: nunca queda un archivo a medias con el nombre final
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+        return StoredObject(key=key, object_id=key, link=dest.as_uri(), bytes=dest.stat().st_size,
+                            md5=file_md5(str(dest)))
+
+    def get(self, key: str, dest_path: str) -> str:
+        source = self._path(key)
+        if not source.is_file():
+            raise StorageError(f"Objeto no encontrado: {key}")
+        shutil.copyfile(source, dest_path)
+        return dest_path
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def link(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path.as_uri() if path.is_file() else None
+
+
+class S3StorageBackend(StorageBackend):
+    """Almacenamiento S3 compatible (AWS S3, MinIO...) con subida multipart en paralelo"""
+
+    name = 's3'
+
+    def __init__(self, bucket: str = None, prefix: str = None, endpoint_url: str = None, region: str = None,
+                 access_key: str = None, secret_key: str = None, public_base_url: str = None,
+                 multipart_threshold: int = None, multipart_chunksize: int = None, max_concurrency: int = None,
+                 workers: int = None, client=None):
+        if boto3 is None:
+            raise ImportError("boto3 no está instalado")
+        super().__init__(workers)
+
+        self.bucket = bucket or Config.S3_BUCKET
+        self.prefix = (Config.S3_PREFIX if prefix is None else prefix).strip('/')
+        self.public_base_url = (public_base_url or Config.S3_PUBLIC_BASE_URL or '').rstrip('/') or None
+        max_concurrency = max_concurrency or Config.S3_MAX_CONCURRENCY
+
+        # Partes de un mismo archivo en paralelo; el pool HTTP cubre todos los archivos simultáneos
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold or Config.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=multipart_chunksize or Config.S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+            max_concurrency=max_concurrency,
+            use_threads=True
+        )
+        self.client = client or boto3.client(
+            's3',
+            endpoint_url=endpoint_url or Config.S3_ENDPOINT_URL,
+            region_name=region or Config.S3_REGION,
+            aws_access_key_id=access_key or Config.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=secret_key or Config.S3_SECRET_ACCESS_KEY,
+            config=BotoConfig(max_pool_connections=max(10, self.workers * max_concurrency),
+                              retries={'max_attempts': Config.DRIVE_UPLOAD_MAX_RETRIES, 'mode': 'adaptive'})
+        )
+
+    def _object_key(self, key: str) -> str:
+        key = normalize_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _error_code(error: Exception) -> Tuple[Optional[str], Optional[int]]:
+        response = getattr(error, 'response', None) or {}
+        status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return response.get('Error', {}).get('Code'), status
+
+    def ensure_bucket(self):
+        """Crear el bucket si no existe (útil con MinIO local)"""
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except ClientError as e:
+            code, status = self._error_code(e)
+            if status != 404 and code not in ('404', 'NoSuchBucket', 'NotFound'):
+                raise
+            kwargs = {'Bucket': self.bucket}
+            region = self.client.meta.region_name
+            if region and region != 'us-east-1':
+                kwargs['CreateBucketConfiguration'] = {'LocationConstraint': region}
+            self.client.create_bucket(**kwargs)
+            logger.info(f"🪣 Bucket creado: {self.bucket}")
+
+    def put(self, path: str, key: str, content_type: str = 'application/pdf') -> StoredObject:
+        key = normalize_key(key)
+        object_key = self._object_key(key)
+        md5 = file_md5(path)
+        self.client.upload_file(
+            str(path), self.bucket, object_key,
+            ExtraArgs={'ContentType': content_type, 'Metadata': {'md5': md5}},
+            Config=self.transfer_config
+        )
+        return StoredObject(key=key, object_id=f"s3://{self.bucket}/{object_key}", link=self._link(object_key),
+                            bytes=os.path.getsize(path), md5=md5)
+
+    def get(self, key: str, dest_path: str) -> str:
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), str(dest_path), Config=self.transfer_config)
+        except ClientError as e:
+            code, status = self._error_code(e)
+            if status == 404 or code in ('404', 'NoSuchKey', 'NotFound'):
+                raise StorageError(f"Objeto no encontrado: {key}") from e
+            raise
+        return dest_path
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            code, status = self._error_code(e)
+            if status == 404 or code in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def _link(self, object_key: str) -> str:
+        if self.public_base_url:
+            return f"{self.public_base_url}/{quote(object_key)}"
+        return f"s3://{self.bucket}/{object_key}"
+
+    def link(self, key: str) -> Optional[str]:
+        return self._link(self._object_key(key)) if self.exists(key) else None
+
+    def presigned_link(self, key: str, expires: int = 3600) -> str:
+        """URL firmada temporal para descargar key sin credenciales"""
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)}, ExpiresIn=expires
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        if ClientError is not None and isinstance(error, ClientError):
+            code, status = self._error_code(error)
+            return code in S3_RETRYABLE_CODES or (status or 0) >= 500
+        if BotoCoreError is not None and isinstance(error, BotoCoreError):
+            # Errores de conexión / lectura de boto (EndpointConnectionError, ReadTimeoutError...)
+            return True
+        return super().is_retryable(error)
+
+
+class DriveStorageBackend(StorageBackend):
+    """Google Drive: cada segmento de la clave es una carpeta bajo la carpeta raíz"""
+
+    name = 'drive'
+    link_columns = DRIVE_LINK_COLUMNS
+
+    def __init__(self, folder_id: str = None, service_factory: Callable = None, workers: int = None,
+                 chunk_size: int = None, folder_cache=None):
+        if MediaFileUpload is None:
+            raise ImportError("google-api-python-client no está instalado")
+        super().__init__(workers or Config.DRIVE_UPLOAD_WORKERS)
+
+        from src.storage.folder_cache import DriveFolderCache
+
+        self.folder_id = folder_id or Config.GOOGLE_DRIVE_FOLDER_ID
+        self.service_factory = service_factory or default_service_factory()
+        self.chunk_size = chunk_size or Config.DRIVE_UPLOAD_CHUNK_BYTES
+        self._local = threading.local()
+        self.folder_cache = folder_cache or DriveFolderCache(self._service, self.folder_id)
+        if folder_cache is None:
+            self.folder_cache.load()
+
+    def _service(self):
+        """Cliente de Drive propio del hilo actual (googleapiclient no es thread-safe)"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self.service_factory()
+            self._local.service = service
+        return service
+
+    def _create_folder(self, name: str, parent_id: str) -> Optional[str]:
+        folder = self._service().files().create(
+            body={'name': name, 'mimeType': FOLDER_MIME, 'parents': [parent_id]},
+            fields='id', supportsAllDrives=True
+        ).execute()
+        return folder.get('id')
+
+    def _resolve(self, key: str, create: bool) -> Tuple[Optional[str], str]:
+        """Carpeta contenedora y nombre de archivo de una clave"""
+        parts = normalize_key(key).split('/')
+        parent_id = self.folder_id
+        for part in parts[:-1]:
+            if create:
+                parent_id = self.folder_cache.get_or_create(part, parent_id, self._create_folder)
+            else:
+                parent_id = self.folder_cache.lookup(part, parent_id)
+            if not parent_id:
+                if create:
+                    raise StorageError(f"No se pudo crear la carpeta {part} para {key}")
+                return None, parts[-1]
+        return parent_id, parts[-1]
+
+    def _find(self, key: str) -> Optional[Dict]:
+        parent_id, name = self._resolve(key, create=False)
+        if not parent_id:
+            return None
+        escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+        response = self._service().files().list(
+            q=f"name='{escaped}' and '{parent_id}' in parents and trashed=false",
+            fields='files(id, webViewLink, md5Checksum, size)',
+            pageSize=1, supportsAllDrives=True, includeItemsFromAllDrives=True
+        ).execute()
+        files = response.get('files', [])
+        return files[0] if files else None
+
+    def put(self, path: str, key: str, content_type: str = 'application/pdf') -> StoredObject:
+        key = normalize_key(key)
+        parent_id, name = self._resolve(key, create=True)
+        md5 = file_md5(path)
+
+        media = MediaFileUpload(str(path), mimetype=content_type, chunksize=self.chunk_size, resumable=True)
+        request = self._service().files().create(
+            body={'name': name, 'parents': [parent_id]}, media_body=media,
+            fields='id, webViewLink, md5Checksum', supportsAllDrives=True
+        )
+        response = None
+        while response is None:
+            _, response = request.next_chunk(num_retries=Config.DRIVE_UPLOAD_MAX_RETRIES)
+
+        remote_md5 = response.get('md5Checksum')
+        if remote_md5 and remote_md5 != md5:
+            raise StorageError(f"MD5 distinto para {key}: local {md5}, Drive {remote_md5}")
+        return StoredObject(key=key, object_id=response['id'], link=response.get('webViewLink'),
+                            bytes=os.path.getsize(path), md5=md5)
+
+    def get(self, key: str, dest_path: str) -> str:
+        found = self._find(key)
+        if not found:
+            raise StorageError(f"Objeto no encontrado: {key}")
+        request = self._service().files().get_media(fileId=found['id'], supportsAllDrives=True)
+        with open(dest_path, 'wb') as f:
+            downloader = MediaIoBaseDownload(f, request, chunksize=self.chunk_size)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk(num_retries=Config.DRIVE_UPLOAD_MAX_RETRIES)
+        return dest_path
+
+    def exists(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def link(self, key: str) -> Optional[str]:
+        found = self._find(key)
+        return found.get('webViewLink') if found else None
+
+
+class BackendUploadEngine(UploadEngine):
+    """Consumidor de la cola upload_queue que guarda en un StorageBackend (local, S3...)"""
+
+    def __init__(self, backend: StorageBackend, queue: UploadQueue = None, workers: int = None, **kwargs):
+        super().__init__(queue=queue, workers=workers or backend.workers, **kwargs)
+        self.backend = backend
+        self.link_columns = backend.link_columns
+
+    @staticmethod
+    def task_key(task: Dict) -> str:
+        """Clave del objeto: prefijo de carpetas de la tarea + nombre"""
+        return '/'.join(part for part in (task.get('prefijo'), task['nombre']) if part)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return self.backend.is_retryable(error)
+
+    def _upload(self, task: Dict) -> Tuple[str, Optional[str], int]:
+        stored = self.backend.put(task['ruta'], self.task_key(task))
+        self._set_progress(task, stored.bytes, stored.bytes, stored.bytes)
+        return stored.object_id, stored.link, stored.bytes
+
+
+def get_storage_backend(name: str = None, **kwargs) -> StorageBackend:
+    """Backend configurado en STORAGE_BACKEND (drive / local / s3)"""
+    name = (name or Config.STORAGE_BACKEND).lower()
+    if name == 'drive':
+        return DriveStorageBackend(**kwargs)
+    if name == 'local':
+        return LocalStorageBackend(**kwargs)
+    if name == 's3':
+        return S3StorageBackend(**kwargs)
+    raise StorageError(f"Backend de almacenamiento desconocido: {name}")
+
+
+def get_upload_engine(queue: UploadQueue = None, backend_name: str = None, **kwargs) -> UploadEngine:
+    """Motor de subidas para el backend configurado (Drive conserva sesiones resumibles y MD5)"""
+    name = (backend_name or Config.STORAGE_BACKEND).lower()
+    if name == 'drive':
+        return DriveUploadEngine(queue=queue, **kwargs)
+    return BackendUploadEngine(get_storage_backend(name), queue=queue, **kwargs)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Operaciones de metadatos de Google Drive por lotes (API HTTP batch)
+- Agrupa hasta 100 llamadas (get / delete / update) en una sola petición HTTP
+- Reintenta solo los elementos con errores transitorios (403 por tasa, 429, 5xx) con backoff
+- Reconciliación de google_drive_id de la base de datos contra Drive
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import Config
+from src.database.models import Tesis, get_session
+from src.storage.upload_queue import backoff_delay, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Límite de llamadas por petición batch que acepta Drive
+MAX_BATCH_SIZE = 100
+
+FILE_CHECK_FIELDS = 'id, name, trashed, size, md5Checksum, webViewLink'
+
+
+@dataclass
+class BatchItemResult:
+    """Resultado de una llamada dentro de un lote"""
+    key: str
+    ok: bool
+    response: Any = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+def _error_status(error: Exception) -> Optional[int]:
+    resp = getattr(error, 'resp', None)
+    return getattr(resp, 'status', None)
+
+
+class DriveBatcher:
+    """Ejecutor de llamadas de metadatos de Drive en lotes de hasta 100"""
+
+    def __init__(self, service, batch_size: int = None, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None):
+        self.service = service
+        self.batch_size = max(1, min(batch_size or Config.DRIVE_BATCH_SIZE, MAX_BATCH_SIZE))
+        self.max_retries = Config.DRIVE_UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {'peticiones_http': 0, 'llamadas': 0, 'reintentos': 0, 'errores': 0}
+
+    def execute(self, calls: Iterable[Tuple[str, Callable]]) -> Dict[str, BatchItemResult]:
+        """Ejecutar llamadas (clave, fábrica de HttpRequest) en lotes; devuelve resultados por clave"""
+        factories = dict(calls)
+        results: Dict[str, BatchItemResult] = {}
+        pending = list(factories)
+        attempt = 0
+
+        while pending:
+            retry = []
+            for start in range(0, len(pending), self.batch_size):
+                retry.extend(self._execute_batch(pending[start:start + self.batch_size], factories, results))
+
+            if not retry:
+                break
+            if attempt >= self.max_retries:
+                # Sin más reintentos: los resultados transitorios quedan como error
+                break
+
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            self.stats['reintentos'] += len(retry)
+            logger.debug(f"⏳ Reintentando {len(retry)} llamadas en lote en {delay:.1f}s")
+            time.sleep(delay)
+            pending = retry
+            attempt += 1
+
+        self.stats['errores'] += sum(1 for r in results.values() if not r.ok)
+        return results
+
+    def _execute_batch(self, keys: List[str], factories: Dict[str, Callable],
+                       results: Dict[str, BatchItemResult]) -> List[str]:
+        """Enviar un lote; devuelve las claves con error transitorio"""
+        retry = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = BatchItemResult(key=request_id, ok=True, response=response)
+                return
+            results[request_id] = BatchItemResult(key=request_id, ok=False, status=_error_status(exception),
+                                                  error=str(exception)[:500])
+            if is_retryable(exception):
+                retry.append(request_id)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for key in keys:
+            batch.add(factories[key](), request_id=key)
+
+        self.stats['peticiones_http'] += 1
+        self.stats['llamadas'] += len(keys)
+        try:
+            batch.execute()
+        except Exception as e:
+            # Falló la petición completa: todo el lote es reintentable si el error es transitorio
+            if not is_retryable(e):
+                raise
+            for key in keys:
+                results[key] = BatchItemResult(key=key, ok=False, status=_error_status(e), error=str(e)[:500])
+            return list(keys)
+        return retry
+
+    # ------------------------------------------------------------------
+    # Operaciones habituales
+    # ------------------------------------------------------------------
+    def get_files(self, file_ids: Iterable[str], fields: str = FILE_CHECK_FIELDS) -> Dict[str, BatchItemResult]:
+        """Metadatos de varios archivos (status 404 = el archivo no existe)"""
+        files = self.service.files()
+        return self.execute(
+            (file_id, lambda file_id=file_id: files.get(fileId=file_id, fields=fields, supportsAllDrives=True))
+            for file_id in dict.fromkeys(file_ids)
+        )
+
+    def delete_files(self, file_ids: Iterable[str]) -> Dict[str, BatchItemResult]:
+        """Eliminar varios archivos"""
+        files = self.service.files()
+        return self.execute(
+            (file_id, lambda file_id=file_id: files.delete(fileId=file_id, supportsAllDrives=True))
+            for file_id in dict.fromkeys(file_ids)
+        )
+
+    def update_files(self, updates: Dict[str, Dict[str, Any]], fields: str = 'id') -> Dict[str, BatchItemResult]:
+        """Actualizar metadatos (p. ej. nombre) de varios archivos"""
+        files = self.service.files()
+        return self.execute(
+            (file_id, lambda file_id=file_id, body=body: files.update(fileId=file_id, body=body, fields=fields,
+                                                                      supportsAllDrives=True))
+            for file_id, body in updates.items()
+        )
+
+
+def is_drive_id(value: str) -> bool:
+    """True si value puede ser un ID de archivo de Drive (no una ruta local ni s3://bucket/clave)"""
+    return bool(value) and '/' not in value and ':' not in value
+
+
+def verify_drive_links(batcher: DriveBatcher, session_factory: Callable = None, page_size: int = 1000,
+                       clear_missing: bool = False, limit: int = None) -> Dict[str, Any]:
+    """Verificar en lotes que cada google_drive_id de tesis existe en Drive y no está en la papelera"""
+    session_factory = session_factory or get_session
+    summary = {'revisadas': 0, 'ok': 0, 'faltantes': 0, 'en_papelera': 0, 'errores': 0, 'limpiadas': 0,
+               'omitidas': 0, 'problemas': []}
+    start = time.time()
+    last_id = 0
+
+    while limit is None or summary['revisadas'] < limit:
+        size = page_size if limit is None else min(page_size, limit - summary['revisadas'])
+        session = session_factory()
+        try:
+            rows = session.query(Tesis.id, Tesis.scjn_id, Tesis.google_drive_id).filter(
+                Tesis.id > last_id, Tesis.google_drive_id.isnot(None)
+            ).order_by(Tesis.id).limit(size).all()
+        finally:
+            session.close()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        foreign = [row for row in rows if not is_drive_id(row[2])]
+        if foreign:
+            # Objetos de otros backends guardados antes de storage_key: no se consultan ni se limpian
+            summary['omitidas'] += len(foreign)
+            rows = [row for row in rows if is_drive_id(row[2])]
+
+        results = batcher.get_files(row[2] for row in rows)
+        broken = []
+        for tesis_id, scjn_id, file_id in rows:
+            result = results.get(file_id)
+            summary['revisadas'] += 1
+            if result is not None and result.ok and not result.response.get('trashed'):
+                summary['ok'] += 1
+                continue
+            if result is not None and result.ok:
+                summary['en_papelera'] += 1
+                estado = 'en_papelera'
+            elif result is not None and result.status == 404:
+                summary['faltantes'] += 1
+                estado = 'faltante'
+            else:
+                summary['errores'] += 1
+                summary['problemas'].append({'tesis_id': tesis_id, 'scjn_id': scjn_id, 'google_drive_id': file_id,
+                                             'estado': 'error', 'error': result.error if result else None})
+                continue
+            summary['problemas'].append({'tesis_id': tesis_id, 'scjn_id': scjn_id, 'google_drive_id': file_id,
+                                         'estado': estado})
+            broken.append(tesis_id)
+
+        if clear_missing and broken:
+            # Sin enlace, la tesis vuelve a ser candidata para upload_existing_pdfs.py
+            session = session_factory()
+            try:
+                summary['limpiadas'] += session.query(Tesis).filter(Tesis.id.in_(broken)).update(
+                    {'google_drive_id': None, 'google_drive_link': None}, synchronize_session=False
+                )
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+        logger.info(f"📊 Revisadas {summary['revisadas']} tesis ({batcher.stats['peticiones_http']} peticiones HTTP)")
+
+    summary['peticiones_http'] = batcher.stats['peticiones_http']
+    summary['duracion'] = time.time() - start
+    return summary
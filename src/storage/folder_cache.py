@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Cache persistente de carpetas de Google Drive
+- Mapa (carpeta padre, nombre) -> ID guardado en la tabla drive_folder
+- Precarga con un único listado paginado del árbol (unidades compartidas incluidas)
+- Creación protegida contra duplicados: lock en proceso y reserva en base de datos entre procesos
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from src.database.models import DriveFolder, get_session
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+# Segundos tras los que una reserva sin folder_id se considera abandonada
+RESERVATION_TIMEOUT = 120
+
+
+def _escape(value: str) -> str:
+    """Escapar comillas para consultas q= de Drive"""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class DriveFolderCache:
+    """Resolución de carpetas sin idas y vueltas a Drive en el camino de subida"""
+
+    def __init__(self, service_getter: Callable, root_id: str, session_factory: Callable = None):
+        self.service_getter = service_getter
+        self.root_id = root_id
+        self.session_factory = session_factory or get_session
+        self._folders: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+        self.stats = {'hits': 0, 'misses': 0, 'creadas': 0, 'listado_paginas': 0}
+
+    # ------------------------------------------------------------------
+    # Carga y precarga
+    # ------------------------------------------------------------------
+    def _list_kwargs(self) -> Dict:
+        kwargs = {'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+        if self.root_id and self.root_id.startswith('0AA'):
+            # La raíz es una unidad compartida: listar solo esa unidad
+            kwargs.update(corpora='drive', driveId=self.root_id)
+        else:
+            kwargs['corpora'] = 'allDrives'
+        return kwargs
+
+    def load(self) -> int:
+        """Cargar el mapa guardado en base de datos"""
+        session = self.session_factory()
+        try:
+            rows = session.query(DriveFolder.parent_id, DriveFolder.nombre, DriveFolder.folder_id).filter(
+                DriveFolder.folder_id.isnot(None)
+            )
+            with self._lock:
+                for parent_id, nombre, folder_id in rows:
+                    self._folders[(parent_id, nombre)] = folder_id
+            return len(self._folders)
+        finally:
+            session.close()
+
+    def prewarm(self) -> int:
+        """Listar todas las carpetas del árbol en una sola consulta paginada y guardar el mapa"""
+        start = time.time()
+        children = defaultdict(list)
+        page_token = None
+
+        while True:
+            response = self.service_getter().files().list(
+                q=f"mimeType='{FOLDER_MIME}' and trashed=false",
+                fields="nextPageToken, files(id, name, parents)",
+                pageSize=1000,
+                pageToken=page_token,
+                **self._list_kwargs()
+            ).execute()
+            self.stats['listado_paginas'] += 1
+
+            for folder in response.get('files', []):
+                for parent in folder.get('parents') or []:
+                    children[parent].append((folder['name'], folder['id']))
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        # Conservar solo carpetas alcanzables desde la raíz configurada
+        found = {}
+        pending = deque([self.root_id])
+        while pending:
+            parent = pending.popleft()
+            for name, folder_id in children.get(parent, []):
+                # Si hay duplicados por nombre, se mantiene el primero listado
+                if (parent, name) not in found:
+                    found[(parent, name)] = folder_id
+                    pending.append(folder_id)
+
+        with self._lock:
+            self._folders.update(found)
+        self._persist_many(found)
+
+        logger.info(f"📁 Cache de carpetas precargado: {len(found)} carpetas en "
+                    f"{self.stats['listado_paginas']} páginas ({time.time() - start:.1f}s)")
+        return len(found)
+
+    def subtree(self) -> Set[str]:
+        """IDs de la raíz y de las carpetas conocidas bajo ella"""
+        children = defaultdict(list)
+        with self._lock:
+            for (parent, _), folder_id in self._folders.items():
+                children[parent].append(folder_id)
+
+        found = {self.root_id}
+        pending = deque([self.root_id])
+        while pending:
+            for folder_id in children.get(pending.popleft(), []):
+                if folder_id not in found:
+                    found.add(folder_id)
+                    pending.append(folder_id)
+        return found
+
+    def _persist_many(self, folders: Dict[Tuple[str, str], str]):
+        session = self.session_factory()
+        try:
+            existing = {
+                (row.parent_id, row.nombre): row
+                for row in session.query(DriveFolder).filter(DriveFolder.parent_id.in_({p for p, _ in folders}))
+            } if folders else {}
+            for (parent_id, nombre), folder_id in folders.items():
+                row = existing.get((parent_id, nombre))
+                if row is None:
+                    session.add(DriveFolder(parent_id=parent_id, nombre=nombre, folder_id=folder_id))
+                elif row.folder_id != folder_id:
+                    row.folder_id = folder_id
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"⚠️ No se pudo guardar el mapa de carpetas: {e}")
+        finally:
+            session.close()
+
+    # ------------------------------------------------------------------
+    # Resolución / creación
+    # ------------------------------------------------------------------
+    def get(self, name: str, parent_id: str) -> Optional[str]:
+        """Obtener ID de carpeta desde el cache (sin llamar a Drive)"""
+        return self._folders.get((parent_id, name))
+
+    def lookup(self, name: str, parent_id: str) -> Optional[str]:
+        """Obtener ID de carpeta existente (cache y, si falta, Drive) sin crearla"""
+        key = (parent_id, name)
+        folder_id = self._folders.get(key)
+        if folder_id:
+            self.stats['hits'] += 1
+            return folder_id
+
+        self.stats['misses'] += 1
+        folder_id = self._find_in_drive(name, parent_id)
+        if folder_id:
+            with self._lock:
+                self._folders[key] = folder_id
+        return folder_id
+
+    def get_or_create(self, name: str, parent_id: str, creator: Callable[[str, str], Optional[str]]) -> Optional[str]:
+        """Obtener o crear carpeta; creator(nombre, padre) crea la carpeta en Drive"""
+        key = (parent_id, name)
+        folder_id = self._folders.get(key)
+        if folder_id:
+            self.stats['hits'] += 1
+            return folder_id
+
+        with self._key_locks[key]:
+            # Otro hilo pudo resolverla mientras esperábamos el lock
+            folder_id = self._folders.get(key)
+            if folder_id:
+                self.stats['hits'] += 1
+                return folder_id
+
+            self.stats['misses'] += 1
+            folder_id = self._resolve_with_reservation(name, parent_id, creator)
+            if folder_id:
+                with self._lock:
+                    self._folders[key] = folder_id
+            return folder_id
+
+    def _find_in_drive(self, name: str, parent_id: str) -> Optional[str]:
+        response = self.service_getter().files().list(
+            q=f"name='{_escape(name)}' and mimeType='{FOLDER_MIME}' and '{parent_id}' in parents and trashed=false",
+            fields="files(id, name)",
+            pageSize=10,
+            **self._list_kwargs()
+        ).execute()
+        files = response.get('files', [])
+        return files[0]['id'] if files else None
+
+    def _resolve_with_reservation(self, name: str, parent_id: str, creator: Callable) -> Optional[str]:
+        """Reservar (padre, nombre) en base de datos antes de crear, para que otro proceso no la duplique"""
+        deadline = time.time() + RESERVATION_TIMEOUT
+        while True:
+            session = self.session_factory()
+            try:
+                row = session.query(DriveFolder).filter(
+                    DriveFolder.parent_id == parent_id, DriveFolder.nombre == name
+                ).first()
+
+                if row is not None and row.folder_id:
+                    return row.folder_id
+
+                if row is not None:
+                    stale = row.fecha_actualizacion and datetime.now() - row.fecha_actualizacion > timedelta(seconds=RESERVATION_TIMEOUT)
+                    if not stale and time.time() < deadline:
+                        # Otro proceso la está creando: esperar a que publique el ID
+                        session.close()
+                        time.sleep(1)
+                        continue
+                    reservation = row
+                    reservation.fecha_actualizacion = datetime.now()
+                    session.commit()
+                else:
+                    reservation = DriveFolder(parent_id=parent_id, nombre=name, folder_id=None)
+                    session.add(reservation)
+                    try:
+                        session.commit()
+                    except IntegrityError:
+                        # Otro proceso reservó primero
+                        session.rollback()
+                        continue
+
+                # Tenemos la reserva: verificar en Drive y crear solo si no existe
+                folder_id = self._find_in_drive(name, parent_id)
+                if not folder_id:
+                    folder_id = creator(name, parent_id)
+                    if folder_id:
+                        self.stats['creadas'] += 1
+                if folder_id:
+                    reservation.folder_id = folder_id
+                    session.commit()
+                else:
+                    session.delete(reservation)
+                    session.commit()
+                return folder_id
+            except Exception as e:
+                session.rollback()
+                logger.error(f"❌ Error resolviendo carpeta {name}: {e}")
+                return None
+            finally:
+                session.close()
+
+    def __len__(self) -> int:
+        return len(self._folders)
@@ -9,6 +9,9 @@ from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 
 from src.config import Config
+from src.storage.drive_batch import DriveBatcher
+from src.storage.md5_index import DriveMD5Index
+from src.storage.upload_queue import file_md5
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,7 @@ class GoogleDriveManager:
         self.creds = None
         self.service = None
         self.folder_id = Config.GOOGLE_DRIVE_FOLDER_ID
+        self.md5_index = None
         
     def authenticate(self):
         """Autenticar con Google Drive API usando cuenta de servicio"""
@@ -66,13 +70,34 @@ class GoogleDriveManager:
             logger.error(f"❌ Error en autenticación con Google Drive: {e}")
             raise
     
+    def get_md5_index(self) -> Optional[DriveMD5Index]:
+        """Índice MD5 para deduplicar subidas (sincronizado una vez por instancia)"""
+        if not Config.DRIVE_DEDUP_ENABLED:
+            return None
+        if self.md5_index is None:
+            self.md5_index = DriveMD5Index(lambda: self.service, self.folder_id)
+            try:
+                self.md5_index.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo sincronizar el índice MD5 de Drive: {e}")
+                self.md5_index.load()
+        return self.md5_index
+    
     def upload_file(self, file_path: str, filename: str = None, parent_id: str = None) -> Optional[tuple]:
-        """Subir archivo a Google Drive y devolver (id, enlace web)"""
+        """Subir archivo a Google Drive y devolver (id, enlace web); si el contenido ya existe, se enlaza"""
         try:
             if not self.service:
                 self.authenticate()
             if not filename:
                 filename = os.path.basename(file_path)
+            
+            md5_index = self.get_md5_index()
+            md5 = file_md5(file_path) if md5_index else None
+            duplicate = md5_index.find(md5) if md5_index else None
+            if duplicate:
+                logger.info(f"♻️ {filename} ya existe en Drive como {duplicate['nombre']} (ID: {duplicate['file_id']})")
+                return (duplicate['file_id'], duplicate['web_link'])
+            
             file_metadata = {
                 'name': filename
             }
@@ -86,19 +111,27 @@ class GoogleDriveManager:
             else:
                 logger.error("No se especificó carpeta destino para el archivo.")
                 return None
-            media = MediaFileUpload(file_path, resumable=True)
+            media = MediaFileUpload(file_path, chunksize=Config.DRIVE_UPLOAD_CHUNK_BYTES, resumable=True)
             extra_args = {}
             # Soporte para unidades compartidas SOLO supportsAllDrives en create
             if self.folder_id and self.folder_id.startswith('0AA'):
                 extra_args['supportsAllDrives'] = True
-            file = self.service.files().create(
+            request = self.service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, webViewLink',
                 **extra_args
-            ).execute()
+            )
+            # Subida por fragmentos: un corte reintenta desde el último fragmento confirmado
+            file = None
+            while file is None:
+                status, file = request.next_chunk(num_retries=Config.DRIVE_UPLOAD_MAX_RETRIES)
+                if status:
+                    logger.debug(f"Subiendo {filename}: {int(status.progress() * 100)}%")
             file_id = file.get('id')
             web_link = file.get('webViewLink')
+            if md5_index:
+                md5_index.add(file_id, md5, filename, file_metadata['parents'][0], os.path.getsize(file_path), web_link)
             logger.info(f"Archivo subido exitosamente: {filename} (ID: {file_id})")
             logger.info(f"Enlace de acceso: {web_link}")
             return (file_id, web_link)
@@ -126,28 +159,38 @@ class GoogleDriveManager:
             return None
     
     def list_files(self, query: str = None) -> List[dict]:
-        """Listar archivos en la carpeta"""
+        """Listar archivos en la carpeta (todas las páginas)"""
         try:
             if not self.service:
                 self.authenticate()
             
             # Construir query
             if not query:
-                query = f"'{self.folder_id}' in parents"
+                query = f"'{self.folder_id}' in parents and trashed=false"
             
             extra_args = {}
-            # Soporte para unidades compartidas: supportsAllDrives y driveId en list
+            # Soporte para unidades compartidas: driveId exige corpora='drive' e includeItemsFromAllDrives
             if self.folder_id and self.folder_id.startswith('0AA'):
                 extra_args['supportsAllDrives'] = True
+                extra_args['includeItemsFromAllDrives'] = True
+                extra_args['corpora'] = 'drive'
                 extra_args['driveId'] = self.folder_id
-            results = self.service.files().list(
-                q=query,
-                pageSize=100,
-                fields="nextPageToken, files(id, name, createdTime, size)",
-                **extra_args
-            ).execute()
             
-            files = results.get('files', [])
+            files = []
+            page_token = None
+            while True:
+                results = self.service.files().list(
+                    q=query,
+                    pageSize=1000,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name, createdTime, size)",
+                    **extra_args
+                ).execute()
+                files.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            
             logger.info(f"Encontrados {len(files)} archivos")
             
             return files
@@ -158,35 +201,49 @@ class GoogleDriveManager:
     
     def delete_file(self, file_id: str) -> bool:
         """Eliminar archivo de Google Drive"""
+        return self.delete_files([file_id]).get(file_id, False)
+    
+    def delete_files(self, file_ids: List[str]) -> dict:
+        """Eliminar varios archivos en lotes de hasta 100 por petición; devuelve {id: eliminado}"""
         try:
             if not self.service:
                 self.authenticate()
             
-            self.service.files().delete(fileId=file_id).execute()
-            logger.info(f"Archivo eliminado: {file_id}")
-            
-            return True
+            results = DriveBatcher(self.service).delete_files(file_ids)
+            for file_id, result in results.items():
+                if result.ok:
+                    logger.info(f"Archivo eliminado: {file_id}")
+                else:
+                    logger.error(f"Error eliminando archivo {file_id}: {result.error}")
+            return {file_id: result.ok for file_id, result in results.items()}
             
         except Exception as e:
-            logger.error(f"Error eliminando archivo {file_id}: {e}")
-            return False
+            logger.error(f"Error eliminando archivos: {e}")
+            return {file_id: False for file_id in file_ids}
     
     def get_file_info(self, file_id: str) -> Optional[dict]:
         """Obtener información de un archivo"""
+        return self.get_files_info([file_id]).get(file_id)
+    
+    def get_files_info(self, file_ids: List[str]) -> dict:
+        """Obtener información de varios archivos en lotes; devuelve {id: metadatos o None}"""
         try:
             if not self.service:
                 self.authenticate()
             
-            file = self.service.files().get(
-                fileId=file_id,
-                fields="id, name, createdTime, modifiedTime, size, webViewLink"
-            ).execute()
-            
-            return file
+            results = DriveBatcher(self.service).get_files(
+                file_ids, fields="id, name, createdTime, modifiedTime, size, webViewLink"
+            )
+            info = {}
+            for file_id, result in results.items():
+                if not result.ok:
+                    logger.error(f"Error obteniendo información del archivo {file_id}: {result.error}")
+                info[file_id] = result.response if result.ok else None
+            return info
             
         except Exception as e:
-            logger.error(f"Error obteniendo información del archivo {file_id}: {e}")
-            return None
+            logger.error(f"Error obteniendo información de archivos: {e}")
+            return {file_id: None for file_id in file_ids}
     
     def create_folder(self, folder_name: str, parent_id: str = None) -> Optional[str]:
         """Crear carpeta en Google Drive (soporta unidades compartidas)"""
@@ -8,6 +8,7 @@ from googleapiclient.errors import HttpError
 from pathlib import Path
 
 from src.config import Config
+from src.storage.drive_batch import DriveBatcher
 
 logger = logging.getLogger(__name__)
 
@@ -62,14 +63,19 @@ class GoogleDriveServiceManager:
             }
             
             # Crear objeto de media
-            media = MediaFileUpload(file_path, resumable=True)
+            media = MediaFileUpload(file_path, chunksize=Config.DRIVE_UPLOAD_CHUNK_BYTES, resumable=True)
             
-            # Subir archivo
-            file = self.service.files().create(
+            # Subir archivo por fragmentos: un corte reintenta desde el último fragmento confirmado
+            request = self.service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink'
-            ).execute()
+            )
+            file = None
+            while file is None:
+                status, file = request.next_chunk(num_retries=Config.DRIVE_UPLOAD_MAX_RETRIES)
+                if status:
+                    logger.debug(f"Subiendo {filename}: {int(status.progress() * 100)}%")
             
             file_id = file.get('id')
             file_name = file.get('name')
@@ -103,26 +109,29 @@ class GoogleDriveServiceManager:
             logger.error(f"Error subiendo PDF {pdf_path}: {e}")
             return None
     
-    def upload_batch(self, file_paths: List[str], prefix: str = "") -> List[Optional[str]]:
-        """Subir múltiples archivos en lote"""
-        results = []
+    def upload_batch(self, file_paths: List[str], prefix: str = "", workers: int = None) -> List[Optional[str]]:
+        """Subir múltiples archivos en paralelo a través de la cola persistente de subidas"""
+        from src.storage.upload_queue import UploadQueue, DriveUploadEngine
         
-        for file_path in file_paths:
-            try:
-                if prefix:
-                    filename = f"{prefix}_{os.path.basename(file_path)}"
-                else:
-                    filename = None
-                
-                file_id = self.upload_file(file_path, filename)
-                results.append(file_id)
-                
-            except Exception as e:
-                logger.error(f"Error en lote subiendo {file_path}: {e}")
-                results.append(None)
+        queue = UploadQueue()
+        task_ids = queue.enqueue_many([
+            {
+                'ruta': file_path,
+                'nombre': f"{prefix}_{os.path.basename(file_path)}" if prefix else os.path.basename(file_path),
+                'parent_id': self.folder_id or None
+            }
+            for file_path in file_paths
+        ])
+        
+        engine = DriveUploadEngine(queue=queue, workers=workers, folder_id=self.folder_id)
+        engine.run(task_ids=task_ids)
+        
+        tasks = queue.get_tasks(task_ids)
+        results = [tasks.get(task_id, {}).get('google_drive_id') for task_id in task_ids]
         
         successful_uploads = len([r for r in results if r is not None])
-        logger.info(f"Lote completado: {successful_uploads}/{len(file_paths)} archivos subidos exitosamente")
+        logger.info(f"Lote completado: {successful_uploads}/{len(file_paths)} archivos subidos exitosamente "
+                    f"({engine.stats['archivos_por_minuto']:.1f} archivos/min)")
         
         return results
     
@@ -156,35 +165,49 @@ class GoogleDriveServiceManager:
     
     def delete_file(self, file_id: str) -> bool:
         """Eliminar archivo de Google Drive"""
+        return self.delete_files([file_id]).get(file_id, False)
+    
+    def delete_files(self, file_ids: List[str]) -> dict:
+        """Eliminar varios archivos en lotes de hasta 100 por petición; devuelve {id: eliminado}"""
         try:
             if not self.service:
                 self.authenticate()
             
-            self.service.files().delete(fileId=file_id).execute()
-            logger.info(f"Archivo eliminado: {file_id}")
-            
-            return True
+            results = DriveBatcher(self.service).delete_files(file_ids)
+            for file_id, result in results.items():
+                if result.ok:
+                    logger.info(f"Archivo eliminado: {file_id}")
+                else:
+                    logger.error(f"Error eliminando archivo {file_id}: {result.error}")
+            return {file_id: result.ok for file_id, result in results.items()}
             
         except Exception as e:
-            logger.error(f"Error eliminando archivo {file_id}: {e}")
-            return False
+            logger.error(f"Error eliminando archivos: {e}")
+            return {file_id: False for file_id in file_ids}
     
     def get_file_info(self, file_id: str) -> Optional[dict]:
         """Obtener información de un archivo"""
+        return self.get_files_info([file_id]).get(file_id)
+    
+    def get_files_info(self, file_ids: List[str]) -> dict:
+        """Obtener información de varios archivos en lotes; devuelve {id: metadatos o None}"""
         try:
             if not self.service:
                 self.authenticate()
             
-            file = self.service.files().get(
-                fileId=file_id,
-                fields="id, name, createdTime, modifiedTime, size, webViewLink"
-            ).execute()
-            
-            return file
+            results = DriveBatcher(self.service).get_files(
+                file_ids, fields="id, name, createdTime, modifiedTime, size, webViewLink"
+            )
+            info = {}
+            for file_id, result in results.items():
+                if not result.ok:
+                    logger.error(f"Error obteniendo información del archivo {file_id}: {result.error}")
+                info[file_id] = result.response if result.ok else None
+            return info
             
         except Exception as e:
-            logger.error(f"Error obteniendo información del archivo {file_id}: {e}")
-            return None
+            logger.error(f"Error obteniendo información de archivos: {e}")
+            return {file_id: None for file_id in file_ids}
     
     def create_folder(self, folder_name: str, parent_id: str = None) -> Optional[str]:
         """Crear carpeta en Google Drive"""
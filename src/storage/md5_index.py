@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Índice MD5 de archivos en Google Drive para deduplicar subidas
+- Construcción con un listado paginado (md5Checksum) limitado al árbol de la carpeta raíz
+- Actualización incremental: listado filtrado por modifiedTime y registro de cada subida
+- Solo se enlazan archivos dentro del árbol: una copia en otra carpeta de la cuenta no cuenta como duplicado
+- Consulta en memoria antes de subir: si los bytes ya están en Drive se enlaza el archivo existente
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from src.database.models import DriveFileIndex, get_session
+from src.storage.folder_cache import DriveFolderCache
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+LIST_FIELDS = "nextPageToken, files(id, name, md5Checksum, size, parents, webViewLink, modifiedTime, trashed)"
+
+# Carpetas por consulta ('a' in parents or 'b' in parents ...): mantiene q= por debajo del límite de longitud
+PARENTS_PER_QUERY = 40
+
+
+class DriveMD5Index:
+    """Índice md5Checksum -> archivo de Drive, persistido en drive_md5_index"""
+
+    def __init__(self, service_getter: Callable, root_id: str = None, session_factory: Callable = None,
+                 folder_cache: DriveFolderCache = None):
+        self.service_getter = service_getter
+        self.root_id = root_id
+        self.session_factory = session_factory or get_session
+        self.folder_cache = folder_cache
+        self._by_md5: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.stats = {'consultas': 0, 'duplicados': 0, 'registrados': 0, 'listado_paginas': 0}
+
+    def _list_kwargs(self) -> Dict:
+        kwargs = {'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+        if self.root_id and self.root_id.startswith('0AA'):
+            kwargs.update(corpora='drive', driveId=self.root_id)
+        else:
+            kwargs['corpora'] = 'allDrives'
+        return kwargs
+
+    def _folder_ids(self, prewarm: bool = False) -> Optional[Set[str]]:
+        """Carpetas del árbol de la raíz (None: raíz en unidad compartida o sin raíz, se usa todo el listado)"""
+        if not self.root_id or self.root_id.startswith('0AA'):
+            return None
+        if self.folder_cache is None:
+            self.folder_cache = DriveFolderCache(self.service_getter, self.root_id, self.session_factory)
+            self.folder_cache.load()
+        if prewarm:
+            self.folder_cache.prewarm()
+        return self.folder_cache.subtree()
+
+    def _queries(self, base: str, folders: Optional[Set[str]]) -> List[str]:
+        if folders is None:
+            return [base]
+        ordered = sorted(folders)
+        return [
+            base + " and (" + " or ".join(f"'{folder_id}' in parents"
+                                          for folder_id in ordered[start:start + PARENTS_PER_QUERY]) + ")"
+            for start in range(0, len(ordered), PARENTS_PER_QUERY)
+        ]
+
+    @staticmethod
+    def _entry(row) -> Dict:
+        return {'file_id': row.file_id, 'md5': row.md5, 'nombre': row.nombre, 'web_link': row.web_link}
+
+    def load(self) -> int:
+        """Cargar el índice guardado en base de datos a memoria"""
+        folders = self._folder_ids()
+        session = self.session_factory()
+        try:
+            entries = {}
+            for row in session.query(DriveFileIndex).order_by(DriveFileIndex.id):
+                if folders is not None and row.parent_id not in folders:
+                    continue
+                # Si hay varias copias con el mismo contenido se conserva la primera registrada
+                entries.setdefault(row.md5, self._entry(row))
+            with self._lock:
+                self._by_md5 = entries
+                self._loaded = True
+            return len(entries)
+        finally:
+            session.close()
+
+    def _watermark(self, session) -> Optional[str]:
+        row = session.query(DriveFileIndex.modificado).filter(
+            DriveFileIndex.modificado.isnot(None)
+        ).order_by(DriveFileIndex.modificado.desc()).first()
+        return row[0] if row else None
+
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """Sincronizar con Drive: listado completo la primera vez (o con full), incremental después"""
+        start = time.time()
+        session = self.session_factory()
+        summary = {'listados': 0, 'nuevos': 0, 'actualizados': 0, 'eliminados': 0}
+        try:
+            watermark = None if full else self._watermark(session)
+            # El listado completo vuelve a listar el árbol de carpetas; el incremental usa el conocido
+            folders = self._folder_ids(prewarm=not watermark)
+            query = f"mimeType != '{FOLDER_MIME}'"
+            if watermark:
+                # Incremental: lo modificado desde la última sincronización (incluye papelera para borrarlo);
+                # >= vuelve a listar el mismo segundo de la marca para no perder cambios simultáneos
+                query += f" and modifiedTime >= '{watermark}'"
+            else:
+                query += " and trashed=false"
+
+            existing = {row.file_id: row for row in session.query(DriveFileIndex)}
+            seen = set()
+            for scoped_query in self._queries(query, folders):
+                self._list_into(session, scoped_query, folders, existing, seen, summary)
+
+            if not watermark:
+                # Listado completo: lo que ya no aparece fue borrado en Drive
+                for file_id, row in existing.items():
+                    if file_id not in seen:
+                        session.delete(row)
+                        summary['eliminados'] += 1
+
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        self.load()
+        logger.info(f"🧮 Índice MD5 de Drive {'completo' if not watermark else 'incremental'}: "
+                    f"{summary['nuevos']} nuevos, {summary['actualizados']} actualizados, "
+                    f"{summary['eliminados']} eliminados ({time.time() - start:.1f}s)")
+        return summary
+
+    def _list_into(self, session, query: str, folders: Optional[Set[str]], existing: Dict, seen: Set[str],
+                   summary: Dict[str, int]):
+        """Aplicar al índice un listado paginado de files.list"""
+        page_token = None
+        while True:
+            response = self.service_getter().files().list(
+                q=query, fields=LIST_FIELDS, pageSize=1000, pageToken=page_token, **self._list_kwargs()
+            ).execute()
+            self.stats['listado_paginas'] += 1
+
+            for item in response.get('files', []):
+                summary['listados'] += 1
+                if folders is not None and not folders.intersection(item.get('parents') or []):
+                    # Fuera del árbol de la raíz (p. ej. una copia en otra carpeta de la cuenta)
+                    continue
+                row = existing.get(item['id'])
+                if item.get('trashed') or not item.get('md5Checksum'):
+                    # Archivos en papelera o sin contenido binario (Docs de Google) no deduplican
+                    if row is not None:
+                        session.delete(row)
+                        summary['eliminados'] += 1
+                    continue
+                seen.add(item['id'])
+                values = {
+                    'md5': item['md5Checksum'], 'nombre': item.get('name'),
+                    'parent_id': (item.get('parents') or [None])[0],
+                    'bytes': int(item['size']) if item.get('size') else None,
+                    'web_link': item.get('webViewLink'), 'modificado': item.get('modifiedTime')
+                }
+                if row is None:
+                    session.add(DriveFileIndex(file_id=item['id'], **values))
+                    summary['nuevos'] += 1
+                else:
+                    for key, value in values.items():
+                        setattr(row, key, value)
+                    summary['actualizados'] += 1
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def find(self, md5: str) -> Optional[Dict]:
+        """Archivo de Drive con el mismo contenido (None si no hay)"""
+        if not self._loaded:
+            self.load()
+        self.stats['consultas'] += 1
+        entry = self._by_md5.get(md5)
+        if entry:
+            self.stats['duplicados'] += 1
+        return entry
+
+    def add(self, file_id: str, md5: str, nombre: str = None, parent_id: str = None,
+            size: int = None, web_link: str = None):
+        """Registrar un archivo recién subido (actualización incremental sin volver a listar)"""
+        if not file_id or not md5:
+            return
+        with self._lock:
+            self._by_md5.setdefault(md5, {'file_id': file_id, 'md5': md5, 'nombre': nombre, 'web_link': web_link})
+
+        session = self.session_factory()
+        try:
+            if session.query(DriveFileIndex.id).filter(DriveFileIndex.file_id == file_id).first() is None:
+                # Sin modifiedTime: la próxima sincronización incremental lo completa
+                session.add(DriveFileIndex(file_id=file_id, md5=md5, nombre=nombre, parent_id=parent_id,
+                                           bytes=size, web_link=web_link))
+                session.commit()
+                self.stats['registrados'] += 1
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"⚠️ No se pudo registrar {file_id} en el índice MD5: {e}")
+        finally:
+            session.close()
+
+    def __len__(self) -> int:
+        return len(self._by_md5)
@@ -0,0 +1,764 @@
+#!/usr/bin/env python3
+"""
+Motor de subidas concurrentes con cola persistente (Google Drive u otro backend de almacenamiento)
+- Cola en base de datos (pending / in_flight / done / failed)
+- UploadEngine genérico; DriveUploadEngine para Drive (otros backends en src/storage/backends.py)
+- Pool de hilos con un cliente build() por hilo (googleapiclient no es thread-safe)
+- Backoff exponencial con jitter ante 403 (límite de tasa), 429 y 5xx
+- Subida por fragmentos con sesión resumible persistida (se retoma tras reiniciar el proceso)
+- Verificación del MD5 local contra md5Checksum de Drive
+- Deduplicación: si el mismo contenido ya está en Drive se enlaza el archivo existente
+- Escritura por lotes de google_drive_id / google_drive_link en tesis (storage_key / storage_link en otros backends)
+- Throughput en archivos por minuto
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from src.config import Config
+from src.database.models import Tesis, UploadSession, UploadTask, get_session
+from src.storage.md5_index import DriveMD5Index
+from src.utils.telemetry import DB, SUBIDA, drive_bytes, drive_request, drive_storage, record_stage, stage
+
+try:
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaFileUpload
+except ImportError:
+    build = None
+    HttpError = None
+    MediaFileUpload = None
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Motivos de 403 que en Drive indican límite de tasa (el resto de 403 son permisos)
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'sharingRateLimitExceeded'}
+
+DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive.file']
+
+# Estados HTTP con los que Drive indica que una sesión resumible ya no existe
+EXPIRED_SESSION_STATUS = {404, 410}
+
+
+class ChecksumMismatch(Exception):
+    """El md5Checksum devuelto por Drive no coincide con el archivo local"""
+
+
+def file_md5(path: str, block_size: int = 1 << 20) -> str:
+    """MD5 del archivo leído por bloques"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _error_reason(error) -> Optional[str]:
+    """Extraer el motivo ('reason') del cuerpo de un HttpError de Drive"""
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        details = json.loads(content).get('error', {})
+        errors = details.get('errors') or [{}]
+        return errors[0].get('reason')
+    except Exception:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Determinar si un error de subida es transitorio"""
+    if isinstance(error, ChecksumMismatch):
+        return True
+    if HttpError is not None and isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUS:
+            return True
+        return status == 403 and _error_reason(error) in RATE_LIMIT_REASONS
+    if isinstance(error, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return False
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """Backoff exponencial con jitter completo"""
+    base = Config.DRIVE_UPLOAD_BACKOFF_BASE if base is None else base
+    cap = Config.DRIVE_UPLOAD_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# Columnas de tesis donde cada motor escribe (id del objeto, enlace)
+DRIVE_LINK_COLUMNS = ('google_drive_id', 'google_drive_link')
+STORAGE_LINK_COLUMNS = ('storage_key', 'storage_link')
+
+
+@dataclass
+class UploadResult:
+    """Resultado de subir una tarea"""
+    task_id: int
+    scjn_id: Optional[str]
+    tesis_id: Optional[int]
+    intentos: int
+    ok: bool
+    google_drive_id: Optional[str] = None
+    google_drive_link: Optional[str] = None
+    error: Optional[str] = None
+    retryable: bool = False
+    bytes: int = 0
+    segundos: float = 0.0
+    link_columns: Tuple[str, str] = DRIVE_LINK_COLUMNS
+
+
+class UploadQueue:
+    """Cola persistente de subidas (tabla upload_queue)"""
+
+    def __init__(self, session_factory: Callable = None, max_attempts: int = None):
+        self.session_factory = session_factory or get_session
+        self.max_attempts = max_attempts or Config.DRIVE_UPLOAD_MAX_ATTEMPTS
+
+    def enqueue(self, ruta: str, nombre: str = None, parent_id: str = None,
+                tesis_id: int = None, scjn_id: str = None, prefijo: str = None) -> int:
+        """Encolar un archivo (no duplica archivos ya encolados o subidos)
+
+        parent_id es la carpeta destino en Drive; prefijo, el de la clave del objeto en backends local/S3.
+        """
+        return self.enqueue_many([{
+            'ruta': ruta, 'nombre': nombre, 'parent_id': parent_id, 'prefijo': prefijo,
+            'tesis_id': tesis_id, 'scjn_id': scjn_id
+        }])[0]
+
+    def enqueue_many(self, items: Iterable[Dict[str, Any]]) -> List[int]:
+        """Encolar varios archivos en una transacción; devuelve ids de tarea en el mismo orden"""
+        items = list(items)
+        session = self.session_factory()
+        try:
+            rutas = [str(item['ruta']) for item in items]
+            existing = {}
+            for start in range(0, len(rutas), 500):
+                rows = session.query(UploadTask.ruta, UploadTask.id).filter(
+                    UploadTask.ruta.in_(rutas[start:start + 500]),
+                    UploadTask.estado.in_((PENDING, IN_FLIGHT, DONE))
+                )
+                existing.update(dict(rows))
+
+            ids = []
+            for item, ruta in zip(items, rutas):
+                if ruta in existing:
+                    ids.append(existing[ruta])
+                    continue
+                task = UploadTask(
+                    ruta=ruta, nombre=item.get('nombre') or os.path.basename(ruta),
+                    parent_id=item.get('parent_id'), prefijo=item.get('prefijo'), tesis_id=item.get('tesis_id'),
+                    scjn_id=item.get('scjn_id'), estado=PENDING, intentos=0
+                )
+                session.add(task)
+                session.flush()
+                existing[ruta] = task.id
+                ids.append(task.id)
+
+            session.commit()
+            return ids
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def claim(self, limit: int, task_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Tomar hasta limit tareas pendientes y marcarlas in_flight"""
+        if limit <= 0:
+            return []
+
+        session = self.session_factory()
+        try:
+            query = session.query(UploadTask).filter(UploadTask.estado == PENDING)
+            if task_ids is not None:
+                query = query.filter(UploadTask.id.in_(task_ids))
+            candidates = query.order_by(UploadTask.id).limit(limit).all()
+
+            claimed = []
+            for task in candidates:
+                # Actualización condicional: otra instancia pudo tomarla entre el SELECT y el UPDATE
+                updated = session.query(UploadTask).filter(
+                    UploadTask.id == task.id, UploadTask.estado == PENDING
+                ).update({'estado': IN_FLIGHT, 'intentos': UploadTask.intentos + 1}, synchronize_session=False)
+                if updated:
+                    claimed.append({
+                        'id': task.id, 'ruta': task.ruta, 'nombre': task.nombre, 'parent_id': task.parent_id,
+                        'prefijo': task.prefijo,
+                        'tesis_id': task.tesis_id, 'scjn_id': task.scjn_id, 'intentos': (task.intentos or 0) + 1
+                    })
+
+            session.commit()
+            return claimed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def complete(self, results: List[UploadResult]) -> Dict[str, int]:
+        """Registrar resultados por lotes: estado de la tarea y enlaces en tesis"""
+        summary = {'done': 0, 'requeued': 0, 'failed': 0}
+        if not results:
+            return summary
+
+        session = self.session_factory()
+        try:
+            for result in results:
+                if result.ok:
+                    values = {
+                        'estado': DONE, 'google_drive_id': result.google_drive_id,
+                        'google_drive_link': result.google_drive_link, 'ultimo_error': None
+                    }
+                    summary['done'] += 1
+                    self._write_tesis_link(session, result)
+                elif result.retryable and result.intentos < self.max_attempts:
+                    values = {'estado': PENDING, 'ultimo_error': result.error}
+                    summary['requeued'] += 1
+                else:
+                    values = {'estado': FAILED, 'ultimo_error': result.error}
+                    summary['failed'] += 1
+
+                session.query(UploadTask).filter(UploadTask.id == result.task_id).update(
+                    values, synchronize_session=False
+                )
+                if result.ok:
+                    session.query(UploadSession).filter(UploadSession.task_id == result.task_id).delete(
+                        synchronize_session=False
+                    )
+
+            session.commit()
+            return summary
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _write_tesis_link(self, session, result: UploadResult):
+        if result.tesis_id is not None:
+            condition = Tesis.id == result.tesis_id
+        elif result.scjn_id:
+            condition = Tesis.scjn_id == result.scjn_id
+        else:
+            return
+        id_column, link_column = result.link_columns
+        session.query(Tesis).filter(condition).update({
+            id_column: result.google_drive_id,
+            link_column: result.google_drive_link
+        }, synchronize_session=False)
+
+    # ------------------------------------------------------------------
+    # Sesiones resumibles
+    # ------------------------------------------------------------------
+    def load_session(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Sesión resumible guardada de una tarea (None si no hay)"""
+        session = self.session_factory()
+        try:
+            row = session.query(UploadSession).filter(UploadSession.task_id == task_id).first()
+            if row is None:
+                return None
+            return {'session_uri': row.session_uri, 'offset': row.offset or 0,
+                    'bytes_total': row.bytes_total, 'md5': row.md5}
+        finally:
+            session.close()
+
+    def save_session(self, task_id: int, session_uri: str, offset: int, bytes_total: int, md5: str):
+        """Guardar (o reemplazar) la sesión resumible de una tarea"""
+        session = self.session_factory()
+        try:
+            session.query(UploadSession).filter(UploadSession.task_id == task_id).delete(synchronize_session=False)
+            session.add(UploadSession(task_id=task_id, session_uri=session_uri, offset=offset,
+                                      bytes_total=bytes_total, md5=md5))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def update_session_offset(self, task_id: int, offset: int):
+        """Registrar los bytes confirmados por Drive"""
+        session = self.session_factory()
+        try:
+            session.query(UploadSession).filter(UploadSession.task_id == task_id).update(
+                {'offset': offset, 'fecha_actualizacion': datetime.now()}, synchronize_session=False
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def clear_session(self, task_id: int):
+        """Descartar la sesión resumible de una tarea"""
+        session = self.session_factory()
+        try:
+            session.query(UploadSession).filter(UploadSession.task_id == task_id).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def recover_stale(self) -> int:
+        """Devolver a pending tareas in_flight de una ejecución interrumpida"""
+        session = self.session_factory()
+        try:
+            count = session.query(UploadTask).filter(UploadTask.estado == IN_FLIGHT).update(
+                {'estado': PENDING}, synchronize_session=False
+            )
+            session.commit()
+            if count:
+                logger.info(f"♻️ {count} subidas interrumpidas devueltas a la cola")
+            return count
+        finally:
+            session.close()
+
+    def retry_failed(self) -> int:
+        """Re-encolar tareas fallidas (reinicia el contador de intentos)"""
+        session = self.session_factory()
+        try:
+            count = session.query(UploadTask).filter(UploadTask.estado == FAILED).update(
+                {'estado': PENDING, 'intentos': 0}, synchronize_session=False
+            )
+            session.commit()
+            return count
+        finally:
+            session.close()
+
+    def counts(self) -> Dict[str, int]:
+        """Tareas por estado"""
+        session = self.session_factory()
+        try:
+            rows = session.query(UploadTask.estado, func.count(UploadTask.id)).group_by(UploadTask.estado)
+            counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+            counts.update(dict(rows))
+            return counts
+        finally:
+            session.close()
+
+    def get_tasks(self, task_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Obtener estado y enlaces de tareas concretas"""
+        session = self.session_factory()
+        try:
+            rows = session.query(
+                UploadTask.id, UploadTask.estado, UploadTask.google_drive_id,
+                UploadTask.google_drive_link, UploadTask.ultimo_error
+            ).filter(UploadTask.id.in_(task_ids))
+            return {
+                row[0]: {'estado': row[1], 'google_drive_id': row[2], 'google_drive_link': row[3], 'error': row[4]}
+                for row in rows
+            }
+        finally:
+            session.close()
+
+
+def default_service_factory() -> Callable:
+    """Fábrica de clientes de Drive con la cuenta de servicio configurada (uno por hilo)"""
+    from google.oauth2 import service_account
+
+    path = str(Config.GOOGLE_DRIVE_SERVICE_ACCOUNT_PATH)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Archivo de cuenta de servicio no encontrado: {path}")
+
+    def factory():
+        credentials = service_account.Credentials.from_service_account_file(path, scopes=DRIVE_SCOPES)
+        return build('drive', 'v3', credentials=credentials, cache_discovery=False)
+
+    return factory
+
+
+class UploadEngine(ABC):
+    """Consumidor concurrente de la cola de subidas (la subida concreta la define cada destino)"""
+
+    link_columns = DRIVE_LINK_COLUMNS
+
+    def __init__(self, queue: UploadQueue = None, workers: int = None, max_retries: int = None,
+                 writeback_batch: int = None, backoff_base: float = None, backoff_max: float = None,
+                 flush_interval: float = 5.0, poll_interval: float = 2.0):
+        self.queue = queue or UploadQueue()
+        self.workers = workers or Config.DRIVE_UPLOAD_WORKERS
+        self.max_retries = Config.DRIVE_UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.writeback_batch = writeback_batch or Config.DRIVE_UPLOAD_WRITEBACK_BATCH
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = self._empty_stats()
+        self.progress: Dict[int, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {'subidos': 0, 'fallidos': 0, 'reencolados': 0, 'reintentos': 0, 'bytes': 0,
+                'bytes_enviados': 0, 'reanudadas': 0, 'md5_verificados': 0, 'md5_fallidos': 0, 'deduplicados': 0,
+                'duracion': 0.0, 'archivos_por_minuto': 0.0}
+
+    def progress_snapshot(self) -> Dict[str, Any]:
+        """Progreso de las subidas en curso (bytes confirmados por el destino)"""
+        with self._stats_lock:
+            tasks = [dict(item, task_id=task_id) for task_id, item in self.progress.items()]
+            stats = dict(self.stats)
+        return {
+            'en_curso': len(tasks),
+            'bytes_confirmados': sum(t['offset'] for t in tasks),
+            'bytes_totales': sum(t['total'] for t in tasks),
+            'tareas': tasks,
+            'bytes_enviados': stats['bytes_enviados'],
+            'reanudadas': stats['reanudadas']
+        }
+
+    # ------------------------------------------------------------------
+    # Subida individual (se ejecuta en los hilos del pool)
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def _upload(self, task: Dict[str, Any]) -> Tuple[str, Optional[str], int]:
+        """Subir el archivo de una tarea; devuelve (id del objeto, enlace, bytes)"""
+
+    def _prepare(self):
+        """Preparación antes de consumir la cola (p. ej. sincronizar índices del destino)"""
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return is_retryable(error)
+
+    def _set_progress(self, task: Dict[str, Any], offset: int, total: int, sent: int = 0):
+        with self._stats_lock:
+            self.progress[task['id']] = {'nombre': task['nombre'], 'offset': offset, 'total': total}
+            self.stats['bytes_enviados'] += max(sent, 0)
+
+    def upload_task(self, task: Dict[str, Any]) -> UploadResult:
+        """Subir una tarea con reintentos y backoff para errores transitorios"""
+        start = time.perf_counter()
+        attempt = 0
+        ok = False
+
+        try:
+            while True:
+                try:
+                    object_id, link, size = self._upload(task)
+                    ok = True
+                    drive_bytes(size)
+                    return UploadResult(
+                        task_id=task['id'], scjn_id=task.get('scjn_id'), tesis_id=task.get('tesis_id'),
+                        intentos=task['intentos'], ok=True, google_drive_id=object_id,
+                        google_drive_link=link, bytes=size, segundos=time.perf_counter() - start,
+                        link_columns=self.link_columns
+                    )
+                except Exception as e:
+                    retryable = self._is_retryable(e)
+                    if not retryable or attempt >= self.max_retries:
+                        return UploadResult(
+                            task_id=task['id'], scjn_id=task.get('scjn_id'), tesis_id=task.get('tesis_id'),
+                            intentos=task['intentos'], ok=False, error=str(e)[:1000], retryable=retryable,
+                            segundos=time.perf_counter() - start
+                        )
+
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    with self._stats_lock:
+                        self.stats['reintentos'] += 1
+                    logger.debug(f"⏳ Reintento {attempt + 1} de {task['nombre']} en {delay:.1f}s: {e}")
+                    time.sleep(delay)
+                    attempt += 1
+        finally:
+            record_stage(SUBIDA, time.perf_counter() - start, ok=ok)
+            with self._stats_lock:
+                self.progress.pop(task['id'], None)
+
+    # ------------------------------------------------------------------
+    # Bucle principal
+    # ------------------------------------------------------------------
+    def run(self, task_ids: Optional[List[int]] = None, stop_event: threading.Event = None) -> Dict[str, Any]:
+        """Procesar la cola; sin stop_event termina al vaciarla, con stop_event espera nuevas tareas"""
+        self.queue.recover_stale()
+        self._prepare()
+        start = time.time()
+        last_flush = time.time()
+        futures = {}
+        buffer: List[UploadResult] = []
+        max_in_flight = self.workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload') as pool:
+            while True:
+                if len(futures) < max_in_flight:
+                    for task in self.queue.claim(max_in_flight - len(futures), task_ids):
+                        futures[pool.submit(self.upload_task, task)] = task
+
+                if not futures:
+                    if buffer:
+                        # Pueden quedar tareas re-encoladas tras el vaciado
+                        self._flush(buffer)
+                        buffer = []
+                        last_flush = time.time()
+                        continue
+                    if stop_event is None or stop_event.is_set():
+                        break
+                    stop_event.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(list(futures), timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.pop(future)
+                    buffer.append(future.result())
+
+                if len(buffer) >= self.writeback_batch or (buffer and time.time() - last_flush >= self.flush_interval):
+                    self._flush(buffer)
+                    buffer = []
+                    last_flush = time.time()
+                    self._log_progress(start)
+
+        self._flush(buffer)
+        self._finish_stats(start)
+        logger.info(
+            f"✅ Subidas completadas: {self.stats['subidos']} ok, {self.stats['fallidos']} fallidas, "
+            f"{self.stats['reintentos']} reintentos, {self.stats['archivos_por_minuto']:.1f} archivos/min"
+        )
+        return dict(self.stats)
+
+    def _flush(self, buffer: List[UploadResult]):
+        if not buffer:
+            return
+        with stage(DB, items=len(buffer)):
+            summary = self.queue.complete(buffer)
+        with self._stats_lock:
+            self.stats['subidos'] += summary['done']
+            self.stats['fallidos'] += summary['failed']
+            self.stats['reencolados'] += summary['requeued']
+            self.stats['bytes'] += sum(r.bytes for r in buffer if r.ok)
+        for result in buffer:
+            if not result.ok and not result.retryable:
+                logger.warning(f"⚠️ Subida fallida (tarea {result.task_id}): {result.error}")
+
+    def _finish_stats(self, start: float):
+        elapsed = time.time() - start
+        with self._stats_lock:
+            self.stats['duracion'] = elapsed
+            self.stats['archivos_por_minuto'] = self.stats['subidos'] / (elapsed / 60) if elapsed > 0 else 0.0
+
+    def _log_progress(self, start: float):
+        elapsed = time.time() - start
+        rate = self.stats['subidos'] / (elapsed / 60) if elapsed > 0 else 0.0
+        logger.info(f"📊 Subidos {self.stats['subidos']} archivos ({rate:.1f} archivos/min)")
+
+    # ------------------------------------------------------------------
+    # Modo en segundo plano (para no bloquear el bucle de scraping)
+    # ------------------------------------------------------------------
+    def start(self):
+        """Iniciar consumidor en segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, kwargs={'stop_event': self._stop},
+                                        name='upload-engine', daemon=True)
+        self._thread.start()
+        logger.info(f"☁️ Motor de subidas iniciado ({self.workers} hilos)")
+
+    def stop(self, timeout: float = None) -> Dict[str, Any]:
+        """Detener el consumidor tras vaciar la cola pendiente"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        return dict(self.stats)
+
+
+class DriveUploadEngine(UploadEngine):
+    """Subidas a Google Drive por fragmentos con sesión resumible y verificación MD5"""
+
+    def __init__(self, queue: UploadQueue = None, workers: int = None, service_factory: Callable = None,
+                 max_retries: int = None, writeback_batch: int = None, folder_id: str = None,
+                 backoff_base: float = None, backoff_max: float = None, chunk_size: int = None,
+                 flush_interval: float = 5.0, poll_interval: float = 2.0, dedup: bool = None,
+                 md5_index: DriveMD5Index = None):
+        if build is None:
+            raise ImportError("google-api-python-client no está instalado")
+
+        super().__init__(queue=queue, workers=workers, max_retries=max_retries, writeback_batch=writeback_batch,
+                         backoff_base=backoff_base, backoff_max=backoff_max,
+                         flush_interval=flush_interval, poll_interval=poll_interval)
+        self.service_factory = service_factory or default_service_factory()
+        self.folder_id = Config.GOOGLE_DRIVE_FOLDER_ID if folder_id is None else folder_id
+        self.chunk_size = chunk_size or Config.DRIVE_UPLOAD_CHUNK_BYTES
+        dedup = Config.DRIVE_DEDUP_ENABLED if dedup is None else dedup
+        self.md5_index = md5_index or (
+            DriveMD5Index(self._service, self.folder_id, self.queue.session_factory) if dedup else None
+        )
+
+    def _prepare(self):
+        try:
+            drive_storage(self._service())
+        except Exception as e:
+            logger.debug(f"No se pudo leer la cuota de Drive: {e}")
+        if self.md5_index is None:
+            return
+        try:
+            self.md5_index.refresh()
+        except Exception as e:
+            # Sin sincronizar se usa el índice guardado: deduplica lo ya conocido
+            logger.warning(f"⚠️ No se pudo sincronizar el índice MD5 de Drive: {e}")
+            self.md5_index.load()
+
+    def _service(self):
+        """Cliente de Drive propio del hilo actual"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self.service_factory()
+            self._local.service = service
+        return service
+
+    def _create_request(self, task: Dict[str, Any]):
+        parent_id = task.get('parent_id') or self.folder_id
+        metadata = {'name': task['nombre']}
+        if parent_id:
+            metadata['parents'] = [parent_id]
+
+        media = MediaFileUpload(task['ruta'], mimetype='application/pdf', chunksize=self.chunk_size, resumable=True)
+        return self._service().files().create(
+            body=metadata, media_body=media, fields='id, webViewLink, md5Checksum', supportsAllDrives=True
+        )
+
+    @staticmethod
+    def _session_status(request, session_uri: str, size: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Consultar a Drive una sesión resumible (PUT bytes */total): (offset confirmado, respuesta si ya terminó)"""
+        resp, content = request.http.request(session_uri, method='PUT',
+                                             headers={'Content-Length': '0', 'Content-Range': f"bytes */{size}"})
+        if resp.status in (200, 201):
+            drive_request('ok')
+            return size, json.loads(content)
+        if resp.status == 308:
+            drive_request('ok')
+            confirmed = resp.get('range')
+            return (int(confirmed.rsplit('-', 1)[1]) + 1 if confirmed else 0), None
+        error = HttpError(resp, content, uri=session_uri)
+        limited = resp.status == 429 or (resp.status == 403 and _error_reason(error) in RATE_LIMIT_REASONS)
+        drive_request('limite' if limited else 'error')
+        raise error
+
+    def _upload_chunks(self, task: Dict[str, Any], size: int, md5: str) -> Dict[str, Any]:
+        """Subir por fragmentos guardando la sesión resumible y el offset tras cada fragmento"""
+        request = self._create_request(task)
+        saved = self.queue.load_session(task['id'])
+        if saved and (saved['md5'] != md5 or saved['bytes_total'] != size):
+            # El archivo cambió desde que se abrió la sesión: empezar de cero
+            self.queue.clear_session(task['id'])
+            saved = None
+
+        if saved:
+            # Retomar desde el offset que Drive confirma (el guardado puede ir por detrás del último fragmento)
+            try:
+                offset, response = self._session_status(request, saved['session_uri'], size)
+            except HttpError as e:
+                if e.resp.status not in EXPIRED_SESSION_STATUS:
+                    raise
+                logger.warning(f"⚠️ Sesión de subida caducada para {task['nombre']}, reiniciando")
+                self.queue.clear_session(task['id'])
+                saved = None
+            else:
+                with self._stats_lock:
+                    self.stats['reanudadas'] += 1
+                if response is not None:
+                    # La subida terminó antes de la interrupción: solo faltaba registrarla
+                    return response
+                request.resumable_uri = saved['session_uri']
+                request.resumable_progress = saved['offset'] = offset
+                logger.info(f"♻️ Retomando {task['nombre']} desde {offset}/{size} bytes")
+
+        persisted_uri = saved['session_uri'] if saved else None
+        persisted_offset = saved['offset'] if saved else 0
+        self._set_progress(task, persisted_offset, size)
+
+        def checkpoint():
+            nonlocal persisted_uri, persisted_offset
+            offset = request.resumable_progress or 0
+            if request.resumable_uri and request.resumable_uri != persisted_uri:
+                self.queue.save_session(task['id'], request.resumable_uri, offset, size, md5)
+                persisted_uri = request.resumable_uri
+            elif offset != persisted_offset:
+                self.queue.update_session_offset(task['id'], offset)
+            self._set_progress(task, offset, size, offset - persisted_offset)
+            persisted_offset = offset
+
+        response = None
+        try:
+            while response is None:
+                try:
+                    _, response = request.next_chunk()
+                    drive_request('ok')
+                except HttpError as e:
+                    limited = e.resp.status == 429 or (
+                        e.resp.status == 403 and _error_reason(e) in RATE_LIMIT_REASONS)
+                    drive_request('limite' if limited else 'error')
+                    if persisted_uri and e.resp.status in EXPIRED_SESSION_STATUS:
+                        # La sesión caducó (Drive las conserva ~1 semana): abrir una nueva
+                        logger.warning(f"⚠️ Sesión de subida caducada para {task['nombre']}, reiniciando")
+                        self.queue.clear_session(task['id'])
+                        request = self._create_request(task)
+                        persisted_uri, persisted_offset = None, 0
+                        continue
+                    raise
+                if response is None:
+                    checkpoint()
+        finally:
+            if response is None and request.resumable_uri:
+                # Guardar la sesión aunque el fragmento haya fallado, para retomarla en el reintento
+                checkpoint()
+
+        return response
+
+    def _verify_md5(self, task: Dict[str, Any], response: Dict[str, Any], md5: str):
+        """Comparar el MD5 local con md5Checksum; si difiere se borra la copia remota"""
+        remote = response.get('md5Checksum')
+        if not remote:
+            return
+        if remote == md5:
+            with self._stats_lock:
+                self.stats['md5_verificados'] += 1
+            return
+
+        with self._stats_lock:
+            self.stats['md5_fallidos'] += 1
+        self.queue.clear_session(task['id'])
+        try:
+            self._service().files().delete(fileId=response['id'], supportsAllDrives=True).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo borrar la copia corrupta {response.get('id')}: {e}")
+        raise ChecksumMismatch(f"MD5 distinto para {task['nombre']}: local {md5}, Drive {remote}")
+
+    def _upload(self, task: Dict[str, Any]) -> Tuple[str, Optional[str], int]:
+        size = os.path.getsize(task['ruta'])
+        md5 = file_md5(task['ruta'])
+
+        duplicate = self.md5_index.find(md5) if self.md5_index else None
+        if duplicate:
+            # El mismo contenido ya está en Drive: enlazar el archivo existente en lugar de subirlo
+            self.queue.clear_session(task['id'])
+            with self._stats_lock:
+                self.stats['deduplicados'] += 1
+            logger.info(f"♻️ {task['nombre']} ya existe en Drive como {duplicate['nombre']} ({duplicate['file_id']})")
+            return duplicate['file_id'], duplicate['web_link'], 0
+
+        response = self._upload_chunks(task, size, md5)
+        self._verify_md5(task, response, md5)
+        if self.md5_index:
+            self.md5_index.add(response.get('id'), md5, task['nombre'], task.get('parent_id') or self.folder_id,
+                               size, response.get('webViewLink'))
+        return response.get('id'), response.get('webViewLink'), size
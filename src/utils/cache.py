@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cache en memoria para el sistema SCJN
+- Política LRU con límite de entradas
+- Expiración por TTL
+- Seguro para hilos
+- Estadísticas de aciertos/fallos
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Cache LRU con expiración por tiempo (TTL)"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, name: str = "cache",
+                 on_remove: Optional[Callable[[Hashable], None]] = None):
+        self.name = name
+        # Aviso de claves que el cache descarta por su cuenta (expulsión LRU o expiración)
+        self.on_remove = on_remove
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener valor si existe y no ha expirado"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+            del self._data[key]
+            self.misses += 1
+
+        self._notify_removed([key])
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Guardar valor y expulsar la entrada menos usada si se excede el límite"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        evicted = []
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                evicted.append(self._data.popitem(last=False)[0])
+                self.evictions += 1
+
+        self._notify_removed(evicted)
+
+    def _notify_removed(self, keys):
+        """Avisar a on_remove fuera del lock de las claves descartadas"""
+        if self.on_remove is None:
+            return
+        for key in keys:
+            self.on_remove(key)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Obtener valor o calcularlo con factory y guardarlo"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Eliminar una entrada concreta"""
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self.invalidations += 1
+                return True
+            return False
+
+    def clear(self):
+        """Vaciar el cache"""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -3,21 +3,30 @@
 Sistema de logging optimizado para el scraper SCJN
 - Rotación automática de archivos
 - Múltiples handlers (console, file, error file)
-- Formateo mejorado con contexto
-- Monitoreo de performance
+- Formateo mejorado con contexto (formateadores creados una vez, no por registro)
+- Escritura asíncrona: los módulos solo encolan (QueueHandler en el logger raíz) y un hilo
+  QueueListener formatea y escribe; con la cola llena se descarta en lugar de bloquear
+- Archivos en JSON por líneas (LOG_JSON) con los campos de `extra` como claves propias
+- Muestreo de mensajes DEBUG por línea de código (LOG_SAMPLE_BURST por LOG_SAMPLE_WINDOW segundos)
+- Monitoreo de performance sobre src/utils/metrics.py (histogramas por operación, exportables a Prometheus)
 """
 
 import os
+import copy
+import json
+import queue
+import atexit
 import logging
 import logging.handlers
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
-import functools
+from typing import Optional, Dict, Any, Iterable, List
+import threading
 import time
 import sys
 
 from src.config import Config
+from src.utils.metrics import MetricsRegistry, get_registry, timed
 
 class ScraperFormatter(logging.Formatter):
     """Formateador personalizado para el scraper"""
@@ -36,102 +45,252 @@ class ScraperFormatter(logging.Formatter):
         super().__init__()
         self.use_colors = use_colors
         self.include_context = include_context
-    
-    def format(self, record):
+        
         # Formato base
         if self.include_context:
-            format_str = '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
+            self.format_str = '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
         else:
-            format_str = '%(asctime)s - %(levelname)s - %(message)s'
+            self.format_str = '%(asctime)s - %(levelname)s - %(message)s'
         
-        # Aplicar colores si está habilitado
-        if self.use_colors and hasattr(sys.stderr, 'isatty') and sys.stderr.isatty():
-            color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
-            format_str = f"{color}{format_str}{self.COLORS['RESET']}"
+        # Colores solo si la consola es una terminal (se decide una vez, no en cada registro)
+        self.colored = use_colors and hasattr(sys.stderr, 'isatty') and sys.stderr.isatty()
+        self._plain = logging.Formatter(self.format_str, datefmt='%Y-%m-%d %H:%M:%S')
+        self._by_level = {}
+    
+    def format(self, record):
+        if not self.colored:
+            return self._plain.format(record)
         
-        formatter = logging.Formatter(format_str, datefmt='%Y-%m-%d %H:%M:%S')
+        # Un formateador por nivel, creado la primera vez que se usa
+        formatter = self._by_level.get(record.levelname)
+        if formatter is None:
+            color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
+            formatter = logging.Formatter(f"{color}{self.format_str}{self.COLORS['RESET']}", datefmt='%Y-%m-%d %H:%M:%S')
+            self._by_level[record.levelname] = formatter
         return formatter.format(record)
 
+# Atributos propios de LogRecord: el resto viene de `extra` y va al JSON como claves propias
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea: ts, nivel, logger, mensaje, origen y los campos de `extra`"""
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'modulo': record.module,
+            'funcion': record.funcName,
+            'linea': record.lineno,
+            'hilo': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['excepcion'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Limitar los mensajes por debajo de `max_level` a `burst` por línea de código y ventana
+    
+    Pensado para los DEBUG por fila o por selector: los primeros de cada ventana pasan, el resto se
+    cuenta y el siguiente que pasa lleva `suprimidos` con los descartados desde el anterior.
+    """
+    
+    def __init__(self, burst: int, window: float, max_level: int = logging.INFO):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_level = max_level
+        self._sites: Dict[tuple, list] = {}  # (ruta, línea) -> [inicio de ventana, emitidos, suprimidos]
+        self._lock = threading.Lock()
+    
+    def filter(self, record):
+        if record.levelno >= self.max_level or self.burst <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [now, 0, 0]
+            elif now - site[0] >= self.window:
+                site[0], site[1] = now, 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+        if suppressed:
+            record.suprimidos = suppressed
+        return True
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que no bloquea: con la cola llena descarta y lo anota en el siguiente registro"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # El mensaje se resuelve aquí (los argumentos pueden cambiar después); el formato, en el listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        if self.dropped:
+            record.descartados = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped = 0
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+# Configuración activa del proceso (una sola cola y un solo listener para todos los loggers)
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[AsyncQueueHandler] = None
+_setup_lock = threading.Lock()
+
+def start_queue_logging(handlers: List[logging.Handler], level: int, config=None) -> AsyncQueueHandler:
+    """Sustituir los handlers del logger raíz por una cola atendida por `handlers` en un hilo
+    
+    Reemplaza también lo que haya dejado un logging.basicConfig anterior; llamarla de nuevo
+    detiene el listener previo tras vaciar su cola.
+    """
+    global _listener, _queue_handler
+    config = config or Config
+    with _setup_lock:
+        stop_queue_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        
+        log_queue = queue.Queue(maxsize=max(config.LOG_QUEUE_SIZE, 0))
+        _queue_handler = AsyncQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLE_BURST, config.LOG_SAMPLE_WINDOW))
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        return _queue_handler
+
+def stop_queue_logging():
+    """Vaciar la cola y cerrar los handlers del listener (también al salir del proceso)"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener, _queue_handler = None, None
+
+atexit.register(stop_queue_logging)
+
 class PerformanceLogger:
-    """Logger para métricas de performance"""
+    """Logger para métricas de performance (temporizadores manuales sobre el registro de métricas)"""
     
-    def __init__(self, logger_name: str = "performance"):
+    def __init__(self, logger_name: str = "performance", registry: Optional[MetricsRegistry] = None):
         self.logger = logging.getLogger(logger_name)
-        self.start_times = {}
+        self.registry = registry or get_registry()
+        self._local = threading.local()
+    
+    @property
+    def start_times(self) -> Dict[str, float]:
+        """Inicios pendientes del hilo actual (la misma operación en otro hilo no se pisa)"""
+        if not hasattr(self._local, 'start_times'):
+            self._local.start_times = {}
+        return self._local.start_times
     
     def start_timer(self, operation: str):
         """Iniciar timer para una operación"""
-        self.start_times[operation] = time.time()
+        self.start_times[operation] = time.perf_counter()
     
     def end_timer(self, operation: str, context: Dict[str, Any] = None):
-        """Finalizar timer y loggear duración"""
-        if operation in self.start_times:
-            duration = time.time() - self.start_times[operation]
+        """Finalizar timer, registrar la duración en el histograma de la operación y loggearla"""
+        start = self.start_times.pop(operation, None)
+        if start is None:
+            return None
+        duration = time.perf_counter() - start
+        status = (context or {}).get('status', 'success')
+        self.registry.observe(operation, duration, status)
+        if self.logger.isEnabledFor(logging.INFO):
             context_str = f" - {context}" if context else ""
             self.logger.info(f"⏱️ {operation}: {duration:.2f}s{context_str}")
-            del self.start_times[operation]
-            return duration
-        return None
+        return duration
+    
+    def log_summary(self, operations: Optional[Iterable[str]] = None):
+        """Loggear recuento y percentiles de latencia de cada operación (por defecto, todas las medidas)"""
+        for operation in operations or self.registry.operations():
+            summary = self.registry.operation_summary(operation)
+            if not summary['count']:
+                continue
+            self.logger.info(f"⏱️ {operation}: {summary['count']} llamadas, p50 {summary['p50']:.3f}s, "
+                             f"p90 {summary['p90']:.3f}s, p99 {summary['p99']:.3f}s, "
+                             f"máx {summary['max']:.3f}s, errores {summary['errores']}")
 
 def performance_monitor(operation_name: str = None):
-    """Decorador para monitorear performance de funciones"""
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            op_name = operation_name or f"{func.__module__}.{func.__name__}"
-            perf_logger = PerformanceLogger()
-            
-            perf_logger.start_timer(op_name)
-            try:
-                result = func(*args, **kwargs)
-                perf_logger.end_timer(op_name, {"status": "success"})
-                return result
-            except Exception as e:
-                perf_logger.end_timer(op_name, {"status": "error", "error": str(e)})
-                raise
-        return wrapper
-    return decorator
+    """Decorador para monitorear performance de funciones (histograma y contador por operación y estado)"""
+    return timed(operation_name)
 
 class ScraperLogger:
     """Clase principal para configurar logging del scraper"""
     
-    def __init__(self, name: str = "scraper", config: Optional[Config] = None):
+    def __init__(self, name: str = "scraper", config: Optional[Config] = None, log_file: Optional[Path] = None):
         self.name = name
         self.config = config or Config
+        self.log_file = Path(log_file) if log_file else self.config.LOG_FILE
         self.logger = None
         self.performance_logger = PerformanceLogger(f"{name}.performance")
         
     def setup_logging(self) -> logging.Logger:
-        """Configurar sistema de logging completo"""
+        """Configurar sistema de logging completo (para todos los loggers del proceso, vía la cola)"""
         
-        # Crear logger principal
+        # Crear logger principal: sin handlers propios, propaga a la cola del logger raíz
+        level = getattr(logging, self.config.LOG_LEVEL)
         self.logger = logging.getLogger(self.name)
-        self.logger.setLevel(getattr(logging, self.config.LOG_LEVEL))
-        
-        # Limpiar handlers existentes
+        self.logger.setLevel(level)
         self.logger.handlers.clear()
+        self.performance_logger.logger.handlers.clear()
         
         # Crear directorios de logs
         self.config.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
         
         # 1. Handler para consola con colores
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_formatter = ScraperFormatter(use_colors=True, include_context=False)
         console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
         
         # 2. Handler para archivo general con rotación
         file_handler = logging.handlers.RotatingFileHandler(
-            filename=self.config.LOG_FILE,
+            filename=self.log_file,
             maxBytes=self.config.LOG_MAX_SIZE,
             backupCount=self.config.LOG_BACKUP_COUNT,
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
-        file_formatter = ScraperFormatter(use_colors=False, include_context=True)
+        if self.config.LOG_JSON:
+            file_formatter = JsonFormatter()
+        else:
+            file_formatter = ScraperFormatter(use_colors=False, include_context=True)
         file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
         
         # 3. Handler separado para errores
         error_handler = logging.handlers.RotatingFileHandler(
@@ -142,7 +301,6 @@ class ScraperLogger:
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(file_formatter)
-        self.logger.addHandler(error_handler)
         
         # 4. Handler para performance
         perf_handler = logging.handlers.RotatingFileHandler(
@@ -152,9 +310,11 @@ class ScraperLogger:
             encoding='utf-8'
         )
         perf_handler.setLevel(logging.INFO)
-        perf_formatter = ScraperFormatter(use_colors=False, include_context=False)
-        perf_handler.setFormatter(perf_formatter)
-        self.performance_logger.logger.addHandler(perf_handler)
+        perf_handler.addFilter(logging.Filter(self.performance_logger.logger.name))
+        perf_handler.setFormatter(file_formatter if self.config.LOG_JSON
+                                  else ScraperFormatter(use_colors=False, include_context=False))
+        
+        start_queue_logging([console_handler, file_handler, error_handler, perf_handler], level, self.config)
         
         # Log inicial
         self.logger.info(f"🚀 Sistema de logging inicializado - Nivel: {self.config.LOG_LEVEL}")
@@ -217,12 +377,13 @@ class ScraperLogger:
 # Instancia global del logger
 _scraper_logger = None
 
-def get_logger(name: str = "scraper", config: Optional[Config] = None) -> logging.Logger:
-    """Obtener logger configurado (función global)"""
+def get_logger(name: str = "scraper", config: Optional[Config] = None,
+               log_file: Optional[Path] = None) -> logging.Logger:
+    """Obtener logger configurado (función global; la primera llamada configura todo el proceso)"""
     global _scraper_logger
     
     if not _scraper_logger:
-        _scraper_logger = ScraperLogger(name, config)
+        _scraper_logger = ScraperLogger(name, config, log_file)
         _scraper_logger.setup_logging()
     
     return _scraper_logger.get_logger()
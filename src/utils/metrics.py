@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Núcleo de métricas de rendimiento para el sistema SCJN
+- Temporizadores monotónicos (perf_counter) como context manager síncrono y asíncrono:
+  el inicio vive en el propio temporizador, así que llamadas concurrentes no se pisan
+- Histogramas de latencia estilo HDR (log-lineales, ~3% de error relativo) con percentiles
+- Contadores y medidores con etiquetas (operación, estado, ...)
+- Exportación en formato de texto de Prometheus; colectores que actualizan medidores al exportar
+- METRICS_ENABLED=false: timer() devuelve un temporizador nulo compartido y no se registra nada
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Límites `le` (segundos) con los que se exportan los histogramas a Prometheus
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Histograma HDR: valores en microsegundos; por debajo de 2**SUB_BITS son exactos y por encima
+# cada potencia de dos se divide en 2**(SUB_BITS-1) sub-cubos
+SUB_BITS = 6
+_LINEAR = 1 << SUB_BITS
+_HALF = 1 << (SUB_BITS - 1)
+
+INF_LABEL = 'le="+Inf"'
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < _LINEAR:
+        return micros
+    shift = micros.bit_length() - SUB_BITS
+    return _LINEAR + (shift - 1) * _HALF + ((micros >> shift) - _HALF)
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """(menor, mayor) valor en microsegundos que cae en el sub-cubo"""
+    if index < _LINEAR:
+        return index, index
+    shift = (index - _LINEAR) // _HALF + 1
+    mantissa = (index - _LINEAR) % _HALF + _HALF
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Contador monótono"""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Valor que sube y baja (cola, navegadores ocupados, ...)"""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class Histogram:
+    """Histograma de latencias log-lineal (HDR) en segundos"""
+
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max', '_lock')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        if seconds < 0.0:
+            seconds = 0.0
+        micros = int(seconds * 1e6)
+        if micros < _LINEAR:
+            index = micros
+        else:
+            shift = micros.bit_length() - SUB_BITS
+            index = _LINEAR + (shift - 1) * _HALF + ((micros >> shift) - _HALF)
+        counts = self.counts
+        with self._lock:
+            counts[index] = counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil q (0-100) en segundos, con la precisión del sub-cubo"""
+        with self._lock:
+            if not self.count:
+                return None
+            target = max(1, math.ceil(self.count * q / 100.0))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(_bucket_bounds(index)[1] / 1e6, self.max)
+            return self.max
+
+    def cumulative(self, bounds: Iterable[float]) -> List[int]:
+        """Observaciones <= cada límite (segundos), para los cubos `le` de Prometheus (precisión del sub-cubo)"""
+        with self._lock:
+            items = sorted(self.counts.items())
+        result = []
+        for bound in bounds:
+            limit = int(bound * 1e6)
+            result.append(sum(count for index, count in items if _bucket_bounds(index)[1] <= limit))
+        return result
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        def rounded(value):
+            return None if value is None else round(value, 6)
+        return {
+            'count': self.count,
+            'media': rounded(self.sum / self.count) if self.count else None,
+            'min': rounded(self.min) if self.count else None,
+            'p50': rounded(self.percentile(50)),
+            'p90': rounded(self.percentile(90)),
+            'p99': rounded(self.percentile(99)),
+            'max': rounded(self.max) if self.count else None,
+        }
+
+
+class MetricFamily:
+    """Métrica con nombre, ayuda y un hijo (Counter/Gauge/Histogram) por combinación de etiquetas"""
+
+    KINDS = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+    def __init__(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[Tuple[str, str], ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted((name, str(value)) for name, value in labels.items()))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self.KINDS[self.kind]()
+                    self._children[key] = child
+        return child
+
+    def items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in sorted(self.items()):
+            if self.kind != 'histogram':
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+                continue
+            bounds = list(self.buckets)
+            for bound, count in zip(bounds, child.cumulative(bounds)):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le)} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, INF_LABEL)} {child.count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+        return lines
+
+
+class Timer:
+    """Temporizador de una operación; cada uso es un objeto nuevo (seguro entre hilos y corrutinas)"""
+
+    __slots__ = ('registry', 'operation', 'start', 'seconds')
+
+    def __init__(self, registry: 'MetricsRegistry', operation: str):
+        self.registry = registry
+        self.operation = operation
+        self.start = 0.0
+        self.seconds = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        self.registry.observe(self.operation, self.seconds, 'error' if exc_type else 'success')
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class _NullTimer:
+    """Temporizador sin efecto para METRICS_ENABLED=false"""
+
+    __slots__ = ()
+    seconds = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso"""
+
+    def __init__(self, enabled: bool = True, namespace: str = "scjn"):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._families: Dict[str, MetricFamily] = {}
+        self._operations: Dict[Tuple[str, str], tuple] = {}
+        self._collectors: List[Callable[['MetricsRegistry'], None]] = []
+        self._lock = threading.Lock()
+        self.operation_seconds = self.histogram('operation_seconds', "Duración de cada operación instrumentada")
+        self.operations_total = self.counter('operations_total', "Operaciones instrumentadas por estado")
+
+    def _family(self, name: str, kind: str, help_text: str, **kwargs) -> MetricFamily:
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            family = self._families.get(full_name)
+            if family is None:
+                family = MetricFamily(full_name, kind, help_text, **kwargs)
+                self._families[full_name] = family
+            elif family.kind != kind:
+                raise ValueError(f"La métrica {full_name} ya existe como {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'counter', help_text)
+
+    def gauge(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'gauge', help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._family(name, 'histogram', help_text, buckets=buckets)
+
+    def timer(self, operation: str):
+        """with/async with registry.timer('op'): ... registra duración y estado (success/error)"""
+        return Timer(self, operation) if self.enabled else NULL_TIMER
+
+    def observe(self, operation: str, seconds: float, status: str = 'success'):
+        """Registrar una duración medida fuera de timer()"""
+        if not self.enabled:
+            return
+        children = self._operations.get((operation, status))
+        if children is None:
+            # Hijos de la operación resueltos una vez: la ruta caliente es un acceso a dict
+            children = (self.operation_seconds.labels(operation=operation),
+                        self.operations_total.labels(operation=operation, status=status))
+            self._operations[(operation, status)] = children
+        children[0].record(seconds)
+        children[1].inc()
+
+    def operations(self) -> List[str]:
+        """Operaciones con al menos una duración registrada"""
+        return sorted(dict(labels)['operation'] for labels, _ in self.operation_seconds.items())
+
+    def operation_summary(self, operation: str) -> Dict[str, Optional[float]]:
+        """Recuento, media y percentiles de una operación"""
+        summary = self.operation_seconds.labels(operation=operation).summary()
+        summary['errores'] = int(self.operations_total.labels(operation=operation, status='error').value)
+        return summary
+
+    def add_collector(self, collector: Callable[['MetricsRegistry'], None]):
+        """collector(registry) actualiza medidores justo antes de exportar (colas, pool de navegadores, ...)"""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def collect(self):
+        """Ejecutar los colectores; uno que falle no impide exportar el resto"""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                logger.warning(f"⚠️ Colector de métricas {getattr(collector, '__name__', collector)} falló: {e}")
+
+    def render(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)"""
+        self.collect()
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Olvidar todas las observaciones (pruebas y benchmarks)"""
+        with self._lock:
+            families = list(self._families.values())
+        for family in families:
+            with family._lock:
+                family._children.clear()
+        self._operations.clear()
+
+
+REGISTRY = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_registry() -> MetricsRegistry:
+    """Registro global del proceso"""
+    return REGISTRY
+
+
+def timed(operation: str = None, registry: MetricsRegistry = None):
+    """Decorador que mide cada llamada (funciones normales y corrutinas) en el histograma por operación"""
+    def decorator(func):
+        op_name = operation or f"{func.__module__}.{func.__name__}"
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                metrics = registry or REGISTRY
+                if not metrics.enabled:
+                    return await func(*args, **kwargs)
+                async with Timer(metrics, op_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = registry or REGISTRY
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                metrics.observe(op_name, time.perf_counter() - start, 'error')
+                raise
+            metrics.observe(op_name, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Telemetría del pipeline de scraping sobre el registro de métricas (src/utils/metrics.py)
+- Etapas: navegacion, extraccion, pdf, subida, db; duración (histograma) y elementos por estado
+  (ok/error), de donde salen throughput y tasa de errores por etapa
+- Profundidad de colas (crawl_frontier, work_queue, upload_queue) leída al exportar, con caché corta
+- Controladores de tasa (en vuelo, límite de concurrencia, pausa) y utilización del pool de pestañas
+- Peticiones a Google Drive por resultado, límites de tasa y cuota de almacenamiento
+- Servidor /metrics en un hilo para los procesos de scraping (METRICS_PORT; 0 = desactivado)
+"""
+
+import logging
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.config import Config
+from src.utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+NAVEGACION = 'navegacion'
+EXTRACCION = 'extraccion'
+PDF = 'pdf'
+SUBIDA = 'subida'
+DB = 'db'
+STAGES = (NAVEGACION, EXTRACCION, PDF, SUBIDA, DB)
+
+
+def _stage_families(registry: MetricsRegistry):
+    return (registry.histogram('stage_seconds', "Duración de cada elemento por etapa del pipeline"),
+            registry.counter('stage_items_total', "Elementos procesados por etapa y estado"))
+
+
+class StageTimer:
+    """Mide un elemento de una etapa; fail() lo marca como error aunque no haya excepción"""
+
+    __slots__ = ('registry', 'name', 'start', 'ok', 'items')
+
+    def __init__(self, registry: MetricsRegistry, name: str, items: int = 1):
+        self.registry = registry
+        self.name = name
+        self.items = items
+        self.ok = True
+        self.start = 0.0
+
+    def fail(self):
+        self.ok = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.name, time.perf_counter() - self.start, ok=self.ok and exc_type is None,
+                     items=self.items, registry=self.registry)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def fail(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+def stage(name: str, items: int = 1, registry: MetricsRegistry = None):
+    """with stage('navegacion') as s: ...; s.fail() si la función devuelve un fallo sin excepción"""
+    registry = registry or get_registry()
+    return StageTimer(registry, name, items) if registry.enabled else NULL_STAGE
+
+
+def record_stage(name: str, seconds: float, ok: bool = True, items: int = 1, registry: MetricsRegistry = None):
+    """Registrar una duración de etapa medida por el llamador"""
+    registry = registry or get_registry()
+    if not registry.enabled:
+        return
+    seconds_family, items_family = _stage_families(registry)
+    seconds_family.labels(stage=name).record(seconds)
+    items_family.labels(stage=name, status='ok' if ok else 'error').inc(items)
+
+
+# ----------------------------------------------------------------------
+# Google Drive
+# ----------------------------------------------------------------------
+def drive_request(resultado: str, registry: MetricsRegistry = None):
+    """Petición a la API de Drive: ok, limite (403 de cuota / 429) o error"""
+    registry = registry or get_registry()
+    if registry.enabled:
+        registry.counter('drive_requests_total', "Peticiones a la API de Google Drive por resultado").labels(
+            resultado=resultado).inc()
+
+
+def drive_bytes(amount: int, registry: MetricsRegistry = None):
+    registry = registry or get_registry()
+    if registry.enabled and amount:
+        registry.counter('drive_uploaded_bytes_total', "Bytes confirmados por Google Drive").labels().inc(amount)
+
+
+def drive_storage(service, registry: MetricsRegistry = None):
+    """Cuota de almacenamiento de la cuenta de Drive (about.get); las unidades compartidas no tienen límite"""
+    registry = registry or get_registry()
+    if not registry.enabled:
+        return
+    quota = service.about().get(fields='storageQuota').execute().get('storageQuota', {})
+    gauge = registry.gauge('drive_storage_bytes', "Almacenamiento de Google Drive usado y límite")
+    for tipo, key in (('usado', 'usage'), ('limite', 'limit')):
+        if quota.get(key) is not None:
+            gauge.labels(tipo=tipo).set(int(quota[key]))
+
+
+# ----------------------------------------------------------------------
+# Colectores (se ejecutan al exportar)
+# ----------------------------------------------------------------------
+_pools = weakref.WeakSet()
+
+
+def track_driver_pool(executor):
+    """Registrar un TabExecutor para exportar pestañas totales y ocupadas"""
+    _pools.add(executor)
+
+
+def collect_driver_pools(registry: MetricsRegistry):
+    tabs = busy = pages = 0
+    for executor in list(_pools):
+        if executor.broken or executor._closed:
+            continue
+        tabs += executor.tab_count
+        busy += sum(1 for tab in executor._tabs if tab['task'] is not None)
+        pages += len(executor._queue)
+    registry.gauge('driver_pool_tabs', "Pestañas de navegador disponibles").labels().set(tabs)
+    registry.gauge('driver_pool_busy', "Pestañas de navegador cargando una página").labels().set(busy)
+    registry.gauge('driver_pool_waiting', "Páginas esperando una pestaña libre").labels().set(pages)
+
+
+def collect_rate_controllers(registry: MetricsRegistry):
+    from src.scraper.rate_control import OPEN, rate_control_states
+
+    gauges = {
+        'en_vuelo': registry.gauge('rate_in_flight', "Peticiones en curso por host"),
+        'concurrencia': registry.gauge('rate_concurrency_limit', "Límite de concurrencia adaptativo por host"),
+        'pausa': registry.gauge('rate_delay_seconds', "Pausa entre peticiones por host"),
+        'tasa_errores': registry.gauge('rate_error_ratio', "Proporción de errores recientes por host"),
+    }
+    for state in rate_control_states():
+        for key, gauge in gauges.items():
+            gauge.labels(host=state['host']).set(state[key] or 0)
+        registry.gauge('rate_circuit_open', "Circuito abierto (1) o cerrado (0) por host").labels(
+            host=state['host']).set(1 if state['circuito'] == OPEN else 0)
+
+
+class QueueDepthCollector:
+    """Tareas por cola y estado; las consultas se repiten como mucho cada `ttl` segundos"""
+
+    def __init__(self, session_factory=None, ttl: float = 15.0):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._last = 0.0
+        self._lock = threading.Lock()
+        self.__name__ = 'QueueDepthCollector'
+
+    def __call__(self, registry: MetricsRegistry):
+        with self._lock:
+            if time.monotonic() - self._last < self.ttl:
+                return
+            self._last = time.monotonic()
+
+        from sqlalchemy import func
+        from src.database.models import CrawlTask, UploadTask, WorkItem, get_session
+
+        gauge = registry.gauge('queue_depth', "Tareas por cola y estado")
+        session = (self.session_factory or get_session)()
+        try:
+            for cola, model in (('crawl_frontier', CrawlTask), ('work_queue', WorkItem), ('upload_queue', UploadTask)):
+                counts = dict(session.query(model.estado, func.count(model.id)).group_by(model.estado))
+                for estado in set(counts) | {'pending', 'done', 'failed'}:
+                    gauge.labels(cola=cola, estado=estado).set(counts.get(estado, 0))
+        finally:
+            session.close()
+
+
+def install_collectors(registry: MetricsRegistry = None, queues: bool = True):
+    """Colectores estándar del pipeline (idempotente)"""
+    registry = registry or get_registry()
+    registry.add_collector(collect_driver_pools)
+    registry.add_collector(collect_rate_controllers)
+    if queues and not any(isinstance(c, QueueDepthCollector) for c in registry._collectors):
+        registry.add_collector(QueueDepthCollector())
+
+
+# ----------------------------------------------------------------------
+# Servidor /metrics para procesos sin API
+# ----------------------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = self.registry.render().encode('utf-8')
+            content_type = PROMETHEUS_CONTENT_TYPE
+        elif self.path.split('?')[0] == '/healthz':
+            body, content_type = b"ok\n", "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"/metrics {self.address_string()} {format % args}")
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None, host: str = None, registry: MetricsRegistry = None):
+    """Servir /metrics en un hilo; None si METRICS_PORT=0 o el puerto está ocupado (p. ej. otro proceso)"""
+    global _server
+    port = Config.METRICS_PORT if port is None else port
+    registry = registry or get_registry()
+    if not port or not registry.enabled:
+        return None
+
+    with _server_lock:
+        if _server is not None:
+            return _server
+        install_collectors(registry)
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+        try:
+            _server = ThreadingHTTPServer((host or Config.METRICS_HOST, port), handler)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo abrir el puerto de métricas {port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"📈 Métricas Prometheus en http://{host or Config.METRICS_HOST}:{_server.server_port}/metrics")
+        return _server
+
+
+def stop_metrics_server():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
@@ -18,6 +18,8 @@ from pathlib import Path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.automation.auto_scraper import IntelligentAutoScraper
+from src.config import Config
+from src.utils.logger import get_logger
 
 class AutoScraperDaemon:
     """Daemon para el sistema de scraping automático"""
@@ -26,7 +28,6 @@ class AutoScraperDaemon:
         self.scraper = None
         self.running = False
         self.pid_file = "data/scraper_daemon.pid"
-        self.log_file = "logs/daemon.log"
         
         # Configurar logging
         self.setup_logging()
@@ -40,15 +41,8 @@ class AutoScraperDaemon:
         signal.signal(signal.SIGINT, self.signal_handler)
     
     def setup_logging(self):
-        """Configurar logging del daemon"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file),
-                logging.StreamHandler()
-            ]
-        )
+        """Configurar logging del daemon (el mismo archivo que el scraper automático)"""
+        get_logger("auto_scraper", log_file=Config.LOGS_DIR / "auto_scraper.log")
         self.logger = logging.getLogger(__name__)
     
     def signal_handler(self, signum, frame):
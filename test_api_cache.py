@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Prueba del cache HTTP de la API de tesis (src/api/http_cache.py)
+- GET /api/tesis/{id} y /api/tesis/scjn/{scjn_id} con TestClient: 200 con ETag, 304 con If-None-Match
+- Cambiar la tesis invalida la respuesta cacheada y cambia el ETag
+- Escrituras que no pasan por los eventos del ORM de la API (UPDATE masivo de la cola de subidas, otro
+  proceso con su propio engine): la entrada se revalida por fecha_actualizacion y no se responde 304
+- Compresión gzip negociada para cuerpos grandes
+- El índice tesis -> claves se poda cuando el cache expulsa (LRU) o deja expirar (TTL) una entrada
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def check_endpoints(client, tesis_id):
+    from src.database.models import Tesis, get_session
+
+    first = client.get(f"/api/tesis/{tesis_id}")
+    etag = first.headers.get('etag')
+    body = first.json() if first.status_code == 200 else {}
+    again = client.get(f"/api/tesis/{tesis_id}", headers={'If-None-Match': etag or ''})
+    by_scjn = client.get("/api/tesis/scjn/2030542")
+    by_scjn_304 = client.get("/api/tesis/scjn/2030542", headers={'If-None-Match': by_scjn.headers.get('etag', '')})
+    missing = client.get("/api/tesis/999999")
+    listing = client.get("/api/tesis")
+    print(f"📊 Detalle: {first.status_code} con ETag {etag}, condicional {again.status_code}; por scjn_id "
+          f"{by_scjn.status_code}/{by_scjn_304.status_code}; inexistente {missing.status_code}; listado {listing.status_code}")
+
+    session = get_session()
+    try:
+        session.query(Tesis).filter_by(id=tesis_id).first().rubro = "RUBRO CORREGIDO"
+        session.commit()
+    finally:
+        session.close()
+    changed = client.get(f"/api/tesis/{tesis_id}", headers={'If-None-Match': etag or ''})
+    print(f"📊 Tras actualizar la tesis: {changed.status_code}, ETag nuevo {changed.headers.get('etag') != etag}, "
+          f"rubro {changed.json().get('rubro') if changed.status_code == 200 else None!r}")
+
+    return (first.status_code == 200 and etag and body['scjn_id'] == '2030542' and body['materia'] is None
+            and again.status_code == 304 and again.headers.get('etag') == etag and not again.content
+            and by_scjn.status_code == 200 and by_scjn_304.status_code == 304 and missing.status_code == 404
+            and listing.status_code == 200 and len(listing.json()) == 1
+            and changed.status_code == 200 and changed.headers.get('etag') != etag
+            and changed.json()['rubro'] == "RUBRO CORREGIDO")
+
+
+def check_external_writes(client, tesis_id):
+    from sqlalchemy import create_engine, update
+    from src.database.models import Tesis
+    from src.storage.upload_queue import UploadQueue, UploadResult
+
+    first = client.get(f"/api/tesis/{tesis_id}")
+    etag = first.headers.get('etag')
+
+    # Subida completada: UPDATE masivo con synchronize_session=False (sin eventos del ORM)
+    queue = UploadQueue()
+    task_id = queue.enqueue(__file__, nombre='tesis.pdf', tesis_id=tesis_id)
+    queue.complete([UploadResult(task_id=task_id, scjn_id='2030542', tesis_id=tesis_id, intentos=1, ok=True,
+                                 google_drive_id='drive-subido', google_drive_link='https://drive/subido')])
+    uploaded = client.get(f"/api/tesis/{tesis_id}", headers={'If-None-Match': etag or ''})
+    uploaded_etag = uploaded.headers.get('etag')
+
+    # Otro proceso (engine propio) cambia el rubro
+    other = create_engine(os.environ['DATABASE_URL'])
+    with other.begin() as conn:
+        conn.execute(update(Tesis).where(Tesis.id == tesis_id).values(rubro="RUBRO DE OTRO PROCESO"))
+    other.dispose()
+    changed = client.get("/api/tesis/scjn/2030542", headers={'If-None-Match': uploaded_etag or ''})
+    again = client.get(f"/api/tesis/{tesis_id}", headers={'If-None-Match': changed.headers.get('etag', '')})
+
+    print(f"📊 Escrituras externas: tras la subida {uploaded.status_code} "
+          f"(google_drive_id {uploaded.json().get('google_drive_id') if uploaded.status_code == 200 else None}), "
+          f"tras otro proceso {changed.status_code}, sin cambios {again.status_code}")
+    return (uploaded.status_code == 200 and uploaded.json()['google_drive_id'] == 'drive-subido'
+            and uploaded_etag != etag and changed.status_code == 200
+            and changed.json()['rubro'] == "RUBRO DE OTRO PROCESO" and again.status_code == 304)
+
+
+def check_compression(client, tesis_id):
+    response = client.get(f"/api/tesis/{tesis_id}", headers={'Accept-Encoding': 'gzip'})
+    print(f"📊 Compresión: Content-Encoding {response.headers.get('content-encoding')}, "
+          f"{len(response.json()['texto'])} caracteres de texto")
+    return response.status_code == 200 and response.headers.get('content-encoding') == 'gzip' \
+        and response.headers.get('vary') == 'Accept-Encoding'
+
+
+def check_index_pruning():
+    from src.api.http_cache import TesisResponseCache
+
+    lru = TesisResponseCache(max_entries=3, ttl_seconds=60, enabled=True)
+    for n in range(50):
+        lru.store(('id', n), {'id': n, 'scjn_id': str(n)}, tesis_id=n, scjn_id=str(n))
+    evicted = lru.stats()['indexed_tesis']
+
+    expiring = TesisResponseCache(max_entries=100, ttl_seconds=0.05, enabled=True)
+    for n in range(10):
+        expiring.store(('id', n), {'id': n}, tesis_id=n)
+    time.sleep(0.1)
+    for n in range(10):
+        expiring.get(('id', n))
+    expired = expiring.stats()['indexed_tesis']
+
+    lru.invalidate_tesis(tesis_id=49, scjn_id='49')
+    invalidated = lru.stats()['indexed_tesis']
+    print(f"📊 Índice por tesis: {evicted} claves de dueño tras 50 inserciones con 3 entradas, {expired} tras "
+          f"expirar 10, {invalidated} tras invalidar una")
+    return evicted == 6 and expired == 0 and invalidated == 4 and lru.get(('id', 48)) is not None
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL CACHE HTTP DE LA API ===\n")
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp}/api.db"
+    ok = True
+    try:
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+        from src.database.models import Tesis, create_tables, get_session
+
+        create_tables()
+        session = get_session()
+        try:
+            tesis = Tesis(scjn_id='2030542', titulo="Tesis de prueba", rubro="DERECHO DE PRUEBA",
+                          texto="Texto de la tesis. " * 200, url="https://sjf2.scjn.gob.mx/detalle/tesis/2030542")
+            session.add(tesis)
+            session.commit()
+            tesis_id = tesis.id
+        finally:
+            session.close()
+
+        client = TestClient(app)
+        checks = [("Endpoints de detalle", lambda: check_endpoints(client, tesis_id)),
+                  ("Escrituras externas", lambda: check_external_writes(client, tesis_id)),
+                  ("Compresión", lambda: check_compression(client, tesis_id)),
+                  ("Poda del índice", check_index_pruning)]
+        for name, check in checks:
+            if not check():
+                print(f"❌ {name}")
+                ok = False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
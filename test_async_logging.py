@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Prueba del logging asíncrono y estructurado (src/utils/logger.py)
+- ScraperLogger sustituye los handlers de un basicConfig previo por una sola cola en el logger raíz;
+  los loggers de módulo (logging.getLogger(__name__)) llegan a los archivos sin handlers propios
+- Archivo en JSON por líneas: campos de `extra`, excepción con traza, argumentos resueltos al encolar
+- Un handler lento no frena al hilo que registra; al detener se vacía la cola
+- Cola llena: se descarta sin bloquear y el siguiente registro lo anota
+- Muestreo: los DEBUG de una misma línea se limitan por ventana y el siguiente lleva los suprimidos
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import logging
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import Config
+from src.utils import logger as scraper_logging
+from src.utils.logger import AsyncQueueHandler, SamplingFilter, ScraperLogger
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_config(directory, **overrides):
+    logs_dir = type(Config.LOGS_DIR)(directory)
+    attrs = {'LOG_LEVEL': 'DEBUG', 'LOGS_DIR': logs_dir, 'LOG_FILE': logs_dir / 'scraper.log', 'LOG_JSON': True}
+    attrs.update(overrides)
+    return type('PruebaConfig', (Config,), attrs)
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def emit(self, record):
+        time.sleep(0.005)
+        self.seen.append(record.getMessage())
+
+
+def check_central_setup(tmp):
+    legacy = os.path.join(tmp, 'legacy.log')
+    logging.basicConfig(level=logging.INFO, handlers=[logging.FileHandler(legacy)])
+    config = make_config(tmp)
+    ScraperLogger("prueba", config).setup_logging()
+
+    root = logging.getLogger()
+    only_queue = len(root.handlers) == 1 and isinstance(root.handlers[0], AsyncQueueHandler)
+    module_logger = logging.getLogger("src.scraper.modulo_de_prueba")
+    items = ['a']
+    module_logger.info("Fila %s con %s", 7, items, extra={'scjn_id': '2030542', 'etapa': 'extraccion'})
+    items.append('b')  # cambiar el argumento después de registrar no altera el mensaje
+    try:
+        raise ValueError("fallo de prueba")
+    except ValueError:
+        module_logger.exception("Error extrayendo")
+    scraper_logging.stop_queue_logging()
+
+    entries = read_json(config.LOG_FILE)
+    row = next(e for e in entries if e['mensaje'].startswith('Fila'))
+    error = next(e for e in entries if e['mensaje'] == 'Error extrayendo')
+    errors_file = read_json(os.path.join(tmp, 'errors.log'))
+    legacy_lines = os.path.getsize(legacy)
+    print(f"📊 Configuración central: solo la cola en el raíz {only_queue}, {len(entries)} líneas JSON, "
+          f"basicConfig previo sin escrituras nuevas ({legacy_lines} bytes)")
+    print(f"   fila: {row['mensaje']!r} scjn_id={row.get('scjn_id')} etapa={row.get('etapa')}; "
+          f"excepción con traza {'ValueError: fallo de prueba' in error.get('excepcion', '')}, "
+          f"{len(errors_file)} en errors.log")
+    return (only_queue and row['mensaje'] == "Fila 7 con ['a']" and row['scjn_id'] == '2030542'
+            and row['logger'] == 'src.scraper.modulo_de_prueba' and row['nivel'] == 'INFO'
+            and 'Traceback' in error['excepcion'] and len(errors_file) == 1 and legacy_lines == 0)
+
+
+def check_slow_handler():
+    slow = SlowHandler()
+    scraper_logging.start_queue_logging([slow], logging.INFO, make_config(tempfile.gettempdir()))
+    log = logging.getLogger("src.prueba.lenta")
+    start = time.perf_counter()
+    for n in range(200):
+        log.info("registro %d", n)
+    produced = time.perf_counter() - start
+    scraper_logging.stop_queue_logging()
+    print(f"📊 Handler lento (5 ms/registro): 200 registros encolados en {produced * 1000:.1f} ms, "
+          f"{len(slow.seen)} escritos tras detener")
+    return produced < 0.2 and slow.seen == [f"registro {n}" for n in range(200)]
+
+
+def check_full_queue():
+    handler = AsyncQueueHandler(queue.Queue(maxsize=5))
+    log = logging.getLogger("src.prueba.llena")
+    log.propagate = False
+    log.addHandler(handler)
+    start = time.perf_counter()
+    for n in range(50):
+        log.warning("aviso %d", n)
+    blocked = time.perf_counter() - start
+    dropped = handler.dropped
+    queued = [handler.queue.get_nowait() for _ in range(5)]
+    log.warning("después de vaciar")
+    marked = handler.queue.get_nowait()
+    log.removeHandler(handler)
+    print(f"📊 Cola llena: {dropped} descartados sin bloquear ({blocked * 1000:.1f} ms), "
+          f"siguiente registro con descartados={getattr(marked, 'descartados', None)}")
+    return dropped == 45 and len(queued) == 5 and marked.descartados == 45 and blocked < 0.5
+
+
+def check_sampling():
+    sampling = SamplingFilter(burst=5, window=0.3)
+    log = logging.getLogger("src.prueba.muestreo")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    passed = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            passed.append(record)
+
+    handler = Collect()
+    handler.addFilter(sampling)
+    log.addHandler(handler)
+
+    def per_row(n):
+        log.debug("selector probado en la fila %d", n)
+
+    for n in range(1000):
+        per_row(n)
+    for n in range(20):
+        log.info("resumen %d", n)  # INFO no se muestrea
+    first_window = len(passed)
+    time.sleep(0.35)
+    per_row(1000)
+    log.removeHandler(handler)
+
+    debug = [r for r in passed if r.levelno == logging.DEBUG]
+    print(f"📊 Muestreo: {len(debug) - 1} de 1000 DEBUG en la primera ventana, {first_window - len(debug) + 1} INFO "
+          f"sin muestrear; la siguiente ventana anota suprimidos={getattr(debug[-1], 'suprimidos', None)}")
+    return len(debug) == 6 and first_window == 25 and debug[-1].suprimidos == 995
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE LOGGING ASÍNCRONO Y ESTRUCTURADO ===\n")
+    tmp = tempfile.mkdtemp()
+    ok = True
+    try:
+        checks = [("Configuración central", lambda: check_central_setup(tmp)), ("Handler lento", check_slow_handler),
+                  ("Cola llena", check_full_queue), ("Muestreo", check_sampling)]
+        for name, check in checks:
+            if not check():
+                print(f"❌ {name}")
+                ok = False
+    finally:
+        scraper_logging.stop_queue_logging()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Prueba del perfil ligero de navegador (sin abrir un navegador)
+- Chrome: headless nuevo, argumentos de perfil ligero, imágenes desactivadas y preferencias de descarga
+- Patrones de bloqueo: imágenes, fuentes, multimedia y terceros bloqueados; HTML, scripts, API y PDF no
+- El bloqueo se aplica vía CDP y se omite sin error en navegadores sin CDP
+- Firefox: restricciones equivalentes por preferencias
+"""
+
+import os
+import sys
+from fnmatch import fnmatchcase
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.browser_profile import (LEAN_CHROME_ARGS, apply_blocking, blocked_url_patterns,
+                                         chrome_options, firefox_options)
+
+BLOCKED = [
+    "https://sjf2.scjn.gob.mx/assets/img/logo-scjn.png",
+    "https://sjf2.scjn.gob.mx/assets/fonts/Montserrat-Regular.woff2",
+    "https://sjf2.scjn.gob.mx/assets/video/tutorial.mp4",
+    "https://www.googletagmanager.com/gtag/js?id=G-XXXX",
+    "https://fonts.gstatic.com/s/roboto/v30/KFOmCnqEu92Fr1Mu4mxK.woff2",
+]
+ALLOWED = [
+    "https://sjf2.scjn.gob.mx/detalle/tesis/2030758",
+    "https://sjf2.scjn.gob.mx/main.4f1c2a.js",
+    "https://sjf2.scjn.gob.mx/services/sjftesismicroservice/api/public/tesis/2030758",
+    "https://sjf2.scjn.gob.mx/services/sjftesismicroservice/api/public/tesis/pdf/2030758.pdf",
+]
+
+
+class CdpDriver:
+    """Registra los comandos CDP recibidos"""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.commands.append((cmd, params))
+        return {}
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL PERFIL LIGERO DE NAVEGADOR ===")
+    ok = True
+
+    options = chrome_options(download_dir="/tmp/pdfs", headless=True, lean=True)
+    prefs = options.experimental_options['prefs']
+    print(f"\n📊 Chrome: {len(options.arguments)} argumentos, prefs {sorted(prefs)}")
+    if "--headless=new" not in options.arguments or "--headless" in options.arguments:
+        print("❌ No se usa el modo headless nuevo")
+        ok = False
+    if not set(LEAN_CHROME_ARGS) <= set(options.arguments):
+        print("❌ Faltan argumentos del perfil ligero")
+        ok = False
+    if prefs.get("profile.managed_default_content_settings.images") != 2 or \
+            prefs.get("download.default_directory") != "/tmp/pdfs":
+        print("❌ Preferencias de imágenes o descargas incorrectas")
+        ok = False
+
+    plain = chrome_options(headless=False, lean=False)
+    if any(arg.startswith("--headless") for arg in plain.arguments) or \
+            "--blink-settings=imagesEnabled=false" in plain.arguments:
+        print("❌ El perfil completo (lean=False) aplicó restricciones")
+        ok = False
+
+    patterns = blocked_url_patterns(stylesheets=False)
+    blocked = [url for url in BLOCKED if any(fnmatchcase(url, pattern) for pattern in patterns)]
+    allowed = [url for url in ALLOWED if not any(fnmatchcase(url, pattern) for pattern in patterns)]
+    print(f"📊 Bloqueo: {len(patterns)} patrones, {len(blocked)}/{len(BLOCKED)} recursos bloqueados, "
+          f"{len(allowed)}/{len(ALLOWED)} necesarios permitidos")
+    if len(blocked) != len(BLOCKED) or len(allowed) != len(ALLOWED):
+        print(f"❌ Patrones incorrectos: sin bloquear {set(BLOCKED) - set(blocked)}, "
+              f"bloqueados {set(ALLOWED) - set(allowed)}")
+        ok = False
+    if "*.css" in patterns or "*.css" not in blocked_url_patterns(stylesheets=True):
+        print("❌ Las hojas de estilo no respetan BROWSER_BLOCK_STYLESHEETS")
+        ok = False
+
+    driver = CdpDriver()
+    if not apply_blocking(driver) or [cmd for cmd, _ in driver.commands] != ['Network.enable', 'Network.setBlockedURLs']:
+        print(f"❌ Comandos CDP inesperados: {driver.commands}")
+        ok = False
+    if apply_blocking(object()):
+        print("❌ Se informó bloqueo en un navegador sin CDP")
+        ok = False
+
+    firefox = firefox_options(headless=True, lean=True)
+    print(f"📊 Firefox: {firefox.arguments}, {len(firefox.preferences)} preferencias")
+    if firefox.preferences.get("permissions.default.image") != 2 or "--headless" not in firefox.arguments:
+        print("❌ Firefox sin las restricciones del perfil ligero")
+        ok = False
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Prueba de la frontera de rastreo (crawl_frontier) con un sitio de resultados simulado
+- Siembra idempotente de términos y expansión término × página -> detalles
+- Sesión interrumpida a mitad de un término: la siguiente retoma sin repetir visitas
+- Reintentos con espera y paso a failed tras max_attempts
+- Cortesía por host: ráfaga inicial y después una petición cada request_delay
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from collections import Counter
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base
+from src.automation.frontier import CrawlFrontier, HostTokenBucket, SEARCH, DONE, FAILED, PENDING, IN_FLIGHT
+
+# Sitio simulado: resultados por término y tamaño de página
+SITE = {'amparo': 45, 'penal': 12, 'fiscal': 0}
+PAGE_SIZE = 20
+
+
+def fake_results(term, page):
+    """Resultados de la página indicada (lista vacía tras la última)"""
+    start = (page - 1) * PAGE_SIZE
+    total = SITE[term]
+    return [{'scjn_id': f"{term}{i:04d}", 'titulo': f"Tesis {term} {i}",
+             'url': f"https://sjf2.scjn.gob.mx/detalle/tesis/{term}{i:04d}"}
+            for i in range(start, min(start + PAGE_SIZE, total))]
+
+
+def crawl(frontier, visits, budget, crash=False):
+    """Consumir hasta budget tareas; con crash la última queda in_flight como en un proceso terminado"""
+    for n in range(budget):
+        task = frontier.next_task()
+        if task is None:
+            return
+        if crash and n == budget - 1:
+            return
+        if task['tipo'] == SEARCH:
+            visits[('busqueda', task['termino'], task['pagina'])] += 1
+            results = fake_results(task['termino'], task['pagina'])
+            frontier.add_details(results)
+            if results:
+                frontier.add_search_page(task['termino'], task['pagina'] + 1)
+        else:
+            visits[('detalle', task['scjn_id'])] += 1
+        frontier.complete(task['id'])
+
+
+def check_resume(SessionLocal):
+    """Dos sesiones (la primera interrumpida) visitan cada página exactamente una vez"""
+    frontier = CrawlFrontier(session_factory=SessionLocal, max_pages=10)
+    seeded = frontier.seed_search_terms(SITE) + frontier.seed_search_terms(SITE)
+    visits = Counter()
+
+    crawl(frontier, visits, budget=30, crash=True)
+    first_session = sum(visits.values())
+
+    # "Nueva sesión": instancia nueva, solo la base de datos como estado
+    frontier = CrawlFrontier(session_factory=SessionLocal, max_pages=10)
+    recovered = frontier.recover_stale()
+    crawl(frontier, visits, budget=1000)
+
+    expected_details = sum(SITE.values())
+    # Páginas con resultados más la primera vacía de cada término
+    expected_pages = sum(-(-total // PAGE_SIZE) + 1 for total in SITE.values())
+    pages = sum(1 for key in visits if key[0] == 'busqueda')
+    details = sum(1 for key in visits if key[0] == 'detalle')
+    repeated = [key for key, count in visits.items() if count > 1]
+    counts = frontier.counts()
+
+    print(f"  🌱 Términos sembrados: {seeded} (dos siembras)")
+    print(f"  🧭 Primera sesión: {first_session} visitas, {recovered} tarea interrumpida recuperada")
+    print(f"  📄 Páginas: {pages}/{expected_pages}  |  Detalles: {details}/{expected_details}  |  "
+          f"Repetidas: {len(repeated)}  |  {counts}")
+
+    ok = True
+    if seeded != len(SITE):
+        print("  ❌ La siembra no es idempotente")
+        ok = False
+    if recovered != 1:
+        print("  ❌ La tarea in_flight de la sesión interrumpida no se recuperó")
+        ok = False
+    if pages != expected_pages or details != expected_details or repeated:
+        print("  ❌ La segunda sesión no retomó exactamente donde quedó la primera")
+        ok = False
+    if not frontier.is_exhausted() or counts[DONE] != expected_pages + expected_details:
+        print("  ❌ La frontera no quedó agotada")
+        ok = False
+    return ok
+
+
+def check_priority_and_failures(SessionLocal):
+    """Detalles antes que páginas siguientes; reintentos con espera y failed tras max_attempts"""
+    frontier = CrawlFrontier(session_factory=SessionLocal, max_attempts=2, retry_delay=0.2)
+    frontier.seed_search_terms(['laboral'])
+    frontier.add_search_page('laboral', 2)
+    frontier.add_details([{'scjn_id': '9000001', 'url': 'https://sjf2.scjn.gob.mx/detalle/tesis/9000001'}])
+
+    ok = True
+    first = frontier.next_task()
+    if first['tipo'] == SEARCH:
+        print("  ❌ Una página de búsqueda se tomó antes que un detalle pendiente")
+        ok = False
+
+    frontier.fail(first['id'], 'timeout')
+    if frontier.next_task()['tipo'] != SEARCH:
+        print("  ❌ La tarea fallida no respetó la espera antes de reintentarse")
+        ok = False
+    time.sleep(0.3)
+    retried = frontier.next_task()
+    if retried['id'] != first['id'] or retried['intentos'] != 2:
+        print("  ❌ La tarea fallida no volvió a la frontera tras la espera")
+        ok = False
+    frontier.fail(retried['id'], 'timeout')
+    counts = frontier.counts()
+    print(f"  🔁 Tras 2 fallos: {counts}")
+    if counts[FAILED] != 1 or counts[PENDING] != 1 or counts[IN_FLIGHT] != 1:
+        print("  ❌ La tarea no pasó a failed tras max_attempts")
+        ok = False
+    if frontier.retry_failed() != 1:
+        print("  ❌ retry_failed no re-encoló la tarea fallida")
+        ok = False
+    return ok
+
+
+def check_politeness():
+    """Ráfaga de host_burst peticiones y después el ritmo de request_delay, independiente por host"""
+    delay, burst, requests = 0.05, 3, 10
+    bucket = HostTokenBucket(delay=delay, burst=burst)
+
+    start = time.monotonic()
+    for _ in range(requests):
+        bucket.acquire('sjf2.scjn.gob.mx')
+    elapsed = time.monotonic() - start
+
+    other_start = time.monotonic()
+    bucket.acquire('otro.host')
+    other = time.monotonic() - other_start
+
+    expected = (requests - burst) * delay
+    print(f"  🚦 {requests} peticiones al mismo host en {elapsed:.2f}s (mínimo {expected:.2f}s), "
+          f"otro host sin espera: {other * 1000:.1f} ms")
+    ok = True
+    if elapsed < expected * 0.9:
+        print("  ❌ La cubeta de fichas no limitó el ritmo por host")
+        ok = False
+    if other > delay:
+        print("  ❌ Un host distinto tuvo que esperar")
+        ok = False
+    return ok
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE LA FRONTERA DE RASTREO ===")
+    workdir = tempfile.mkdtemp(prefix="crawl_frontier_")
+    ok = True
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'frontera.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+
+        print("\n📁 Reanudación entre sesiones")
+        ok = check_resume(SessionLocal) and ok
+
+        engine.dispose()
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'prioridad.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        print("\n📁 Prioridad y reintentos")
+        ok = check_priority_and_failures(sessionmaker(bind=engine)) and ok
+        engine.dispose()
+
+        print("\n📁 Cortesía por host")
+        ok = check_politeness() and ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
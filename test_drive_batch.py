@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Prueba de las operaciones de metadatos por lotes contra un servidor Drive falso local
+- Endpoint /batch/drive/v3 (multipart/mixed) con files.get y files.delete
+- Errores 429 por elemento para validar el reintento selectivo
+- Reconciliación de google_drive_id: faltantes, en papelera y limpieza de enlaces
+- Rutas locales y s3://bucket/clave en google_drive_id (anteriores a storage_key) no se consultan ni se limpian
+- Peticiones HTTP necesarias frente a una petición por archivo
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis
+from src.storage.drive_batch import DriveBatcher, verify_drive_links
+from test_upload_engine import FakeDriveState, make_handler, make_service_factory
+
+# Proporción de llamadas dentro de un lote que reciben 429 la primera vez
+ITEM_FAULT_RATE = 0.05
+
+
+class FakeBatchState(FakeDriveState):
+    """Estado del servidor falso con archivos en papelera y contador de lotes"""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_requests = 0
+        self.batch_calls = 0
+        self.throttled = set()
+        self.random = random.Random(7)
+
+    def handle_call(self, method, path):
+        """Resolver una llamada individual del lote: (status, cuerpo)"""
+        file_id = urlparse(path).path.rsplit('/', 1)[-1]
+        with self.lock:
+            self.batch_calls += 1
+            if file_id not in self.throttled and self.random.random() < ITEM_FAULT_RATE:
+                self.throttled.add(file_id)
+                return 429, {'error': {'code': 429, 'errors': [{'reason': 'rateLimitExceeded'}]}}
+            item = self.files.get(file_id)
+            if item is None:
+                return 404, {'error': {'code': 404, 'errors': [{'reason': 'notFound'}]}}
+            if method == 'DELETE':
+                del self.files[file_id]
+                self.deleted += 1
+                return 204, None
+            return 200, {'id': file_id, 'name': item['metadata'].get('name'), 'trashed': item.get('trashed', False)}
+
+
+def make_batch_handler(state: FakeBatchState):
+    base_handler = make_handler(state)
+
+    class FakeBatchHandler(base_handler):
+        def do_POST(self):
+            if urlparse(self.path).path != '/batch/drive/v3':
+                return super().do_POST()
+
+            body = self._read_body()
+            content_type = self.headers.get('Content-Type')
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body
+            )
+            with state.lock:
+                state.batch_requests += 1
+
+            boundary = 'fake_batch_boundary'
+            parts = []
+            for part in message.iter_parts():
+                request_line = part.get_payload(decode=True).decode('utf-8').split('\r\n', 1)[0]
+                method, path, _ = request_line.split(' ', 2)
+                status, payload = state.handle_call(method, path)
+                content_id = part['Content-ID'].replace('<', '<response-', 1)
+                inner = f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n\r\n"
+                if payload is not None:
+                    inner += json.dumps(payload)
+                parts.append(f"--{boundary}\r\nContent-Type: application/http\r\n"
+                             f"Content-ID: {content_id}\r\n\r\n{inner}\r\n")
+
+            response = (''.join(parts) + f"--{boundary}--\r\n").encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', f"multipart/mixed; boundary={boundary}")
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+    return FakeBatchHandler
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE OPERACIONES DE DRIVE POR LOTES (DRIVE FALSO) ===")
+
+    state = FakeBatchState()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_batch_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"✅ Servidor Drive falso en {base_url}")
+
+    workdir = tempfile.mkdtemp(prefix="drive_batch_")
+    total, missing, trashed = 1050, 30, 20
+    ok = True
+
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'batch.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+
+        session = SessionLocal()
+        for i in range(total):
+            file_id = f"file{i:05d}"
+            if i >= missing:
+                state.files[file_id] = {'metadata': {'name': f"tesis_{i}.pdf"}, 'size': 1, 'trashed': i < missing + trashed}
+            session.add(Tesis(scjn_id=f"b{i:05d}", titulo=f"Tesis {i}", google_drive_id=file_id,
+                              google_drive_link=f"https://drive.google.com/file/d/{file_id}/view"))
+        foreign = ['s3://tesis/Derecho Civil/Tesis_1.pdf', '/srv/almacen/Derecho Civil/Tesis_2.pdf']
+        for i, object_id in enumerate(foreign):
+            session.add(Tesis(scjn_id=f"x{i:05d}", titulo=f"Tesis externa {i}", google_drive_id=object_id))
+        session.commit()
+        session.close()
+
+        batcher = DriveBatcher(make_service_factory(base_url)(), backoff_base=0.01, backoff_max=0.05)
+        summary = verify_drive_links(batcher, session_factory=SessionLocal, clear_missing=True)
+
+        print(f"\n📊 Revisadas {summary['revisadas']}: {summary['ok']} ok, {summary['faltantes']} faltantes, "
+              f"{summary['en_papelera']} en papelera, {summary['errores']} errores")
+        print(f"   {summary['peticiones_http']} peticiones HTTP ({batcher.stats['reintentos']} llamadas reintentadas) "
+              f"en lugar de {total}")
+
+        session = SessionLocal()
+        linked = session.query(Tesis).filter(Tesis.google_drive_id.isnot(None)).count() - len(foreign)
+        foreign_kept = session.query(Tesis).filter(Tesis.google_drive_id.in_(foreign)).count()
+        session.close()
+
+        expected_ok = total - missing - trashed
+        if (summary['ok'], summary['faltantes'], summary['en_papelera'], summary['errores']) != \
+                (expected_ok, missing, trashed, 0):
+            print("❌ Resultado de la reconciliación incorrecto")
+            ok = False
+        if summary['limpiadas'] != missing + trashed or linked != expected_ok:
+            print(f"❌ Se esperaban {missing + trashed} enlaces limpiados ({linked} tesis con enlace)")
+            ok = False
+        if summary['omitidas'] != len(foreign) or foreign_kept != len(foreign):
+            print(f"❌ Objetos de otros backends consultados o limpiados ({summary['omitidas']} omitidos)")
+            ok = False
+        if batcher.stats['reintentos'] == 0:
+            print("❌ No se reintentaron las llamadas con 429")
+            ok = False
+        if summary['peticiones_http'] > total // 100 * 3:
+            print("❌ Demasiadas peticiones HTTP para lotes de 100")
+            ok = False
+
+        # Borrado por lotes: incluye un archivo ya inexistente
+        to_delete = [f"file{i:05d}" for i in range(missing + trashed, missing + trashed + 150)] + ['file00000']
+        requests_before = batcher.stats['peticiones_http']
+        results = batcher.delete_files(to_delete)
+        deleted = sum(1 for r in results.values() if r.ok)
+        print(f"\n🗑️ Borrados {deleted}/{len(to_delete)} en {batcher.stats['peticiones_http'] - requests_before} "
+              f"peticiones HTTP (file00000 → {results['file00000'].status})")
+        if deleted != 150 or results['file00000'].status != 404:
+            print("❌ Resultado del borrado por lotes incorrecto")
+            ok = False
+
+        engine.dispose()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Prueba de la exportación masiva en streaming (src/database/export.py y GET /api/export) con 50k tesis
+- NDJSON y Arrow IPC: ida y vuelta de valores (texto, JSON, fechas y booleanos) y número de filas
+- Proyección de columnas: solo las pedidas, html_content excluida por defecto y columnas desconocidas rechazadas
+- since=: solo las tesis con fecha_descarga posterior; fecha inválida rechazada
+- Memoria: el pico al exportar todo el corpus (NDJSON y Arrow) no supera el techo y no crece con las filas
+  (comparado con exportar solo las posteriores a since=)
+- Endpoint con TestClient: formatos, columnas, since y errores 400
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = 50000
+NEW_ROWS = 15000  # descargadas después de SINCE
+SINCE = datetime(2026, 1, 1)
+BATCH_SIZE = 500
+CEILING_MB = 16
+TEXTO = "Texto de la tesis con contenido jurisprudencial. " * 20  # ~1 KB por fila
+HTML = "<div>" + TEXTO * 2 + "</div>"
+
+
+def peak_mb(run):
+    """(resultado, pico de memoria en MB) de run()"""
+    tracemalloc.start()
+    try:
+        result = run()
+        return result, tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def populate(engine, Tesis):
+    old = ROWS - NEW_ROWS
+    rows = [{'scjn_id': str(2000000 + n), 'titulo': f"TÍTULO {n}", 'rubro': f"RUBRO {n}", 'texto': TEXTO,
+             'html_content': HTML, 'metadata_json': {'registro': 2000000 + n, 'materias': ['Civil']},
+             'fecha_descarga': (SINCE - timedelta(days=30) if n < old else SINCE + timedelta(seconds=n)),
+             'procesado': n % 2 == 0} for n in range(ROWS)]
+    with engine.begin() as conn:
+        for start in range(0, ROWS, 10000):
+            conn.execute(Tesis.__table__.insert(), rows[start:start + 10000])
+
+
+def read_ndjson(chunks):
+    return [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+
+
+def read_arrow(chunks):
+    import pyarrow as pa
+    return pa.ipc.open_stream(io.BytesIO(b''.join(chunks))).read_all()
+
+
+def check_round_trips(session):
+    """NDJSON y Arrow devuelven las mismas filas y valores que la base"""
+    from src.database.export import DEFAULT_EXPORT_COLUMNS, iter_arrow_stream, iter_ndjson, resolve_columns
+
+    columns = resolve_columns(None)
+    records = read_ndjson(iter_ndjson(session, columns, batch_size=BATCH_SIZE))
+    table = read_arrow(iter_arrow_stream(session, columns, batch_size=BATCH_SIZE))
+    first = records[0]
+    arrow_first = {name: table.column(name)[0].as_py() for name in table.column_names}
+    print(f"📊 Ida y vuelta: {len(records)} líneas NDJSON, {table.num_rows} filas Arrow en "
+          f"{len(table.to_batches())} lotes, {len(columns)} columnas")
+
+    ok = True
+    if len(records) != ROWS or table.num_rows != ROWS:
+        print("❌ Número de filas exportadas incorrecto")
+        ok = False
+    if list(first) != DEFAULT_EXPORT_COLUMNS or table.column_names != DEFAULT_EXPORT_COLUMNS \
+            or 'html_content' in first:
+        print("❌ Columnas por defecto incorrectas")
+        ok = False
+    expected = {'scjn_id': '2000000', 'texto': TEXTO, 'procesado': True,
+                'metadata_json': {'registro': 2000000, 'materias': ['Civil']}}
+    if any(first[key] != value for key, value in expected.items()) \
+            or first['fecha_descarga'] != (SINCE - timedelta(days=30)).isoformat():
+        print(f"❌ Valores NDJSON incorrectos: {first['scjn_id']}, {first['fecha_descarga']}")
+        ok = False
+    if any(arrow_first[key] != value for key, value in expected.items() if key != 'metadata_json') \
+            or json.loads(arrow_first['metadata_json']) != expected['metadata_json'] \
+            or arrow_first['fecha_descarga'] != SINCE - timedelta(days=30):
+        print(f"❌ Valores Arrow incorrectos: {arrow_first['scjn_id']}, {arrow_first['fecha_descarga']}")
+        ok = False
+    if [r['id'] for r in records[:1000]] != table.column('id').to_pylist()[:1000]:
+        print("❌ NDJSON y Arrow no siguen el mismo orden")
+        ok = False
+    return ok
+
+
+def check_projection_and_since(session):
+    """Columnas pedidas y filtro since= (con sus errores)"""
+    from src.database.export import ExportError, iter_arrow_stream, iter_ndjson, parse_since, resolve_columns
+
+    columns = resolve_columns(['scjn_id', ' rubro ', 'html_content'])
+    since = parse_since(SINCE.isoformat())
+    records = read_ndjson(iter_ndjson(session, columns, since, batch_size=BATCH_SIZE))
+    table = read_arrow(iter_arrow_stream(session, columns, since, batch_size=BATCH_SIZE))
+    print(f"📊 Proyección {columns} desde {since}: {len(records)} líneas NDJSON, {table.num_rows} filas Arrow")
+
+    ok = True
+    if any(list(r) != columns for r in records) or table.column_names != columns \
+            or records[0]['html_content'] != HTML:
+        print("❌ La proyección no devuelve exactamente las columnas pedidas")
+        ok = False
+    oldest_new = str(2000000 + ROWS - NEW_ROWS)
+    if len(records) != NEW_ROWS or table.num_rows != NEW_ROWS or records[0]['scjn_id'] != oldest_new:
+        print(f"❌ since= devolvió {len(records)} tesis (se esperaban {NEW_ROWS})")
+        ok = False
+
+    rejected = 0
+    for bad in (lambda: resolve_columns(['scjn_id', 'no_existe']), lambda: parse_since('ayer')):
+        try:
+            bad()
+        except ExportError:
+            rejected += 1
+    if rejected != 2:
+        print("❌ Columna desconocida o fecha inválida aceptadas")
+        ok = False
+    return ok
+
+
+def check_memory(session):
+    """El pico de memoria exportando todo el corpus (con html_content) queda bajo el techo y no crece con las filas"""
+    from src.database.export import EXPORTABLE_COLUMNS, iter_arrow_stream, iter_ndjson
+
+    columns = list(EXPORTABLE_COLUMNS)
+
+    def consume(generator, since=None):
+        return sum(len(chunk) for chunk in generator(session, columns, since, batch_size=BATCH_SIZE))
+
+    ndjson_bytes, ndjson_peak = peak_mb(lambda: consume(iter_ndjson))
+    arrow_bytes, arrow_peak = peak_mb(lambda: consume(iter_arrow_stream))
+    _, small_peak = peak_mb(lambda: consume(iter_ndjson, SINCE))
+    print(f"📊 Pico de memoria: NDJSON {ndjson_peak:.1f} MB para {ndjson_bytes / 1024 / 1024:.0f} MB exportados "
+          f"({small_peak:.1f} MB con {NEW_ROWS} filas), Arrow {arrow_peak:.1f} MB para "
+          f"{arrow_bytes / 1024 / 1024:.0f} MB (techo {CEILING_MB} MB)")
+
+    ok = True
+    if ndjson_peak > CEILING_MB or arrow_peak > CEILING_MB:
+        print("❌ La exportación superó el techo de memoria")
+        ok = False
+    if ndjson_peak > small_peak * 2 + 1:
+        print("❌ La memoria de la exportación crece con el número de filas")
+        ok = False
+    return ok
+
+
+def check_endpoint(client):
+    """GET /api/export: NDJSON y Arrow con columnas y since=, errores 400"""
+    response = client.get('/api/export', params={'columnas': 'scjn_id,rubro', 'since': SINCE.isoformat()})
+    records = [json.loads(line) for line in response.text.splitlines()]
+    arrow = client.get('/api/export', params={'formato': 'arrow', 'columnas': 'id,fecha_descarga'})
+    table = read_arrow([arrow.content]) if arrow.status_code == 200 else None
+    errors = [client.get('/api/export', params=params).status_code
+              for params in ({'columnas': 'no_existe'}, {'since': 'ayer'}, {'formato': 'csv'})]
+    print(f"📊 Endpoint: NDJSON {response.status_code} ({response.headers.get('content-type')}, {len(records)} "
+          f"líneas), Arrow {arrow.status_code} ({table.num_rows if table is not None else 0} filas), "
+          f"errores {errors}")
+
+    ok = True
+    if response.status_code != 200 or not response.headers.get('content-type', '').startswith('application/x-ndjson') \
+            or len(records) != NEW_ROWS or list(records[0]) != ['scjn_id', 'rubro']:
+        print("❌ Respuesta NDJSON del endpoint incorrecta")
+        ok = False
+    if table is None or table.num_rows != ROWS or table.column_names != ['id', 'fecha_descarga'] \
+            or 'attachment' not in arrow.headers.get('content-disposition', ''):
+        print("❌ Respuesta Arrow del endpoint incorrecta")
+        ok = False
+    if errors[:2] != [400, 400] or errors[2] != 422:
+        print("❌ Parámetros inválidos no rechazados")
+        ok = False
+    return ok
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE EXPORTACIÓN EN STREAMING ===")
+    ok = True
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp}/export.db"
+    try:
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+        from src.database.models import Tesis, create_tables, engine, get_session
+
+        create_tables()
+        populate(engine, Tesis)
+        print(f"\n📊 {ROWS} tesis creadas ({NEW_ROWS} descargadas después de {SINCE.date()})")
+
+        session = get_session()
+        try:
+            checks = [("Ida y vuelta NDJSON/Arrow", lambda: check_round_trips(session)),
+                      ("Proyección y since=", lambda: check_projection_and_since(session)),
+                      ("Memoria acotada", lambda: check_memory(session))]
+            for name, check in checks:
+                if not check():
+                    print(f"❌ {name}")
+                    ok = False
+        finally:
+            session.close()
+
+        if not check_endpoint(TestClient(app)):
+            print("❌ Endpoint /api/export")
+            ok = False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Prueba del cache persistente de carpetas de Drive (src/storage/folder_cache.py) contra un servidor Drive falso local
+- Precarga: un único listado paginado de carpetas; solo se conservan las alcanzables desde la raíz
+  (con nombres duplicados se mantiene la primera) y resolverlas después no llama a Drive
+- Persistencia: otra instancia sobre la misma base carga el mapa sin listar de nuevo
+- Carrera entre procesos (dos instancias en hilos): la fila de reserva deja crear la carpeta una sola vez
+- Reserva abandonada: una anterior a RESERVATION_TIMEOUT se toma de inmediato, una reciente tras esperar el plazo
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, DriveFolder
+from src.storage import folder_cache
+from src.storage.folder_cache import DriveFolderCache, RESERVATION_TIMEOUT
+from test_upload_engine import FOLDER_MIME, FakeDriveState, make_handler, make_service_factory
+
+ROOT = 'raiz'
+FOLDERS_PER_PAGE = 10  # el servidor falso ignora pageSize=1000 y pagina de 10 en 10
+MATERIAS = ['Derecho Civil', 'Derecho Penal', "Derecho d'Autor"]
+EPOCAS = ['10a. Época', '11a. Época']
+SALAS = ['Pleno', 'Primera Sala', 'Segunda Sala']
+CREATE_DELAY = 0.3  # creación lenta en Drive para que la carrera se solape
+
+
+def make_paged_handler(state: FakeDriveState):
+    base_handler = make_handler(state)
+
+    class FakePagedHandler(base_handler):
+        def do_GET(self):
+            """files.list con filtro name='...' y paginación por pageToken"""
+            parsed = urlparse(self.path)
+            if parsed.path != '/drive/v3/files':
+                return super().do_GET()
+            params = parse_qs(parsed.query)
+            query = params.get('q', [''])[0]
+            with state.lock:
+                files = state.list_files(query)
+                state.list_requests += 1
+            name = re.search(r"name='((?:[^'\\]|\\.)*)'", query)
+            if name:
+                wanted = re.sub(r"\\(.)", r"\1", name.group(1))
+                files = [f for f in files if f['name'] == wanted]
+
+            start = int(params.get('pageToken', ['0'])[0])
+            end = start + min(int(params.get('pageSize', ['100'])[0]), FOLDERS_PER_PAGE)
+            payload = {'files': files[start:end]}
+            if end < len(files):
+                payload['nextPageToken'] = str(end)
+            return self._send_json(200, payload)
+
+    return FakePagedHandler
+
+
+def add_folder(state, name, parent):
+    return state.create_file({'name': name, 'mimeType': FOLDER_MIME, 'parents': [parent]}, b'')['id']
+
+
+def build_tree(state):
+    """Árbol materia/época/sala bajo la raíz, una carpeta ajena y un duplicado posterior"""
+    paths = {}
+    for materia in MATERIAS:
+        paths[(materia,)] = add_folder(state, materia, ROOT)
+        for epoca in EPOCAS:
+            paths[(materia, epoca)] = add_folder(state, epoca, paths[(materia,)])
+            for sala in SALAS:
+                paths[(materia, epoca, sala)] = add_folder(state, sala, paths[(materia, epoca)])
+    add_folder(state, 'Derecho Civil', 'otra_raiz')
+    add_folder(state, 'Derecho Civil', ROOT)
+    return paths
+
+
+class Creator:
+    """Crea carpetas en el Drive falso (lento) y cuenta las creaciones"""
+
+    def __init__(self, state):
+        self.state = state
+        self.created = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name, parent):
+        time.sleep(CREATE_DELAY)
+        folder_id = add_folder(self.state, name, parent)
+        with self.lock:
+            self.created.append((parent, name, folder_id))
+        return folder_id
+
+
+def resolve_path(cache, path, creator):
+    parent = ROOT
+    for name in path:
+        parent = cache.get_or_create(name, parent, creator)
+    return parent
+
+
+def folders_named(state, name, parent):
+    return [file_id for file_id, info in state.files.items()
+            if info['metadata'].get('name') == name and info['metadata'].get('parents') == [parent]]
+
+
+def check_prewarm(state, service_factory, SessionLocal, paths) -> bool:
+    """Un único listado paginado resuelve todo el árbol; otra instancia lo carga de la base"""
+    creator = Creator(state)
+    cache = DriveFolderCache(service_factory, ROOT, session_factory=SessionLocal)
+    requests_before = state.list_requests
+    found = cache.prewarm()
+    listed = state.list_requests - requests_before
+    total_folders = sum(1 for info in state.files.values() if info['metadata'].get('mimeType') == FOLDER_MIME)
+
+    requests_before = state.list_requests
+    resolved = {path: resolve_path(cache, path, creator) for path in paths}
+    after_prewarm = state.list_requests - requests_before
+
+    other = DriveFolderCache(service_factory, ROOT, session_factory=SessionLocal)
+    loaded = other.load()
+    reloaded = {path: resolve_path(other, path, creator) for path in paths}
+    after_load = state.list_requests - requests_before
+    print(f"\n📊 Precarga: {found} carpetas de {total_folders} en {cache.stats['listado_paginas']} páginas "
+          f"({listed} peticiones); {after_prewarm} llamadas a Drive al resolver {len(paths)} rutas, "
+          f"{loaded} cargadas por otra instancia ({after_load - after_prewarm} llamadas), "
+          f"{len(creator.created)} creadas")
+
+    ok = True
+    expected_pages = -(-total_folders // FOLDERS_PER_PAGE)
+    if found != len(paths) or cache.stats['listado_paginas'] != expected_pages or listed != expected_pages:
+        print("❌ La precarga no fue un único listado paginado del árbol de la raíz")
+        ok = False
+    if resolved != paths or cache.get('Derecho Civil', ROOT) != paths[('Derecho Civil',)]:
+        print("❌ La precarga no conservó las carpetas alcanzables (o no la primera de un duplicado)")
+        ok = False
+    if loaded != len(paths) or reloaded != paths or after_load or creator.created:
+        print("❌ El mapa persistido no evitó llamadas a Drive o creaciones en otra instancia")
+        ok = False
+    return ok
+
+
+def check_race(state, service_factory, SessionLocal) -> bool:
+    """Dos instancias (procesos distintos) piden la misma carpeta nueva a la vez"""
+    creator = Creator(state)
+    barrier = threading.Barrier(2)
+    results = []
+
+    def worker():
+        cache = DriveFolderCache(service_factory, ROOT, session_factory=SessionLocal)
+        barrier.wait()
+        results.append(cache.get_or_create('Derecho Agrario', ROOT, creator))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    session = SessionLocal()
+    rows = session.query(DriveFolder).filter(DriveFolder.parent_id == ROOT, DriveFolder.nombre == 'Derecho Agrario').all()
+    session.close()
+    in_drive = folders_named(state, 'Derecho Agrario', ROOT)
+    print(f"📊 Carrera: resultados {results}, {len(creator.created)} creadas, {len(in_drive)} en Drive, "
+          f"{len(rows)} filas de reserva")
+    if len(creator.created) != 1 or len(in_drive) != 1 or len(set(results)) != 1 or results[0] != in_drive[0] \
+            or len(rows) != 1 or rows[0].folder_id != in_drive[0]:
+        print("❌ La carrera creó la carpeta más de una vez o no publicó el ID en la reserva")
+        return False
+    return True
+
+
+def check_abandoned_reservations(state, service_factory, SessionLocal) -> bool:
+    """Reservas sin folder_id de un proceso caído: se toman tras RESERVATION_TIMEOUT"""
+    creator = Creator(state)
+    session = SessionLocal()
+    session.add(DriveFolder(parent_id=ROOT, nombre='Derecho Fiscal', folder_id=None,
+                            fecha_actualizacion=datetime.now() - timedelta(seconds=RESERVATION_TIMEOUT + 5)))
+    session.add(DriveFolder(parent_id=ROOT, nombre='Derecho Laboral', folder_id=None))
+    session.commit()
+    session.close()
+
+    cache = DriveFolderCache(service_factory, ROOT, session_factory=SessionLocal)
+    start = time.time()
+    stale_id = cache.get_or_create('Derecho Fiscal', ROOT, creator)
+    stale_seconds = time.time() - start
+
+    # Reserva reciente: con un plazo corto, la instancia espera el plazo y luego la toma
+    timeout = 2
+    folder_cache.RESERVATION_TIMEOUT = timeout
+    try:
+        start = time.time()
+        fresh_id = cache.get_or_create('Derecho Laboral', ROOT, creator)
+        fresh_seconds = time.time() - start
+    finally:
+        folder_cache.RESERVATION_TIMEOUT = RESERVATION_TIMEOUT
+
+    session = SessionLocal()
+    published = dict(session.query(DriveFolder.nombre, DriveFolder.folder_id).filter(
+        DriveFolder.nombre.in_(['Derecho Fiscal', 'Derecho Laboral'])))
+    session.close()
+    print(f"📊 Reservas abandonadas: antigua tomada en {stale_seconds:.1f}s, reciente en {fresh_seconds:.1f}s "
+          f"(plazo {timeout}s), {len(creator.created)} creadas")
+
+    ok = True
+    if not stale_id or stale_seconds >= 1 or published.get('Derecho Fiscal') != stale_id:
+        print("❌ La reserva anterior a RESERVATION_TIMEOUT no se tomó de inmediato")
+        ok = False
+    if not fresh_id or fresh_seconds < timeout or published.get('Derecho Laboral') != fresh_id:
+        print("❌ La reserva reciente no se respetó hasta el plazo o no se tomó después")
+        ok = False
+    if len(creator.created) != 2 or folders_named(state, 'Derecho Laboral', ROOT) != [fresh_id]:
+        print("❌ Carpetas creadas de más al tomar reservas abandonadas")
+        ok = False
+    return ok
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL CACHE DE CARPETAS DE DRIVE (DRIVE FALSO) ===")
+
+    state = FakeDriveState()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_paged_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"✅ Servidor Drive falso en {base_url}")
+
+    workdir = tempfile.mkdtemp(prefix="folder_cache_")
+    ok = True
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'carpetas.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+        service_factory = make_service_factory(base_url)
+        paths = build_tree(state)
+
+        checks = [("Precarga y persistencia", lambda: check_prewarm(state, service_factory, SessionLocal, paths)),
+                  ("Carrera entre procesos", lambda: check_race(state, service_factory, SessionLocal)),
+                  ("Reservas abandonadas", lambda: check_abandoned_reservations(state, service_factory, SessionLocal))]
+        for name, check in checks:
+            if not check():
+                print(f"❌ {name}")
+                ok = False
+        engine.dispose()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
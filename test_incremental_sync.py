@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Prueba de la sincronización incremental desde la marca de agua de registro digital
+- Marca inicial tomada del registro más alto ya guardado en tesis
+- Solo se sondean registros posteriores a la marca
+- Se detiene tras las páginas vacías configuradas
+- Una segunda ejecución sin novedades solo sondea las páginas vacías y la marca no retrocede
+- Un registro sin respuesta tras todos los reintentos: la marca no lo pasa y la siguiente ejecución lo sondea
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis
+from src.automation.frontier import HostTokenBucket
+from src.automation.incremental import IncrementalSync, WatermarkStore
+
+WATERMARK = 2031000
+PAGE_SIZE = 50
+EMPTY_PAGES = 2
+# Tesis publicadas después de la marca (con huecos dentro de las páginas)
+NEW = {registro for registro in range(WATERMARK + 1, WATERMARK + 180) if registro % 7}
+# Registro que no responde (nueva, con tesis por encima) y reintentos del rastreador
+FAILING = WATERMARK + 3
+MAX_ATTEMPTS = 3
+
+
+class FakeProbe:
+    """Sonda simulada sobre NEW; registra cada registro sondeado"""
+
+    probed = []
+
+    def __call__(self, registro):
+        FakeProbe.probed.append(registro)
+        if registro in NEW:
+            return {'rubro': f"Rubro {registro}", 'texto': 'Texto', 'url': f"/detalle/tesis/{registro}",
+                    'fecha_publicacion': f"2026-10-{registro % 28 + 1:02d}"}
+        return None
+
+
+class FailingProbe(FakeProbe):
+    """Sonda que no responde para FAILING mientras failing esté activo"""
+
+    failing = True
+
+    def __call__(self, registro):
+        if registro == FAILING and FailingProbe.failing:
+            raise TimeoutError(f"sin respuesta para {registro}")
+        return super().__call__(registro)
+
+
+def make_sync(SessionLocal, probe=FakeProbe):
+    return IncrementalSync(probe, session_factory=SessionLocal, page_size=PAGE_SIZE, empty_pages=EMPTY_PAGES,
+                           workers=2, politeness=HostTokenBucket(delay=0), max_attempts=MAX_ATTEMPTS)
+
+
+def make_database(workdir, name):
+    """Base temporal con el historial ya descargado: la serie anterior y la vigente hasta la marca"""
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, name)}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    session = SessionLocal()
+    session.add_all(Tesis(scjn_id=str(registro), titulo=f"Tesis {registro}")
+                    for registro in [170000, 180000, WATERMARK - 2, WATERMARK])
+    session.commit()
+    session.close()
+    return engine, SessionLocal
+
+
+def saver(SessionLocal, saved):
+    def on_new(registro, detail):
+        saved.append(registro)
+        session = SessionLocal()
+        session.add(Tesis(scjn_id=str(registro), titulo=detail.get('titulo', '')))
+        session.commit()
+        session.close()
+    return on_new
+
+
+def run_exhausted_scenario(workdir) -> bool:
+    """Registro que agota los reintentos con tesis por encima: la marca se queda antes de él"""
+    engine, SessionLocal = make_database(workdir, 'agotados.db')
+    saved = []
+    FailingProbe.failing = True
+    first = make_sync(SessionLocal, FailingProbe).run(on_new=saver(SessionLocal, saved))
+    first_mark = WatermarkStore(SessionLocal).get()['registro_max']
+
+    FailingProbe.failing = False
+    FakeProbe.probed.clear()
+    second = make_sync(SessionLocal, FailingProbe).run(on_new=saver(SessionLocal, saved))
+    second_mark = WatermarkStore(SessionLocal).get()['registro_max']
+    engine.dispose()
+    print(f"📊 Registro {FAILING} sin respuesta: {first['errores']} errores, completo {first['completo']}, "
+          f"marca {first_mark}; reintento: {FAILING in FakeProbe.probed}, marca {second_mark}")
+
+    ok = True
+    if first['errores'] != MAX_ATTEMPTS or first['completo'] or first_mark != FAILING - 1:
+        print("❌ La marca de agua pasó un registro que no se pudo sondear")
+        ok = False
+    if FAILING not in saved or not second['completo'] or second_mark != max(NEW):
+        print("❌ La siguiente ejecución no recuperó el registro sin respuesta")
+        ok = False
+    if sorted(saved) != sorted(NEW):
+        print(f"❌ Tesis nuevas guardadas: {len(saved)} de {len(NEW)}")
+        ok = False
+    return ok
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE SINCRONIZACIÓN INCREMENTAL ===")
+    workdir = tempfile.mkdtemp(prefix="incremental_sync_")
+    ok = True
+    try:
+        engine, SessionLocal = make_database(workdir, 'incremental.db')
+        saved = []
+        on_new = saver(SessionLocal, saved)
+
+        first = make_sync(SessionLocal).run(on_new=on_new)
+        first_probed = list(FakeProbe.probed)
+        print(f"\n📊 Primera ejecución: {first['nuevas']} nuevas, {first['sondeados']} sondeados en "
+              f"{first['paginas']} páginas, marca {first['desde'] - 1} -> {first['hasta']}")
+
+        FakeProbe.probed.clear()
+        second = make_sync(SessionLocal).run(on_new=on_new)
+        print(f"📊 Segunda ejecución: {second['nuevas']} nuevas, {second['sondeados']} sondeados en "
+              f"{second['paginas']} páginas, marca {second['desde'] - 1} -> {second['hasta']}")
+
+        mark = WatermarkStore(SessionLocal).get()
+        engine.dispose()
+        print(f"   Marca guardada: registro {mark['registro_max']}, publicación {mark['fecha_publicacion_max']}")
+
+        if sorted(saved) != sorted(NEW):
+            print(f"❌ Tesis nuevas guardadas: {len(saved)} de {len(NEW)}")
+            ok = False
+        if min(first_probed) <= WATERMARK:
+            print("❌ Se sondearon registros anteriores a la marca de agua")
+            ok = False
+        if not first['completo'] or first['paginas'] != -(-(max(NEW) - WATERMARK) // PAGE_SIZE) + EMPTY_PAGES:
+            print("❌ La primera ejecución no se detuvo tras las páginas vacías")
+            ok = False
+        if first['hasta'] != max(NEW) or mark['registro_max'] != max(NEW):
+            print("❌ La marca de agua no avanzó hasta el registro más alto encontrado")
+            ok = False
+        if second['nuevas'] or second['sondeados'] > EMPTY_PAGES * PAGE_SIZE:
+            print("❌ La segunda ejecución sondeó más que las páginas vacías")
+            ok = False
+        if min(FakeProbe.probed) <= max(NEW):
+            print("❌ La segunda ejecución volvió a sondear registros ya sincronizados")
+            ok = False
+        if not mark['fecha_publicacion_max']:
+            print("❌ No se guardó la fecha de publicación más reciente")
+            ok = False
+
+        FakeProbe.probed.clear()
+        if not run_exhausted_scenario(workdir):
+            ok = False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Prueba del núcleo de métricas (src/utils/metrics.py) y de performance_monitor
+- Histograma HDR: cada valor cae en su sub-cubo y los percentiles tienen <4% de error
+- Hilos: la misma operación medida a la vez en varios hilos no mezcla inicios (antes se pisaban)
+- Corrutinas: @timed sobre funciones async y `async with registry.timer(...)`
+- Errores contados por estado; exportación Prometheus con cubos acumulados y etiquetas escapadas
+- METRICS_ENABLED=false: temporizador nulo y coste por llamada casi nulo
+- ScraperFormatter reutiliza sus formateadores
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.metrics import (NULL_TIMER, Histogram, MetricsRegistry, _bucket_bounds, _bucket_index,
+                               get_registry, timed)
+from src.utils.logger import PerformanceLogger, ScraperFormatter, performance_monitor
+
+
+def check_histogram():
+    random.seed(7)
+    ok = all(_bucket_bounds(_bucket_index(v))[0] <= v <= _bucket_bounds(_bucket_index(v))[1]
+             for v in list(range(5000)) + [random.randrange(1, 10 ** 10) for _ in range(20000)])
+
+    histogram = Histogram()
+    values = sorted(random.uniform(0.0005, 5.0) for _ in range(20000))
+    for value in values:
+        histogram.record(value)
+    worst = 0.0
+    for q in (50, 90, 99, 99.9):
+        exact = values[int(len(values) * q / 100) - 1]
+        worst = max(worst, abs(histogram.percentile(q) - exact) / exact)
+    print(f"📊 Histograma: sub-cubos correctos {ok}, error relativo máximo en percentiles {worst * 100:.2f}%, "
+          f"{len(histogram.counts)} sub-cubos para {histogram.count} valores")
+    return ok and worst < 0.04 and histogram.count == len(values)
+
+
+def check_threads():
+    registry = MetricsRegistry()
+    perf = PerformanceLogger("prueba.performance", registry=registry)
+    results = {}
+
+    def work(n):
+        pause = 0.02 + 0.02 * n
+        perf.start_timer("misma_operacion")
+        time.sleep(pause)
+        results[n] = (pause, perf.end_timer("misma_operacion"))
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    @timed("decorada", registry=registry)
+    def decorated():
+        time.sleep(0.001)
+
+    pool = [threading.Thread(target=lambda: [decorated() for _ in range(200)]) for _ in range(8)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    own = all(duration is not None and pause <= duration < pause + 0.015 for pause, duration in results.values())
+    summary = registry.operation_summary("decorada")
+    print(f"📊 Hilos: duraciones propias {own}, misma_operacion {registry.operation_summary('misma_operacion')['count']} "
+          f"registros; decorada {summary['count']} llamadas desde 8 hilos (p50 {summary['p50']}s)")
+    return own and registry.operation_summary('misma_operacion')['count'] == 6 and summary['count'] == 1600
+
+
+def check_async():
+    registry = MetricsRegistry()
+
+    @timed("corrutina", registry=registry)
+    async def fetch(n):
+        await asyncio.sleep(0.01 * (n % 3))
+        if n % 10 == 0:
+            raise ValueError("fallo simulado")
+        return n
+
+    async def block():
+        async with registry.timer("bloque") as timer:
+            await asyncio.sleep(0.02)
+        return timer.seconds
+
+    async def run():
+        results = await asyncio.gather(*[fetch(n) for n in range(50)], return_exceptions=True)
+        return results, await block()
+
+    results, seconds = asyncio.run(run())
+    summary = registry.operation_summary("corrutina")
+    failures = sum(1 for result in results if isinstance(result, ValueError))
+    print(f"📊 Corrutinas: {summary['count']} medidas, {summary['errores']} errores ({failures} excepciones), "
+          f"máx {summary['max']}s; bloque async with {seconds:.3f}s")
+    # 50 corrutinas concurrentes: ninguna duración puede sumar las pausas de las demás
+    return summary['count'] == 50 and summary['errores'] == failures == 5 and summary['max'] < 0.05 \
+        and 0.02 <= seconds < 0.05
+
+
+def check_prometheus():
+    registry = MetricsRegistry()
+    for seconds in (0.002, 0.02, 0.2, 2.0, 20.0):
+        registry.observe('detalle "tesis"\n', seconds)
+    registry.observe('detalle "tesis"\n', 0.3, 'error')
+    registry.gauge('cola_pendiente', "Tareas pendientes").labels(cola='subidas').set(7)
+    text = registry.render()
+
+    buckets = [line for line in text.splitlines() if line.startswith('scjn_operation_seconds_bucket')]
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    escaped = 'operation="detalle \\"tesis\\"\\n"' in text
+    ok = (escaped and counts == sorted(counts) and counts[-1] == 6 and 'le="+Inf"' in buckets[-1]
+          and '# TYPE scjn_operation_seconds histogram' in text and 'scjn_cola_pendiente{cola="subidas"} 7' in text
+          and 'scjn_operations_total{operation="detalle \\"tesis\\"\\n",status="error"} 1' in text
+          and 'le="0.25"} 3' in text and 'le="0.5"} 4' in text)
+    print(f"📊 Prometheus: {len(text.splitlines())} líneas, cubos acumulados {counts}, etiquetas escapadas {escaped}")
+    if not ok:
+        print(text)
+    return ok
+
+
+def check_disabled():
+    enabled = MetricsRegistry(enabled=True)
+    disabled = MetricsRegistry(enabled=False)
+
+    def bare():
+        return 1
+
+    on = timed("coste", registry=enabled)(bare)
+    off = timed("coste", registry=disabled)(bare)
+    calls = 100000
+
+    def per_call(func):
+        best = float('inf')
+        for _ in range(3):
+            begin = time.perf_counter()
+            for _ in range(calls):
+                func()
+            best = min(best, (time.perf_counter() - begin) / calls)
+        return best
+
+    base, cost_off, cost_on = per_call(bare), per_call(off), per_call(on)
+    print(f"📊 Coste por llamada: sin decorar {base * 1e9:.0f} ns, desactivado +{(cost_off - base) * 1e9:.0f} ns, "
+          f"activado +{(cost_on - base) * 1e9:.0f} ns")
+    return disabled.timer("x") is NULL_TIMER and not disabled.operations() and cost_off - base < 1e-6 \
+        and enabled.operation_summary("coste")['count'] == 3 * calls
+
+
+def check_formatter_and_monitor():
+    formatter = ScraperFormatter(use_colors=True, include_context=False)
+    reference = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    same = True
+    for level in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR) * 50:
+        record = logging.LogRecord("prueba", level, __file__, 1, "mensaje %s", (level,), None)
+        output = formatter.format(record)
+        same = same and (formatter.colored or output == reference.format(record))
+    cached = len(formatter._by_level) <= 4
+
+    @performance_monitor("monitor_prueba")
+    def monitored(fail=False):
+        if fail:
+            raise RuntimeError("fallo")
+        return "ok"
+
+    monitored()
+    try:
+        monitored(fail=True)
+    except RuntimeError:
+        pass
+    summary = get_registry().operation_summary("monitor_prueba")
+    print(f"📊 Formateador reutilizado {cached}, salida idéntica {same}; performance_monitor: "
+          f"{summary['count']} llamadas, {summary['errores']} errores")
+    return same and cached and summary['count'] == 2 and summary['errores'] == 1
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL NÚCLEO DE MÉTRICAS ===\n")
+    checks = [("Histograma HDR", check_histogram), ("Hilos", check_threads), ("Corrutinas", check_async),
+              ("Exportación Prometheus", check_prometheus), ("Métricas desactivadas", check_disabled),
+              ("Formateador y performance_monitor", check_formatter_and_monitor)]
+    ok = True
+    for name, check in checks:
+        if not check():
+            print(f"❌ {name}")
+            ok = False
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
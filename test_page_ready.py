@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Prueba de las esperas explícitas de página lista con un driver guionizado
+- La espera implícita queda desactivada
+- Con contenido: la espera termina en cuanto aparece, muy por debajo de la pausa fija anterior
+- Sin contenido: termina al asentarse la página (documento, Angular y red) sin agotar el tiempo máximo
+- Paginación: espera a que el resultado de la página anterior desaparezca
+- Sin CDP: el contador de red se instala tras la carga
+- Descargas: se espera al PDF completo, no a un tiempo fijo
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.common.exceptions import StaleElementReferenceException
+
+from src.scraper.page_ready import PageReady, PENDING_TRACKER_JS, wait_for_download
+
+# Pausa fija + espera implícita que usaban los scrapers por página de detalle
+OLD_FIXED_WAIT = 3.0
+LOADED_AT = 0.3  # readyState 'complete'
+ANGULAR_STABLE_AT = 0.6
+XHR_DONE_AT = 0.8
+CONTENT_AT = 0.9
+
+
+class ScriptedElement:
+    """Elemento que pasa a obsoleto en stale_at (segundos desde la navegación)"""
+
+    def __init__(self, driver, stale_at=None):
+        self.driver = driver
+        self.stale_at = stale_at
+
+    def is_enabled(self):
+        if self.stale_at is not None and self.driver.elapsed() >= self.stale_at:
+            raise StaleElementReferenceException("elemento de la página anterior")
+        return True
+
+    def is_displayed(self):
+        return True
+
+
+class ScriptedDriver:
+    """Driver con una línea de tiempo fija de carga; solo implementa lo que usa PageReady"""
+
+    def __init__(self, cdp=True, content=('.rubro',)):
+        self.implicit_wait = 10
+        self.content = set(content)
+        self.tracker = False
+        self.scripts = 0
+        self.started = time.monotonic()
+        if cdp:
+            self.execute_cdp_cmd = self._execute_cdp_cmd
+
+    def _execute_cdp_cmd(self, cmd, params):
+        self.tracker = True
+        return {}
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def implicitly_wait(self, seconds):
+        self.implicit_wait = seconds
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        if script == PENDING_TRACKER_JS:
+            self.tracker = True
+            return None
+        t = self.elapsed()
+        selectors = args[0] if args else []
+        state = {'ready': 'complete' if t >= LOADED_AT else 'loading',
+                 'angular': t >= ANGULAR_STABLE_AT, 'pending': -1, 'idle_ms': -1, 'match': -1,
+                 'resources': 12 if t >= XHR_DONE_AT else int(t * 10)}
+        if self.tracker:
+            state['pending'] = 0 if t >= XHR_DONE_AT else 1
+            state['idle_ms'] = max(0.0, (t - XHR_DONE_AT) * 1000) if t >= XHR_DONE_AT else 0
+        if t >= CONTENT_AT:
+            for index, selector in enumerate(selectors):
+                if selector in self.content:
+                    state['match'] = index
+                    break
+        return state
+
+    def find_elements(self, by, selector):
+        if selector in self.content and self.elapsed() >= CONTENT_AT:
+            return [ScriptedElement(self)]
+        return []
+
+
+def timed(callable_):
+    begin = time.monotonic()
+    result = callable_()
+    return result, time.monotonic() - begin
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE ESPERAS EXPLÍCITAS DE PÁGINA LISTA ===")
+    ok = True
+
+    # 1. Contenido esperado: termina al aparecer
+    driver = ScriptedDriver()
+    ready = PageReady(driver, timeout=10, poll=0.02, network_idle=0.3)
+    found, seconds = timed(lambda: ready.wait(['.no-existe', '.rubro']))
+    print(f"\n📊 Con contenido: {found} en {seconds:.2f}s (antes {OLD_FIXED_WAIT:.0f}s fijos + espera implícita)")
+    if driver.implicit_wait != 0:
+        print("❌ La espera implícita no se desactivó")
+        ok = False
+    if not found or seconds > CONTENT_AT + 0.3:
+        print("❌ La espera no terminó al aparecer el contenido")
+        ok = False
+    if ready.find_first(['.no-existe', '.rubro']) is None or ready.find_first(['.no-existe']) is not None:
+        print("❌ find_first no devolvió el primer elemento existente")
+        ok = False
+
+    # 2. Contenido inexistente: termina al asentarse, no al agotar el tiempo máximo
+    driver = ScriptedDriver()
+    ready = PageReady(driver, timeout=10, poll=0.02, network_idle=0.3)
+    found, seconds = timed(lambda: ready.wait(['.no-existe']))
+    print(f"📊 Sin contenido: {found} en {seconds:.2f}s (tiempo máximo 10s)")
+    if found or not XHR_DONE_AT + 0.3 <= seconds < XHR_DONE_AT + 1.0:
+        print("❌ La página asentada sin contenido no terminó tras la red inactiva")
+        ok = False
+
+    # 3. Sin selectores: página asentada
+    driver = ScriptedDriver()
+    ready = PageReady(driver, timeout=10, poll=0.02, network_idle=0.3)
+    settled, seconds = timed(lambda: ready.wait())
+    print(f"📊 Asentada: {settled} en {seconds:.2f}s")
+    if not settled or seconds < XHR_DONE_AT + 0.3:
+        print("❌ La página se dio por asentada con peticiones en vuelo")
+        ok = False
+
+    # 4. Paginación: el resultado anterior debe quedar obsoleto antes de mirar la página nueva
+    driver = ScriptedDriver()
+    ready = PageReady(driver, timeout=10, poll=0.02, network_idle=0.3)
+    driver.started -= CONTENT_AT  # la página anterior ya tenía contenido
+    previous = ScriptedElement(driver, stale_at=CONTENT_AT + 0.4)
+    found, seconds = timed(lambda: ready.wait(['.rubro'], stale=previous))
+    print(f"📊 Paginación: {found} en {seconds:.2f}s")
+    if not found or seconds < 0.4:
+        print("❌ La espera de paginación aceptó el contenido de la página anterior")
+        ok = False
+
+    # 5. Sin CDP: el contador de red se instala tras la carga
+    driver = ScriptedDriver(cdp=False)
+    ready = PageReady(driver, timeout=10, poll=0.02, network_idle=0.3)
+    settled, seconds = timed(lambda: ready.wait())
+    print(f"📊 Sin CDP: {settled} en {seconds:.2f}s, contador instalado: {driver.tracker}")
+    if ready.cdp or not driver.tracker or not settled:
+        print("❌ Sin CDP no se instaló el contador de red tras la carga")
+        ok = False
+
+    # 6. Tiempo agotado
+    driver = ScriptedDriver()
+    ready = PageReady(driver, timeout=0.4, poll=0.02, network_idle=0.3)
+    found, seconds = timed(lambda: ready.wait(['.rubro']))
+    if found or seconds > 0.6 or ready.stats['agotadas'] != 1:
+        print("❌ La espera no respetó el tiempo máximo")
+        ok = False
+    print(f"📊 Agotada: {found} en {seconds:.2f}s, resumen {ready.summary()}")
+
+    # 7. Descarga: PDF completo, sin parciales
+    workdir = tempfile.mkdtemp(prefix="page_ready_")
+    try:
+        since = time.time()
+        partial = os.path.join(workdir, 'tesis.pdf.crdownload')
+        open(partial, 'wb').close()
+
+        def finish():
+            time.sleep(0.3)
+            with open(os.path.join(workdir, 'tesis.pdf'), 'wb') as handle:
+                handle.write(b'%PDF-1.4')
+            time.sleep(0.2)
+            os.remove(partial)
+
+        writer = threading.Thread(target=finish)
+        writer.start()
+        path, seconds = timed(lambda: wait_for_download(workdir, since=since, timeout=5, poll=0.05))
+        writer.join()
+        print(f"📊 Descarga: {os.path.basename(path) if path else None} en {seconds:.2f}s (antes 5-18s fijos)")
+        if not path or seconds < 0.5 or seconds > 1.5:
+            print("❌ La espera de descarga no terminó al completarse el PDF")
+            ok = False
+        if wait_for_download(workdir, since=time.time() + 60, timeout=0.3, poll=0.05) is not None:
+            print("❌ Se devolvió un PDF anterior al click de descarga")
+            ok = False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Prueba de la extracción de texto de PDFs (src/analysis/pdf_extractor.py) con PDFs generados
+- PDF con capa de texto: PyMuPDF, sin respaldo
+- PDF disperso (poco texto visible para PyMuPDF): respaldo con pdfplumber, que recupera más texto
+- PDF corrupto: error guardado en tesis_pdf sin sha256, se reintenta en la siguiente ejecución
+- Registro tesis_pdf y pasajes fuente='pdf' en tesis_chunk
+- Segunda ejecución: los PDFs sin cambios se omiten por sha256 y sus pasajes no se reescriben
+- PDF modificado y PDF reparado: se vuelven a extraer y a indexar
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis, TesisChunk, TesisPDF
+from src.analysis.chunk_index import document_hash
+from src.analysis.pdf_extractor import PDFExtractionStage, extract_pdf, file_sha256, fitz, pdfplumber
+
+LINE = "La suspensión en el juicio de amparo procede contra actos de autoridad que afecten derechos. "
+TEXT_ID, SPARSE_ID, BROKEN_ID, MISSING_ID = '2030542', '2030543', '2030544', '2030545'
+
+
+def write_text_pdf(path, marker, pages=3):
+    """PDF con capa de texto normal en todas sus páginas"""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{marker} página {number + 1}")
+        for line in range(20):
+            page.insert_text((72, 100 + 14 * line), LINE[:80], fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def write_sparse_pdf(path):
+    """PDF con el texto fuera del área visible: PyMuPDF lo recorta y pdfplumber sí lo lee"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), f"Registro {SPARSE_ID}")
+    for line in range(10):
+        page.insert_text((700, 100 + 20 * line), f"Texto de la tesis dispersa, línea {line}")
+    doc.save(path)
+    doc.close()
+
+
+def snapshot(SessionLocal):
+    """Registros tesis_pdf por scjn_id y pasajes pdf por tesis_id"""
+    session = SessionLocal()
+    try:
+        ids = dict(session.query(Tesis.scjn_id, Tesis.id))
+        records = {scjn_id: session.query(TesisPDF).filter(TesisPDF.tesis_id == tesis_id).first()
+                   for scjn_id, tesis_id in ids.items()}
+        records = {scjn_id: None if r is None else {
+            'sha256': r.sha256, 'paginas': r.paginas, 'texto': r.texto or '', 'extractor': r.extractor,
+            'error': r.error} for scjn_id, r in records.items()}
+        chunks = {}
+        for chunk in session.query(TesisChunk).filter(TesisChunk.fuente == 'pdf'):
+            chunks.setdefault(chunk.tesis_id, []).append((chunk.id, chunk.doc_hash))
+        return ids, records, chunks
+    finally:
+        session.close()
+
+
+def run_stage(SessionLocal, pdfs_dir, workers):
+    session = SessionLocal()
+    try:
+        return PDFExtractionStage(workers=workers, pdfs_dir=pdfs_dir).run(session)
+    finally:
+        session.close()
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE EXTRACCIÓN DE TEXTO DE PDFs ===")
+    if fitz is None or pdfplumber is None:
+        print("⚠️ PyMuPDF o pdfplumber no instalados: se omite la prueba")
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="pdf_extractor_")
+    pdfs_dir = os.path.join(workdir, 'pdfs')
+    os.makedirs(pdfs_dir)
+    ok = True
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'pdf.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+        session = SessionLocal()
+        session.add_all(Tesis(scjn_id=scjn_id, titulo=f"Tesis {scjn_id}")
+                        for scjn_id in (TEXT_ID, SPARSE_ID, BROKEN_ID, MISSING_ID))
+        session.commit()
+        session.close()
+
+        text_pdf = os.path.join(pdfs_dir, f"tesis_{TEXT_ID}.pdf")
+        sparse_pdf = os.path.join(pdfs_dir, f"{SPARSE_ID}.pdf")
+        broken_pdf = os.path.join(pdfs_dir, f"tesis_{BROKEN_ID}.pdf")
+        write_text_pdf(text_pdf, f"Registro {TEXT_ID}")
+        write_sparse_pdf(sparse_pdf)
+        with open(broken_pdf, 'wb') as f:
+            f.write(b"%PDF-1.4\n" + b"\x00contenido truncado" * 50)
+
+        # Respaldo directo: PyMuPDF ve solo la primera línea, pdfplumber el texto completo
+        direct = extract_pdf(sparse_pdf)
+        print(f"\n📊 PDF disperso: extractor {direct['extractor']}, {len(direct['texto'])} caracteres")
+        if direct['extractor'] != 'pdfplumber' or 'línea 9' not in direct['texto']:
+            print("❌ El PDF disperso no pasó al respaldo con pdfplumber")
+            ok = False
+
+        # 1. Primera ejecución en el pool de procesos
+        first = run_stage(SessionLocal, pdfs_dir, workers=2)
+        ids, records, chunks = snapshot(SessionLocal)
+        text_record, sparse_record, broken_record = records[TEXT_ID], records[SPARSE_ID], records[BROKEN_ID]
+        print(f"📊 Primera ejecución: {first['archivos']} PDFs, {first['extraidos']} extraídos "
+              f"(PyMuPDF {first['pymupdf']}, pdfplumber {first['pdfplumber']}), {first['errores']} errores, "
+              f"{first['paginas']} páginas; pasajes pdf {({t: len(c) for t, c in chunks.items()})}")
+        if (first['archivos'], first['extraidos'], first['errores'], first['pymupdf'], first['pdfplumber']) \
+                != (3, 2, 1, 1, 1) or records[MISSING_ID] is not None:
+            print("❌ Resumen de la primera ejecución incorrecto")
+            ok = False
+        if text_record['extractor'] != 'pymupdf' or text_record['paginas'] != 3 \
+                or text_record['sha256'] != file_sha256(text_pdf) or f"Registro {TEXT_ID} página 3" not in text_record['texto']:
+            print(f"❌ Registro tesis_pdf del PDF con texto incorrecto: {text_record}")
+            ok = False
+        if sparse_record['extractor'] != 'pdfplumber' or sparse_record['sha256'] != file_sha256(sparse_pdf):
+            print(f"❌ Registro tesis_pdf del PDF disperso incorrecto: {sparse_record['extractor']}")
+            ok = False
+        if broken_record['sha256'] is not None or not broken_record['error'] or broken_record['extractor']:
+            print(f"❌ El PDF corrupto guardó hash o extractor: {broken_record}")
+            ok = False
+        expected_hashes = {ids[TEXT_ID]: document_hash(text_record['texto']),
+                           ids[SPARSE_ID]: document_hash(sparse_record['texto'])}
+        if set(chunks) != set(expected_hashes) \
+                or any({h for _, h in chunks[t]} != {expected} for t, expected in expected_hashes.items()):
+            print("❌ Pasajes fuente='pdf' ausentes o con hash de documento incorrecto")
+            ok = False
+
+        # 2. Sin cambios: se omiten por sha256, el corrupto se reintenta
+        second = run_stage(SessionLocal, pdfs_dir, workers=1)
+        _, _, second_chunks = snapshot(SessionLocal)
+        print(f"📊 Segunda ejecución: {second['sin_cambios']} sin cambios, {second['extraidos']} extraídos, "
+              f"{second['errores']} errores")
+        if (second['sin_cambios'], second['extraidos'], second['errores']) != (2, 0, 1) or second_chunks != chunks:
+            print("❌ La segunda ejecución no omitió los PDFs sin cambios (o reescribió sus pasajes)")
+            ok = False
+
+        # 3. PDF modificado y PDF reparado
+        write_text_pdf(text_pdf, f"Registro {TEXT_ID} versión corregida", pages=2)
+        write_text_pdf(broken_pdf, f"Registro {BROKEN_ID}", pages=1)
+        third = run_stage(SessionLocal, pdfs_dir, workers=1)
+        _, records, third_chunks = snapshot(SessionLocal)
+        print(f"📊 Tercera ejecución: {third['sin_cambios']} sin cambios, {third['extraidos']} extraídos, "
+              f"{third['errores']} errores; páginas del modificado {records[TEXT_ID]['paginas']}")
+        if (third['sin_cambios'], third['extraidos'], third['errores']) != (1, 2, 0):
+            print("❌ Los PDFs modificados o reparados no se volvieron a extraer")
+            ok = False
+        if records[TEXT_ID]['paginas'] != 2 or 'versión corregida' not in records[TEXT_ID]['texto'] \
+                or {h for _, h in third_chunks[ids[TEXT_ID]]} != {document_hash(records[TEXT_ID]['texto'])}:
+            print("❌ El PDF modificado no se re-indexó")
+            ok = False
+        if records[BROKEN_ID]['sha256'] != file_sha256(broken_pdf) or records[BROKEN_ID]['error'] \
+                or ids[BROKEN_ID] not in third_chunks or third_chunks[ids[SPARSE_ID]] != chunks[ids[SPARSE_ID]]:
+            print("❌ El PDF reparado no se extrajo o se tocaron pasajes sin cambios")
+            ok = False
+
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
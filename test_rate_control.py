@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Prueba del controlador adaptativo de peticiones
+- AIMD con reloj simulado (determinista): la concurrencia crece hasta el máximo con respuestas rápidas,
+  se reduce a la mitad con lentitud (sin alargar la pausa) y con errores (alargando la pausa)
+- Cortacircuitos con reloj simulado: se abre con errores sostenidos, semiabierto tras el enfriamiento
+  con una única petición de prueba y cerrado si esta responde
+- Servidor simulado con hilos reales y capacidad limitada: el controlador aprovecha la capacidad
+- Caída total: el circuito se abre y el servidor deja de recibir peticiones
+- Recuperación: la petición de prueba cierra el circuito y se vuelve a trabajar
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.rate_control import RateController, CircuitOpenError, CLOSED
+
+CAPACITY = 3
+WORKERS = 8
+SETTINGS = dict(min_delay=0.0, max_delay=0.5, initial_delay=0.05, max_concurrency=WORKERS, latency_target=0.1,
+                error_threshold=0.5, window=10, cooldown=0.2, max_cooldown=1.0)
+
+
+class FakeClock:
+    """Reloj monotónico simulado: sleep() avanza el tiempo sin esperar"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+def open_requests(controller, clock):
+    """Iniciar con try_begin() tantas peticiones como permita la ventana de concurrencia"""
+    tickets = []
+    while len(tickets) < int(controller.limit):
+        ticket = controller.try_begin()
+        if ticket is None:
+            if controller.state()['circuito'] != CLOSED:
+                break
+            clock.sleep(controller.delay)
+            continue
+        tickets.append(ticket)
+    return tickets
+
+
+def check_aimd() -> bool:
+    """Ajuste AIMD y cortacircuitos con reloj simulado, sin hilos"""
+    ok = True
+    clock = FakeClock()
+    controller = RateController('simulado', clock=clock, sleep=clock.sleep, **SETTINGS)
+
+    # Servidor sano: la ventana crece hasta el máximo y la pausa baja al mínimo
+    for _ in range(60):
+        tickets = open_requests(controller, clock)
+        clock.sleep(0.02)
+        for ticket in tickets:
+            controller.finish(ticket, True, 0.02)
+    state = controller.state()
+    print(f"\n📊 Sano (reloj simulado): concurrencia {state['concurrencia']}, pausa {state['pausa']}s")
+    if controller.limit != WORKERS or state['pausa'] != 0.0:
+        print("❌ La concurrencia no creció hasta el máximo con respuestas rápidas")
+        ok = False
+
+    # Lentitud: un único recorte a la mitad por ventana en vuelo, sin alargar la pausa
+    delay = controller.delay
+    tickets = open_requests(controller, clock)
+    clock.sleep(0.2)
+    for ticket in tickets:
+        controller.finish(ticket, True, 0.2)
+    print(f"📊 Lentitud: {len(tickets)} peticiones lentas, concurrencia {controller.limit}, pausa {controller.delay:.3f}s")
+    if controller.limit != WORKERS / 2 or controller.delay != delay:
+        print("❌ La concurrencia no se redujo a la mitad con la lentitud")
+        ok = False
+
+    # Error: recorte a la mitad y pausa de al menos 0.1 s
+    tickets = open_requests(controller, clock)
+    for ticket in tickets[:-1]:
+        controller.finish(ticket, True, 0.02)
+    limit = controller.limit
+    controller.finish(tickets[-1], False, 0.02)
+    print(f"📊 Error: concurrencia {limit} -> {controller.limit}, pausa {controller.delay:.3f}s")
+    if controller.limit != max(1.0, limit / 2) or controller.delay < 0.1:
+        print("❌ La concurrencia no se recortó con el error")
+        ok = False
+
+    # Errores sostenidos: el circuito se abre y rechaza sin enviar
+    for _ in range(10):
+        if controller.state()['circuito'] != CLOSED:
+            break
+        for ticket in open_requests(controller, clock):
+            controller.finish(ticket, False, 0.005)
+    try:
+        with controller.request(block=False):
+            pass
+        rejected = False
+    except CircuitOpenError:
+        rejected = True
+    state = controller.state()
+    print(f"📊 Errores sostenidos: circuito {state['circuito']}, {state['aperturas']} aperturas, "
+          f"concurrencia {state['concurrencia']}")
+    if state['aperturas'] != 1 or not rejected or controller.try_begin() is not None or controller.limit != 1.0:
+        print("❌ El circuito no se abrió con errores sostenidos")
+        ok = False
+
+    # Tras el enfriamiento (y la pausa vigente): una sola petición de prueba; si responde, el circuito se cierra
+    clock.sleep(SETTINGS['cooldown'] + controller.delay)
+    trial = controller.try_begin()
+    second = controller.try_begin()
+    if trial is not None:
+        controller.finish(trial, True, 0.02)
+    state = controller.state()
+    print(f"📊 Enfriamiento: petición de prueba {trial}, segunda {second}, circuito {state['circuito']}")
+    if trial is None or second is not None or state['circuito'] != CLOSED:
+        print("❌ El circuito no pasó por semiabierto con una única petición de prueba")
+        ok = False
+    return ok
+
+
+class FakeServer:
+    """Servidor simulado: latencia base, degradación por encima de CAPACITY y modo caído"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.hits = 0
+        self.errors = 0
+        self.down = False
+
+    def get(self):
+        with self.lock:
+            self.active += 1
+            self.hits += 1
+            overloaded = self.active > CAPACITY
+            down = self.down
+        try:
+            if down:
+                time.sleep(0.005)
+                raise ConnectionError("503 servicio no disponible")
+            time.sleep(0.2 if overloaded else 0.02)
+            if overloaded and self.hits % 3 == 0:
+                raise ConnectionError("503 sobrecarga")
+        except ConnectionError:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def run_workers(controller, server, seconds, block=True):
+    """WORKERS hilos pidiendo sin pausa propia durante seconds; devuelve (éxitos, fallos, rechazadas)"""
+    counts = {'ok': 0, 'fail': 0, 'rejected': 0}
+    lock = threading.Lock()
+    stop_at = time.time() + seconds
+
+    def worker():
+        while time.time() < stop_at:
+            try:
+                with controller.request(block=block):
+                    server.get()
+                key = 'ok'
+            except ConnectionError:
+                key = 'fail'
+            except CircuitOpenError:
+                key = 'rejected'
+                time.sleep(0.01)
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts['ok'], counts['fail'], counts['rejected']
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL CONTROL ADAPTATIVO DE PETICIONES ===")
+    ok = check_aimd()
+    controller = RateController('simulado', **SETTINGS)
+    server = FakeServer()
+
+    # 1. Servidor sano con capacidad limitada (hilos reales)
+    good, bad, _ = run_workers(controller, server, 2.0)
+    state = controller.state()
+    print(f"\n📊 Sano: {good} éxitos, {bad} errores, {state['lentas']} lentas ({good / 2.0:.0f} peticiones/s), "
+          f"concurrencia {state['concurrencia']}, pausa {state['pausa']}s, latencia {state['latencia_media']}s")
+    print("   Referencia con pausa fija de 1 s: 2 peticiones en 2 s")
+    if good < 40:
+        print("❌ El controlador no aprovechó la capacidad del servidor")
+        ok = False
+
+    # 2. Caída total: el circuito debe cortar el tráfico (sin bloquear: se rechaza al instante)
+    server.down = True
+    hits_before = server.hits
+    good, bad, rejected = run_workers(controller, server, 1.5, block=False)
+    hits_down = server.hits - hits_before
+    state = controller.state()
+    print(f"📊 Caída: {hits_down} peticiones llegaron al servidor en 1.5 s, {rejected} rechazadas sin enviar, "
+          f"{state['aperturas']} aperturas del circuito, circuito {state['circuito']}")
+    if state['aperturas'] == 0:
+        print("❌ El circuito no se abrió con errores sostenidos")
+        ok = False
+    if hits_down > 40:
+        print("❌ El servidor caído siguió recibiendo demasiadas peticiones")
+        ok = False
+
+    # 3. Recuperación (bloqueando: los hilos esperan a que el circuito deje pasar la petición de prueba)
+    server.down = False
+    good, bad, _ = run_workers(controller, server, 2.5)
+    state = controller.state()
+    print(f"📊 Recuperación: {good} éxitos, {bad} errores, circuito {state['circuito']}, "
+          f"concurrencia {state['concurrencia']}")
+    if state['circuito'] != CLOSED or good < 5 or bad:
+        print("❌ El circuito no se cerró tras la recuperación del servidor")
+        ok = False
+
+    print(f"\n📈 Estado final: {state}")
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Prueba del rastreo por rangos de registro digital con un espacio de IDs simulado
+- Dos zonas densas (con huecos pequeños) separadas por un hueco largo
+- Registros ya guardados en tesis que no deben sondearse
+- Errores transitorios que se reintentan
+- Interrupción por tiempo y reanudación desde el mapa de bits persistido
+- Cobertura: todas las tesis simuladas encontradas con muchos menos sondeos que IDs
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis, RegistroBlock
+from src.automation.frontier import HostTokenBucket
+from src.automation.registro_crawler import RegistroCrawler, BLOCK_SIZE, WINDOW
+
+START, END = 200000, 215000
+# Zonas con tesis (90 % de densidad) y el hueco largo entre ellas
+ZONES = [(200000, 201500), (212000, 213000)]
+FAULT_EVERY = 97
+
+
+def build_space():
+    rng = random.Random(7)
+    return {registro for zone_start, zone_end in ZONES for registro in range(zone_start, zone_end)
+            if rng.random() < 0.9}
+
+
+class FakeProbe:
+    """Sonda simulada: detalle si el registro existe, None si no; errores cada FAULT_EVERY llamadas"""
+
+    calls = 0
+    lock = threading.Lock()
+    probed = []
+
+    def __init__(self, space):
+        self.space = space
+
+    def __call__(self, registro):
+        with FakeProbe.lock:
+            FakeProbe.calls += 1
+            FakeProbe.probed.append(registro)
+            if FakeProbe.calls % FAULT_EVERY == 0:
+                raise RuntimeError("timeout simulado")
+        time.sleep(0.0005)
+        if registro in self.space:
+            return {'rubro': f"Rubro {registro}", 'texto': 'Texto', 'url': f"/detalle/tesis/{registro}"}
+        return None
+
+
+def make_crawler(SessionLocal, space):
+    return RegistroCrawler(lambda: FakeProbe(space), session_factory=SessionLocal, workers=4,
+                           gap_threshold=200, max_stride=1024, politeness=HostTokenBucket(delay=0))
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL RASTREO POR REGISTRO DIGITAL ===")
+    workdir = tempfile.mkdtemp(prefix="registro_crawler_")
+    ok = True
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'registros.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+
+        space = build_space()
+        known = sorted(space)[::10]
+        session = SessionLocal()
+        session.add_all(Tesis(scjn_id=str(registro), titulo=f"Tesis {registro}") for registro in known)
+        session.commit()
+        session.close()
+
+        found = set()
+
+        def on_hit(registro, detail):
+            found.add(registro)
+
+        # Primera sesión: se corta por tiempo
+        crawler = make_crawler(SessionLocal, space)
+        first = crawler.crawl(START, END, deadline=time.time() + 0.5, on_hit=on_hit)
+        crawler.close()
+        print(f"\n📊 Primera sesión: {first['sondeados']} sondeados, {first['encontrados']} nuevas, "
+              f"{first['conocidos']} ya en BD, completo={first['completo']}, cobertura {first['cobertura']:.1f}%")
+
+        # Segunda sesión: instancia nueva, retoma desde el mapa de bits guardado
+        crawler = make_crawler(SessionLocal, space)
+        second = crawler.crawl(START, END, on_hit=on_hit)
+        crawler.close()
+        print(f"📊 Segunda sesión: {second['sondeados']} sondeados, {second['encontrados']} nuevas, "
+              f"{second['huecos']} huecos, {second['saltados']} IDs saltados, {second['errores']} errores reintentados")
+        print(f"   Cobertura {second['cobertura']:.1f}% de {second['total']} IDs, "
+              f"{second['sondeos_por_minuto']:.0f} sondeos/min, completo={second['completo']}")
+
+        probed_known = set(FakeProbe.probed) & set(known)
+        expected = space - set(known)
+        missing = expected - found
+        repeated = len(FakeProbe.probed) - len(set(FakeProbe.probed))
+        session = SessionLocal()
+        blocks = session.query(RegistroBlock).all()
+        stored_bytes = sum(len(block.probados) + len(block.encontrados) for block in blocks)
+        session.close()
+        engine.dispose()
+
+        print(f"   Tesis simuladas: {len(space)}  |  Nuevas encontradas: {len(found)}/{len(expected)}  |  "
+              f"Sondeos totales: {FakeProbe.calls} para {END - START} IDs")
+        print(f"   Mapa de bits: {len(blocks)} bloques, {stored_bytes} bytes")
+
+        if first['completo'] or first['sondeados'] == 0:
+            print("❌ La primera sesión debía cortarse por tiempo tras sondear algo")
+            ok = False
+        if missing:
+            print(f"❌ Faltan {len(missing)} tesis (p. ej. {sorted(missing)[:5]})")
+            ok = False
+        if probed_known:
+            print(f"❌ Se sondearon {len(probed_known)} registros que ya estaban en la base de datos")
+            ok = False
+        # Al cortar con reintentos pendientes se repiten, como mucho, los vacíos de las últimas ventanas
+        if repeated > second['errores'] + first['errores'] + 2 * WINDOW:
+            print(f"❌ {repeated} sondeos repetidos además de los reintentos por error")
+            ok = False
+        if not second['completo'] or second['huecos'] == 0 or second['saltados'] == 0:
+            print("❌ El hueco largo no se detectó o el rango no se completó")
+            ok = False
+        if FakeProbe.calls > (END - START) * 0.6:
+            print("❌ El muestreo de huecos no redujo los sondeos")
+            ok = False
+        if stored_bytes > 2 * (END // BLOCK_SIZE - START // BLOCK_SIZE + 1) * BLOCK_SIZE // 8:
+            print("❌ El mapa de bits ocupa más de 2 bits por registro")
+            ok = False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
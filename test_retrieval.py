@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Prueba del motor de recuperación de /api/consulta (src/analysis/retrieval.py)
+- Índice en memoria: se construye una vez y después solo aplica tesis nuevas o cambiadas
+- Un UPDATE de texto/rubro (ORM) se detecta por fecha_actualizacion; los borrados reconstruyen en segundo plano
+- Las inserciones con insert_tesis_once (ON CONFLICT, sin eventos del ORM) también se detectan
+- Triggers FTS5 de tesis_chunk: insertar, actualizar y borrar pasajes mantiene el índice de texto completo
+- tesis_chunk: búsqueda -> re-ranking -> empaquetado con presupuesto de tokens; las tesis nuevas o
+  cambiadas después de indexar_pasajes.py se dividen antes de buscar
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+TEXTOS = {
+    '2030001': "La suspensión provisional en el juicio de amparo procede contra actos de autoridad.",
+    '2030002': "El interés superior de la niñez orienta las decisiones sobre guarda y custodia.",
+    '2030003': "La prescripción de la acción penal se interrumpe con la orden de aprehensión.",
+}
+
+
+def add_tesis(session, scjn_id, texto):
+    from src.database.models import Tesis
+
+    tesis = Tesis(scjn_id=scjn_id, titulo=f"Tesis {scjn_id}", rubro=texto.split('.')[0].upper(), texto=texto)
+    session.add(tesis)
+    session.commit()
+    return tesis.id
+
+
+def found(engine, session, question):
+    return engine.retrieve(question, session=session).scjn_ids
+
+
+def check_memory_index(session):
+    from src.analysis.retrieval import HashingEmbedder, RetrievalEngine
+    from src.config import Config
+    from src.database.models import Tesis, insert_tesis_once, tesis_row
+
+    Config.RETRIEVAL_CHUNK_INDEX = False
+    engine = RetrievalEngine(embedder=HashingEmbedder())
+    for scjn_id, texto in TEXTOS.items():
+        add_tesis(session, scjn_id, texto)
+
+    first = found(engine, session, "suspensión provisional en amparo")
+    again = found(engine, session, "interés superior de la niñez")
+    built = engine.index_stats['reconstrucciones']
+
+    # Inserción nueva con el ORM y otra con ON CONFLICT (sin eventos del ORM): solo esas se indexan
+    add_tesis(session, '2030004', "La usucapión requiere posesión pública, pacífica y continua.")
+    insert_tesis_once(session, tesis_row({'scjn_id': '2030005', 'titulo': "Tesis 2030005"},
+                                         {'texto': "El arrendamiento inmobiliario se rige por el código civil."}))
+    inserted = found(engine, session, "usucapión posesión pacífica") + found(engine, session, "arrendamiento inmobiliario")
+    after_insert = dict(engine.index_stats)
+
+    # UPDATE del texto (como hace el análisis): la tesis se re-indexa, el término anterior deja de encontrarse
+    tesis = session.query(Tesis).filter_by(scjn_id='2030003').one()
+    tesis.texto = "La caducidad de la instancia opera por inactividad procesal de las partes."
+    tesis.rubro = "CADUCIDAD DE LA INSTANCIA"
+    session.commit()
+    updated = found(engine, session, "caducidad de la instancia")
+    stale = found(engine, session, "prescripción acción penal aprehensión")
+
+    print(f"📊 Índice en memoria: {built} construcción inicial, encontrados {first + again}; inserciones "
+          f"{inserted} con {after_insert['tesis_reindexadas']} tesis aplicadas en {after_insert['incrementales']} "
+          f"pasos incrementales; tras UPDATE {updated}, término viejo {stale}")
+    ok = (first[:1] == ['2030001'] and again[:1] == ['2030002'] and built == 1
+          and inserted == ['2030004', '2030005'] and after_insert['reconstrucciones'] == 1
+          and after_insert['tesis_reindexadas'] == 2 and updated[:1] == ['2030003'] and '2030003' not in stale)
+
+    # Borrado: no deja marca por fila, se reconstruye en segundo plano sin bloquear la consulta
+    session.query(Tesis).filter_by(scjn_id='2030002').delete()
+    session.commit()
+    found(engine, session, "guarda y custodia")
+    engine._rebuild_thread.join(timeout=30)
+    deleted = found(engine, session, "interés superior de la niñez guarda custodia")
+    print(f"📊 Tras borrar una tesis: {engine.index_stats['reconstrucciones']} construcciones, encontrados {deleted}, "
+          f"{engine.stats()['passages']} pasajes vivos")
+    return ok and engine.index_stats['reconstrucciones'] == 2 and '2030002' not in deleted
+
+
+def fts_ids(session, term):
+    from sqlalchemy import text
+
+    return [row[0] for row in session.execute(
+        text("SELECT rowid FROM tesis_chunk_fts WHERE tesis_chunk_fts MATCH :q ORDER BY rowid"), {'q': term})]
+
+
+def check_fts_triggers(session):
+    from src.database.models import TesisChunk
+
+    chunks = [TesisChunk(tesis_id=900 + n, fuente='texto', orden=0, inicio=0, fin=len(texto), texto=texto,
+                         doc_hash='prueba')
+              for n, texto in enumerate(["Amparo indirecto contra leyes autoaplicativas.",
+                                         "Amparo directo en materia laboral."])]
+    session.add_all(chunks)
+    session.commit()
+    inserted = fts_ids(session, 'amparo')
+    folded = fts_ids(session, 'autoaplicativas') == fts_ids(session, 'AUTOAPLICATIVAS') == [chunks[0].id]
+
+    chunks[0].texto = "Revisión fiscal interpuesta por la autoridad demandada."
+    session.commit()
+    after_update = (fts_ids(session, 'amparo'), fts_ids(session, 'fiscal'), fts_ids(session, 'autoaplicativas'))
+
+    session.delete(chunks[1])
+    session.commit()
+    after_delete = fts_ids(session, 'laboral')
+    print(f"📊 Triggers FTS5: insertados {inserted}, tras actualizar amparo/fiscal/anterior {after_update}, "
+          f"tras borrar {after_delete}")
+    ok = (inserted == [c.id for c in chunks] and folded and after_update == ([chunks[1].id], [chunks[0].id], [])
+          and after_delete == [])
+
+    session.delete(chunks[0])
+    session.commit()
+    return ok
+
+
+def check_chunk_search(session):
+    from src.analysis.chunk_index import ChunkIndexer
+    from src.analysis.retrieval import HashingEmbedder, RetrievalEngine
+    from src.analysis.chunking import estimate_tokens
+    from src.config import Config
+    from src.database.models import Tesis, TesisChunk, insert_tesis_once, tesis_row
+
+    Config.RETRIEVAL_CHUNK_INDEX = True
+    largo = " ".join(f"El control de convencionalidad ex officio obliga a todas las autoridades, párrafo {n}."
+                     for n in range(60))
+    add_tesis(session, '2040001', largo)
+    add_tesis(session, '2040002', "La pensión alimenticia se fija con base en la capacidad del deudor.")
+    embedder = HashingEmbedder()
+    ChunkIndexer(embedder=embedder).sync_texto(session)
+
+    engine = RetrievalEngine(embedder=embedder, token_budget=300)
+    result = engine.retrieve("control de convencionalidad ex officio", session=session)
+    doc = result.documents[0] if result.documents else {}
+    used = sum(estimate_tokens(p['texto']) for d in result.documents for p in d['pasajes'])
+    print(f"📊 tesis_chunk: {result.scjn_ids}, {len(doc.get('pasajes', []))} pasajes de "
+          f"{session.query(TesisChunk).filter_by(tesis_id=doc.get('id')).count()} ({used} tokens, presupuesto 300)")
+    ok = (result.scjn_ids[:1] == ['2040001'] and result.context.startswith("Documento 1 (registro 2040001)")
+          and 0 < used <= 300 and all(p['fuente'] == 'texto' for p in doc['pasajes']))
+
+    # Tesis llegadas después de indexar (ON CONFLICT, como el scraper) y un UPDATE de texto
+    insert_tesis_once(session, tesis_row({'scjn_id': '2040003', 'titulo': "Tesis 2040003"},
+                                         {'texto': "La servidumbre de paso se constituye sobre el predio sirviente."}))
+    tesis = session.query(Tesis).filter_by(scjn_id='2040002').one()
+    tesis.texto = "La compensación económica procede al disolverse el vínculo matrimonial."
+    session.commit()
+    nueva = engine.retrieve("servidumbre de paso predio sirviente", session=session).scjn_ids
+    cambiada = engine.retrieve("compensación económica vínculo matrimonial", session=session).scjn_ids
+    vieja = engine.retrieve("pensión alimenticia capacidad del deudor", session=session).scjn_ids
+    print(f"📊 Puesta al día: tesis nueva {nueva}, tesis cambiada {cambiada}, texto anterior {vieja}")
+    return ok and nueva[:1] == ['2040003'] and cambiada[:1] == ['2040002'] and '2040002' not in vieja
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL MOTOR DE RECUPERACIÓN ===\n")
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp}/recuperacion.db"
+    ok = True
+    try:
+        from src.database.models import create_tables, get_session
+
+        create_tables()
+        session = get_session()
+        try:
+            checks = [("Índice en memoria", lambda: check_memory_index(session)),
+                      ("Triggers FTS5", lambda: check_fts_triggers(session)),
+                      ("Búsqueda en tesis_chunk", lambda: check_chunk_search(session))]
+            for name, check in checks:
+                if not check():
+                    print(f"❌ {name}")
+                    ok = False
+        finally:
+            session.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Prueba de los backends de almacenamiento (put / get / exists / link / batch_put)
+- Backend local en un directorio temporal (siempre)
+- Backend S3 contra MinIO u otro servicio compatible si S3_ENDPOINT_URL está definido
+  (p. ej. docker run -p 9000:9000 minio/minio server /data)
+- Archivo mayor que el umbral multipart para validar la subida en partes paralelas
+- Motor de la cola upload_queue con el backend: enlaces escritos en tesis.storage_key / storage_link
+  (las columnas de Drive quedan vacías)
+- Migración: add_missing_columns mueve a storage_key los enlaces locales/S3 guardados antes como IDs de Drive
+"""
+
+import os
+import sys
+import time
+import shutil
+import filecmp
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis, UploadTask, add_missing_columns
+from src.storage.upload_queue import UploadQueue, DONE
+from src.storage.backends import (
+    BackendUploadEngine, LocalStorageBackend, S3StorageBackend, StorageError, StoredObject, boto3
+)
+
+MB = 1024 * 1024
+
+
+def write_file(path, size):
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n" + os.urandom(size))
+    return path
+
+
+def check_backend(backend, workdir):
+    """Contrato común de StorageBackend"""
+    ok = True
+    small = write_file(os.path.join(workdir, 'pequeno.pdf'), 64 * 1024)
+
+    stored = backend.put(small, 'Derecho Civil/10a. Época/Pleno/Tesis_1.pdf')
+    copy = os.path.join(workdir, 'copia.pdf')
+    backend.get(stored.key, copy)
+    if not (backend.exists(stored.key) and backend.link(stored.key) and filecmp.cmp(small, copy, shallow=False)):
+        print("  ❌ put/get/exists/link no conservan el archivo")
+        ok = False
+
+    if backend.exists('no/existe.pdf') or backend.link('no/existe.pdf') is not None:
+        print("  ❌ Un objeto inexistente aparece como existente")
+        ok = False
+    try:
+        backend.get('no/existe.pdf', copy)
+        print("  ❌ get de un objeto inexistente no falló")
+        ok = False
+    except StorageError:
+        pass
+    try:
+        backend.put(small, '../fuera.pdf')
+        print("  ❌ Se aceptó una clave con '..'")
+        ok = False
+    except StorageError:
+        pass
+
+    # Archivo mayor que el umbral multipart (S3 lo sube en partes paralelas)
+    large = write_file(os.path.join(workdir, 'grande.pdf'), 12 * MB)
+    start = time.time()
+    stored = backend.put(large, 'grandes/Tesis_grande.pdf')
+    backend.get(stored.key, copy)
+    if not filecmp.cmp(large, copy, shallow=False):
+        print("  ❌ El archivo grande no se recupera íntegro")
+        ok = False
+    print(f"  📦 Archivo de 12 MB: {time.time() - start:.2f}s (subida + descarga)")
+
+    files = [write_file(os.path.join(workdir, f"lote_{i}.pdf"), 128 * 1024) for i in range(24)]
+    start = time.time()
+    results = backend.batch_put([(path, f"lote/{os.path.basename(path)}") for path in files])
+    stored_count = sum(1 for r in results if isinstance(r, StoredObject))
+    print(f"  📤 batch_put: {stored_count}/{len(files)} en {time.time() - start:.2f}s")
+    if stored_count != len(files):
+        print(f"  ❌ Errores en batch_put: {[r for r in results if not isinstance(r, StoredObject)][:3]}")
+        ok = False
+    return ok
+
+
+def check_queue_engine(backend, workdir):
+    """La cola persistente sube con el backend y escribe id/enlace en tesis"""
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, f'cola_{backend.name}.db')}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    session = SessionLocal()
+    items = []
+    for i in range(20):
+        scjn_id = f"{backend.name}{i:04d}"
+        session.add(Tesis(scjn_id=scjn_id, titulo=f"Tesis {scjn_id}"))
+        path = write_file(os.path.join(workdir, f"tesis_{scjn_id}.pdf"), 32 * 1024)
+        items.append({'ruta': path, 'nombre': f"Tesis_{scjn_id}.pdf", 'scjn_id': scjn_id,
+                      'prefijo': 'Derecho Penal/11a. Época/Primera Sala'})
+    session.commit()
+    session.close()
+
+    queue = UploadQueue(session_factory=SessionLocal)
+    queue.enqueue_many(items)
+    stats = BackendUploadEngine(backend, queue=queue, workers=4).run()
+
+    session = SessionLocal()
+    linked = session.query(Tesis).filter(Tesis.storage_key.isnot(None), Tesis.storage_link.isnot(None)).count()
+    as_drive = session.query(Tesis).filter(Tesis.google_drive_id.isnot(None)).count()
+    with_folder = session.query(UploadTask).filter(UploadTask.parent_id.isnot(None)).count()
+    session.close()
+    engine.dispose()
+
+    print(f"  ☁️ Cola: {stats['subidos']} subidos, {stats['archivos_por_minuto']:.0f} archivos/min, "
+          f"{linked} tesis con storage_key, {as_drive} con google_drive_id")
+    last_key = BackendUploadEngine.task_key(items[-1])
+    return queue.counts()[DONE] == len(items) and linked == len(items) and backend.exists(last_key) \
+        and with_folder == 0 and as_drive == 0
+
+
+def check_column_migration(workdir):
+    """Base anterior a storage_key: los objetos locales/S3 guardados como IDs de Drive se mueven"""
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'migracion.db')}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tesis DROP COLUMN storage_key"))
+        conn.execute(text("ALTER TABLE tesis DROP COLUMN storage_link"))
+        for scjn_id, object_id in (('m1', 's3://tesis/Derecho Penal/Tesis_m1.pdf'),
+                                   ('m2', '/srv/almacen/Tesis_m2.pdf'), ('m3', '1AbCdEfGhIjKlMnOp')):
+            conn.execute(text("INSERT INTO tesis (scjn_id, google_drive_id, google_drive_link) "
+                              "VALUES (:scjn_id, :object_id, :object_id)"), {'scjn_id': scjn_id, 'object_id': object_id})
+    with engine.connect() as conn:
+        add_missing_columns(conn)
+    with engine.connect() as conn:
+        rows = {row[0]: (row[1], row[2]) for row in conn.execute(
+            text("SELECT scjn_id, google_drive_id, storage_key FROM tesis"))}
+    engine.dispose()
+
+    print(f"  🧱 Migración: {rows}")
+    return rows == {'m1': (None, 's3://tesis/Derecho Penal/Tesis_m1.pdf'), 'm2': (None, '/srv/almacen/Tesis_m2.pdf'),
+                    'm3': ('1AbCdEfGhIjKlMnOp', None)}
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE BACKENDS DE ALMACENAMIENTO ===")
+    workdir = tempfile.mkdtemp(prefix="storage_backends_")
+    backends = [LocalStorageBackend(root=os.path.join(workdir, 'almacen'))]
+
+    if os.getenv('S3_ENDPOINT_URL') and boto3 is not None:
+        s3 = S3StorageBackend(bucket=os.getenv('S3_TEST_BUCKET', 'scjn-tesis-prueba'),
+                              prefix=f"prueba-{int(time.time())}",
+                              multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+        s3.ensure_bucket()
+        backends.append(s3)
+    else:
+        print("⚠️ S3_ENDPOINT_URL no definido (o boto3 no instalado): se omite el backend S3")
+
+    ok = True
+    try:
+        for backend in backends:
+            print(f"\n📁 Backend {backend.name}")
+            backend_ok = check_backend(backend, workdir) and check_queue_engine(backend, workdir)
+            print(f"  {'✅' if backend_ok else '❌'} {backend.name}")
+            ok = ok and backend_ok
+        if not check_column_migration(workdir):
+            print("❌ Los enlaces de backends no Drive no se movieron a storage_key")
+            ok = False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prueba de memoria acotada del recorrido por trozos (src/database/streaming.py) con 100k tesis
+- iter_keyset e iter_rows: el pico de memoria con 100k filas no supera el techo y no crece con la tabla
+  (comparado con recorrer solo las primeras 10k); .all() sobre las mismas columnas, como referencia
+- Escribir y confirmar entre trozos mientras se recorre un filtro que esas escrituras invalidan:
+  cada fila se visita exactamente una vez
+- count_rows y check_database_health sobre la misma base
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = 100000
+CEILING_MB = 16
+TEXTO = "Texto de la tesis con contenido jurisprudencial. " * 20  # ~1 KB por fila
+HTML = "<div>" + TEXTO * 2 + "</div>"
+
+
+def peak_mb(run):
+    """(resultado, pico de memoria en MB) de run()"""
+    tracemalloc.start()
+    try:
+        result = run()
+        return result, tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def populate(engine, Tesis):
+    rows = [{'scjn_id': str(2000000 + n), 'titulo': f"TÍTULO {n}", 'rubro': f"RUBRO {n}", 'texto': TEXTO,
+             'html_content': HTML, 'procesado': False} for n in range(ROWS)]
+    with engine.begin() as conn:
+        for start in range(0, ROWS, 10000):
+            conn.execute(Tesis.__table__.insert(), rows[start:start + 10000])
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE RECORRIDO CON MEMORIA ACOTADA ===")
+    ok = True
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp}/streaming.db"
+    try:
+        from src.database.models import Tesis, check_database_health, create_tables, engine, get_session
+        from src.database.streaming import count_rows, iter_chunks, iter_keyset, iter_rows
+
+        create_tables()
+        begin = time.time()
+        populate(engine, Tesis)
+        print(f"\n📊 {ROWS} tesis creadas ({time.time() - begin:.1f}s)")
+
+        session = get_session()
+        try:
+            columns = (Tesis.id, Tesis.scjn_id, Tesis.texto)
+
+            def consume(rows):
+                count, chars = 0, 0
+                for _, scjn_id, texto in rows:
+                    count += 1
+                    chars += len(texto)
+                return count
+
+            small, small_peak = peak_mb(lambda: consume(iter_keyset(session, *columns, limit=ROWS // 10)))
+            keyset, keyset_peak = peak_mb(lambda: consume(iter_keyset(session, *columns)))
+            streamed, rows_peak = peak_mb(lambda: consume(iter_rows(session, *columns, order_by=Tesis.id)))
+            listed, listed_peak = peak_mb(lambda: len(session.query(*columns).all()))
+            print(f"📊 Pico de memoria: iter_keyset {keyset_peak:.1f} MB ({small_peak:.1f} MB con {small} filas), "
+                  f"iter_rows {rows_peak:.1f} MB, .all() {listed_peak:.1f} MB (techo {CEILING_MB} MB)")
+
+            if (small, keyset, streamed, listed) != (ROWS // 10, ROWS, ROWS, ROWS):
+                print(f"❌ Filas recorridas incorrectas: {small}, {keyset}, {streamed}, {listed}")
+                ok = False
+            if keyset_peak > CEILING_MB or rows_peak > CEILING_MB:
+                print("❌ El recorrido superó el techo de memoria")
+                ok = False
+            if keyset_peak > small_peak * 2 + 1:
+                print("❌ La memoria de iter_keyset crece con el número de filas")
+                ok = False
+
+            # Marcar como procesadas mientras se recorren las no procesadas
+            pendiente = Tesis.procesado == False
+            seen, last, ordered = 0, 0, True
+            for chunk in iter_chunks(session, Tesis.id, filters=[pendiente], batch_size=700):
+                ids = [tesis_id for (tesis_id,) in chunk]
+                ordered = ordered and ids[0] > last and ids == sorted(ids)
+                last = ids[-1]
+                seen += len(ids)
+                session.query(Tesis).filter(Tesis.id.in_(ids)).update({'procesado': True}, synchronize_session=False)
+                session.commit()
+            pending = count_rows(session, Tesis, filters=[pendiente])
+            print(f"📊 Recorrido con escrituras: {seen} filas visitadas, {pending} pendientes, orden {ordered}")
+            if seen != ROWS or pending != 0 or not ordered:
+                print("❌ El recorrido con escrituras entre trozos saltó o repitió filas")
+                ok = False
+
+            total = count_rows(session, Tesis)
+            by_column = count_rows(session, Tesis.scjn_id, filters=[Tesis.scjn_id.like('2000%')])
+        finally:
+            session.close()
+
+        health = check_database_health()
+        print(f"📊 count_rows: {total} tesis, {by_column} con prefijo 2000; salud: {health}")
+        if total != ROWS or by_column != 1000 or health.get('total_tesis') != ROWS:
+            print("❌ Recuentos incorrectos")
+            ok = False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
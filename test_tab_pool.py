@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Prueba del executor de pestañas con un navegador guionizado de varias pestañas
+- Las cargas avanzan en paralelo en todas las pestañas (mucho más rápido que en serie)
+- Cada resultado corresponde a su URL (la extracción se hace en la pestaña correcta)
+- Las pestañas se reciclan sin cambiar su número
+- Una página que nunca queda lista falla con TimeoutError sin bloquear a las demás
+- Las cargas pasan por el controlador adaptativo (concurrencia limitada por él)
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.scraper.page_ready import PENDING_TRACKER_JS
+from src.scraper.rate_control import RateController
+from src.scraper.tab_pool import NAVIGATE_JS, TabExecutor
+
+LOAD = 0.2  # segundos hasta que la página tiene contenido
+TABS = 4
+PAGES = 40
+NEVER = "https://sjf2.scjn.gob.mx/detalle/tesis/nunca"
+
+
+class SwitchTo:
+    def __init__(self, browser):
+        self.browser = browser
+
+    def window(self, handle):
+        if handle not in self.browser.tabs:
+            raise KeyError(handle)
+        self.browser.current = handle
+
+    def new_window(self, kind):
+        self.browser.counter += 1
+        handle = f"tab-{self.browser.counter}"
+        self.browser.tabs[handle] = {'url': 'about:blank', 'since': time.monotonic(), 'previous': False}
+        self.browser.current = handle
+
+
+class ScriptedBrowser:
+    """Navegador con pestañas; cada página tarda LOAD segundos en tener contenido"""
+
+    def __init__(self):
+        self.counter = 1
+        self.tabs = {'tab-1': {'url': 'about:blank', 'since': time.monotonic(), 'previous': False}}
+        self.current = 'tab-1'
+        self.switch_to = SwitchTo(self)
+        self.max_loading = 0
+
+    @property
+    def current_window_handle(self):
+        return self.current
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def close(self):
+        del self.tabs[self.current]
+
+    def _loading(self):
+        now = time.monotonic()
+        return sum(1 for tab in self.tabs.values() if tab['url'] != 'about:blank' and now - tab['since'] < LOAD)
+
+    def execute_script(self, script, *args):
+        tab = self.tabs[self.current]
+        if script == NAVIGATE_JS:
+            tab.update(url=args[0], since=time.monotonic(), previous=False)
+            self.max_loading = max(self.max_loading, self._loading())
+            return None
+        if script == PENDING_TRACKER_JS or script == "window.stop();":
+            return None
+        elapsed = time.monotonic() - tab['since']
+        loaded = elapsed >= LOAD and tab['url'] != NEVER
+        return {'ready': 'complete' if loaded else 'loading', 'angular': loaded, 'previous': False,
+                'pending': 0 if loaded else 1, 'idle_ms': 1000 if loaded else 0,
+                'match': 0 if loaded else -1, 'resources': 5}
+
+    @property
+    def current_url(self):
+        return self.tabs[self.current]['url']
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL EXECUTOR DE PESTAÑAS ===")
+    ok = True
+    browser = ScriptedBrowser()
+    controller = RateController('simulado', min_delay=0.0, max_delay=0.5, initial_delay=0.0,
+                                max_concurrency=TABS, latency_target=5.0, window=10)
+    executor = TabExecutor(driver=browser, tabs=TABS, selectors=['.rubro'], timeout=1.0,
+                           recycle_after=7, rate=controller, poll=0.01)
+
+    urls = [f"https://sjf2.scjn.gob.mx/detalle/tesis/{2030000 + index}" for index in range(PAGES)]
+    begin = time.monotonic()
+    results = list(executor.map(urls, lambda driver: driver.current_url))
+    seconds = time.monotonic() - begin
+    serial = PAGES * LOAD
+    print(f"\n📊 {PAGES} páginas en {seconds:.2f}s con {TABS} pestañas (en serie: {serial:.1f}s), "
+          f"máximo {browser.max_loading} cargando a la vez")
+
+    if results != urls:
+        print("❌ Resultados extraídos de la pestaña equivocada")
+        ok = False
+    if seconds > serial / 2.5:
+        print("❌ Las pestañas no cargaron en paralelo")
+        ok = False
+    if browser.max_loading > TABS:
+        print("❌ Más cargas simultáneas que pestañas")
+        ok = False
+
+    never = executor.submit(NEVER, lambda driver: driver.current_url)
+    others = [executor.submit(url, lambda driver: driver.current_url) for url in urls[:6]]
+    if [future.result(timeout=5) for future in others] != urls[:6]:
+        print("❌ La página que nunca carga bloqueó a las demás")
+        ok = False
+    try:
+        never.result(timeout=5)
+        print("❌ La página que nunca carga no falló")
+        ok = False
+    except TimeoutError:
+        pass
+
+    executor.shutdown()
+    summary = executor.summary()
+    print(f"📊 Resumen: {summary['paginas']} páginas, {summary['agotadas']} agotadas, "
+          f"{summary['reciclajes']} reciclajes, {len(browser.tabs)} pestañas abiertas")
+    print(f"📊 Controlador: {controller.state()}")
+    if summary['reciclajes'] == 0 or len(browser.tabs) != TABS:
+        print("❌ Las pestañas no se reciclaron manteniendo su número")
+        ok = False
+    if controller.state()['en_vuelo'] != 0:
+        print("❌ Quedaron peticiones abiertas en el controlador")
+        ok = False
+    try:
+        executor.submit(urls[0])
+        print("❌ Se aceptó una tarea con el executor cerrado")
+        ok = False
+    except RuntimeError:
+        pass
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
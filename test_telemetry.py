@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Prueba de la telemetría del pipeline (src/utils/telemetry.py) y del servidor /metrics
+- Etapas: duración y elementos ok/error; el nivel http del detalle mide navegacion y extraccion
+- Motor de subidas: etapa subida por archivo, etapa db por lote escrito en la cola
+- Colectores: profundidad de colas (con caché), pool de pestañas, controladores de tasa; uno que
+  falle no impide exportar el resto
+- Servidor /metrics en un puerto libre, leído con urllib como lo haría Prometheus
+- METRICS_ENABLED=false: etapas nulas sin registrar nada
+"""
+
+import os
+import sys
+import socket
+import shutil
+import tempfile
+import urllib.request
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DETAIL_HTML = "<html><body><div class='rubro'>RUBRO DE PRUEBA</div><div class='texto'>Texto</div></body></html>"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def sample(text, name, **labels):
+    """Valor de la muestra `name{labels}` en la exportación (None si no aparece)"""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    line_start = f"{name}{{{wanted}}} " if labels else f"{name} "
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {'Content-Type': 'text/html; charset=utf-8'}
+    text = DETAIL_HTML
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        import requests
+        self.calls += 1
+        if self.calls % 4 == 0:
+            raise requests.ConnectionError("conexión rechazada")
+        return FakeResponse()
+
+
+class FakeExecutor:
+    """Lo que collect_driver_pools lee de un TabExecutor"""
+    broken = False
+    _closed = False
+    tab_count = 4
+
+    def __init__(self):
+        self._tabs = [{'task': object()}, {'task': object()}, {'task': None}, {'task': None}]
+        self._queue = [1, 2, 3]
+
+
+def check_stages(registry):
+    from src.utils.telemetry import DB, PDF, record_stage, stage
+
+    for n in range(10):
+        with stage(PDF, registry=registry) as s:
+            if n % 5 == 0:
+                s.fail()
+    try:
+        with stage(DB, items=3, registry=registry):
+            raise RuntimeError("fallo de escritura")
+    except RuntimeError:
+        pass
+    record_stage(DB, 0.01, items=7, registry=registry)
+
+    text = registry.render()
+    pdf_ok = sample(text, 'scjn_stage_items_total', stage='pdf', status='ok')
+    pdf_error = sample(text, 'scjn_stage_items_total', stage='pdf', status='error')
+    db_ok = sample(text, 'scjn_stage_items_total', stage='db', status='ok')
+    db_error = sample(text, 'scjn_stage_items_total', stage='db', status='error')
+    counted = sample(text, 'scjn_stage_seconds_count', stage='pdf')
+    print(f"📊 Etapas: pdf {pdf_ok:.0f} ok / {pdf_error:.0f} error, db {db_ok:.0f} ok / {db_error:.0f} error, "
+          f"{counted:.0f} duraciones de pdf")
+    return (pdf_ok, pdf_error, db_ok, db_error, counted) == (8, 2, 7, 3, 10)
+
+
+def check_fetcher(registry):
+    from src.scraper.rate_control import RateController
+    from src.scraper.tiered_fetcher import TieredFetcher
+
+    rate = RateController('local', min_delay=0.0, initial_delay=0.0, max_concurrency=4, error_threshold=1.0)
+    fetcher = TieredFetcher(session=FakeSession(), rate=rate, http_first=True)
+    results = [fetcher.fetch_http(f"https://sjf2.scjn.gob.mx/detalle/tesis/{n}") for n in range(8)]
+    text = registry.render()
+    nav_ok = sample(text, 'scjn_stage_items_total', stage='navegacion', status='ok')
+    nav_error = sample(text, 'scjn_stage_items_total', stage='navegacion', status='error')
+    extracted = sample(text, 'scjn_stage_items_total', stage='extraccion', status='ok')
+    print(f"📊 Nivel http: {sum(r is not None for r in results)} detalles, navegacion {nav_ok:.0f} ok / "
+          f"{nav_error:.0f} error, extraccion {extracted:.0f}")
+    return (nav_ok, nav_error, extracted) == (6, 2, 6)
+
+
+def check_upload_engine(registry, tmp):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.database.models import Base
+    from src.storage.upload_queue import UploadEngine, UploadQueue
+
+    class LocalEngine(UploadEngine):
+        def _upload(self, task):
+            if task['nombre'].startswith('roto'):
+                raise FileNotFoundError(task['ruta'])
+            return f"id-{task['id']}", None, os.path.getsize(task['ruta'])
+
+    engine = create_engine(f"sqlite:///{tmp}/subidas.db")
+    Base.metadata.create_all(engine)
+    queue = UploadQueue(session_factory=sessionmaker(bind=engine), max_attempts=1)
+    items = []
+    for n in range(6):
+        path = os.path.join(tmp, f"tesis_{n}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF" + b"x" * 1000)
+        items.append({'ruta': path, 'nombre': f"{'roto' if n == 5 else 'tesis'}_{n}.pdf"})
+    queue.enqueue_many(items)
+    before = sample(registry.render(), 'scjn_stage_items_total', stage='db', status='ok') or 0
+    stats = LocalEngine(queue=queue, workers=2, writeback_batch=4, poll_interval=0.05).run()
+
+    text = registry.render()
+    up_ok = sample(text, 'scjn_stage_items_total', stage='subida', status='ok')
+    up_error = sample(text, 'scjn_stage_items_total', stage='subida', status='error')
+    written = sample(text, 'scjn_stage_items_total', stage='db', status='ok') - before
+    uploaded = sample(text, 'scjn_drive_uploaded_bytes_total')
+    print(f"📊 Subidas: {stats['subidos']} subidas, subida {up_ok:.0f} ok / {up_error:.0f} error, "
+          f"{written:.0f} resultados escritos en la cola, {uploaded:.0f} bytes")
+    return (up_ok, up_error, written, uploaded) == (5, 1, 6, 5 * 1004)
+
+
+def check_collectors(registry):
+    from src.database.models import CrawlTask, UploadTask, WorkItem, create_tables, get_session
+    from src.scraper.rate_control import get_rate_controller
+    from src.utils.telemetry import QueueDepthCollector, collect_driver_pools, collect_rate_controllers, \
+        track_driver_pool
+
+    create_tables()
+    session = get_session()
+    try:
+        session.add_all([CrawlTask(clave=f"detalle:{n}", tipo='detalle', host='sjf2.scjn.gob.mx',
+                                   estado='pending' if n < 7 else 'done') for n in range(10)])
+        session.add_all([WorkItem(clave=f"registro:{n}", tipo='registro', estado='leased') for n in range(3)])
+        session.add_all([UploadTask(ruta=f"/tmp/{n}.pdf", nombre=f"{n}.pdf", estado='failed') for n in range(2)])
+        session.commit()
+    finally:
+        session.close()
+
+    executor = FakeExecutor()
+    track_driver_pool(executor)
+    controller = get_rate_controller('prueba.telemetria')
+    queues = QueueDepthCollector(ttl=60)
+
+    def broken(registry):
+        raise RuntimeError("colector roto")
+
+    for collector in (broken, queues, collect_driver_pools, collect_rate_controllers):
+        registry.add_collector(collector)
+
+    text = registry.render()
+    pending = sample(text, 'scjn_queue_depth', cola='crawl_frontier', estado='pending')
+    leased = sample(text, 'scjn_queue_depth', cola='work_queue', estado='leased')
+    failed = sample(text, 'scjn_queue_depth', cola='upload_queue', estado='failed')
+    busy = sample(text, 'scjn_driver_pool_busy')
+    waiting = sample(text, 'scjn_driver_pool_waiting')
+    limit = sample(text, 'scjn_rate_concurrency_limit', host='prueba.telemetria')
+    print(f"📊 Colectores: crawl_frontier pending {pending}, work_queue leased {leased}, upload_queue failed "
+          f"{failed}; pestañas ocupadas {busy} de {sample(text, 'scjn_driver_pool_tabs')}, {waiting} en espera; "
+          f"límite de concurrencia {limit}")
+
+    # Caché: una tarea nueva no aparece hasta que vence el ttl
+    session = get_session()
+    session.add(CrawlTask(clave="detalle:extra", tipo='detalle', host='sjf2.scjn.gob.mx'))
+    session.commit()
+    session.close()
+    cached = sample(registry.render(), 'scjn_queue_depth', cola='crawl_frontier', estado='pending') == 7
+    queues.ttl = 0
+    refreshed = sample(registry.render(), 'scjn_queue_depth', cola='crawl_frontier', estado='pending') == 8
+    print(f"📊 Caché de colas: sin reconsultar {cached}, tras vencer {refreshed}")
+    registry._collectors.remove(broken)
+    return (pending, leased, failed, busy, waiting) == (7, 3, 2, 2, 3) \
+        and limit == controller.state()['concurrencia'] and cached and refreshed
+
+
+def check_server(registry):
+    from src.utils.telemetry import start_metrics_server, stop_metrics_server
+
+    port = free_port()
+    server = start_metrics_server(port, host='127.0.0.1', registry=registry)
+    try:
+        again = start_metrics_server(port, host='127.0.0.1', registry=registry)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            content_type = response.headers['Content-Type']
+            body = response.read().decode('utf-8')
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5) as response:
+            health = response.read()
+    finally:
+        stop_metrics_server()
+    print(f"📊 Servidor: {len(body.splitlines())} líneas en /metrics ({content_type}), healthz {health!r}, "
+          f"idempotente {again is server}")
+    return server is not None and again is server and content_type.startswith('text/plain; version=0.0.4') \
+        and 'scjn_stage_seconds_bucket{stage="pdf"' in body and health == b"ok\n"
+
+
+def check_disabled():
+    from src.utils.metrics import MetricsRegistry
+    from src.utils.telemetry import NULL_STAGE, drive_request, record_stage, stage, start_metrics_server
+
+    disabled = MetricsRegistry(enabled=False)
+    with stage('pdf', registry=disabled) as s:
+        s.fail()
+    record_stage('db', 1.0, registry=disabled)
+    drive_request('ok', registry=disabled)
+    null = stage('pdf', registry=disabled) is NULL_STAGE
+    server = start_metrics_server(free_port(), registry=disabled)
+    print(f"📊 Desactivado: etapa nula {null}, familias registradas {len(disabled._families)}, servidor {server}")
+    return null and 'stage_seconds' not in disabled._families and server is None
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DE TELEMETRÍA DEL PIPELINE ===\n")
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp}/telemetria.db"
+    ok = True
+    try:
+        from src.utils.metrics import get_registry
+
+        registry = get_registry()
+        registry.reset()
+        checks = [("Etapas", lambda: check_stages(registry)), ("Nivel http", lambda: check_fetcher(registry)),
+                  ("Motor de subidas", lambda: check_upload_engine(registry, tmp)),
+                  ("Colectores", lambda: check_collectors(registry)), ("Servidor /metrics", lambda: check_server(registry)),
+                  ("Telemetría desactivada", check_disabled)]
+        for name, check in checks:
+            if not check():
+                print(f"❌ {name}")
+                ok = False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Prueba del fetcher por niveles contra un servidor HTTP local
+- Página renderizada en servidor: se sirve por HTTP (gzip, conexión persistente) sin navegador
+- Página que requiere JavaScript (solo la raíz de la app) y errores 500: se escala al navegador
+- App sin renderizar con un contenedor .contenido genérico en una URL de detalle: sin el registro digital
+  en la página no cuenta como tesis y se escala al navegador
+- Tras varios fallos HTTP seguidos solo se prueba HTTP 1 de cada N páginas
+- Nivel anotado en cada detalle y estadísticas de páginas sin navegador
+"""
+
+import os
+import sys
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from src.scraper.rate_control import RateController
+from src.scraper.tiered_fetcher import BROWSER, HTTP, TieredFetcher, TierStats
+
+RENDERED = """<html><body><h1>Tesis {id}</h1><p>Registro digital: {id}</p><div class="rubro">RUBRO DE LA TESIS {id}</div>
+<div class="texto">Texto completo de la tesis {id}, con las consideraciones que sustentan el criterio.</div>
+<a class="pdf-link" href="/pdf/{id}.pdf">PDF</a></body></html>"""
+APP_SHELL = """<html><head><script src="main.js"></script></head><body><app-root></app-root></body></html>"""
+# Marco de la aplicación: el contenedor genérico tiene texto, pero no el de la tesis pedida
+APP_SHELL_WRAPPER = """<html><head><link rel="canonical" href="{path}"><script src="main.js"></script></head>
+<body><div class="contenido">Semanario Judicial de la Federación. Cargando la información solicitada, espere
+un momento por favor.</div><app-root></app-root></body></html>"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+    connections = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        kind, _, ident = self.path.rpartition('/')
+        with Handler.lock:
+            Handler.requests_seen.append(self.path)
+            Handler.connections.add(self.client_address)
+        if ident == '500':
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if kind.startswith('/shell'):
+            html = APP_SHELL_WRAPPER.format(path=self.path)
+        elif kind.endswith('/render') or kind.endswith('/detalle/tesis'):
+            html = RENDERED.format(id=ident)
+        else:
+            html = APP_SHELL
+        body = html.encode('utf-8')
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Browser:
+    """Nivel de respaldo: cuenta las URL que llegan al navegador"""
+
+    def __init__(self):
+        self.urls = []
+
+    def __call__(self, url):
+        self.urls.append(url)
+        return {'rubro': f"Rubro con navegador {url.rsplit('/', 1)[1]}", 'texto': 'Texto'}
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL FETCHER POR NIVELES ===")
+    ok = True
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    stats = TierStats()
+    rate = RateController('local', min_delay=0.0, initial_delay=0.0, max_concurrency=4)
+    fetcher = TieredFetcher(session=session, rate=rate, http_first=True, skip_after=3, stats=stats)
+    browser = Browser()
+    try:
+        # 1. Páginas renderizadas en servidor
+        details = [fetcher.fetch(f"{base}/render/{ident}", browser) for ident in range(10)]
+        connections = len(Handler.connections)
+        print(f"\n📊 Renderizadas: niveles {sorted({d['nivel'] for d in details})}, "
+              f"{len(Handler.requests_seen)} peticiones en {connections} conexiones")
+        if any(d['nivel'] != HTTP for d in details) or browser.urls:
+            print("❌ Páginas con los campos en el HTML llegaron al navegador")
+            ok = False
+        if details[3]['rubro'] != "RUBRO DE LA TESIS 3" or not details[3]['pdf_url'].endswith('/pdf/3.pdf'):
+            print(f"❌ Campos mal extraídos: {details[3]}")
+            ok = False
+        if connections > 2:
+            print("❌ La sesión no reutilizó la conexión (keep-alive)")
+            ok = False
+
+        # 2. Página de la aplicación sin contenido y error 500: navegador
+        shell = fetcher.fetch(f"{base}/app/20", browser)
+        failed = fetcher.fetch(f"{base}/render/500", browser)
+        print(f"📊 Escaladas: {shell['nivel']}, {failed['nivel']} (navegador: {len(browser.urls)} páginas), "
+              f"errores del controlador {rate.state()['errores']}")
+        if shell['nivel'] != BROWSER or failed['nivel'] != BROWSER:
+            print("❌ Páginas sin campos no se escalaron al navegador")
+            ok = False
+        if rate.state()['errores'] != 1:
+            print("❌ El error 500 no se contó en el controlador")
+            ok = False
+
+        # 2b. URL de detalle: la tesis renderizada se acepta, el marco con .contenido no
+        detail = fetcher.fetch(f"{base}/detalle/tesis/2030542", browser)
+        wrapped = fetcher.fetch(f"{base}/shell/detalle/tesis/2030543", browser)
+        print(f"📊 URL de detalle: tesis renderizada por {detail['nivel']}, marco con .contenido por {wrapped['nivel']}")
+        if detail['nivel'] != HTTP or wrapped['nivel'] != BROWSER or wrapped['texto'] != 'Texto':
+            print("❌ El marco de la aplicación con un contenedor genérico se aceptó como tesis")
+            ok = False
+
+        # 3. Sitio solo con JavaScript: el nivel HTTP se prueba 1 de cada skip_after páginas
+        before = len(Handler.requests_seen)
+        for ident in range(30, 60):
+            fetcher.fetch(f"{base}/app/{ident}", browser)
+        http_tries = len(Handler.requests_seen) - before
+        print(f"📊 Racha de fallos: {http_tries} peticiones HTTP para 30 páginas")
+        if http_tries > 12:
+            print("❌ El nivel HTTP se siguió probando en cada página")
+            ok = False
+
+        # 4. Vuelve a servir: el nivel HTTP se recupera
+        recovered = [fetcher.fetch(f"{base}/render/{ident}", browser)['nivel'] for ident in range(70, 76)]
+        if recovered[-1] != HTTP:
+            print("❌ El nivel HTTP no se recuperó cuando volvió a servir")
+            ok = False
+
+        summary = stats.summary()
+        print(f"📊 Estadísticas: {summary}")
+        if summary[HTTP] + summary[BROWSER] != 10 + 2 + 2 + 30 + 6 or not 0 < summary['sin_navegador'] < 1:
+            print("❌ Estadísticas por nivel incorrectas")
+            ok = False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
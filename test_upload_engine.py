@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Prueba del motor de subidas concurrentes contra un servidor Drive falso local
+- Servidor HTTP que imita files.create (subida resumible por fragmentos y multipart) y files.delete
+- Inyección de errores 429 / 503 / 403 rateLimitExceeded para validar el backoff
+- Fragmentos fallidos y reinicio del motor: la subida se retoma desde la sesión guardada
+- Estado de la sesión guardada: offset guardado por detrás del confirmado, subida ya terminada y sesión caducada
+- Copia corrupta en Drive: el MD5 no coincide y la subida se repite
+- Deduplicación: un PDF con los mismos bytes que uno ya subido se enlaza sin volver a subirlo; una copia
+  fuera del árbol de la carpeta raíz no cuenta, una en una subcarpeta sí
+- Base de datos SQLite temporal (cola upload_queue y enlaces en tesis)
+- Throughput en archivos/min con 1 y con varios hilos
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, Tesis, UploadSession, UploadTask
+from src.storage.upload_queue import UploadQueue, DriveUploadEngine, DONE, FAILED, file_md5
+
+# Latencia simulada por petición (segundos) y frecuencia de errores inyectados
+FAKE_LATENCY = 0.05
+FAULT_EVERY = 7
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+
+class FakeDriveState:
+    """Estado compartido del servidor falso"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.sessions = {}
+        self.files = {}
+        self.faults = 0
+        self.requests = 0
+        self.chunk_requests = 0
+        self.chunk_fault_every = 0
+        self.sessions_created = 0
+        self.corrupt_names = set()
+        self.deleted = 0
+        self.list_requests = 0
+
+    def next_fault(self):
+        """Cada FAULT_EVERY peticiones de inicio devuelve un error transitorio distinto"""
+        with self.lock:
+            self.requests += 1
+            if self.requests % FAULT_EVERY:
+                return None
+            self.faults += 1
+            return [(429, 'rateLimitExceeded'), (503, 'backendError'), (403, 'userRateLimitExceeded')][self.faults % 3]
+
+    def next_chunk_fault(self):
+        """Cada chunk_fault_every fragmentos se pierde la conexión (503)"""
+        with self.lock:
+            self.chunk_requests += 1
+            return bool(self.chunk_fault_every) and self.chunk_requests % self.chunk_fault_every == 0
+
+    def create_file(self, metadata, data):
+        with self.lock:
+            file_id = f"fake{next(self.counter)}"
+            md5 = hashlib.md5(data).hexdigest()
+            self.files[file_id] = {'metadata': metadata, 'size': len(data), 'md5': md5,
+                                   'modified': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}
+            if metadata.get('name') in self.corrupt_names:
+                # Simular una copia dañada una sola vez
+                self.corrupt_names.discard(metadata['name'])
+                md5 = hashlib.md5(data + b'corrupto').hexdigest()
+        return {'id': file_id, 'webViewLink': f"https://drive.google.com/file/d/{file_id}/view", 'md5Checksum': md5}
+
+    def list_files(self, query: str):
+        """files.list: filtra por tipo (carpeta o no) y por 'X' in parents como Drive"""
+        folders = f"mimeType='{FOLDER_MIME}'" in query
+        parents = set(re.findall(r"'([^']+)' in parents", query))
+        listed = []
+        for file_id, info in self.files.items():
+            metadata = info['metadata']
+            if (metadata.get('mimeType') == FOLDER_MIME) != folders:
+                continue
+            if parents and not parents.intersection(metadata.get('parents') or []):
+                continue
+            listed.append({'id': file_id, 'name': metadata.get('name'), 'parents': metadata.get('parents'),
+                           'md5Checksum': info['md5'], 'size': str(info['size']), 'modifiedTime': info['modified'],
+                           'trashed': False, 'webViewLink': f"https://drive.google.com/file/d/{file_id}/view"})
+        return listed
+
+
+def make_handler(state: FakeDriveState):
+    class FakeDriveHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return self.rfile.read(length) if length else b''
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status, reason):
+            self._send_json(status, {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason}]}})
+
+        def _send_incomplete(self, received):
+            """308: fragmento aceptado, con el rango confirmado hasta ahora"""
+            self.send_response(308)
+            if received:
+                self.send_header('Range', f"bytes=0-{received - 1}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            time.sleep(FAKE_LATENCY)
+            body = self._read_body()
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+
+            if not parsed.path.endswith('/drive/v3/files'):
+                return self._send_error(404, 'notFound')
+
+            fault = state.next_fault()
+            if fault:
+                return self._send_error(*fault)
+
+            upload_type = params.get('uploadType', [''])[0]
+            if upload_type == 'resumable':
+                metadata = json.loads(body or b'{}')
+                with state.lock:
+                    upload_id = str(next(state.counter))
+                    state.sessions[upload_id] = {'metadata': metadata, 'data': bytearray()}
+                    state.sessions_created += 1
+                host = self.headers.get('Host')
+                location = f"http://{host}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+                return self._send_json(200, {}, headers={'Location': location})
+
+            # Subida multipart: metadatos y contenido en el mismo cuerpo
+            return self._send_json(200, state.create_file({'multipart': True}, body))
+
+        def do_PUT(self):
+            time.sleep(FAKE_LATENCY)
+            body = self._read_body()
+            params = parse_qs(urlparse(self.path).query)
+            upload_id = params.get('upload_id', [''])[0]
+            with state.lock:
+                upload = state.sessions.get(upload_id)
+            if upload is None:
+                return self._send_error(404, 'notFound')
+
+            # Content-Range: "bytes inicio-fin/total" (fragmento) o "bytes */total" (consulta de estado)
+            content_range = self.headers.get('Content-Range', '').replace('bytes ', '')
+            span, _, total = content_range.partition('/')
+            data = upload['data']
+
+            if span == '*':
+                if total != '*' and len(data) == int(total):
+                    return self._finish(upload_id, upload)
+                return self._send_incomplete(len(data))
+
+            if state.next_chunk_fault():
+                return self._send_error(503, 'backendError')
+
+            first = int(span.split('-')[0]) if span else 0
+            if first != len(data):
+                return self._send_error(400, 'badContentRange')
+            data.extend(body)
+
+            if total != '*' and len(data) == int(total):
+                return self._finish(upload_id, upload)
+            return self._send_incomplete(len(data))
+
+        def _finish(self, upload_id, upload):
+            with state.lock:
+                state.sessions.pop(upload_id, None)
+            return self._send_json(200, state.create_file(upload['metadata'], bytes(upload['data'])))
+
+        def do_GET(self):
+            # files.list: listado de una sola página para el índice MD5
+            time.sleep(FAKE_LATENCY)
+            if urlparse(self.path).path != '/drive/v3/files':
+                return self._send_error(404, 'notFound')
+            with state.lock:
+                files = state.list_files(parse_qs(urlparse(self.path).query).get('q', [''])[0])
+                state.list_requests += 1
+            return self._send_json(200, {'files': files})
+
+        def do_DELETE(self):
+            with state.lock:
+                state.deleted += 1
+                state.files.pop(urlparse(self.path).path.rsplit('/', 1)[-1], None)
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    return FakeDriveHandler
+
+
+def make_service_factory(base_url: str):
+    """Clientes de Drive apuntando al servidor falso"""
+    # rootUrl apunta al servidor falso (api_endpoint no redirige las URLs de subida /upload)
+    discovery = json.loads(get_static_doc('drive', 'v3'))
+    discovery['rootUrl'] = f"{base_url}/"
+
+    def service_factory():
+        http = httplib2.Http(timeout=10)
+        # Igual que googleapiclient.http.build_http: 308 es "fragmento aceptado", no una redirección
+        http.redirect_codes = http.redirect_codes - {308}
+        return build_from_document(discovery, http=http)
+
+    return service_factory
+
+
+def prepare_queue(name: str, files: int, size: int, workdir: str):
+    """Base de datos temporal con N tesis y sus PDFs encolados"""
+    db_path = os.path.join(workdir, f"queue_{name}.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    session = SessionLocal()
+    items = []
+    for i in range(files):
+        scjn_id = f"{name}{i:05d}"
+        path = os.path.join(workdir, f"tesis_{scjn_id}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n" + os.urandom(size))
+        session.add(Tesis(scjn_id=scjn_id, titulo=f"Tesis {scjn_id}"))
+        items.append({'ruta': path, 'nombre': os.path.basename(path), 'scjn_id': scjn_id})
+    session.commit()
+    session.close()
+
+    queue = UploadQueue(session_factory=SessionLocal, max_attempts=5)
+    queue.enqueue_many(items)
+    return engine, SessionLocal, queue, items
+
+
+def count_linked(SessionLocal):
+    session = SessionLocal()
+    linked = session.query(Tesis).filter(Tesis.google_drive_id.isnot(None)).count()
+    session.close()
+    return linked
+
+
+def run_scenario(workers: int, files: int, base_url: str, workdir: str):
+    """Subir N archivos con el número de hilos indicado y validar la escritura en tesis"""
+    engine, SessionLocal, queue, _ = prepare_queue(str(workers), files, 32 * 1024, workdir)
+
+    # Backoff corto para que la prueba sea rápida
+    upload_engine = DriveUploadEngine(queue=queue, workers=workers, service_factory=make_service_factory(base_url),
+                                      writeback_batch=10, folder_id='carpeta_prueba',
+                                      backoff_base=0.05, backoff_max=0.5)
+    stats = upload_engine.run()
+
+    counts = queue.counts()
+    linked = count_linked(SessionLocal)
+    engine.dispose()
+    return stats, counts, linked
+
+
+def run_resume_scenario(state: FakeDriveState, files: int, base_url: str, workdir: str) -> bool:
+    """Fragmentos fallidos + reinicio: la segunda ejecución retoma las sesiones guardadas"""
+    chunk = 256 * 1024
+    engine, SessionLocal, queue, items = prepare_queue('r', files, 4 * chunk, workdir)
+    state.corrupt_names.add(items[0]['nombre'])
+    state.chunk_fault_every = 5
+    sessions_before = state.sessions_created
+
+    # Primera ejecución sin reintentos: las tareas con un fragmento fallido quedan a medias
+    first = DriveUploadEngine(queue=UploadQueue(session_factory=SessionLocal, max_attempts=1), workers=4,
+                              service_factory=make_service_factory(base_url), folder_id='carpeta_prueba',
+                              max_retries=0, chunk_size=chunk)
+    first_stats = first.run()
+    interrupted = queue.counts()[FAILED]
+    session = SessionLocal()
+    saved_sessions = session.query(UploadSession).count()
+    session.close()
+
+    # "Reinicio del proceso": un motor nuevo sin estado en memoria, solo la base de datos
+    queue.retry_failed()
+    state.chunk_fault_every = 0
+    second = DriveUploadEngine(queue=queue, workers=4, service_factory=make_service_factory(base_url),
+                               folder_id='carpeta_prueba', chunk_size=chunk,
+                               backoff_base=0.05, backoff_max=0.5)
+    second_stats = second.run()
+
+    counts = queue.counts()
+    linked = count_linked(SessionLocal)
+    engine.dispose()
+
+    # Sesiones abiertas de más: una por archivo más la repetida por la copia corrupta
+    extra_sessions = state.sessions_created - sessions_before - files
+    total_bytes = sum(os.path.getsize(item['ruta']) for item in items)
+    sent = first_stats['bytes_enviados'] + second_stats['bytes_enviados']
+
+    print(f"\n📊 Reanudación: {interrupted} subidas interrumpidas ({saved_sessions} con sesión guardada), "
+          f"{second_stats['reanudadas']} retomadas, "
+          f"{extra_sessions} sesiones extra")
+    print(f"   Bytes enviados {sent} de {total_bytes}  |  MD5 verificados "
+          f"{first_stats['md5_verificados'] + second_stats['md5_verificados']}, "
+          f"fallidos {first_stats['md5_fallidos'] + second_stats['md5_fallidos']}, copias borradas {state.deleted}")
+    print(f"   Cola: {counts}  |  Tesis con enlace: {linked}")
+
+    ok = True
+    if counts[DONE] != files or linked != files:
+        print(f"❌ Se esperaban {files} subidas completadas y enlazadas")
+        ok = False
+    if saved_sessions == 0 or second_stats['reanudadas'] < saved_sessions:
+        print("❌ Las subidas interrumpidas no se retomaron desde la sesión guardada")
+        ok = False
+    if extra_sessions > 1:
+        print("❌ Se abrieron sesiones nuevas en lugar de retomar las existentes")
+        ok = False
+    largest = max(os.path.getsize(item['ruta']) for item in items)
+    if sent > total_bytes + largest:
+        print("❌ Se reenviaron bytes ya confirmados (solo la copia corrupta debe repetirse)")
+        ok = False
+    if state.deleted != 1 or first_stats['md5_fallidos'] + second_stats['md5_fallidos'] != 1:
+        print("❌ La copia corrupta no se detectó por MD5")
+        ok = False
+    return ok
+
+
+def run_session_status_scenario(state: FakeDriveState, base_url: str, workdir: str) -> bool:
+    """Sesiones guardadas que no coinciden con lo guardado en base: se retoma desde lo que confirma Drive"""
+    chunk = 256 * 1024
+    engine, SessionLocal, queue, items = prepare_queue('st', 3, 4 * chunk, workdir)
+    session = SessionLocal()
+    task_ids = dict(session.query(UploadTask.ruta, UploadTask.id))
+    session.close()
+
+    def open_session(item, received):
+        with open(item['ruta'], 'rb') as f:
+            data = f.read()
+        with state.lock:
+            upload_id = str(next(state.counter))
+            state.sessions[upload_id] = {'metadata': {'name': item['nombre'], 'parents': ['carpeta_prueba']},
+                                         'data': bytearray(data[:received])}
+        return f"{base_url}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}", len(data)
+
+    # Dos fragmentos confirmados pero offset guardado 0; subida completa sin registrar; sesión caducada
+    lagging, finished, expired = items
+    for item, received in ((lagging, 2 * chunk), (finished, None)):
+        uri, size = open_session(item, received)
+        queue.save_session(task_ids[item['ruta']], uri, 0, size, file_md5(item['ruta']))
+    queue.save_session(task_ids[expired['ruta']], f"{base_url}/upload/drive/v3/files?uploadType=resumable&upload_id=caducada",
+                       chunk, os.path.getsize(expired['ruta']), file_md5(expired['ruta']))
+
+    sessions_before = state.sessions_created
+    stats = DriveUploadEngine(queue=queue, workers=1, service_factory=make_service_factory(base_url),
+                              folder_id='carpeta_prueba', chunk_size=chunk,
+                              backoff_base=0.05, backoff_max=0.5).run()
+    counts = queue.counts()
+    linked = count_linked(SessionLocal)
+    engine.dispose()
+
+    sizes = {item['nombre']: os.path.getsize(item['ruta']) for item in items}
+    expected_sent = sizes[lagging['nombre']] - 2 * chunk + sizes[expired['nombre']]
+    print(f"\n📊 Estado de sesiones guardadas: {stats['reanudadas']} retomadas, {stats['bytes_enviados']} bytes "
+          f"enviados (como mucho {expected_sent}), {state.sessions_created - sessions_before} sesiones nuevas, "
+          f"MD5 fallidos {stats['md5_fallidos']}  |  Cola: {counts}")
+
+    ok = True
+    if counts[DONE] != len(items) or linked != len(items) or stats['md5_fallidos']:
+        print("❌ Las subidas con sesión guardada no terminaron íntegras")
+        ok = False
+    if stats['reanudadas'] != 2 or stats['bytes_enviados'] > expected_sent:
+        print("❌ No se retomó desde el offset confirmado por Drive")
+        ok = False
+    if state.sessions_created - sessions_before != 1:
+        print("❌ Solo la sesión caducada debía abrirse de nuevo")
+        ok = False
+    return ok
+
+
+def run_dedup_scenario(state: FakeDriveState, base_url: str, workdir: str) -> bool:
+    """Copias con los mismos bytes: solo la primera se sube, el resto se enlaza al archivo existente"""
+    engine, SessionLocal, queue, items = prepare_queue('d', 6, 32 * 1024, workdir)
+    # Tres tesis con el contenido de la primera
+    for item in items[1:4]:
+        shutil.copyfile(items[0]['ruta'], item['ruta'])
+    # Una con el de un archivo de una subcarpeta de la raíz y otra con el de un archivo fuera de la raíz
+    subfolder = state.create_file({'name': 'subcarpeta', 'mimeType': FOLDER_MIME, 'parents': ['carpeta_prueba']},
+                                  b'')['id']
+    for item, parent in ((items[4], subfolder), (items[5], 'otra_carpeta')):
+        with open(item['ruta'], 'rb') as f:
+            state.create_file({'name': f"copia_{item['nombre']}", 'parents': [parent]}, f.read())
+    outside = next(file_id for file_id, info in state.files.items()
+                   if info['metadata'].get('parents') == ['otra_carpeta'])
+    files_before = len(state.files)
+    lists_before = state.list_requests
+
+    upload_engine = DriveUploadEngine(queue=queue, workers=1, service_factory=make_service_factory(base_url),
+                                      folder_id='carpeta_prueba', backoff_base=0.05, backoff_max=0.5)
+    stats = upload_engine.run()
+
+    counts = queue.counts()
+    linked = count_linked(SessionLocal)
+    session = SessionLocal()
+    shared = {row.google_drive_id for row in session.query(Tesis).filter(
+        Tesis.scjn_id.in_([item['scjn_id'] for item in items[:4]]))}
+    outside_linked = session.query(Tesis).filter(Tesis.google_drive_id == outside).count()
+    session.close()
+    engine.dispose()
+
+    uploaded = len(state.files) - files_before
+    print(f"\n📊 Deduplicación: {stats['deduplicados']} enlazadas sin subir, {uploaded} archivos nuevos en Drive, "
+          f"{state.list_requests - lists_before} listado(s) para el índice")
+    print(f"   Cola: {counts}  |  Tesis con enlace: {linked}")
+
+    ok = True
+    if counts[DONE] != len(items) or linked != len(items):
+        print(f"❌ Se esperaban {len(items)} subidas completadas y enlazadas")
+        ok = False
+    if stats['deduplicados'] != 4 or uploaded != 2 or len(shared) != 1:
+        print("❌ Las copias con el mismo contenido no se enlazaron al archivo existente")
+        ok = False
+    if outside_linked:
+        print("❌ Se enlazó un archivo fuera del árbol de la carpeta raíz")
+        ok = False
+    return ok
+
+
+def main():
+    """Función principal"""
+    print("🧪 === PRUEBA DEL MOTOR DE SUBIDAS (DRIVE FALSO) ===")
+
+    state = FakeDriveState()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"✅ Servidor Drive falso en {base_url}")
+
+    workdir = tempfile.mkdtemp(prefix="upload_engine_")
+    files = 40
+    ok = True
+
+    try:
+        results = {}
+        for workers in (1, 8):
+            stats, counts, linked = run_scenario(workers, files, base_url, workdir)
+            results[workers] = stats
+            print(f"\n📊 {workers} hilo(s): {stats['subidos']}/{files} subidos, {stats['reintentos']} reintentos, "
+                  f"{stats['archivos_por_minuto']:.0f} archivos/min")
+            print(f"   Cola: {counts}  |  Tesis con enlace: {linked}")
+
+            if counts[DONE] != files or linked != files:
+                print(f"❌ Se esperaban {files} subidas completadas y enlazadas")
+                ok = False
+            if stats['reintentos'] == 0:
+                print("❌ No se observaron reintentos pese a los errores inyectados")
+                ok = False
+
+        speedup = results[8]['archivos_por_minuto'] / max(results[1]['archivos_por_minuto'], 0.001)
+        print(f"\n⚡ Aceleración con 8 hilos: {speedup:.1f}x")
+        print(f"🧯 Errores transitorios inyectados: {state.faults}")
+
+        ok = run_resume_scenario(state, 12, base_url, workdir) and ok
+        ok = run_session_status_scenario(state, base_url, workdir) and ok
+        ok = run_dedup_scenario(state, base_url, workdir) and ok
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Prueba de la cola de trabajo distribuida con varios procesos contra una misma base SQLite en WAL
+- Tramos de registros alineados con los bloques del mapa de bits
+- Token de arrendamiento: un nodo cuyo arrendamiento venció no puede cerrar la tarea del siguiente
+- Tres procesos trabajadores; uno muere a mitad de un tramo sin liberarlo: su arrendamiento vence,
+  otro nodo retoma el tramo y cada tesis queda guardada exactamente una vez
+- Cupo global: las peticiones de todos los procesos juntos respetan la pausa de rate_gate
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BASE = 300 * 8192  # primer registro del bloque 300 del mapa de bits
+RANGES = [(BASE + 100, BASE + 3 * 8192)]
+CLUSTER = 200  # el sitio simulado solo tiene tesis al principio de cada bloque
+GLOBAL_DELAY = 0.004
+LEASE = 2.0
+
+
+def site_has(registro):
+    """Sitio simulado: una tesis cada 5 registros en los primeros CLUSTER de cada bloque"""
+    return registro % 8192 < CLUSTER and registro % 5 == 0
+
+
+def expected_hits():
+    return sum(1 for start, end in RANGES for registro in range(start, end) if site_has(registro))
+
+
+def worker(name, crash_after):
+    """Proceso trabajador: sonda simulada detrás de un RateController con el cupo global"""
+    from src.automation.registro_crawler import RegistroCrawler
+    from src.automation.work_queue import DistributedWorker, GlobalRateGate, WorkQueue
+    from src.scraper.rate_control import RateController
+
+    controller = RateController('registro.local', min_delay=0.0, initial_delay=0.0, max_concurrency=4,
+                                gate=GlobalRateGate('registro.local', delay=GLOBAL_DELAY))
+    requests = []
+
+    class FakeProbe:
+        def __call__(self, registro):
+            with controller.request():
+                requests.append(time.time())
+                if crash_after and len(requests) >= crash_after:
+                    # Proceso terminado sin liberar el arrendamiento ni guardar el punto de control
+                    os._exit(3)
+                time.sleep(0.001)
+            if not site_has(registro):
+                return None
+            return {'rubro': f"RUBRO {registro}", 'texto': f"Texto {registro}",
+                    'url': f"https://sjf2.scjn.gob.mx/detalle/tesis/{registro}"}
+
+    crawler = RegistroCrawler(FakeProbe, workers=2, gap_threshold=50, max_stride=4096)
+    node = DistributedWorker(WorkQueue(worker_id=name, lease_seconds=LEASE), crawler=crawler,
+                             heartbeat=LEASE / 4, poll=0.2, global_delay=0)
+    stats = node.run(deadline=time.time() + 120)
+    print(json.dumps({**stats, 'requests': requests}))
+    return 0
+
+
+def check_lease_token(WorkQueue):
+    """Un arrendamiento vencido y reasignado ya no es del primer nodo"""
+    first = WorkQueue(worker_id='lento', lease_seconds=0.2)
+    second = WorkQueue(worker_id='rapido', lease_seconds=30)
+    first.add([{'clave': 'prueba:token', 'tipo': 'prueba'}])
+    lease = first.claim(['prueba'])
+    blocked = second.claim(['prueba'])
+    time.sleep(0.3)
+    stolen = second.claim(['prueba'])
+    late_beat = first.heartbeat(lease)
+    late_done = first.complete(lease)
+    done = second.complete(stolen)
+    print(f"📊 Token: reclamo con arrendamiento vigente {blocked}, reasignada {stolen is not None}, "
+          f"latido tardío {late_beat}, cierre tardío {late_done}, cierre del nuevo dueño {done}")
+    return blocked is None and stolen is not None and not late_beat and not late_done and done
+
+
+def main():
+    """Función principal"""
+    if len(sys.argv) > 1 and sys.argv[1] == '--trabajador':
+        return worker(sys.argv[2], int(sys.argv[3]))
+
+    print("🧪 === PRUEBA DE LA COLA DE TRABAJO DISTRIBUIDA ===")
+    ok = True
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/distribuida.db")
+    os.environ['DATABASE_URL'] = env['DATABASE_URL']
+    try:
+        from src.database.models import Tesis, WorkItem, create_tables, get_session
+        from src.automation.work_queue import DONE, REGISTRO, WorkQueue, registro_tramos
+
+        create_tables()
+        tramos = registro_tramos(*RANGES[0])
+        print(f"\n📊 Tramos: {tramos}")
+        if tramos[0] != (BASE + 100, BASE + 8192) or any(end % 8192 for _, end in tramos):
+            print("❌ Tramos no alineados con los bloques del mapa de bits")
+            ok = False
+
+        if not check_lease_token(WorkQueue):
+            print("❌ Un nodo con el arrendamiento vencido pudo cerrar o renovar la tarea")
+            ok = False
+
+        queue = WorkQueue(worker_id='siembra')
+        seeded = queue.seed_registro_ranges(RANGES) + queue.seed_registro_ranges(RANGES)
+        if seeded != len(tramos):
+            print(f"❌ Siembra no idempotente: {seeded} tramos")
+            ok = False
+
+        begin = time.time()
+        crasher = subprocess.Popen([sys.executable, __file__, '--trabajador', 'caido', '60'], env=env,
+                                   stdout=subprocess.PIPE, text=True)
+        crasher.wait(timeout=60)
+        processes = [subprocess.Popen([sys.executable, __file__, '--trabajador', f"nodo-{n}", '0'], env=env,
+                                      stdout=subprocess.PIPE, text=True) for n in range(3)]
+        reports = []
+        for process in processes:
+            out, _ = process.communicate(timeout=180)
+            if process.returncode != 0 or not out.strip():
+                print(f"❌ Trabajador terminó con código {process.returncode}")
+                ok = False
+                continue
+            reports.append(json.loads(out.strip().splitlines()[-1]))
+        elapsed = time.time() - begin
+
+        session = get_session()
+        try:
+            rows = session.query(Tesis.scjn_id).all()
+            items = session.query(WorkItem).filter(WorkItem.tipo == REGISTRO).all()
+            states = {item.clave: (item.estado, item.intentos, item.nodo) for item in items}
+        finally:
+            session.close()
+
+        saved = sum(report['nuevas'] for report in reports)
+        print(f"📊 Trabajador caído: código {crasher.returncode}")
+        print(f"📊 Tramos: {states}")
+        print(f"📊 Tesis: {len(rows)} filas, {len({row[0] for row in rows})} distintas, esperadas {expected_hits()}; "
+              f"nuevas por nodo {[report['nuevas'] for report in reports]}, "
+              f"duplicadas {sum(report['duplicadas'] for report in reports)} ({elapsed:.1f}s)")
+        if crasher.returncode != 3:
+            print("❌ El trabajador simulado no murió a mitad del tramo")
+            ok = False
+        if any(estado != DONE for estado, _, _ in states.values()):
+            print("❌ Quedaron tramos sin terminar")
+            ok = False
+        if not any(intentos >= 2 and nodo != 'caido' for _, intentos, nodo in states.values()):
+            print("❌ El tramo del trabajador caído no se reasignó a otro nodo")
+            ok = False
+        # Lo que el trabajador caído guardó antes de morir más lo de los demás: cada tesis una vez
+        if len(rows) != expected_hits() or len({row[0] for row in rows}) != len(rows) or saved > len(rows):
+            print("❌ Las tesis no quedaron guardadas exactamente una vez")
+            ok = False
+
+        stamps = sorted(stamp for report in reports for stamp in report['requests'])
+        if len(stamps) > 1:
+            spacing = (stamps[-1] - stamps[0]) / (len(stamps) - 1)
+            print(f"📊 Cupo global: {len(stamps)} peticiones de {len(reports)} procesos, "
+                  f"{spacing * 1000:.1f} ms de media entre peticiones (pausa {GLOBAL_DELAY * 1000:.0f} ms)")
+            if spacing < GLOBAL_DELAY * 0.95:
+                print("❌ Los procesos juntos superaron el cupo global de peticiones")
+                ok = False
+        if len({report['nodo'] for report in reports if report['completadas']}) < 2:
+            print("❌ El trabajo no se repartió entre varios procesos")
+            ok = False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ Prueba superada" if ok else "\n❌ Prueba fallida")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,7 +24,9 @@ def upload_existing_pdfs():
     
     try:
         from src.database.models import Tesis, get_session
+        from src.database.streaming import count_rows, iter_chunks
         from src.storage.google_drive import GoogleDriveManager
+        from src.storage.upload_queue import UploadQueue, DriveUploadEngine
         
         # Verificar configuración de Google Drive
         gdrive = GoogleDriveManager()
@@ -40,87 +42,54 @@ def upload_existing_pdfs():
             print("❌ Directorio de PDFs no encontrado")
             return False
         
-        pdf_files = list(pdfs_dir.glob("tesis_*.pdf"))
-        print(f"📊 PDFs encontrados: {len(pdf_files)}")
+        total_pdfs = sum(1 for _ in pdfs_dir.glob("tesis_*.pdf"))
+        print(f"📊 PDFs encontrados: {total_pdfs}")
         
-        if not pdf_files:
+        if not total_pdfs:
             print("❌ No se encontraron PDFs para subir")
             return False
         
-        # Mostrar PDFs encontrados
-        for pdf_file in pdf_files:
-            print(f"  📄 {pdf_file.name}")
-        
-        # Obtener tesis sin PDF en Google Drive
+        # Recorrer por trozos las tesis sin PDF en Google Drive y encolar las que tienen PDF local
+        queue = UploadQueue()
+        task_ids = []
+        error_count = 0
+        sin_pdf = Tesis.google_drive_link.is_(None)
         session = get_session()
-        tesis_sin_pdf = session.query(Tesis).filter(Tesis.google_drive_link.is_(None)).all()
-        session.close()
+        try:
+            print(f"📊 Tesis sin PDF en Drive: {count_rows(session, Tesis.id, filters=[sin_pdf])}")
+            
+            for chunk in iter_chunks(session, Tesis.id, Tesis.scjn_id, Tesis.titulo, filters=[sin_pdf]):
+                items = []
+                for tesis_id, scjn_id, titulo in chunk:
+                    pdf_file = pdfs_dir / f"tesis_{scjn_id}.pdf"
+                    if not pdf_file.exists():
+                        continue
+                    
+                    safe_title = (titulo or '')[:50].replace('/', '_').replace(':', '_').replace('\\', '_')
+                    items.append({
+                        'ruta': str(pdf_file),
+                        'nombre': f"Tesis_{scjn_id}_{safe_title}.pdf",
+                        'tesis_id': tesis_id,
+                        'scjn_id': scjn_id
+                    })
+                if items:
+                    task_ids.extend(queue.enqueue_many(items))
+        finally:
+            session.close()
         
-        print(f"📊 Tesis sin PDF en Drive: {len(tesis_sin_pdf)}")
+        if not task_ids:
+            print("✅ Todos los PDFs locales ya tienen enlace de Google Drive")
+            return True
         
-        # Procesar PDFs existentes
-        success_count = 0
-        error_count = 0
+        print(f"📥 PDFs encolados para subir: {len(task_ids)}")
         
-        for pdf_file in pdf_files:
-            # Extraer ID de tesis del nombre del archivo
-            filename = pdf_file.name
-            if filename.startswith("tesis_") and filename.endswith(".pdf"):
-                tesis_id = filename[6:-4]  # Remover "tesis_" y ".pdf"
-                
-                print(f"\n📄 Procesando: {filename}")
-                print(f"  🆔 ID de tesis: {tesis_id}")
-                
-                # Buscar tesis en la base de datos
-                session = get_session()
-                tesis = session.query(Tesis).filter(Tesis.scjn_id == tesis_id).first()
-                session.close()
-                
-                if not tesis:
-                    print(f"  ❌ Tesis {tesis_id} no encontrada en la base de datos")
-                    error_count += 1
-                    continue
-                
-                print(f"  📝 Título: {tesis.titulo[:50]}...")
-                
-                # Verificar si ya tiene enlace de Google Drive
-                if tesis.google_drive_link:
-                    print(f"  ✅ Ya tiene enlace de Google Drive")
-                    continue
-                
-                try:
-                    # Subir a Google Drive
-                    print(f"  ☁️ Subiendo a Google Drive...")
-                    
-                    # Generar nombre del archivo
-                    safe_title = tesis.titulo[:50].replace('/', '_').replace(':', '_').replace('\\', '_')
-                    filename = f"Tesis_{tesis.scjn_id}_{safe_title}.pdf"
-                    
-                    result = gdrive.upload_file(str(pdf_file), filename)
-                    
-                    if result:
-                        file_id, web_link = result
-                        print(f"  ✅ Subido exitosamente")
-                        print(f"  🔗 Enlace: {web_link}")
-                        
-                        # Actualizar base de datos
-                        session = get_session()
-                        tesis_db = session.query(Tesis).filter(Tesis.id == tesis.id).first()
-                        if tesis_db:
-                            tesis_db.google_drive_id = file_id
-                            tesis_db.google_drive_link = web_link
-                            session.commit()
-                            print(f"  💾 Base de datos actualizada")
-                        session.close()
-                        
-                        success_count += 1
-                    else:
-                        print(f"  ❌ Error subiendo a Google Drive")
-                        error_count += 1
-                    
-                except Exception as e:
-                    print(f"  ❌ Error procesando {filename}: {e}")
-                    error_count += 1
+        # Subir en paralelo; los enlaces se escriben en la base de datos por lotes
+        engine = DriveUploadEngine(queue=queue, folder_id=gdrive.folder_id)
+        stats = engine.run(task_ids=task_ids)
+        
+        success_count = stats['subidos']
+        error_count += stats['fallidos']
+        print(f"⏱️ Throughput: {stats['archivos_por_minuto']:.1f} archivos/min ({stats['reintentos']} reintentos)")
         
         print(f"\n📊 Resumen:")
         print(f"✅ PDFs subidos exitosamente: {success_count}")
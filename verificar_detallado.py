@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Script de verificación detallada del sistema de scraping SCJN
-Incluye verificación de entorno virtual, configuración, estructura y importaciones
+Incluye verificación de entorno virtual, configuración, estructura, importaciones
+y enlaces de Google Drive (consultas por lotes)
 """
 
 import os
@@ -291,6 +292,41 @@ def verificar_logs_recientes():
     
     return True
 
+def verificar_enlaces_drive(limite=1000):
+    """Verificar en lotes que los google_drive_id de la base de datos existen en Drive"""
+    print("\n☁️ VERIFICACIÓN DE ENLACES DE GOOGLE DRIVE")
+    print("=" * 40)
+    
+    try:
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        
+        from src.config import Config
+        if not Config.GOOGLE_DRIVE_ENABLED:
+            print("⚠️  Google Drive deshabilitado, se omite")
+            return True
+        
+        from src.storage.google_drive import GoogleDriveManager
+        from src.storage.drive_batch import DriveBatcher, verify_drive_links
+        
+        gdrive = GoogleDriveManager()
+        gdrive.authenticate()
+        
+        # 100 archivos por petición HTTP en lugar de una petición por archivo
+        summary = verify_drive_links(DriveBatcher(gdrive.service), limit=limite)
+        print(f"✅ Enlaces correctos: {summary['ok']}/{summary['revisadas']} "
+              f"({summary['peticiones_http']} peticiones HTTP)")
+        if summary['faltantes'] or summary['en_papelera']:
+            print(f"  ❌ Faltantes: {summary['faltantes']}  🗑️ En papelera: {summary['en_papelera']}")
+            print("  💡 Ejecutar: python3 reconciliar_drive.py --limpiar")
+        if summary['errores']:
+            print(f"  ⚠️  Errores de consulta: {summary['errores']}")
+        
+        return summary['faltantes'] + summary['en_papelera'] + summary['errores'] == 0
+    except Exception as e:
+        print(f"❌ Error verificando enlaces de Google Drive: {e}")
+        return False
+
 def verificar_servicios():
     """Verificar servicios del sistema"""
     print("\n🔍 VERIFICACIÓN DE SERVICIOS")
@@ -343,6 +379,7 @@ def main():
     resultados.append(("Estructura código", verificar_estructura_codigo()))
     resultados.append(("Importaciones", probar_importaciones()))
     resultados.append(("Base de datos", verificar_base_datos()))
+    resultados.append(("Enlaces Google Drive", verificar_enlaces_drive()))
     resultados.append(("Scripts de prueba", ejecutar_scripts_prueba()))
     resultados.append(("Logs recientes", verificar_logs_recientes()))
     resultados.append(("Servicios", verificar_servicios()))